@@ -0,0 +1,820 @@
+"""
+This file defines the FakeDockerDaemon which serves the subset of the Docker Engine API that wedpy uses from an
+in-process HTTP server. Every call can be given a latency so wedpy can be benchmarked at scale without a real
+docker daemon, and every call is counted so changes in the number of API calls can be compared as well as time.
+
+Usage:
+    with FakeDockerDaemon(latencies={"build": 0.2, "pull": 0.05}) as daemon:
+        os.environ["DOCKER_HOST"] = daemon.base_url
+"""
+import hashlib
+import io
+import json
+import queue
+import re
+import tarfile
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+class FakeDockerError(Exception):
+    """
+    The FakeDockerError is raised by a route to return an Engine API error response.
+
+    Attributes:
+        status (int): the HTTP status code of the response
+        message (str): the error message returned to the client
+    """
+    def __init__(self, status: int, message: str) -> None:
+        """
+        The constructor for the FakeDockerError class.
+
+        :param status: the HTTP status code of the response
+        :param message: the error message returned to the client
+        """
+        super().__init__(message)
+        self.status: int = status
+        self.message: str = message
+
+
+def new_id() -> str:
+    """
+    Creates a random 64 character ID like the ones docker uses for images, containers and networks.
+
+    :return: the ID
+    """
+    return hashlib.sha256(uuid.uuid4().bytes).hexdigest()
+
+
+def normalise_reference(reference: str) -> str:
+    """
+    Adds the latest tag to an image reference that has no tag.
+
+    :param reference: the image reference, for example "postgres" or "postgres:15"
+    :return: the image reference with a tag
+    """
+    if "@" in reference or ":" in reference.rsplit("/", 1)[-1]:
+        return reference
+    return f"{reference}:latest"
+
+
+# the operations reported on the events stream once they finish, with the type of object they change
+EVENT_TYPES: Dict[str, str] = {
+    "build": "image", "pull": "image", "image_load": "image", "image_tag": "image", "image_remove": "image",
+    "container_create": "container", "container_start": "container", "container_stop": "container",
+    "container_pause": "container", "container_unpause": "container", "container_remove": "container",
+}
+
+
+class FakeDockerDaemon:
+    """
+    The FakeDockerDaemon class serves a fake Docker Engine API from a thread in this process.
+
+    Attributes:
+        latencies (Dict[str, float]): seconds to sleep before answering each kind of call, keyed by the operation
+                                      names in calls
+        exiting_images (Set[str]): image references whose containers exit straight after starting, like init jobs
+        failing_operations (Set[str]): operations that answer with a server error, to test failure handling
+        calls (Counter): the number of calls made for each operation
+        images (Dict[str, dict]): the images known to the daemon keyed by image ID
+        containers (Dict[str, dict]): the containers known to the daemon keyed by container ID
+        networks (Dict[str, dict]): the networks known to the daemon keyed by network ID
+        volumes (Dict[str, dict]): the named volumes known to the daemon keyed by name
+        volume_files (Dict[str, Dict[str, bytes]]): the files in each named volume keyed by their path in the volume
+        logs (Dict[str, List[Tuple[str, bytes]]]): the stream and data of every write of each container keyed by
+                                                   container ID
+        subscribers (List[queue.Queue]): the queues of the open events streams
+        registry (Dict[str, str]): the digest of every image pushed, keyed by the reference it was pushed to
+        registry_layers (Set[str]): the layers the registry already has
+    """
+    def __init__(self, latencies: Optional[Dict[str, float]] = None,
+                 exiting_images: Optional[Iterable[str]] = None,
+                 failing_operations: Optional[Iterable[str]] = None) -> None:
+        """
+        The constructor for the FakeDockerDaemon class.
+
+        :param latencies: seconds to sleep before answering each kind of call
+        :param exiting_images: image references whose containers exit straight after starting
+        :param failing_operations: operations that answer with a server error
+        """
+        self.latencies: Dict[str, float] = {} if latencies is None else dict(latencies)
+        self.exiting_images: Set[str] = {normalise_reference(i) for i in (exiting_images or [])}
+        self.failing_operations: Set[str] = set(failing_operations or [])
+        self.calls: Counter = Counter()
+        self.images: Dict[str, dict] = {}
+        self.containers: Dict[str, dict] = {}
+        self.networks: Dict[str, dict] = {}
+        self.volumes: Dict[str, dict] = {}
+        self.volume_files: Dict[str, Dict[str, bytes]] = {}
+        self.logs: Dict[str, List[Tuple[str, bytes]]] = {}
+        self.subscribers: List[queue.Queue] = []
+        self.registry: Dict[str, str] = {}
+        self.registry_layers: Set[str] = set()
+        self.lock = threading.RLock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.routes: List[Tuple[str, "re.Pattern", str, Callable]] = [
+            ("GET", re.compile(r"^/_ping$"), "ping", self.ping),
+            ("HEAD", re.compile(r"^/_ping$"), "ping", self.ping),
+            ("GET", re.compile(r"^/version$"), "version", self.version),
+            ("GET", re.compile(r"^/info$"), "info", self.info),
+            ("GET", re.compile(r"^/events$"), "events", self.events),
+            ("POST", re.compile(r"^/build$"), "build", self.build),
+            ("POST", re.compile(r"^/images/create$"), "pull", self.pull),
+            ("GET", re.compile(r"^/images/json$"), "image_list", self.list_images),
+            ("POST", re.compile(r"^/images/load$"), "image_load", self.load_image),
+            ("GET", re.compile(r"^/images/(?P<name>.+)/get$"), "image_save", self.save_image),
+            ("GET", re.compile(r"^/images/(?P<name>.+)/json$"), "image_inspect", self.inspect_image),
+            ("POST", re.compile(r"^/images/(?P<name>.+)/tag$"), "image_tag", self.tag_image),
+            ("POST", re.compile(r"^/images/(?P<name>.+)/push$"), "image_push", self.push_image),
+            ("DELETE", re.compile(r"^/images/(?P<name>.+)$"), "image_remove", self.remove_image),
+            ("POST", re.compile(r"^/containers/create$"), "container_create", self.create_container),
+            ("GET", re.compile(r"^/containers/json$"), "container_list", self.list_containers),
+            ("GET", re.compile(r"^/containers/(?P<name>[^/]+)/json$"), "container_inspect",
+             self.inspect_container),
+            ("POST", re.compile(r"^/containers/(?P<name>[^/]+)/start$"), "container_start", self.start_container),
+            ("POST", re.compile(r"^/containers/(?P<name>[^/]+)/stop$"), "container_stop", self.stop_container),
+            ("POST", re.compile(r"^/containers/(?P<name>[^/]+)/kill$"), "container_stop", self.stop_container),
+            ("POST", re.compile(r"^/containers/(?P<name>[^/]+)/wait$"), "container_wait", self.wait_container),
+            ("POST", re.compile(r"^/containers/(?P<name>[^/]+)/pause$"), "container_pause", self.pause_container),
+            ("POST", re.compile(r"^/containers/(?P<name>[^/]+)/unpause$"), "container_unpause",
+             self.unpause_container),
+            ("GET", re.compile(r"^/containers/(?P<name>[^/]+)/logs$"), "container_logs", self.container_logs),
+            ("GET", re.compile(r"^/containers/(?P<name>[^/]+)/archive$"), "archive_get", self.get_archive),
+            ("PUT", re.compile(r"^/containers/(?P<name>[^/]+)/archive$"), "archive_put", self.put_archive),
+            ("DELETE", re.compile(r"^/containers/(?P<name>[^/]+)$"), "container_remove", self.remove_container),
+            ("GET", re.compile(r"^/networks$"), "network_list", self.list_networks),
+            ("POST", re.compile(r"^/networks/create$"), "network_create", self.create_network),
+            ("POST", re.compile(r"^/networks/(?P<name>[^/]+)/connect$"), "network_connect", self.connect_network),
+            ("POST", re.compile(r"^/networks/(?P<name>[^/]+)/disconnect$"), "network_disconnect",
+             self.disconnect_network),
+            ("GET", re.compile(r"^/networks/(?P<name>[^/]+)$"), "network_inspect", self.inspect_network),
+            ("DELETE", re.compile(r"^/networks/(?P<name>[^/]+)$"), "network_remove", self.remove_network),
+            ("GET", re.compile(r"^/volumes$"), "volume_list", self.list_volumes),
+            ("POST", re.compile(r"^/volumes/create$"), "volume_create", self.create_volume),
+            ("GET", re.compile(r"^/volumes/(?P<name>[^/]+)$"), "volume_inspect", self.inspect_volume),
+            ("DELETE", re.compile(r"^/volumes/(?P<name>[^/]+)$"), "volume_remove", self.remove_volume),
+        ]
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"tcp://{host}:{port}"
+
+    def start(self) -> "FakeDockerDaemon":
+        """
+        Starts serving the API on a free port on localhost.
+
+        :return: the daemon
+        """
+        daemon = self
+
+        class Handler(FakeDockerHandler):
+            fake = daemon
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-docker", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops serving the API.
+
+        :return: None
+        """
+        with self.lock:
+            for subscriber in self.subscribers:
+                subscriber.put(None)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeDockerDaemon":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def dispatch(self, method: str, path: str) -> Tuple[str, Callable, dict]:
+        """
+        Finds the route for a request.
+
+        :param method: the HTTP method of the request
+        :param path: the path of the request without the API version prefix
+        :return: the operation name, the route and the path parameters
+        """
+        for route_method, pattern, operation, route in self.routes:
+            if route_method != method:
+                continue
+            match = pattern.match(path)
+            if match is not None:
+                return operation, route, {k: unquote(v) for k, v in match.groupdict().items()}
+        raise FakeDockerError(404, f"page not found: {method} {path}")
+
+    # lookups
+
+    def find_image(self, reference: str) -> dict:
+        with self.lock:
+            if reference in self.images:
+                return self.images[reference]
+            for image in self.images.values():
+                if image["Id"] == reference or image["Id"][7:].startswith(reference.replace("sha256:", "")):
+                    return image
+                if normalise_reference(reference) in image["RepoTags"]:
+                    return image
+        raise FakeDockerError(404, f"No such image: {reference}")
+
+    def find_container(self, name: str) -> dict:
+        with self.lock:
+            if name in self.containers:
+                return self.containers[name]
+            for container in self.containers.values():
+                if container["Name"] == f"/{name}" or container["Id"].startswith(name):
+                    return container
+        raise FakeDockerError(404, f"No such container: {name}")
+
+    def find_network(self, name: str) -> dict:
+        with self.lock:
+            for network in self.networks.values():
+                if network["Id"] == name or network["Name"] == name or network["Id"].startswith(name):
+                    return network
+        raise FakeDockerError(404, f"network {name} not found")
+
+    def find_volume(self, name: str) -> dict:
+        with self.lock:
+            if name in self.volumes:
+                return self.volumes[name]
+        raise FakeDockerError(404, f"get {name}: no such volume")
+
+    def find_mount(self, container: dict, path: str) -> str:
+        for mount in container["Mounts"]:
+            if mount["Destination"].rstrip("/") == path.rstrip("/"):
+                return mount["Name"]
+        raise FakeDockerError(404, f"Could not find the file {path} in container {container['Name'].lstrip('/')}")
+
+    def add_volume(self, name: str, labels: Optional[dict] = None) -> dict:
+        """
+        Adds a named volume to the daemon, returning the existing one if the name is taken as docker does.
+
+        :param name: the name of the volume
+        :param labels: the labels of the volume
+        :return: the volume
+        """
+        with self.lock:
+            if name not in self.volumes:
+                self.volumes[name] = {"Name": name, "Driver": "local", "Labels": labels or {}, "Scope": "local",
+                                      "Mountpoint": f"/var/lib/docker/volumes/{name}/_data", "Options": {}}
+                self.volume_files[name] = {}
+            return self.volumes[name]
+
+    def add_logs(self, name: str, lines: Iterable[str], stream: str = "stdout") -> None:
+        """
+        Adds lines to the logs of a container.
+
+        :param name: the name or ID of the container
+        :param lines: the lines written by the container
+        :param stream: the stream the lines were written to, stdout or stderr
+        :return: None
+        """
+        container = self.find_container(name)
+        with self.lock:
+            self.logs.setdefault(container["Id"], []).extend([(stream, f"{line}\n".encode()) for line in lines])
+
+    def publish(self, kind: str, action: str) -> None:
+        """
+        Sends an event to every open events stream.
+
+        :param kind: the type of object that changed, such as container or image
+        :param action: the operation that changed it
+        :return: None
+        """
+        event = {"Type": kind, "Action": action, "time": int(time.time())}
+        with self.lock:
+            for subscriber in self.subscribers:
+                subscriber.put(event)
+
+    def add_image(self, reference: str, labels: Optional[dict] = None, size: int = 1024) -> dict:
+        """
+        Adds an image to the daemon, moving the tag from any image that already has it.
+
+        :param reference: the image reference to tag the image with
+        :param labels: the labels of the image
+        :param size: the size of the image in bytes
+        :return: the image
+        """
+        tag = normalise_reference(reference)
+        image_id = f"sha256:{new_id()}"
+        image = {"Id": image_id, "RepoTags": [tag], "RepoDigests": [], "Created": int(time.time()),
+                 "Size": size, "Config": {"Labels": labels or {}}, "Labels": labels or {}}
+        with self.lock:
+            for other in self.images.values():
+                if tag in other["RepoTags"]:
+                    other["RepoTags"].remove(tag)
+            self.images[image_id] = image
+        self.publish("image", "tag")
+        return image
+
+    # routes
+
+    def ping(self, request: "FakeDockerHandler", **_) -> str:
+        return "OK"
+
+    def events(self, request: "FakeDockerHandler", **_) -> Iterable[dict]:
+        subscriber: queue.Queue = queue.Queue()
+        with self.lock:
+            self.subscribers.append(subscriber)
+
+        def stream() -> Iterable[dict]:
+            try:
+                while True:
+                    event = subscriber.get()
+                    if event is None:
+                        return
+                    yield event
+            finally:
+                with self.lock:
+                    self.subscribers.remove(subscriber)
+        return stream()
+
+    def version(self, request: "FakeDockerHandler", **_) -> dict:
+        return {"Version": "fake", "ApiVersion": "1.41", "MinAPIVersion": "1.12", "Os": "linux", "Arch": "amd64"}
+
+    def info(self, request: "FakeDockerHandler", **_) -> dict:
+        with self.lock:
+            running = sum(1 for c in self.containers.values() if c["State"]["Running"])
+            return {"ID": "fake", "NCPU": 4, "MemTotal": 8 * 1024 ** 3, "Containers": len(self.containers),
+                    "ContainersRunning": running, "Images": len(self.images), "Architecture": "x86_64"}
+
+    def build(self, request: "FakeDockerHandler", **_) -> Iterable[dict]:
+        tag = request.query.get("t", [None])[0]
+        dockerfile = request.query.get("dockerfile", ["Dockerfile"])[0]
+        labels = json.loads(request.query.get("labels", ["{}"])[0])
+        instructions = ["FROM scratch"]
+        try:
+            with tarfile.open(fileobj=io.BytesIO(request.body)) as context:
+                member = context.extractfile(dockerfile)
+                if member is not None:
+                    instructions = [line.strip() for line in member.read().decode().splitlines()
+                                    if line.strip() and not line.strip().startswith("#")]
+        except (KeyError, tarfile.TarError):
+            yield {"error": f"Cannot locate specified Dockerfile: {dockerfile}",
+                   "errorDetail": {"message": f"Cannot locate specified Dockerfile: {dockerfile}"}}
+            return
+        for index, instruction in enumerate(instructions):
+            yield {"stream": f"Step {index + 1}/{len(instructions)} : {instruction}\n"}
+        image = self.add_image(tag if tag is not None else f"sha256:{new_id()}", labels=labels,
+                               size=len(request.body))
+        yield {"aux": {"ID": image["Id"]}}
+        yield {"stream": f"Successfully built {image['Id'][7:19]}\n"}
+        if tag is not None:
+            yield {"stream": f"Successfully tagged {normalise_reference(tag)}\n"}
+
+    def pull(self, request: "FakeDockerHandler", **_) -> Iterable[dict]:
+        repository = request.query.get("fromImage", [""])[0]
+        tag = request.query.get("tag", ["latest"])[0] or "latest"
+        reference = f"{repository}:{tag}" if "@" not in tag else f"{repository}{tag}"
+        yield {"status": f"Pulling from {repository}", "id": tag}
+        self.add_image(reference)
+        yield {"status": f"Status: Downloaded newer image for {reference}"}
+
+    def list_images(self, request: "FakeDockerHandler", **_) -> List[dict]:
+        with self.lock:
+            return [dict(image) for image in self.images.values()]
+
+    def inspect_image(self, request: "FakeDockerHandler", name: str) -> dict:
+        return self.find_image(name)
+
+    def tag_image(self, request: "FakeDockerHandler", name: str) -> Tuple[int, None]:
+        image = self.find_image(name)
+        repo = request.query.get("repo", [""])[0]
+        tag = request.query.get("tag", ["latest"])[0] or "latest"
+        reference = f"{repo}:{tag}"
+        with self.lock:
+            for other in self.images.values():
+                if reference in other["RepoTags"]:
+                    other["RepoTags"].remove(reference)
+            image["RepoTags"].append(reference)
+        return 201, None
+
+    def push_image(self, request: "FakeDockerHandler", name: str) -> Iterable[dict]:
+        tag = request.query.get("tag", ["latest"])[0] or "latest"
+        reference = f"{name}:{tag}"
+        try:
+            image = self.find_image(reference)
+        except FakeDockerError:
+            yield {"error": f"An image does not exist locally with the tag: {name}",
+                   "errorDetail": {"message": f"An image does not exist locally with the tag: {name}"}}
+            return
+        yield {"status": f"The push refers to repository [{name}]"}
+        # every image is one layer, so pushing the same image again finds the layer in the registry
+        layer = image["Id"][7:19]
+        with self.lock:
+            exists = layer in self.registry_layers
+        if exists is True:
+            yield {"status": "Layer already exists", "progressDetail": {}, "id": layer}
+        else:
+            yield {"status": "Preparing", "progressDetail": {}, "id": layer}
+            current = 0
+            while True:
+                current = min(current + 64 * 1024, image["Size"])
+                yield {"status": "Pushing", "progressDetail": {"current": current, "total": image["Size"]},
+                       "id": layer}
+                if current >= image["Size"]:
+                    break
+            yield {"status": "Pushed", "progressDetail": {}, "id": layer}
+        digest = "sha256:" + hashlib.sha256(image["Id"].encode()).hexdigest()
+        with self.lock:
+            self.registry_layers.add(layer)
+            self.registry[normalise_reference(reference)] = digest
+        yield {"status": f"{tag}: digest: {digest} size: 528"}
+        yield {"progressDetail": {}, "aux": {"Tag": tag, "Digest": digest, "Size": 528}}
+
+    def save_image(self, request: "FakeDockerHandler", name: str) -> Iterable[bytes]:
+        image = self.find_image(name)
+        config_name = f"{image['Id'][7:]}.json"
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode="w") as tar:
+            files = {
+                "manifest.json": json.dumps([{"Config": config_name, "RepoTags": image["RepoTags"],
+                                              "Layers": ["layer.tar"]}]).encode(),
+                config_name: json.dumps({"config": image["Config"]}).encode(),
+                "layer.tar": bytes(image["Size"]),
+            }
+            for filename, data in files.items():
+                info = tarfile.TarInfo(filename)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        data = archive.getvalue()
+        for offset in range(0, len(data), 64 * 1024):
+            yield data[offset:offset + 64 * 1024]
+
+    def load_image(self, request: "FakeDockerHandler", **_) -> Iterable[dict]:
+        try:
+            with tarfile.open(fileobj=io.BytesIO(request.body)) as tar:
+                manifest = json.load(tar.extractfile("manifest.json"))
+                for entry in manifest:
+                    config = json.load(tar.extractfile(entry["Config"]))
+                    layer_size = sum(tar.getmember(layer).size for layer in entry.get("Layers", []))
+                    labels = config.get("config", {}).get("Labels") or {}
+                    for tag in entry["RepoTags"]:
+                        self.add_image(tag, labels=labels, size=layer_size)
+                        yield {"stream": f"Loaded image: {tag}\n"}
+        except (KeyError, tarfile.TarError, json.JSONDecodeError) as e:
+            yield {"error": f"invalid image archive: {e}", "errorDetail": {"message": str(e)}}
+
+    def remove_image(self, request: "FakeDockerHandler", name: str) -> List[dict]:
+        image = self.find_image(name)
+        with self.lock:
+            self.images.pop(image["Id"], None)
+        return [{"Untagged": tag} for tag in image["RepoTags"]] + [{"Deleted": image["Id"]}]
+
+    def create_container(self, request: "FakeDockerHandler", **_) -> Tuple[int, dict]:
+        name = request.query.get("name", [None])[0]
+        spec = request.json()
+        image = self.find_image(spec["Image"])
+        host_config = spec.get("HostConfig") or {}
+        with self.lock:
+            if name is not None and any(c["Name"] == f"/{name}" for c in self.containers.values()):
+                raise FakeDockerError(409, f'Conflict. The container name "/{name}" is already in use')
+            container_id = new_id()
+            network_mode = host_config.get("NetworkMode") or "default"
+            endpoints = (spec.get("NetworkingConfig") or {}).get("EndpointsConfig") or {}
+            mounts = []
+            for bind in host_config.get("Binds") or []:
+                source, destination = bind.split(":")[:2]
+                if not source.startswith("/"):
+                    self.add_volume(source)
+                    mounts.append({"Type": "volume", "Name": source, "Destination": destination})
+            self.containers[container_id] = {
+                "Id": container_id,
+                "Name": f"/{name if name is not None else container_id[:12]}",
+                "Image": image["Id"],
+                "Created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "Config": {"Image": spec["Image"], "Env": spec.get("Env") or [],
+                           "Labels": spec.get("Labels") or {}, "Cmd": spec.get("Cmd"), "Tty": bool(spec.get("Tty"))},
+                "HostConfig": host_config,
+                "State": {"Status": "created", "Running": False, "ExitCode": 0,
+                          "StartedAt": "0001-01-01T00:00:00Z", "FinishedAt": "0001-01-01T00:00:00Z"},
+                "NetworkSettings": {"Networks": {network_mode: endpoints.get(network_mode) or {}}, "Ports": {}},
+                "Mounts": mounts,
+            }
+        return 201, {"Id": container_id, "Warnings": []}
+
+    def _container_summary(self, container: dict) -> dict:
+        state = container["State"]
+        return {
+            "Id": container["Id"],
+            "Names": [container["Name"]],
+            "Image": container["Config"]["Image"],
+            "ImageID": container["Image"],
+            "Labels": container["Config"]["Labels"],
+            "State": state["Status"],
+            "Status": f"Exited ({state['ExitCode']})" if state["Status"] == "exited" else state["Status"],
+            "Ports": [
+                {"PrivatePort": int(port.split("/")[0]), "Type": port.split("/")[1],
+                 "IP": binding.get("HostIp", ""), "PublicPort": int(binding["HostPort"])}
+                for port, bindings in (container["HostConfig"].get("PortBindings") or {}).items()
+                for binding in (bindings or []) if binding.get("HostPort")
+            ],
+            "NetworkSettings": container["NetworkSettings"],
+        }
+
+    def list_containers(self, request: "FakeDockerHandler", **_) -> List[dict]:
+        show_all = request.query.get("all", ["0"])[0] in ("1", "true", "True")
+        filters = json.loads(request.query.get("filters", ["{}"])[0])
+        results = []
+        with self.lock:
+            for container in self.containers.values():
+                if show_all is False and container["State"]["Running"] is False:
+                    continue
+                if not self._matches(container, filters):
+                    continue
+                results.append(self._container_summary(container))
+        return results
+
+    def _matches(self, container: dict, filters: dict) -> bool:
+        labels = container["Config"]["Labels"]
+        for name in filters.get("name", []):
+            if name.lstrip("/") not in container["Name"]:
+                return False
+        for label in filters.get("label", []):
+            key, _, value = label.partition("=")
+            if key not in labels or (value and labels[key] != value):
+                return False
+        for network in filters.get("network", []):
+            if network not in container["NetworkSettings"]["Networks"]:
+                return False
+        for status in filters.get("status", []):
+            if container["State"]["Status"] != status:
+                return False
+        return True
+
+    def inspect_container(self, request: "FakeDockerHandler", name: str) -> dict:
+        return self.find_container(name)
+
+    def start_container(self, request: "FakeDockerHandler", name: str) -> Tuple[int, None]:
+        container = self.find_container(name)
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        with self.lock:
+            bindings = container["HostConfig"].get("PortBindings") or {}
+            container["NetworkSettings"]["Ports"] = bindings
+            container["State"].update({"Status": "running", "Running": True, "StartedAt": now})
+            if container["Config"]["Image"] in self.exiting_images or \
+                    normalise_reference(container["Config"]["Image"]) in self.exiting_images:
+                container["State"].update({"Status": "exited", "Running": False, "ExitCode": 0, "FinishedAt": now})
+        return 204, None
+
+    def stop_container(self, request: "FakeDockerHandler", name: str) -> Tuple[int, None]:
+        container = self.find_container(name)
+        with self.lock:
+            if container["State"]["Running"] is True:
+                container["State"].update({
+                    "Status": "exited", "Running": False, "ExitCode": 143,
+                    "FinishedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+                })
+        return 204, None
+
+    def wait_container(self, request: "FakeDockerHandler", name: str) -> dict:
+        container = self.find_container(name)
+        return {"StatusCode": container["State"]["ExitCode"], "Error": None}
+
+    def pause_container(self, request: "FakeDockerHandler", name: str) -> Tuple[int, None]:
+        container = self.find_container(name)
+        with self.lock:
+            container["State"]["Paused"] = True
+        return 204, None
+
+    def unpause_container(self, request: "FakeDockerHandler", name: str) -> Tuple[int, None]:
+        container = self.find_container(name)
+        with self.lock:
+            container["State"]["Paused"] = False
+        return 204, None
+
+    def container_logs(self, request: "FakeDockerHandler", name: str) -> Iterable[bytes]:
+        container = self.find_container(name)
+        with self.lock:
+            logs = list(self.logs.get(container["Id"], []))
+        for stream, data in logs:
+            # the frames of the multiplexed stream of a container without a TTY
+            yield bytes([2 if stream == "stderr" else 1, 0, 0, 0]) + len(data).to_bytes(4, "big") + data
+
+    def get_archive(self, request: "FakeDockerHandler", name: str) -> Iterable[bytes]:
+        container = self.find_container(name)
+        path = request.query.get("path", ["/"])[0]
+        volume = self.find_mount(container, path)
+        root = path.rstrip("/").rsplit("/", 1)[-1]
+        archive = io.BytesIO()
+        with self.lock, tarfile.open(fileobj=archive, mode="w") as tar:
+            for filename, data in sorted(self.volume_files[volume].items()):
+                info = tarfile.TarInfo(f"{root}/{filename}")
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        yield archive.getvalue()
+
+    def put_archive(self, request: "FakeDockerHandler", name: str) -> Tuple[int, None]:
+        container = self.find_container(name)
+        path = request.query.get("path", ["/"])[0].rstrip("/")
+        with tarfile.open(fileobj=io.BytesIO(request.body)) as tar:
+            for member in tar.getmembers():
+                if not member.isfile():
+                    continue
+                root, _, filename = member.name.partition("/")
+                volume = self.find_mount(container, f"{path}/{root}")
+                with self.lock:
+                    self.volume_files[volume][filename] = tar.extractfile(member).read()
+        return 200, None
+
+    def remove_container(self, request: "FakeDockerHandler", name: str) -> Tuple[int, None]:
+        container = self.find_container(name)
+        force = request.query.get("force", ["false"])[0] in ("1", "true", "True")
+        with self.lock:
+            if container["State"]["Running"] is True and force is False:
+                raise FakeDockerError(409, f"You cannot remove a running container {container['Id']}")
+            self.containers.pop(container["Id"], None)
+        return 204, None
+
+    def _network_view(self, network: dict) -> dict:
+        view = dict(network)
+        with self.lock:
+            view["Containers"] = {
+                container["Id"]: {"Name": container["Name"].lstrip("/")}
+                for container in self.containers.values()
+                if container["State"]["Running"] is True and network["Name"] in
+                container["NetworkSettings"]["Networks"]
+            }
+        return view
+
+    def list_networks(self, request: "FakeDockerHandler", **_) -> List[dict]:
+        with self.lock:
+            return [self._network_view(network) for network in self.networks.values()]
+
+    def create_network(self, request: "FakeDockerHandler", **_) -> Tuple[int, dict]:
+        spec = request.json()
+        with self.lock:
+            if any(network["Name"] == spec["Name"] for network in self.networks.values()):
+                raise FakeDockerError(409, f"network with name {spec['Name']} already exists")
+            network_id = new_id()
+            self.networks[network_id] = {"Id": network_id, "Name": spec["Name"], "Driver": "bridge",
+                                         "Labels": spec.get("Labels") or {}}
+        return 201, {"Id": network_id, "Warning": ""}
+
+    def inspect_network(self, request: "FakeDockerHandler", name: str) -> dict:
+        return self._network_view(self.find_network(name))
+
+    def connect_network(self, request: "FakeDockerHandler", name: str) -> Tuple[int, None]:
+        network = self.find_network(name)
+        spec = request.json()
+        container = self.find_container(spec["Container"])
+        with self.lock:
+            container["NetworkSettings"]["Networks"][network["Name"]] = spec.get("EndpointConfig") or {}
+        return 200, None
+
+    def disconnect_network(self, request: "FakeDockerHandler", name: str) -> Tuple[int, None]:
+        network = self.find_network(name)
+        container = self.find_container(request.json()["Container"])
+        with self.lock:
+            container["NetworkSettings"]["Networks"].pop(network["Name"], None)
+        return 200, None
+
+    def remove_network(self, request: "FakeDockerHandler", name: str) -> Tuple[int, None]:
+        network = self.find_network(name)
+        with self.lock:
+            self.networks.pop(network["Id"], None)
+        return 204, None
+
+    def list_volumes(self, request: "FakeDockerHandler", **_) -> dict:
+        filters = json.loads(request.query.get("filters", ["{}"])[0])
+        volumes = []
+        with self.lock:
+            for volume in self.volumes.values():
+                labels = volume["Labels"]
+                matches = True
+                for label in filters.get("label", []):
+                    key, _, value = label.partition("=")
+                    if key not in labels or (value and labels[key] != value):
+                        matches = False
+                if matches is True:
+                    volumes.append(dict(volume))
+        return {"Volumes": volumes, "Warnings": []}
+
+    def create_volume(self, request: "FakeDockerHandler", **_) -> Tuple[int, dict]:
+        spec = request.json()
+        return 201, dict(self.add_volume(spec.get("Name") or new_id(), labels=spec.get("Labels")))
+
+    def inspect_volume(self, request: "FakeDockerHandler", name: str) -> dict:
+        return dict(self.find_volume(name))
+
+    def remove_volume(self, request: "FakeDockerHandler", name: str) -> Tuple[int, None]:
+        self.find_volume(name)
+        with self.lock:
+            if any(mount.get("Name") == name for container in self.containers.values()
+                   for mount in container["Mounts"]):
+                raise FakeDockerError(409, f"remove {name}: volume is in use")
+            self.volumes.pop(name, None)
+            self.volume_files.pop(name, None)
+        return 204, None
+
+
+class FakeDockerHandler(BaseHTTPRequestHandler):
+    """
+    The FakeDockerHandler class turns HTTP requests into calls to the routes of the FakeDockerDaemon.
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    fake: FakeDockerDaemon
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def json(self) -> dict:
+        return json.loads(self.body.decode() or "{}")
+
+    def read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().strip().split(b";")[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b"".join(chunks)
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def handle_request(self, method: str) -> None:
+        parsed = urlparse(self.path)
+        path = re.sub(r"^/v[0-9.]+", "", parsed.path)
+        self.query = parse_qs(parsed.query)
+        self.body = self.read_body()
+        try:
+            operation, route, params = self.fake.dispatch(method, path)
+            with self.fake.lock:
+                self.fake.calls[operation] += 1
+            if operation in self.fake.failing_operations:
+                raise FakeDockerError(500, f"{operation} failed on this fake daemon")
+            latency = self.fake.latencies.get(operation, 0)
+            if latency > 0:
+                time.sleep(latency)
+            result = route(self, **params)
+            status = 200
+            if isinstance(result, tuple):
+                status, result = result
+            if result is None or isinstance(result, (dict, list, str)):
+                self.send_body(status, result)
+            else:
+                self.send_stream(status, result)
+            if operation in EVENT_TYPES:
+                self.fake.publish(EVENT_TYPES[operation], operation)
+        except FakeDockerError as e:
+            self.send_body(e.status, {"message": e.message})
+
+    def send_body(self, status: int, result) -> None:
+        if result is None:
+            body = b""
+        elif isinstance(result, str):
+            body = result.encode()
+        else:
+            body = json.dumps(result).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain" if isinstance(result, str) else "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def send_stream(self, status: int, chunks: Iterable) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in chunks:
+            data = chunk if isinstance(chunk, bytes) else (json.dumps(chunk) + "\r\n").encode()
+            if len(data) == 0:
+                continue
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self) -> None:
+        self.handle_request("GET")
+
+    def do_HEAD(self) -> None:
+        self.handle_request("HEAD")
+
+    def do_POST(self) -> None:
+        self.handle_request("POST")
+
+    def do_PUT(self) -> None:
+        self.handle_request("PUT")
+
+    def do_DELETE(self) -> None:
+        self.handle_request("DELETE")
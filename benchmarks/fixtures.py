@@ -0,0 +1,157 @@
+"""
+This file defines the helpers that generate a synthetic workspace for the benchmarks: a seating plan with N attendees
+whose repos are local bare git repos, each holding a wedding invite with M builds, plus the local wedding invite of
+the main repo.
+"""
+import os
+import subprocess
+from typing import List
+
+import yaml
+
+
+BRANCH = "development"
+
+
+def git(*args: str, cwd: str) -> None:
+    """
+    Runs a git command, raising if it fails.
+
+    :param args: the arguments to pass to git
+    :param cwd: the directory to run git in
+    :return: None
+    """
+    subprocess.run(["git", "-c", "user.name=wedpy", "-c", "user.email=bench@wedpy", *args], cwd=cwd, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def build_dicts(package_name: str, builds: int, pulled_builds: int, git_url: str, port_offset: int,
+                build_root: str = ".") -> List[dict]:
+    """
+    Creates the build dicts for a package.
+
+    :param package_name: the name of the package
+    :param builds: the number of builds from source
+    :param pulled_builds: the number of builds pulled from a registry
+    :param git_url: the git url of the package
+    :param port_offset: the first outside port to give to the builds
+    :param build_root: the build root of the builds from source
+    :return: the build dicts
+    """
+    dicts = []
+    for index in range(builds):
+        name = f"{package_name}_service_{index}"
+        dicts.append({
+            "name": name, "default_image_name": name, "default_container_name": name, "git_url": git_url,
+            "image_url": f"bench/{name}", "branch": BRANCH, "default_image_tag": name, "build_root": build_root,
+            "build_lock": True, "outside_port": port_offset + index, "inside_port": 8000,
+            "config": {"PACKAGE": package_name},
+        })
+    for index in range(pulled_builds):
+        name = f"{package_name}_db_{index}"
+        dicts.append({
+            "name": name, "default_image_name": name, "default_container_name": name,
+            "image_url": f"bench/{name}", "default_image_tag": f"bench/{name}",
+            "config": {"POSTGRES_PASSWORD": "password"},
+        })
+    return dicts
+
+
+def init_build_dicts(package_name: str, git_url: str, build_root: str = ".") -> List[dict]:
+    """
+    Creates the init build dicts for a package.
+
+    :param package_name: the name of the package
+    :param git_url: the git url of the package
+    :param build_root: the build root of the init build
+    :return: the init build dicts
+    """
+    name = f"{package_name}_init"
+    return [{
+        "name": name, "default_image_name": name, "default_container_name": name, "git_url": git_url,
+        "image_url": f"bench/{name}", "branch": BRANCH, "default_image_tag": name, "build_root": build_root,
+        "build_lock": True, "config": {"DATABASE_URL": f"postgres://{package_name}_db_0:5432"},
+    }]
+
+
+def make_attendee_repo(remotes_path: str, package_name: str, builds: int, pulled_builds: int,
+                       port_offset: int) -> str:
+    """
+    Creates a bare git repo for an attendee with a wedding invite and a Dockerfile on the development branch.
+
+    :param remotes_path: the directory to create the bare repo in
+    :param package_name: the name of the package
+    :param builds: the number of builds from source
+    :param pulled_builds: the number of builds pulled from a registry
+    :param port_offset: the first outside port to give to the builds
+    :return: the git url of the bare repo
+    """
+    git_url = os.path.join(remotes_path, f"{package_name}.git")
+    work_path = os.path.join(remotes_path, f"{package_name}-work")
+    os.makedirs(work_path)
+    git("init", "--bare", "-b", "main", git_url, cwd=remotes_path)
+    git("init", "-b", "main", cwd=work_path)
+
+    invite = {
+        "package_name": package_name,
+        "builds": build_dicts(package_name, builds, pulled_builds, git_url, port_offset),
+        "init_builds": init_build_dicts(package_name, git_url),
+    }
+    with open(os.path.join(work_path, "wedding_invite.yml"), "w") as f:
+        yaml.safe_dump(invite, f)
+    with open(os.path.join(work_path, "Dockerfile"), "w") as f:
+        f.write(f"FROM python:3.11-slim\nCOPY . /app\nRUN echo {package_name}\nCMD python /app/main.py\n")
+    with open(os.path.join(work_path, "main.py"), "w") as f:
+        f.write(f"print('{package_name}')\n")
+
+    git("add", ".", cwd=work_path)
+    git("commit", "-m", "initial", cwd=work_path)
+    git("remote", "add", "origin", git_url, cwd=work_path)
+    git("push", "origin", "main", cwd=work_path)
+    git("push", "origin", f"main:{BRANCH}", cwd=work_path)
+    return git_url
+
+
+def make_workspace(root: str, attendees: int, builds: int, pulled_builds: int = 1) -> List[str]:
+    """
+    Creates a workspace with a seating plan of attendees backed by local bare git repos and a local wedding invite.
+
+    :param root: the directory to create the workspace in, wedpy commands are run from here
+    :param attendees: the number of attendees in the seating plan
+    :param builds: the number of builds from source in each wedding invite
+    :param pulled_builds: the number of builds pulled from a registry in each wedding invite
+    :return: the image tags of the init builds, whose containers exit straight after starting
+    """
+    remotes_path = os.path.join(root, "remotes")
+    for directory in ("remotes", "sandbox", "post_office"):
+        os.makedirs(os.path.join(root, directory))
+
+    seating_plan = {"network_name": "bench_network", "venue": "sandbox", "post_office": "post_office",
+                    "attendees": []}
+    init_images = []
+    for index in range(attendees):
+        package_name = f"package_{index}"
+        git_url = make_attendee_repo(remotes_path, package_name, builds, pulled_builds,
+                                     port_offset=10000 + index * (builds + 1))
+        seating_plan["attendees"].append({
+            "name": package_name, "default_image_name": package_name, "git_url": git_url,
+            "image_url": f"bench/{package_name}", "branch": BRANCH,
+        })
+        init_images.append(f"{package_name}_init")
+
+    with open(os.path.join(root, "seating_plan.yml"), "w") as f:
+        yaml.safe_dump(seating_plan, f)
+
+    local_invite = {
+        "package_name": "local",
+        "builds": build_dicts("local", builds, pulled_builds, git_url="local", port_offset=9000,
+                              build_root="service"),
+        "init_builds": init_build_dicts("local", git_url="local", build_root="service"),
+    }
+    with open(os.path.join(root, "wedding_invite.yml"), "w") as f:
+        yaml.safe_dump(local_invite, f)
+    os.makedirs(os.path.join(root, "service"))
+    with open(os.path.join(root, "service", "Dockerfile"), "w") as f:
+        f.write("FROM python:3.11-slim\nCOPY . /app\nCMD python /app/main.py\n")
+    init_images.append("local_init")
+    return init_images
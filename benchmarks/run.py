@@ -0,0 +1,193 @@
+"""
+This file defines the wedpy benchmark suite. A synthetic seating plan with N attendees and M builds each is generated
+from local bare git repos, and the SeatingPlan phases are timed against an in-process fake Docker daemon with
+configurable per-call latencies. The results are written as JSON so performance changes can be compared over time.
+
+Usage:
+    python -m benchmarks.run --attendees 20 --builds 3 --latency build=0.2 --latency pull=0.05 --output out.json
+    python -m benchmarks.run --baseline out.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from benchmarks.fixtures import make_workspace
+
+PHASES: List[str] = ["install", "post_invites", "build", "build_without_pool", "run_containers",
+                     "destroy_containers", "wipe_images", "up"]
+
+
+def parse_latencies(values: List[str]) -> Dict[str, float]:
+    """
+    Parses latencies given on the command line as operation=seconds.
+
+    :param values: the latencies from the command line
+    :return: a map of operation names to seconds
+    """
+    latencies = {}
+    for value in values:
+        operation, _, seconds = value.partition("=")
+        latencies[operation] = float(seconds)
+    return latencies
+
+
+def git_revision() -> Optional[str]:
+    """
+    Gets the git revision of the wedpy checkout being benchmarked.
+
+    :return: the revision or None if it is not a git checkout
+    """
+    result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+class BenchmarkRun:
+    """
+    The BenchmarkRun class runs the phases of one benchmark against a fake docker daemon.
+
+    Attributes:
+        daemon (FakeDockerDaemon): the fake docker daemon the phases talk to
+        root (str): the workspace the phases are run in
+        init_delay (float): the seconds the up phase waits after starting init containers
+        results (Dict[str, dict]): the time and number of API calls of each phase
+    """
+    def __init__(self, daemon: FakeDockerDaemon, root: str, init_delay: float = 0) -> None:
+        """
+        The constructor for the BenchmarkRun class.
+
+        :param daemon: the fake docker daemon the phases talk to
+        :param root: the workspace the phases are run in
+        :param init_delay: the seconds the up phase waits after starting init containers
+        """
+        self.daemon: FakeDockerDaemon = daemon
+        self.root: str = root
+        self.init_delay: float = init_delay
+        self.results: Dict[str, dict] = {}
+
+    def measure(self, phase: str, function: Callable[[], None]) -> None:
+        """
+        Times a phase and counts the API calls it made.
+
+        :param phase: the name of the phase
+        :param function: the function running the phase
+        :return: None
+        """
+        calls_before = sum(self.daemon.calls.values())
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        self.results[phase] = {"seconds": elapsed, "api_calls": sum(self.daemon.calls.values()) - calls_before}
+        print(f"{phase:<20} {elapsed:8.3f}s  {self.results[phase]['api_calls']:6d} API calls", file=sys.stderr)
+
+    def run(self, phases: List[str]) -> Dict[str, dict]:
+        """
+        Runs the phases in order.
+
+        :param phases: the phases to run
+        :return: the time and number of API calls of each phase
+        """
+        from wedpy.seating_plan.pipeline import Pipeline
+        from wedpy.seating_plan.seating_plan import SeatingPlan
+        from wedpy.wedding_invite.local_wedding_invite import LocalWeddingInvite
+
+        seating_plan = SeatingPlan(seating_plan_path=os.path.join(self.root, "seating_plan.yml"))
+        for phase in phases:
+            if phase == "build":
+                self.measure(phase, lambda: seating_plan.build(pool=True))
+            elif phase == "build_without_pool":
+                self.measure(phase, lambda: seating_plan.build(pool=False))
+            elif phase == "destroy_containers":
+                self.measure(phase, lambda: (seating_plan.destroy_containers(), seating_plan.destroy_network()))
+            elif phase == "up":
+                for directory in ("sandbox", "post_office"):
+                    shutil.rmtree(os.path.join(self.root, directory))
+                    os.mkdir(os.path.join(self.root, directory))
+                local_wedding_invite = LocalWeddingInvite(os.path.join(self.root, "wedding_invite.yml"))
+                pipeline = Pipeline(seating_plan=seating_plan, local_wedding_invite=local_wedding_invite,
+                                    init_delay=self.init_delay)
+                self.measure(phase, pipeline.run)
+            else:
+                self.measure(phase, getattr(seating_plan, phase))
+        return self.results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict]) -> None:
+    """
+    Prints the change in time and API calls of each phase against a baseline.
+
+    :param results: the results of this run
+    :param baseline: the results of a previous run
+    :return: None
+    """
+    for phase, result in results.items():
+        previous = baseline.get(phase)
+        if previous is None:
+            continue
+        change = (result["seconds"] - previous["seconds"]) / previous["seconds"] * 100 if previous["seconds"] else 0
+        print(f"{phase:<20} {previous['seconds']:8.3f}s -> {result['seconds']:8.3f}s ({change:+6.1f}%)  "
+              f"API calls {previous['api_calls']} -> {result['api_calls']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--attendees', type=int, default=10)
+    parser.add_argument('--builds', type=int, default=2)
+    parser.add_argument('--pulled_builds', type=int, default=1)
+    parser.add_argument('--latency', action='append', default=[], metavar='OPERATION=SECONDS',
+                        help='latency of a fake docker operation, for example build=0.2')
+    parser.add_argument('--phases', nargs='+', default=PHASES, choices=PHASES)
+    parser.add_argument('--init_delay', type=float, default=0)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--baseline', default=None)
+    args = parser.parse_args()
+
+    from wedpy import docker_client
+    from wedpy.wedding_invite import wedding_invite
+
+    wedding_invite.INIT_CONTAINER_DELAY = args.init_delay
+    latencies = parse_latencies(args.latency)
+
+    root = tempfile.mkdtemp(prefix="wedpy-bench-")
+    cwd = os.getcwd()
+    try:
+        init_images = make_workspace(root, attendees=args.attendees, builds=args.builds,
+                                     pulled_builds=args.pulled_builds)
+        with FakeDockerDaemon(latencies=latencies, exiting_images=init_images) as daemon:
+            os.environ["DOCKER_HOST"] = daemon.base_url
+            docker_client._clients.clear()
+            os.chdir(root)
+            results = BenchmarkRun(daemon=daemon, root=root, init_delay=args.init_delay).run(phases=args.phases)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "parameters": {"attendees": args.attendees, "builds": args.builds, "pulled_builds": args.pulled_builds,
+                       "latencies": latencies, "init_delay": args.init_delay},
+        "results": results,
+    }
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            compare(results, json.load(f)["results"])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+This file defines the startup-time benchmark for the wedpy entry points. Each entry point module is imported in a
+fresh interpreter a number of times and the median import time is recorded along with any heavy modules that were
+imported, so regressions in CLI startup can be caught by comparing against a saved baseline.
+
+Usage:
+    python -m benchmarks.startup --output startup.json
+    python -m benchmarks.startup --baseline startup.json --tolerance 0.25
+"""
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+ENTRY_POINTS: Dict[str, str] = {
+    "wedpy-install": "wedpy.endpoints.install",
+    "wedpy-post": "wedpy.endpoints.post_invites",
+    "wedpy-build": "wedpy.endpoints.build",
+    "wedpy-run": "wedpy.endpoints.run",
+    "wedpy-stop": "wedpy.endpoints.stop",
+    "wedpy-teardown": "wedpy.endpoints.teardown",
+    "wedpy-wipe": "wedpy.endpoints.wipe_images",
+    "wedpy-up": "wedpy.endpoints.up",
+    "wedpy-watch": "wedpy.endpoints.watch",
+    "wedpy-status": "wedpy.endpoints.status",
+    "wedpy-logs": "wedpy.endpoints.logs",
+    "wedpy-reset": "wedpy.endpoints.reset",
+    "wedpy-agent": "wedpy.endpoints.agent",
+    "wedpy-publish": "wedpy.endpoints.publish",
+}
+
+HEAVY_MODULES: List[str] = ["docker", "requests", "urllib3", "tqdm", "multiprocessing"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(repr((elapsed, heavy)))
+"""
+
+
+def measure(module: str, repeat: int) -> dict:
+    """
+    Imports the module in a fresh interpreter repeat times.
+
+    :param module: the module of the entry point to import
+    :param repeat: the number of fresh interpreters to measure
+    :return: the median import time in milliseconds and the heavy modules that were imported
+    """
+    timings = []
+    heavy: List[str] = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                check=True, capture_output=True, text=True).stdout
+        elapsed, heavy = ast.literal_eval(output.strip().splitlines()[-1])
+        timings.append(elapsed * 1000)
+    return {"module": module, "median_ms": statistics.median(timings), "min_ms": min(timings),
+            "heavy_modules": heavy}
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """
+    Compares the results against a baseline.
+
+    :param results: the results of this run
+    :param baseline: the results of a previous run
+    :param tolerance: the allowed fractional slowdown before an entry point counts as a regression
+    :return: a description of every regression found
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result["median_ms"] > previous["median_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: {previous['median_ms']:.1f}ms -> {result['median_ms']:.1f}ms")
+        new_heavy = set(result["heavy_modules"]) - set(previous["heavy_modules"])
+        if len(new_heavy) > 0:
+            regressions.append(f"{name}: now imports {', '.join(sorted(new_heavy))} at startup")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--baseline', default=None)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = {name: measure(module, args.repeat) for name, module in ENTRY_POINTS.items()}
+    for name, result in results.items():
+        print(f"{name:<16} {result['median_ms']:8.1f}ms  heavy: {', '.join(result['heavy_modules']) or '-'}")
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if len(regressions) > 0:
+            sys.exit("startup regressions:\n" + "\n".join(f"  - {r}" for r in regressions))
+
+
+if __name__ == '__main__':
+    main()
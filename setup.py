@@ -14,7 +14,17 @@ setup(
             'wedpy-build = wedpy.endpoints.build:main',
             'wedpy-wipe = wedpy.endpoints.wipe_images:main',
             'wedpy-post = wedpy.endpoints.post_invites:main',
-        ]
+            'wedpy-up = wedpy.endpoints.up:main',
+            'wedpy-watch = wedpy.endpoints.watch:main',
+            'wedpy-status = wedpy.endpoints.status:main',
+            'wedpy-logs = wedpy.endpoints.logs:main',
+            'wedpy-reset = wedpy.endpoints.reset:main',
+            'wedpy-agent = wedpy.endpoints.agent:main',
+            'wedpy-publish = wedpy.endpoints.publish:main',
+        ],
+        'pytest11': [
+            'wedpy = wedpy.pytest_plugin',
+        ],
     },
     install_requires=[
         'requests==2.29.0',
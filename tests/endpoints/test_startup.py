@@ -0,0 +1,29 @@
+"""
+This file defines the tests guarding the startup cost of the entry points.
+"""
+import subprocess
+import sys
+from unittest import TestCase, main
+
+from benchmarks.startup import ENTRY_POINTS, HEAVY_MODULES
+
+
+class TestStartup(TestCase):
+
+    def test_no_heavy_imports(self) -> None:
+        """
+        Tests that importing an entry point does not import docker-py, tqdm or multiprocessing, which are only
+        imported by the code paths that need them.
+        :return: None
+        """
+        for name, module in ENTRY_POINTS.items():
+            output = subprocess.run(
+                [sys.executable, "-c",
+                 f"import sys, {module}; print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"],
+                check=True, capture_output=True, text=True
+            ).stdout
+            self.assertEqual(output.strip(), "[]", msg=name)
+
+
+if __name__ == '__main__':
+    main()
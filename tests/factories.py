@@ -0,0 +1,34 @@
+"""
+This file defines the factories the tests use to make the builds of a wedding invite, so every test starts from the
+same build and only sets the fields it is about.
+"""
+from wedpy.builder_pool import BuildJob
+from wedpy.core_unit import CoreUnit
+from wedpy.wedding_invite.build import Build
+
+
+def build_dict(name: str, **fields) -> dict:
+    """
+    Gets the dict of a build as it is loaded from a wedding invite, built from the local source in the directory named
+    after the build.
+
+    :param name: the name of the build, also used for its image, container and build root
+    :param fields: the fields set on top of the defaults
+    :return: the build dict
+    """
+    return dict({"name": name, "image_url": f"bench/{name}", "git_url": "local", "default_container_name": name,
+                 "default_image_tag": name, "build_root": name}, **fields)
+
+
+def build_job(name: str, package_root: str = "/src", package_name: str = "service", **fields) -> BuildJob:
+    """
+    Gets the job of a build for the builder pool.
+
+    :param name: the name of the build, also used for its image, container and build root
+    :param package_root: the root directory of the package the build belongs to
+    :param package_name: the name of the package the build belongs to
+    :param fields: the fields set on top of the defaults of build_dict
+    :return: the build job
+    """
+    unit = CoreUnit.from_dict(build_dict(name, **fields))
+    return BuildJob(build=Build(unit=unit, package_name=package_name), package_root=package_root)
@@ -5,7 +5,7 @@ import os
 import shutil
 import tempfile
 from unittest import main, TestCase
-from unittest.mock import patch
+from unittest.mock import PropertyMock, patch
 
 from wedpy.seating_plan.dependency import Dependency
 
@@ -74,6 +74,30 @@ class TestDependency(TestCase):
             f"Successfully checked out testb branch for test"
         )
 
+    @patch("wedpy.seating_plan.dependency.time")
+    @patch("wedpy.seating_plan.dependency.print")
+    @patch("wedpy.seating_plan.dependency.subprocess")
+    def test_clone_repo_retry(self, mock_subprocess, mock_print, mock_time) -> None:
+        """
+        The test_clone_repo_retry method is used to test that a clone dropped by the network is retried and that
+        other clone failures are not.
+        """
+        process = mock_subprocess.Popen.return_value
+        process.communicate.side_effect = [(b"", b"fatal: the remote end hung up unexpectedly"), (b"", b""),
+                                           (b"", b"")]
+        type(process).returncode = PropertyMock(side_effect=[128, 0, 0, 0])
+        self.dependency.clone_repo(venue_path=self.venue_path)
+
+        self.assertEqual(mock_subprocess.Popen.call_count, 3)
+        mock_time.sleep.assert_called_once()
+
+        mock_subprocess.Popen.reset_mock()
+        process.communicate.side_effect = None
+        process.communicate.return_value = (b"", b"fatal: repository not found")
+        type(process).returncode = PropertyMock(return_value=128)
+        self.dependency.clone_repo(venue_path=self.venue_path)
+        self.assertEqual(mock_subprocess.Popen.call_count, 1)
+
 
 if __name__ == '__main__':
     main()
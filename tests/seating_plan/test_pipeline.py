@@ -0,0 +1,215 @@
+"""
+This file defines the tests around the Pipeline class.
+"""
+import threading
+from unittest import TestCase, main
+from unittest.mock import MagicMock, patch
+
+from wedpy.capacity import CapacityLimiter, HostCapacity
+from wedpy.failures import FAIL_FAST, RetryPolicy
+from wedpy.seating_plan.pipeline import Pipeline, PipelineError
+
+
+class TestPipeline(TestCase):
+
+    def setUp(self) -> None:
+        self.events = []
+        self.lock = threading.Lock()
+        self.seating_plan = MagicMock()
+        self.seating_plan.full_venue_path = "/venue"
+        self.seating_plan.network_name = "test_network"
+        self.seating_plan.client.containers.get.return_value.wait.return_value = {"StatusCode": 0}
+
+        self.service = self.make_build("service")
+        self.init = self.make_build("init")
+        invite = MagicMock()
+        invite.package_name = "taxonomist"
+        invite.builds = [self.service]
+        invite.init_builds = [self.init]
+
+        self.dependency = MagicMock()
+        self.dependency.name = "taxonomist"
+        self.dependency.clone_repo.side_effect = lambda venue_path: self.record("clone")
+        self.dependency.get_wedding_invite.return_value = invite
+        self.seating_plan.post_invite.side_effect = lambda dependency: self.record("post")
+        self.seating_plan.dependencies = [self.dependency]
+        self.seating_plan.namespace.side_effect = lambda invite: invite
+
+    def record(self, event: str) -> None:
+        with self.lock:
+            self.events.append(event)
+
+    def make_build(self, name: str) -> MagicMock:
+        build = MagicMock()
+        build.core_unit.main = False
+        build.skipped_in_dev = False
+        build.build_demand.return_value = (1.0, 0)
+        build.run_demand = (0.0, 0)
+        build.trace_tags = {"build": name}
+        build.core_unit.default_container_name = name
+        build.build_image.side_effect = lambda *args: self.record(f"build {name}")
+        build.run_container.side_effect = lambda **kwargs: self.record(f"run {name}")
+        return build
+
+    def test_run(self) -> None:
+        """
+        Tests that an attendee is cloned, posted, built and run in order with the init container last.
+        :return: None
+        """
+        Pipeline(seating_plan=self.seating_plan, init_delay=0).run()
+
+        self.assertEqual(self.events[:2], ["clone", "post"])
+        self.assertEqual(self.events[-1], "run init")
+        self.assertLess(self.events.index("build service"), self.events.index("run service"))
+        self.assertLess(self.events.index("run service"), self.events.index("run init"))
+        self.dependency.clone_repo.assert_called_once_with(venue_path="/venue")
+        self.service.build_image.assert_called_once_with("/venue/taxonomist", None, False)
+        self.service.run_container.assert_called_once_with(
+            runner=self.seating_plan.client.containers, network_name="test_network", dev=False,
+            package_root="/venue/taxonomist", profile="default"
+        )
+
+    def test_run_local_dev(self) -> None:
+        """
+        Tests that the main build of the local wedding invite is skipped in dev mode.
+        :return: None
+        """
+        self.seating_plan.dependencies = []
+        main_build = self.make_build("main")
+        main_build.core_unit.main = True
+        main_build.skipped_in_dev = True
+        local_wedding_invite = MagicMock()
+        local_wedding_invite.local_wedding_invite.builds = [main_build, self.service]
+        local_wedding_invite.local_wedding_invite.init_builds = []
+
+        Pipeline(seating_plan=self.seating_plan, local_wedding_invite=local_wedding_invite, dev=True,
+                 init_delay=0).run()
+
+        main_build.build_image.assert_not_called()
+        self.service.build_image.assert_called_once_with(".", None, False)
+        self.assertEqual(self.events, ["build service", "run service"])
+
+    def test_run_local_after_attendees(self) -> None:
+        """
+        Tests that the containers of the local wedding invite only start once the attendees and their init containers
+        are up, and that they are not started when an attendee failed.
+        :return: None
+        """
+        local = self.make_build("local")
+        local_wedding_invite = MagicMock()
+        local_wedding_invite.local_wedding_invite.package_name = "main"
+        local_wedding_invite.local_wedding_invite.builds = [local]
+        local_wedding_invite.local_wedding_invite.init_builds = []
+
+        Pipeline(seating_plan=self.seating_plan, local_wedding_invite=local_wedding_invite, init_delay=0).run()
+        self.assertLess(self.events.index("run init"), self.events.index("run local"))
+
+        self.events.clear()
+        self.dependency.clone_repo.side_effect = RuntimeError("clone failed")
+        with self.assertRaises(PipelineError) as context:
+            Pipeline(seating_plan=self.seating_plan, local_wedding_invite=local_wedding_invite, init_delay=0).run()
+        self.assertEqual(["main: not started because taxonomist failed", "taxonomist: clone failed"],
+                         sorted(context.exception.failures))
+        self.assertNotIn("run local", self.events)
+
+    def test_run_service_failure(self) -> None:
+        """
+        Tests that the init builds of a package still queued are cancelled once one of its containers fails.
+        :return: None
+        """
+        self.service.run_container.side_effect = RuntimeError("port is already allocated")
+        # the only build slot is held by a slow build until the failure cancelled the rest, so the init build is
+        # still queued when it fails
+        cancelled = threading.Event()
+        slow = self.make_build("slow")
+        slow.build_image.side_effect = lambda *args: cancelled.wait(5)
+        self.dependency.get_wedding_invite.return_value.builds = [self.service, slow]
+        cancel = Pipeline._cancel
+
+        def cancel_and_release(futures) -> None:
+            cancel(futures)
+            cancelled.set()
+
+        with patch.object(Pipeline, "_cancel", side_effect=cancel_and_release), \
+                self.assertRaises(PipelineError) as context:
+            Pipeline(seating_plan=self.seating_plan, init_delay=0, max_builds=1).run()
+        self.assertEqual(["taxonomist: port is already allocated"], context.exception.failures)
+        self.init.build_image.assert_not_called()
+        self.assertNotIn("run init", self.events)
+
+    def test_run_failure(self) -> None:
+        """
+        Tests that a failing package is reported without stopping the other packages.
+        :return: None
+        """
+        failing = MagicMock()
+        failing.name = "cerberus"
+        failing.clone_repo.side_effect = RuntimeError("clone failed")
+        self.seating_plan.dependencies = [failing, self.dependency]
+
+        with self.assertRaises(PipelineError) as context:
+            Pipeline(seating_plan=self.seating_plan, init_delay=0).run()
+
+        self.assertEqual(context.exception.failures, ["cerberus: clone failed"])
+        self.assertIn("run init", self.events)
+
+    def test_run_fail_fast(self) -> None:
+        """
+        Tests that a failing package cancels the packages still in flight with the fail-fast policy.
+        :return: None
+        """
+        failing = MagicMock()
+        failing.name = "cerberus"
+        failing.clone_repo.side_effect = RuntimeError("clone failed")
+        self.seating_plan.dependencies = [failing, self.dependency]
+        pipeline = Pipeline(seating_plan=self.seating_plan, init_delay=0, failure_policy=FAIL_FAST)
+        # the other clone only finishes once the failure cancelled the pipeline
+        self.dependency.clone_repo.side_effect = lambda venue_path: pipeline._cancelled.wait(5)
+
+        with self.assertRaises(PipelineError) as context:
+            pipeline.run()
+
+        self.assertEqual(context.exception.failures, [
+            "cerberus: clone failed", "taxonomist: cancelled after another package failed"
+        ])
+        self.assertEqual([], self.events)
+
+    def test_run_capacity(self) -> None:
+        """
+        Tests that the cores and memory held by a container are given back when it fails to start and when an init
+        container exits, and that an init container exiting with an error fails the package.
+        :return: None
+        """
+        capacity = CapacityLimiter(capacity=HostCapacity(cpus=4.0, memory=4096))
+        self.service.run_demand = (1.0, 1024)
+        self.init.run_demand = (2.0, 1024)
+        Pipeline(seating_plan=self.seating_plan, init_delay=0, capacity=capacity).run()
+        self.assertEqual((3.0, 3072), (capacity.free_cpus, capacity.free_memory))
+        self.seating_plan.client.containers.get.assert_called_once_with("init")
+
+        capacity = CapacityLimiter(capacity=HostCapacity(cpus=4.0, memory=4096))
+        self.seating_plan.client.containers.get.return_value.wait.return_value = {"StatusCode": 1}
+        with self.assertRaises(PipelineError) as context:
+            Pipeline(seating_plan=self.seating_plan, init_delay=0, capacity=capacity).run()
+        self.assertEqual(["taxonomist: init exited with status 1"], context.exception.failures)
+        self.assertEqual((3.0, 3072), (capacity.free_cpus, capacity.free_memory))
+
+        capacity = CapacityLimiter(capacity=HostCapacity(cpus=4.0, memory=4096))
+        self.service.run_container.side_effect = RuntimeError("port is already allocated")
+        with self.assertRaises(PipelineError):
+            Pipeline(seating_plan=self.seating_plan, init_delay=0, capacity=capacity).run()
+        self.assertEqual((4.0, 4096, 0), (capacity.free_cpus, capacity.free_memory, capacity.in_flight))
+
+    def test_build_retry(self) -> None:
+        """
+        Tests that a build failing with a transient error is retried.
+        :return: None
+        """
+        self.service.build_image.side_effect = [ConnectionResetError(), None]
+        with patch("builtins.print"):
+            Pipeline(seating_plan=self.seating_plan, init_delay=0, retry=RetryPolicy(base_delay=0.01)).run()
+        self.assertEqual(2, self.service.build_image.call_count)
+
+
+if __name__ == '__main__':
+    main()
@@ -13,14 +13,15 @@ from wedpy.seating_plan.seating_plan import SeatingPlan
 class TestSeatingPlan(TestCase):
 
     @patch('wedpy.seating_plan.seating_plan.Dependency')
-    @patch('wedpy.seating_plan.seating_plan.docker.from_env')
-    def setUp(self, mock_docker_from_env, mock_dependency) -> None:
+    def setUp(self, mock_dependency) -> None:
         """
         The setUp method is used to set up the unit tests for the SeatingPlan class.
         """
         self.dependency_mock = MagicMock()
         self.docker_mock = MagicMock()
-        mock_docker_from_env.return_value = self.docker_mock
+        get_client_patcher = patch('wedpy.seating_plan.seating_plan.get_client', return_value=self.docker_mock)
+        self.mock_get_client = get_client_patcher.start()
+        self.addCleanup(get_client_patcher.stop)
         mock_dependency.return_value = self.dependency_mock
         self.venue_path = tempfile.mkdtemp()
         script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -54,18 +55,22 @@ class TestSeatingPlan(TestCase):
         """
         self.assertEqual(SeatingPlan.load_config(config_file=self.file_path), self.expected_file_data)
 
-    @patch('wedpy.seating_plan.seating_plan.docker.from_env')
     @patch('wedpy.seating_plan.seating_plan.Dependency')
-    def test_init(self, mock_dependency, mock_docker_from_env) -> None:
+    def test_init(self, mock_dependency) -> None:
         """
-        Tests that the constructor for the SeatingPlan class sets the attributes correctly.
+        Tests that the constructor for the SeatingPlan class sets the attributes correctly and that the docker
+        client is only created on first use.
         :return: None
         """
+        self.mock_get_client.reset_mock()
         self.seating_plan = SeatingPlan(seating_plan_path=self.file_path)
+        self.mock_get_client.assert_not_called()
         self.assertEqual(self.seating_plan.config, self.expected_file_data)
         self.assertEqual(self.seating_plan.network_name, self.expected_file_data['network_name'])
         self.assertEqual(self.seating_plan.venue, self.expected_file_data['venue'])
-        self.assertEqual(self.seating_plan.client, mock_docker_from_env.return_value)
+        self.assertEqual(self.seating_plan.client, self.docker_mock)
+        self.assertEqual(self.seating_plan.client, self.docker_mock)
+        self.mock_get_client.assert_called_once_with()
         self.assertEqual(self.seating_plan.full_venue_path, os.path.join(os.getcwd(), self.expected_file_data['venue']))
         mock_dependency.assert_called_once_with(
             name=self.expected_file_data['attendees'][0]['name'],
@@ -111,7 +116,12 @@ class TestSeatingPlan(TestCase):
         self.seating_plan.run_containers()
         dep_mock.run_containers.assert_called_once_with(
             runner=self.docker_mock.containers,
-            network_name=self.seating_plan.network_name
+            network_name=self.seating_plan.network_name,
+            remote=False,
+            dev=False,
+            package_root=os.path.join(self.seating_plan.full_venue_path, dep_mock.package_name),
+            snapshots=None,
+            profile="default"
         )
 
     def test_stop_containers(self) -> None:
@@ -144,13 +154,37 @@ class TestSeatingPlan(TestCase):
         container_two.remove.assert_called_once_with(force=True)
         dep_mock.destroy_init_containers.assert_called_once_with()
 
+    @patch('wedpy.seating_plan.seating_plan.release')
+    @patch('wedpy.seating_plan.seating_plan.SeatingPlan.invites', new_callable=PropertyMock)
+    def test_destroy_containers_shared(self, mock_invites, mock_release) -> None:
+        """
+        Tests that shared containers are released rather than stopped or destroyed.
+        :return: None
+        """
+        mock_invites.return_value = []
+        shared = MagicMock()
+        shared.labels = {"wedpy.shared": "abc"}
+        self.seating_plan.network.containers = [shared]
+
+        self.seating_plan.stop_containers()
+        self.seating_plan.destroy_containers()
+
+        shared.stop.assert_not_called()
+        shared.remove.assert_not_called()
+        mock_release.assert_called_once_with(shared, network=self.seating_plan.network)
+
     def test_destroy_network(self) -> None:
         """
-        Tests that the destroy_network method destroys the network.
+        Tests that the destroy_network method destroys the network and the data volumes created for it.
         :return: None
         """
+        volume = MagicMock()
+        self.docker_mock.volumes.list.return_value = [volume]
         self.seating_plan.destroy_network()
         self.seating_plan.network.remove.assert_called_once_with()
+        self.docker_mock.volumes.list.assert_called_once_with(
+            filters={"label": f"wedpy.network={self.seating_plan.network_name}"})
+        volume.remove.assert_called_once_with(force=True)
 
     @patch('wedpy.seating_plan.seating_plan.SeatingPlan.invites', new_callable=PropertyMock)
     def test_wipe_images(self, mock_invites) -> None:
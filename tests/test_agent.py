@@ -0,0 +1,158 @@
+"""
+This file defines the tests for the agent answering the commands of the entry points over a unix socket, using a fake
+docker daemon.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import TestCase, main
+from unittest.mock import patch
+
+import yaml
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from wedpy import docker_client
+from wedpy.agent import AGENT_ENV, Agent, ContainerState, request
+
+
+def wait_for(condition, timeout: float = 5) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition() is True:
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class TestContainerState(TestCase):
+
+    def setUp(self) -> None:
+        docker_client._clients.clear()
+
+    def tearDown(self) -> None:
+        docker_client._clients.clear()
+
+    def test_containers(self) -> None:
+        """
+        Tests that the containers are only listed again after the events stream reports a change.
+        :return: None
+        """
+        with FakeDockerDaemon() as daemon, patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            daemon.add_image("service")
+            client = docker_client.get_client()
+            state = ContainerState(docker_client=client)
+            state.start()
+            try:
+                self.assertEqual([], state.containers())
+                self.assertEqual([], state.containers())
+                self.assertEqual(1, daemon.calls["container_list"])
+
+                client.containers.run("service", name="service", detach=True)
+                self.assertTrue(wait_for(lambda: len(state.containers()) == 1))
+
+                def cached() -> bool:
+                    # the create and start events may arrive after the list above, each forgetting it once
+                    calls = daemon.calls["container_list"]
+                    state.containers()
+                    return calls == daemon.calls["container_list"]
+
+                self.assertTrue(wait_for(cached))
+            finally:
+                state.stop()
+
+
+class TestAgent(TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.root)
+        with open(os.path.join(self.root, "seating_plan.yml"), "w") as f:
+            yaml.safe_dump({"network_name": "agent_network", "venue": "sandbox", "post_office": "post_office",
+                            "attendees": []}, f)
+        with open(os.path.join(self.root, "wedding_invite.yml"), "w") as f:
+            yaml.safe_dump({"package_name": "service", "builds": [{
+                "name": "service", "image_url": "bench/service", "git_url": "local",
+                "default_container_name": "service", "default_image_tag": "service", "build_root": "service",
+            }]}, f)
+        self.path = os.path.join(self.root, ".wedpy", "agent.sock")
+        docker_client._clients.clear()
+
+    def tearDown(self) -> None:
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root)
+        docker_client._clients.clear()
+
+    def test_request(self) -> None:
+        """
+        Tests that the agent answers the status of the seating plan, and that the entry points run commands
+        themselves when no agent is running.
+        :return: None
+        """
+        self.assertIsNone(request("ping", path=self.path))
+        with FakeDockerDaemon() as daemon, patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            daemon.add_image("service")
+            agent = Agent(path=self.path, docker_client=docker_client.get_client())
+            thread = threading.Thread(target=agent.serve_forever)
+            thread.start()
+            try:
+                self.assertTrue(wait_for(lambda: request("ping", path=self.path) is not None))
+                self.assertEqual({"ok": True, "output": "pong"}, request("ping", path=self.path))
+                with patch.dict(os.environ, {AGENT_ENV: "off"}):
+                    self.assertIsNone(request("ping", path=self.path))
+
+                args = {"remote": False, "dev": False, "json": False, "only": [], "exclude": []}
+                response = request("status", args=args, path=self.path)
+                self.assertTrue(response["ok"])
+                self.assertIn("service  service    build  service  missing", response["output"])
+
+                docker_client.get_client().containers.run("service", name="service", detach=True)
+                self.assertTrue(wait_for(lambda: "running" in request("status", args=args,
+                                                                      path=self.path)["output"]))
+
+                response = request("status", args=dict(args, only=["nothing"]), path=self.path)
+                self.assertFalse(response["ok"])
+                self.assertIn("nothing", response["error"])
+                self.assertEqual({"ok": False, "error": "unknown command build"}, request("build", path=self.path))
+            finally:
+                request("shutdown", path=self.path)
+                thread.join(timeout=5)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_read_only_commands(self) -> None:
+        """
+        Tests that the agent answers the logs, and that the notices a command prints to stderr are sent back apart from
+        its output.
+        :return: None
+        """
+        with FakeDockerDaemon() as daemon, patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            daemon.add_image("service")
+            client = docker_client.get_client()
+            client.networks.create("agent_network")
+            client.containers.run("service", name="service", network="agent_network", detach=True)
+            daemon.add_logs("service", ["listening on 8000"])
+            agent = Agent(path=self.path, docker_client=client)
+            thread = threading.Thread(target=agent.serve_forever)
+            thread.start()
+            try:
+                self.assertTrue(wait_for(lambda: request("ping", path=self.path) is not None))
+                args = {"remote": False, "dev": False, "json": True, "only": ["service"], "exclude": []}
+                response = request("status", args=args, path=self.path)
+                self.assertTrue(response["ok"])
+                self.assertEqual("selected 1 builds: service\n", response["stderr"])
+                [entry] = json.loads(response["output"])
+                self.assertEqual(("service", "running"), (entry["container"], entry["state"]))
+
+                args = {"since": None, "grep": None, "buffer_lines": 100, "only": [], "exclude": []}
+                self.assertEqual({"ok": True, "output": "service/service | listening on 8000"},
+                                 request("logs", args=args, path=self.path))
+            finally:
+                request("shutdown", path=self.path)
+                thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
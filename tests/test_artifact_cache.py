@@ -0,0 +1,148 @@
+"""
+This file defines the tests for the ArtifactCache loading images built from the same inputs instead of rebuilding
+them, using a fake docker daemon.
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from wedpy import docker_client
+from wedpy.artifact_cache import ARTIFACT_CACHE_ENV, ArtifactCache, fingerprint
+from wedpy.core_unit import CoreUnit
+from wedpy.wedding_invite.build import Build
+
+
+class TestArtifactCache(TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.root, "cache")
+        self.context_path = os.path.join(self.root, "service")
+        os.makedirs(self.context_path)
+        with open(os.path.join(self.context_path, "Dockerfile"), "w") as f:
+            f.write("FROM python:3.11-slim\nCOPY . /app\n")
+        with open(os.path.join(self.context_path, "main.py"), "w") as f:
+            f.write("print('hello')\n")
+        self.build = Build(unit=CoreUnit.from_dict({
+            "name": "service", "image_url": "bench/service", "git_url": "local", "default_container_name": "service",
+            "default_image_tag": "service", "build_root": "service", "build_lock": True,
+        }))
+        docker_client._clients.clear()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root)
+        docker_client._clients.clear()
+
+    def test_fingerprint(self) -> None:
+        """
+        Tests that the fingerprint changes with the build context but not with files in .dockerignore.
+        :return: None
+        """
+        first = fingerprint(self.context_path, "Dockerfile")
+        with open(os.path.join(self.context_path, ".dockerignore"), "w") as f:
+            f.write("# local files\nnotes.txt\n")
+        with_ignore = fingerprint(self.context_path, "Dockerfile")
+        with open(os.path.join(self.context_path, "notes.txt"), "w") as f:
+            f.write("not sent to docker")
+
+        self.assertNotEqual(first, with_ignore)
+        self.assertEqual(with_ignore, fingerprint(self.context_path, "Dockerfile"))
+        self.assertNotEqual(with_ignore, fingerprint(self.context_path, "Dockerfile", build_args={"DEBUG": "1"}))
+
+        with open(os.path.join(self.context_path, "main.py"), "w") as f:
+            f.write("print('changed')\n")
+        self.assertNotEqual(with_ignore, fingerprint(self.context_path, "Dockerfile"))
+
+    def test_fingerprint_kept(self) -> None:
+        """
+        Tests that a build context whose files have not changed is not read again, and that it is once a file changes.
+        :return: None
+        """
+        first = fingerprint(self.context_path, "Dockerfile")
+        with patch("builtins.open", side_effect=AssertionError("read again")):
+            self.assertEqual(first, fingerprint(self.context_path, "Dockerfile"))
+
+        main_path = os.path.join(self.context_path, "main.py")
+        with open(main_path, "w") as f:
+            f.write("print('howdy')\n")
+        os.utime(main_path, ns=(0, 0))
+        self.assertNotEqual(first, fingerprint(self.context_path, "Dockerfile"))
+
+    def test_build_image(self) -> None:
+        """
+        Tests that the first build is stored and that a second machine loads it instead of building.
+        :return: None
+        """
+        with patch.dict(os.environ, {ARTIFACT_CACHE_ENV: self.cache_path}):
+            with FakeDockerDaemon() as first_machine, \
+                    patch.dict(os.environ, {"DOCKER_HOST": first_machine.base_url}):
+                self.build.build_image(self.root, None)
+                self.assertEqual(first_machine.calls["build"], 1)
+            docker_client._clients.clear()
+
+            with FakeDockerDaemon() as second_machine, \
+                    patch.dict(os.environ, {"DOCKER_HOST": second_machine.base_url}):
+                self.build.build_image(self.root, "service:v2")
+                self.assertEqual(second_machine.calls["build"], 0)
+                self.assertEqual(second_machine.calls["image_load"], 1)
+                self.assertIsNotNone(second_machine.find_image("service"))
+                self.assertIsNotNone(second_machine.find_image("service:v2"))
+
+    def test_store_failure(self) -> None:
+        """
+        Tests that a build whose image cannot be stored in the cache still succeeds with a warning.
+        :return: None
+        """
+        with patch.dict(os.environ, {ARTIFACT_CACHE_ENV: self.cache_path}), \
+                FakeDockerDaemon(failing_operations=["image_save"]) as daemon, \
+                patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}), patch("builtins.print") as mock_print:
+            self.build.build_image(self.root, None)
+            self.assertIsNotNone(daemon.find_image("service"))
+        self.assertIn("could not be stored in the artifact cache", mock_print.call_args[0][0])
+        cache = ArtifactCache(directory=self.cache_path)
+        self.assertFalse(os.path.exists(cache.bundle_path(fingerprint(self.context_path, "Dockerfile"))))
+
+    def test_corrupted_bundle(self) -> None:
+        """
+        Tests that a bundle that does not match its checksum is removed and the image is rebuilt.
+        :return: None
+        """
+        build_fingerprint = fingerprint(self.context_path, "Dockerfile")
+        cache = ArtifactCache(directory=self.cache_path)
+        with patch.dict(os.environ, {ARTIFACT_CACHE_ENV: self.cache_path}), FakeDockerDaemon() as daemon, \
+                patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            self.build.build_image(self.root, None)
+            with open(cache.bundle_path(build_fingerprint), "ab") as f:
+                f.write(b"garbage")
+
+            self.assertFalse(cache.load(build_fingerprint, tag="service", docker_client=docker_client.get_client()))
+            self.assertFalse(os.path.exists(cache.bundle_path(build_fingerprint)))
+
+            self.build.build_image(self.root, None)
+            self.assertEqual(daemon.calls["build"], 2)
+            self.assertTrue(os.path.exists(cache.bundle_path(build_fingerprint)))
+
+    def test_evict(self) -> None:
+        """
+        Tests that the least recently used bundles are removed once the cache is over its maximum size.
+        :return: None
+        """
+        cache = ArtifactCache(directory=self.cache_path, max_bytes=250)
+        for index, build_fingerprint in enumerate(["aa11", "bb22", "cc33"]):
+            os.makedirs(os.path.dirname(cache.bundle_path(build_fingerprint)), exist_ok=True)
+            with open(cache.bundle_path(build_fingerprint), "wb") as f:
+                f.write(bytes(100))
+            with open(cache.metadata_path(build_fingerprint), "w") as f:
+                f.write("{}")
+            os.utime(cache.bundle_path(build_fingerprint), (index, index))
+
+        self.assertEqual(cache.evict(), ["aa11"])
+        self.assertFalse(os.path.exists(cache.metadata_path("aa11")))
+        self.assertTrue(os.path.exists(cache.bundle_path("cc33")))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+This file defines a smoke test running the benchmark suite at a small scale so the fake docker daemon and the
+fixtures keep working with the SeatingPlan phases.
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from benchmarks.fixtures import make_workspace
+from benchmarks.run import BenchmarkRun
+from wedpy import docker_client
+
+
+class TestBenchmarks(TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        docker_client._clients.clear()
+
+    def tearDown(self) -> None:
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root)
+        docker_client._clients.clear()
+
+    @patch('wedpy.wedding_invite.wedding_invite.INIT_CONTAINER_DELAY', 0)
+    def test_run(self) -> None:
+        """
+        Tests that every phase runs against the fake docker daemon and leaves it empty.
+        :return: None
+        """
+        init_images = make_workspace(self.root, attendees=2, builds=1)
+        phases = ["install", "post_invites", "build_without_pool", "run_containers", "destroy_containers",
+                  "wipe_images"]
+
+        with FakeDockerDaemon(exiting_images=init_images) as daemon, \
+                patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            os.chdir(self.root)
+            results = BenchmarkRun(daemon=daemon, root=self.root).run(phases=phases)
+
+        self.assertEqual(list(results), phases)
+        self.assertTrue(os.path.exists(os.path.join(self.root, "post_office", "package_1", "wedding_invite.yml")))
+        self.assertEqual(daemon.calls["build"], 4)
+        self.assertEqual(daemon.calls["pull"], 2)
+        self.assertEqual(daemon.calls["container_start"], 6)
+        self.assertEqual(daemon.containers, {})
+        self.assertEqual(daemon.images, {})
+        self.assertEqual(daemon.networks, {})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+This file defines the tests for the BuilderPool spreading builds across docker hosts, using fake docker daemons for
+the builder hosts and the host running the containers.
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from wedpy import docker_client
+from wedpy.builder_pool import BuildDurations, BuilderHost, BuilderPool, BuilderPoolError, BuildJob
+from wedpy.core_unit import CoreUnit
+from wedpy.wedding_invite.build import Build
+
+
+class TestBuilderPool(TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        with open(os.path.join(self.root, "Dockerfile"), "w") as f:
+            f.write("FROM python:3.11-slim\n")
+        self.durations = BuildDurations(path=os.path.join(self.root, ".wedpy", "durations.json"))
+        docker_client._clients.clear()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root)
+        docker_client._clients.clear()
+
+    def jobs(self, count: int) -> list:
+        jobs = []
+        for index in range(count):
+            build = Build(unit=CoreUnit.from_dict({
+                "name": f"service_{index}", "image_url": f"bench/service_{index}", "git_url": "local",
+                "default_container_name": f"service_{index}", "default_image_tag": f"service_{index}",
+                "build_root": ".", "build_lock": True,
+            }))
+            jobs.append(BuildJob(build=build, package_root=self.root))
+        return jobs
+
+    def test_build(self) -> None:
+        """
+        Tests that builds are split across the hosts and every image ends up on the host running the containers.
+        :return: None
+        """
+        self.durations.durations = {"service_0": 30.0, "service_1": 20.0, "service_2": 10.0, "service_3": 5.0}
+        with FakeDockerDaemon(latencies={"build": 0.05}) as run_host, FakeDockerDaemon(latencies={"build": 0.05}) \
+                as builder, patch.dict(os.environ, {"DOCKER_HOST": run_host.base_url}):
+            hosts = [BuilderHost(name="local", max_builds=2),
+                     BuilderHost(name="remote", base_url=builder.base_url, max_builds=2)]
+            BuilderPool(hosts=hosts, durations=self.durations).build(jobs=self.jobs(count=4))
+
+            self.assertEqual(run_host.calls["build"], 2)
+            self.assertEqual(builder.calls["build"], 2)
+            self.assertEqual(run_host.calls["image_load"], 2)
+            for index in range(4):
+                self.assertIsNotNone(run_host.find_image(f"service_{index}"))
+        self.assertTrue(os.path.exists(self.durations.path))
+
+    def test_build_fallback(self) -> None:
+        """
+        Tests that builds move to another host when the daemon of a host errors.
+        :return: None
+        """
+        with FakeDockerDaemon() as run_host, FakeDockerDaemon(failing_operations={"build"}) as builder, \
+                patch.dict(os.environ, {"DOCKER_HOST": run_host.base_url}):
+            hosts = [BuilderHost(name="local", max_builds=1),
+                     BuilderHost(name="remote", base_url=builder.base_url, max_builds=1)]
+            BuilderPool(hosts=hosts, durations=self.durations).build(jobs=self.jobs(count=3))
+
+            self.assertEqual(run_host.calls["build"], 3)
+            for index in range(3):
+                self.assertIsNotNone(run_host.find_image(f"service_{index}"))
+
+    def test_build_no_hosts_left(self) -> None:
+        """
+        Tests that an error listing the builds is raised when every host has failed.
+        :return: None
+        """
+        with FakeDockerDaemon(failing_operations={"build"}) as run_host, \
+                patch.dict(os.environ, {"DOCKER_HOST": run_host.base_url}):
+            pool = BuilderPool(hosts=[BuilderHost(name="local")], durations=self.durations)
+            with self.assertRaises(BuilderPoolError) as context:
+                pool.build(jobs=self.jobs(count=2))
+        self.assertEqual(len(context.exception.failures), 2)
+
+
+if __name__ == '__main__':
+    main()
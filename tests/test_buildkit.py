@@ -0,0 +1,222 @@
+"""
+This file defines the tests around the buildx build backend, using a fake docker CLI.
+"""
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import MagicMock, patch
+
+import docker
+from docker.errors import BuildError
+
+from wedpy import tracing
+from wedpy.artifact_cache import FINGERPRINT_LABEL, fingerprint
+from wedpy.buildkit import BUILD_BACKEND_ENV, BUILD_CACHE_ENV, BUILDX_BUILDER_ENV, BuildxBuilder, build_backend, \
+    docker_environment
+from wedpy.core_unit import CoreUnit
+from wedpy.wedding_invite.build import Build
+
+# prints the plain progress of a build with two stages built in parallel, exports the cache if asked to and fails
+# if the tag is "broken"
+FAKE_DOCKER = """
+import os
+import sys
+
+args = sys.argv[1:]
+with open(os.environ["FAKE_DOCKER_ARGS"], "w") as f:
+    f.write("\\n".join(args))
+print("#1 [internal] load build definition from Dockerfile")
+print("#1 DONE 0.0s")
+print("#5 [deps 1/2] RUN --mount=type=cache,target=/root/.npm npm ci")
+print("#6 [assets 1/1] RUN make assets")
+print("#6 CACHED")
+print("#5 DONE 1.2s")
+if "--cache-to" in args:
+    destination = args[args.index("--cache-to") + 1].split("dest=")[1].split(",")[0]
+    os.makedirs(destination)
+    open(os.path.join(destination, "index.json"), "w").close()
+if "--tag" in args and args[args.index("--tag") + 1] == "broken":
+    print("#7 [build 2/2] RUN make")
+    print("#7 ERROR: process \\"/bin/sh -c make\\" did not complete successfully: exit code: 2")
+    sys.exit(1)
+"""
+
+
+class TestBuildxBuilder(TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.executable = os.path.join(self.root, "docker")
+        with open(self.executable, "w") as f:
+            f.write(f"#!{sys.executable}\n{FAKE_DOCKER}")
+        os.chmod(self.executable, os.stat(self.executable).st_mode | stat.S_IEXEC)
+        self.args_path = os.path.join(self.root, "args")
+        self.cache_dir = os.path.join(self.root, "cache")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root)
+
+    def test_command(self) -> None:
+        """
+        Tests that the build arguments, secrets, builder instance and cache directory are passed to buildx, and that
+        a cache is only imported once it was exported.
+        :return: None
+        """
+        builder = BuildxBuilder(builder="ci", cache_dir=self.cache_dir)
+        command = builder.command("/src/api", "Dockerfile", "org/api:dev", build_args={"VERSION": "1"},
+                                  secrets={"npmrc": "secrets/npmrc", "token": "env:GITHUB_TOKEN"})
+        cache_path = os.path.join(self.cache_dir, "org_api_dev")
+
+        self.assertEqual(["docker", "buildx", "build", "--progress=plain", "--load", "--tag", "org/api:dev",
+                          "--file", "/src/api/Dockerfile", "--builder", "ci", "--build-arg", "VERSION=1",
+                          "--secret", "id=npmrc,src=/src/api/secrets/npmrc", "--secret", "id=token,env=GITHUB_TOKEN",
+                          "--cache-to", f"type=local,dest={cache_path}.new,mode=max", "/src/api"], command)
+
+        os.makedirs(cache_path)
+        open(os.path.join(cache_path, "index.json"), "w").close()
+        command = builder.command("/src/api", "Dockerfile", "org/api:dev")
+        self.assertIn(f"type=local,src={cache_path}", command)
+
+    def test_platform_command(self) -> None:
+        """
+        Tests that an image built for another platform is pushed rather than loaded, and that the images of every
+        platform are combined with imagetools.
+        :return: None
+        """
+        command = BuildxBuilder().command("/src/api", "Dockerfile", "localhost:5000/api:latest-arm64",
+                                          platform="linux/arm64", push=True)
+        self.assertIn("--push", command)
+        self.assertNotIn("--load", command)
+        self.assertEqual("linux/arm64", command[command.index("--platform") + 1])
+
+        builder = BuildxBuilder(executable=self.executable)
+        with patch.dict(os.environ, {"FAKE_DOCKER_ARGS": self.args_path}):
+            builder.create_manifest("localhost:5000/api", ["localhost:5000/api:latest-amd64",
+                                                           "localhost:5000/api:latest-arm64"])
+        with open(self.args_path) as f:
+            self.assertEqual(["buildx", "imagetools", "create", "--tag", "localhost:5000/api",
+                              "localhost:5000/api:latest-amd64", "localhost:5000/api:latest-arm64"],
+                             f.read().split("\n"))
+
+    def test_from_env(self) -> None:
+        """
+        Tests that the backend, builder instance and cache directory are read from the environment.
+        :return: None
+        """
+        with patch.dict(os.environ, {BUILD_BACKEND_ENV: "buildx", BUILDX_BUILDER_ENV: "ci",
+                                     BUILD_CACHE_ENV: self.cache_dir}):
+            self.assertEqual("buildx", build_backend())
+            builder = BuildxBuilder.from_env()
+            self.assertEqual(("ci", self.cache_dir), (builder.builder, builder.cache_dir))
+        with patch.dict(os.environ, {BUILD_BACKEND_ENV: "kaniko"}):
+            self.assertRaises(ValueError, build_backend)
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertEqual("docker", build_backend())
+
+    def test_docker_environment(self) -> None:
+        """
+        Tests that a builder host reached over TCP or TLS is passed to the docker CLI with its certificates, and that
+        one reached over ssh is refused rather than built on locally.
+        :return: None
+        """
+        client = MagicMock()
+        client.api.base_url = "http://10.0.0.5:2375"
+        self.assertEqual({"DOCKER_HOST": "tcp://10.0.0.5:2375"}, docker_environment(client))
+        client.api.base_url = "http+docker://localhost"
+        self.assertEqual({}, docker_environment(client))
+        self.assertEqual({}, docker_environment(None))
+
+        for name in ("ca.pem", "cert.pem", "key.pem"):
+            with open(os.path.join(self.root, name), "w") as f:
+                f.write("pem")
+        # the client a builder host with a cert_path connects with, without asking the daemon for its API version
+        tls = docker.tls.TLSConfig(
+            client_cert=(os.path.join(self.root, "cert.pem"), os.path.join(self.root, "key.pem")),
+            ca_cert=os.path.join(self.root, "ca.pem"), verify=True
+        )
+        client = docker.DockerClient(base_url="tcp://10.0.0.6:2376", tls=tls, version="1.41")
+        self.assertEqual({"DOCKER_HOST": "tcp://10.0.0.6:2376", "DOCKER_TLS_VERIFY": "1",
+                          "DOCKER_CERT_PATH": self.root}, docker_environment(client))
+
+        client = MagicMock()
+
+        client.api.base_url = "http+docker://ssh"
+        self.assertRaises(ValueError, docker_environment, client)
+        with patch.dict(os.environ, {"DOCKER_HOST": "unix:///var/run/docker.sock"}), \
+                self.assertRaises(BuildError) as context:
+            BuildxBuilder(executable=self.executable).build(self.root, "Dockerfile", "api", docker_client=client)
+        self.assertIn("ssh", str(context.exception))
+
+    def test_build(self) -> None:
+        """
+        Tests that a build records a span for every step, including the steps of stages built in parallel, and
+        replaces the cache of the image with the one it exported.
+        :return: None
+        """
+        builder = BuildxBuilder(cache_dir=self.cache_dir, executable=self.executable)
+        trace_dir = tracing.start()
+        self.addCleanup(shutil.rmtree, trace_dir, True)
+        self.addCleanup(os.environ.pop, tracing.TRACE_DIR_ENV, None)
+        with patch.dict(os.environ, {"FAKE_DOCKER_ARGS": self.args_path}):
+            builder.build(self.root, "Dockerfile", "api", trace_tags={"build": "api"})
+            builder.build(self.root, "Dockerfile", "api", trace_tags={"build": "api"})
+
+        with open(self.args_path) as f:
+            self.assertIn(f"type=local,src={os.path.join(self.cache_dir, 'api')}", f.read().split("\n"))
+        self.assertEqual(["index.json"], os.listdir(os.path.join(self.cache_dir, "api")))
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, "api.new")))
+
+        output_path = os.path.join(self.root, "trace.json")
+        tracing.finish(output_path=output_path)
+        with open(output_path) as f:
+            steps = [event["args"] for event in json.load(f)["traceEvents"] if event["name"] == "build step"]
+        self.assertEqual(6, len(steps))
+        self.assertIn({"build": "api", "step": "[assets 1/1] RUN make assets", "result": "cached"}, steps)
+
+    def test_build_failure(self) -> None:
+        """
+        Tests that a failed build raises a BuildError with the output of the build.
+        :return: None
+        """
+        builder = BuildxBuilder(executable=self.executable)
+        with patch.dict(os.environ, {"FAKE_DOCKER_ARGS": self.args_path}), \
+                self.assertRaises(BuildError) as context:
+            builder.build(self.root, "Dockerfile", "broken")
+        self.assertIn("did not complete successfully", context.exception.msg)
+
+        with self.assertRaises(BuildError):
+            BuildxBuilder(executable=os.path.join(self.root, "missing")).build(self.root, "Dockerfile", "api")
+
+    @patch("wedpy.wedding_invite.build.BuildxBuilder")
+    @patch("wedpy.wedding_invite.build.get_client")
+    def test_build_image(self, mock_get_client, mock_builder) -> None:
+        """
+        Tests that Build.build_image builds with buildx when the buildx backend is selected.
+        :return: None
+        """
+        unit = CoreUnit.from_dict({"name": "api", "git_url": "local", "image_url": "org/api",
+                                   "default_image_tag": "api", "default_container_name": "api", "build_root": "api",
+                                   "build_lock": True, "build_args": {"VERSION": "1"},
+                                   "build_secrets": {"token": "env:GITHUB_TOKEN"}})
+        context_path = os.path.join(self.root, "api")
+        os.makedirs(context_path)
+        with open(os.path.join(context_path, "Dockerfile"), "w") as f:
+            f.write("FROM scratch\n")
+        with patch.dict(os.environ, {BUILD_BACKEND_ENV: "buildx"}):
+            Build(unit=unit, package_name="service").build_image(package_root=self.root, tag=None)
+
+        mock_builder.from_env.return_value.build.assert_called_once_with(
+            context_path=context_path, dockerfile="Dockerfile", tag="api", build_args={"VERSION": "1"},
+            secrets={"token": "env:GITHUB_TOKEN"}, docker_client=mock_get_client.return_value,
+            trace_tags={"package": "service", "build": "api"},
+            labels={FINGERPRINT_LABEL: fingerprint(context_path, "Dockerfile", build_args={"VERSION": "1"})}
+        )
+        mock_get_client.return_value.api.build.assert_not_called()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+This file defines the tests for admitting builds and containers against the capacity of the host.
+"""
+import os
+import threading
+import time
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from wedpy.capacity import CPUS_ENV, MEMORY_ENV, CapacityLimiter, HostCapacity, parse_memory
+
+
+class TestParseMemory(TestCase):
+
+    def test_parse_memory(self) -> None:
+        """
+        Tests that memory sizes in the formats docker accepts are parsed to bytes.
+        :return: None
+        """
+        self.assertIsNone(parse_memory(None))
+        self.assertEqual(1024, parse_memory(1024))
+        self.assertEqual(1024, parse_memory("1024"))
+        self.assertEqual(512 * 1024 ** 2, parse_memory("512m"))
+        self.assertEqual(2 * 1024 ** 3, parse_memory("2G"))
+        self.assertEqual(int(1.5 * 1024 ** 3), parse_memory("1.5gb"))
+
+    def test_parse_memory_invalid(self) -> None:
+        """
+        Tests that a size docker would refuse is refused.
+        :return: None
+        """
+        with self.assertRaises(ValueError):
+            parse_memory("lots")
+
+
+class TestHostCapacity(TestCase):
+
+    @patch.dict(os.environ, {CPUS_ENV: "3", MEMORY_ENV: "6g"})
+    def test_detect_from_env(self) -> None:
+        """
+        Tests that the detected capacity can be overridden by the environment.
+        :return: None
+        """
+        capacity = HostCapacity.detect()
+        self.assertEqual(3.0, capacity.cpus)
+        self.assertEqual(6 * 1024 ** 3, capacity.memory)
+
+    def test_detect(self) -> None:
+        """
+        Tests that the host always has some capacity.
+        :return: None
+        """
+        with patch.dict(os.environ, {}, clear=True):
+            capacity = HostCapacity.detect()
+        self.assertGreaterEqual(capacity.cpus, 1)
+        self.assertGreater(capacity.memory, 0)
+
+
+class TestCapacityLimiter(TestCase):
+
+    def setUp(self) -> None:
+        self.limiter = CapacityLimiter(HostCapacity(cpus=2, memory=4 * 1024 ** 3))
+
+    def test_max_workers(self) -> None:
+        """
+        Tests that the number of workers follows the cores of the host.
+        :return: None
+        """
+        self.assertEqual(2, self.limiter.max_workers)
+        self.assertEqual(1, CapacityLimiter(HostCapacity(cpus=0.5, memory=1)).max_workers)
+
+    def test_reserve(self) -> None:
+        """
+        Tests that a reservation is given back when the with block ends.
+        :return: None
+        """
+        with self.limiter.reserve((1.0, 1024 ** 3)):
+            self.assertEqual(1.0, self.limiter.free_cpus)
+            self.assertEqual(3 * 1024 ** 3, self.limiter.free_memory)
+            self.assertEqual(1, self.limiter.in_flight)
+        self.assertEqual(2.0, self.limiter.free_cpus)
+        self.assertEqual(4 * 1024 ** 3, self.limiter.free_memory)
+        self.assertEqual(0, self.limiter.in_flight)
+
+    def test_acquire_waits_for_release(self) -> None:
+        """
+        Tests that work which does not fit waits until running work gives its share back.
+        :return: None
+        """
+        self.limiter.acquire((2.0, 0))
+        admitted = threading.Event()
+
+        def acquire() -> None:
+            self.limiter.acquire((1.0, 0))
+            admitted.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        time.sleep(0.05)
+        self.assertFalse(admitted.is_set())
+        self.limiter.release((2.0, 0))
+        thread.join(timeout=5)
+        self.assertTrue(admitted.is_set())
+
+    def test_acquire_larger_than_host(self) -> None:
+        """
+        Tests that work larger than the host still runs when nothing else is running.
+        :return: None
+        """
+        self.limiter.acquire((1.0, 16 * 1024 ** 3))
+        self.assertEqual(1, self.limiter.in_flight)
+
+    def test_acquire_hold(self) -> None:
+        """
+        Tests that held capacity does not make later work wait forever.
+        :return: None
+        """
+        self.limiter.acquire((2.0, 4 * 1024 ** 3), hold=True)
+        self.assertEqual(0, self.limiter.in_flight)
+        self.limiter.acquire((1.0, 1024 ** 3))
+        self.assertEqual(1, self.limiter.in_flight)
+
+
+if __name__ == "__main__":
+    main()
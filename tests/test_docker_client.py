@@ -0,0 +1,45 @@
+"""
+This file defines the tests around the get_client function.
+"""
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from wedpy import docker_client
+from wedpy.docker_client import get_client
+
+
+class TestGetClient(TestCase):
+
+    def setUp(self) -> None:
+        docker_client._clients.clear()
+
+    def tearDown(self) -> None:
+        docker_client._clients.clear()
+
+    @patch('docker.from_env')
+    def test_get_client(self, mock_from_env) -> None:
+        """
+        Tests that the client is created once and reused within a process.
+        :return: None
+        """
+        self.assertEqual(get_client(), mock_from_env.return_value)
+        self.assertEqual(get_client(), mock_from_env.return_value)
+        mock_from_env.assert_called_once_with()
+
+    @patch('wedpy.docker_client.os.getpid')
+    @patch('docker.from_env')
+    def test_get_client_new_process(self, mock_from_env, mock_getpid) -> None:
+        """
+        Tests that a forked process does not reuse the client of its parent.
+        :return: None
+        """
+        mock_getpid.return_value = 1
+        get_client()
+        mock_getpid.return_value = 2
+        get_client()
+        self.assertEqual(mock_from_env.call_count, 2)
+        self.assertEqual(list(docker_client._clients), [2])
+
+
+if __name__ == '__main__':
+    main()
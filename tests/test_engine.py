@@ -0,0 +1,119 @@
+"""
+This file defines the tests for the asyncio Engine API client, using a fake docker daemon.
+"""
+import asyncio
+import io
+import tarfile
+import time
+from unittest import TestCase, main
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from wedpy.engine import AsyncEngineClient, EngineError, EngineNotFound, split_reference
+
+
+def build_context(dockerfile: str) -> bytes:
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w") as tar:
+        data = dockerfile.encode()
+        info = tarfile.TarInfo("Dockerfile")
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+    return archive.getvalue()
+
+
+class TestAsyncEngineClient(TestCase):
+
+    def test_split_reference(self) -> None:
+        """
+        Tests that image references are split into the repository and tag the pull endpoint takes.
+        :return: None
+        """
+        self.assertEqual(("postgres", "latest"), split_reference("postgres"))
+        self.assertEqual(("postgres", "15"), split_reference("postgres:15"))
+        self.assertEqual(("localhost:5000/postgres", "latest"), split_reference("localhost:5000/postgres"))
+        self.assertEqual(("postgres", "sha256:abc"), split_reference("postgres@sha256:abc"))
+
+    def test_calls(self) -> None:
+        """
+        Tests the calls wedpy makes, including the streamed build, pull and log endpoints.
+        :return: None
+        """
+        async def calls(daemon: FakeDockerDaemon) -> None:
+            async with AsyncEngineClient(base_url=daemon.base_url) as engine:
+                self.assertTrue(await engine.ping())
+                await engine.pull("bench/postgres:15")
+                self.assertTrue(await engine.image_exists("bench/postgres:15"))
+                self.assertFalse(await engine.image_exists("bench/missing"))
+
+                output = [line async for line in engine.build(build_context("FROM scratch\nRUN true\n"), tag="app")]
+                self.assertEqual("Step 2/2 : RUN true\n", output[1]["stream"])
+                self.assertIn("aux", output[2])
+                self.assertEqual(["app:latest"], (await engine.inspect_image("app"))["RepoTags"])
+
+                container_id = await engine.create_container({"Image": "app"}, name="app")
+                await engine.start_container("app")
+                self.assertEqual(container_id, (await engine.inspect_container("app"))["Id"])
+                self.assertEqual(["/app"], (await engine.containers(filters={"name": ["app"]}))[0]["Names"])
+
+                daemon.add_logs("app", ["started", "listening"])
+                daemon.add_logs("app", ["warning"], stream="stderr")
+                self.assertEqual([("stdout", b"started\n"), ("stdout", b"listening\n"), ("stderr", b"warning\n")],
+                                 [frame async for frame in engine.logs("app")])
+
+                with self.assertRaises(EngineError) as context:
+                    await engine.create_container({"Image": "app"}, name="app")
+                self.assertEqual(409, context.exception.status)
+                await engine.stop_container("app")
+                await engine.remove_container("app")
+                with self.assertRaises(EngineNotFound):
+                    await engine.inspect_container("app")
+                self.assertEqual(1, engine.idle_connections)
+
+        with FakeDockerDaemon() as daemon:
+            asyncio.run(calls(daemon))
+
+    def test_concurrency(self) -> None:
+        """
+        Tests that hundreds of calls are in flight at once over a bounded pool of reused connections.
+        :return: None
+        """
+        async def inspect_all(daemon: FakeDockerDaemon) -> float:
+            async with AsyncEngineClient(base_url=daemon.base_url, max_connections=20) as engine:
+                await engine.create_container({"Image": "service"}, name="service")
+                start = time.monotonic()
+                results = await asyncio.gather(*(engine.inspect_container("service") for _ in range(200)))
+                self.assertEqual(200, len(results))
+                self.assertLessEqual(engine.idle_connections, 20)
+                return time.monotonic() - start
+
+        with FakeDockerDaemon(latencies={"container_inspect": 0.05}) as daemon:
+            daemon.add_image("service")
+            # one call at a time would take 10 seconds
+            self.assertLess(asyncio.run(inspect_all(daemon)), 5)
+            self.assertEqual(200, daemon.calls["container_inspect"])
+
+    def test_timeout(self) -> None:
+        """
+        Tests that a call that takes too long is cancelled and its connection is not reused.
+        :return: None
+        """
+        async def slow_call(daemon: FakeDockerDaemon) -> None:
+            async with AsyncEngineClient(base_url=daemon.base_url, timeout=0.2) as engine:
+                with self.assertRaises(asyncio.TimeoutError):
+                    await engine.containers()
+                self.assertEqual(0, engine.idle_connections)
+
+                task = asyncio.ensure_future(engine.containers())
+                await asyncio.sleep(0.05)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+                self.assertEqual(0, engine.idle_connections)
+                self.assertTrue(await engine.ping())
+
+        with FakeDockerDaemon(latencies={"container_list": 1}) as daemon:
+            asyncio.run(slow_call(daemon))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+This file defines the tests for the Environment API and the pytest plugin built on it, using a fake docker daemon.
+"""
+import os
+import shutil
+import socket
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import MagicMock, patch
+
+import yaml
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from wedpy import docker_client
+from wedpy.environment import Environment
+from wedpy.pytest_plugin import XDIST_WORKER_ENV, worker_instance
+
+
+class TestEnvironment(TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.listener = socket.socket()
+        self.listener.bind(("localhost", 0))
+        self.listener.listen()
+        self.port = self.listener.getsockname()[1]
+        with open(os.path.join(self.root, "seating_plan.yml"), "w") as f:
+            yaml.safe_dump({"network_name": "environment_network", "venue": "sandbox", "post_office": "post_office",
+                            "attendees": []}, f)
+        with open(os.path.join(self.root, "wedding_invite.yml"), "w") as f:
+            yaml.safe_dump({"package_name": "service", "builds": [{
+                "name": "service", "image_url": "bench/service", "git_url": "local",
+                "default_container_name": "service", "default_image_tag": "service", "build_root": "service",
+                "inside_port": 80, "outside_port": self.port,
+            }]}, f)
+        docker_client._clients.clear()
+        delay_patcher = patch("wedpy.wedding_invite.wedding_invite.INIT_CONTAINER_DELAY", 0)
+        delay_patcher.start()
+        self.addCleanup(delay_patcher.stop)
+
+    def tearDown(self) -> None:
+        self.listener.close()
+        shutil.rmtree(self.root)
+        docker_client._clients.clear()
+
+    def test_up(self) -> None:
+        """
+        Tests that the environment is brought up once and reused while it runs the current images, and brought up
+        again once it was destroyed.
+        :return: None
+        """
+        cwd = os.getcwd()
+        with FakeDockerDaemon() as daemon, patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            daemon.add_image("service")
+            environment = Environment(root=self.root)
+            self.assertFalse(environment.is_running())
+
+            self.assertTrue(environment.up(build=False))
+            self.assertEqual(cwd, os.getcwd())
+            self.assertTrue(environment.is_running())
+            self.assertFalse(environment.up(build=False))
+            self.assertFalse(Environment(root=self.root).up(build=False))
+            self.assertEqual(1, daemon.calls["container_create"])
+
+            self.assertEqual(("localhost", self.port), environment.endpoint("service"))
+            self.assertEqual(f"http://localhost:{self.port}", environment.url("service"))
+            self.assertRaises(KeyError, environment.endpoint, "nothing")
+
+            environment.down()
+            self.assertEqual([], docker_client.get_client().containers.list(all=True))
+            self.assertTrue(environment.up(build=False))
+            self.assertEqual(2, daemon.calls["container_create"])
+
+    def test_up_replaces_leftovers(self) -> None:
+        """
+        Tests that bringing up an environment whose container was stopped, or runs an image that was rebuilt since,
+        replaces the container instead of failing on its name.
+        :return: None
+        """
+        with FakeDockerDaemon() as daemon, patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            daemon.add_image("service")
+            client = docker_client.get_client()
+            environment = Environment(root=self.root)
+            self.assertTrue(environment.up(build=False))
+
+            client.containers.get("service").stop()
+            self.assertTrue(environment.up(build=False))
+            [container] = client.containers.list(all=True)
+            self.assertEqual("running", container.status)
+
+            image = daemon.add_image("service")
+            self.assertFalse(environment.is_running())
+            self.assertTrue(environment.up(build=False))
+            [container] = client.containers.list(all=True)
+            self.assertEqual(image["Id"], container.image.id)
+            self.assertEqual(3, daemon.calls["container_create"])
+
+    def test_up_instance(self) -> None:
+        """
+        Tests that an instance runs its own containers on its own network and ports.
+        :return: None
+        """
+        with FakeDockerDaemon() as daemon, patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            daemon.add_image("service")
+            environment = Environment(root=self.root, instance="gw0")
+            environment.up(build=False)
+            client = docker_client.get_client()
+            self.assertEqual(["gw0_environment_network"], [network.name for network in client.networks.list()])
+            self.assertEqual(1, len(client.containers.list()))
+            self.assertNotEqual(self.port, environment.endpoint("service")[1])
+
+            environment.down()
+            self.assertEqual([], client.containers.list(all=True))
+            self.assertEqual([], client.networks.list())
+
+    def test_prepare_once(self) -> None:
+        """
+        Tests that the processes of one run prepare the environment once, that the next run prepares it again and
+        that a failed preparation is tried again by the next process.
+        :return: None
+        """
+        with patch.object(Environment, "_prepare") as mock_prepare:
+            self.assertTrue(Environment(root=self.root).prepare(run_id="first"))
+            self.assertFalse(Environment(root=self.root, instance="gw1").prepare(run_id="first"))
+            self.assertEqual(1, mock_prepare.call_count)
+
+            mock_prepare.side_effect = RuntimeError("build failed")
+            self.assertRaises(RuntimeError, Environment(root=self.root).prepare, "second")
+            mock_prepare.side_effect = None
+            self.assertTrue(Environment(root=self.root).prepare(run_id="second"))
+            self.assertEqual(3, mock_prepare.call_count)
+
+    def test_wait_ready(self) -> None:
+        """
+        Tests that waiting returns once the services accept connections and times out otherwise.
+        :return: None
+        """
+        environment = Environment(root=self.root)
+        environment.wait_ready(timeout=1)
+        self.listener.close()
+        self.assertRaises(TimeoutError, environment.wait_ready, ["service"], 0.1, 0.05)
+
+    def test_reset_without_snapshots(self) -> None:
+        """
+        Tests that resetting an environment created without snapshots is refused.
+        :return: None
+        """
+        self.assertRaises(RuntimeError, Environment(root=self.root).reset)
+
+
+class TestPytestPlugin(TestCase):
+
+    def test_worker_instance(self) -> None:
+        """
+        Tests that every xdist worker gets its own instance.
+        :return: None
+        """
+        config = MagicMock()
+        config.getoption.return_value = None
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(worker_instance(config))
+        with patch.dict(os.environ, {XDIST_WORKER_ENV: "gw1"}):
+            self.assertEqual("gw1", worker_instance(config))
+            config.getoption.return_value = "ci"
+            self.assertEqual("ci_gw1", worker_instance(config))
+
+
+if __name__ == "__main__":
+    main()
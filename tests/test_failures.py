@@ -0,0 +1,134 @@
+"""
+This file defines the tests for the failure policies and the retries of the build, pull and clone paths.
+"""
+import os
+import time
+from types import SimpleNamespace
+from unittest import TestCase, main
+from unittest.mock import MagicMock, patch
+
+from wedpy.failures import (FAILURE_POLICY_ENV, KEEP_GOING, RETRIES_ENV, BuildFailures, RetryPolicy, failure_policy,
+                            is_transient)
+from wedpy.wedding_invite.wedding_invite import build_in_order, build_in_pool
+
+
+class FakeBuild:
+    """
+    A build that sleeps or fails instead of building, which can be handed to a process pool.
+    """
+    def __init__(self, name: str, seconds: float = 0.0, fails: bool = False) -> None:
+        self.core_unit = SimpleNamespace(default_image_tag=name)
+        self.seconds = seconds
+        self.fails = fails
+
+    def build_demand(self, remote: bool = False) -> tuple:
+        return 0.0, 0
+
+    def build_image(self, package_root: str, tag: str, remote: bool = False) -> None:
+        time.sleep(self.seconds)
+        if self.fails is True:
+            raise RuntimeError("RUN make returned a non-zero code: 2")
+
+
+class TestFailures(TestCase):
+
+    def test_is_transient(self) -> None:
+        """
+        Tests that dropped connections, overloaded daemons and registries and network failures inside a build are
+        retried while other failures are not.
+        :return: None
+        """
+        self.assertTrue(is_transient(ConnectionResetError()))
+        self.assertTrue(is_transient(TimeoutError()))
+        self.assertTrue(is_transient(MagicMock(status_code=503)))
+        self.assertTrue(is_transient(RuntimeError("Get https://registry-1.docker.io/v2/: net/http: TLS handshake "
+                                                  "timeout")))
+        self.assertTrue(is_transient(RuntimeError("Temporary failure resolving 'deb.debian.org'")))
+        self.assertFalse(is_transient(MagicMock(status_code=404)))
+        self.assertFalse(is_transient(RuntimeError("RUN make returned a non-zero code: 2")))
+
+    def test_retry(self) -> None:
+        """
+        Tests that transient errors are retried with exponential backoff until the retries run out, and that other
+        errors are raised straight away.
+        :return: None
+        """
+        retry = RetryPolicy(retries=2, base_delay=0.01)
+        function = MagicMock(side_effect=[ConnectionResetError(), ConnectionResetError(), "built"])
+        with patch("builtins.print"):
+            self.assertEqual("built", retry.call("api build", function, "."))
+        self.assertEqual(3, function.call_count)
+
+        function = MagicMock(side_effect=ConnectionResetError())
+        with patch("builtins.print"):
+            self.assertRaises(ConnectionResetError, retry.call, "api build", function)
+        self.assertEqual(3, function.call_count)
+
+        function = MagicMock(side_effect=ValueError("invalid Dockerfile"))
+        self.assertRaises(ValueError, retry.call, "api build", function)
+        self.assertEqual(1, function.call_count)
+
+        retry = RetryPolicy(base_delay=1, max_delay=4)
+        self.assertLessEqual(retry.delay(1), 1)
+        self.assertGreaterEqual(retry.delay(3), 2)
+        self.assertLessEqual(retry.delay(10), 4)
+
+    def test_from_env(self) -> None:
+        """
+        Tests that the policy and the retries are read from the environment and that invalid values are refused.
+        :return: None
+        """
+        with patch.dict(os.environ, {FAILURE_POLICY_ENV: KEEP_GOING, RETRIES_ENV: "5"}):
+            self.assertEqual(KEEP_GOING, failure_policy())
+            self.assertEqual(5, RetryPolicy.from_env().retries)
+        with patch.dict(os.environ, {FAILURE_POLICY_ENV: "sometimes", RETRIES_ENV: "many"}):
+            self.assertRaises(ValueError, failure_policy)
+            self.assertRaises(ValueError, RetryPolicy.from_env)
+
+    def test_build_in_pool_fail_fast(self) -> None:
+        """
+        Tests that the first failure in the pool cancels the builds still queued or running.
+        :return: None
+        """
+        builds = [FakeBuild("broken", fails=True)] + [FakeBuild(f"slow{i}", seconds=2) for i in range(4)]
+        start = time.monotonic()
+        with patch.dict(os.environ, {RETRIES_ENV: "0"}), self.assertRaises(BuildFailures) as context:
+            build_in_pool(builds, args=(".", None, False), desc="builds", processes=2)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(["broken: RUN make returned a non-zero code: 2"], context.exception.failures)
+        self.assertEqual(["slow0", "slow1", "slow2", "slow3"], context.exception.cancelled)
+
+    def test_build_in_pool_keep_going(self) -> None:
+        """
+        Tests that keep-going finishes every build and reports every failure.
+        :return: None
+        """
+        builds = [FakeBuild("broken", fails=True), FakeBuild("api", seconds=0.1),
+                  FakeBuild("also_broken", seconds=0.2, fails=True)]
+        with patch.dict(os.environ, {RETRIES_ENV: "0", FAILURE_POLICY_ENV: KEEP_GOING}), \
+                self.assertRaises(BuildFailures) as context:
+            build_in_pool(builds, args=(".", None, False), desc="builds", processes=2)
+        self.assertEqual(["broken", "also_broken"], [f.split(":")[0] for f in context.exception.failures])
+        self.assertEqual([], context.exception.cancelled)
+
+    def test_build_in_order(self) -> None:
+        """
+        Tests that builds run one after the other stop at the first failure with fail-fast and run on with
+        keep-going.
+        :return: None
+        """
+        builds = [FakeBuild("broken", fails=True), FakeBuild("api")]
+        with patch.dict(os.environ, {RETRIES_ENV: "0"}), patch("tqdm.tqdm", side_effect=lambda builds, **_: builds):
+            with self.assertRaises(BuildFailures) as context:
+                build_in_order(builds, args=(".", None, False), desc="builds")
+            self.assertEqual(["api"], context.exception.cancelled)
+
+            with patch.dict(os.environ, {FAILURE_POLICY_ENV: KEEP_GOING}), \
+                    self.assertRaises(BuildFailures) as context:
+                build_in_order(builds + [FakeBuild("also_broken", fails=True)], args=(".", None, False),
+                               desc="builds")
+            self.assertEqual(2, len(context.exception.failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+This file defines the tests for the run, teardown, status and pull paths over the asyncio engine client, using a fake
+docker daemon.
+"""
+import os
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from tests.factories import build_dict
+from wedpy import docker_client, fanout
+from wedpy.docker_client import ENGINE_ENV
+from wedpy.failures import RETRIES_ENV, RetryPolicy
+from wedpy.status import StatusReport
+from wedpy.wedding_invite.wedding_invite import WeddingInvite
+
+
+def invite(network_name: str) -> WeddingInvite:
+    return WeddingInvite(
+        build_dicts=[
+            build_dict("api", inside_port=80, outside_port=8080, config={"MODE": "test"}, cpus=0.5,
+                       memory=64 * 1024 ** 2, default_container_name=f"{network_name}_api"),
+            build_dict("postgres", data_volumes={"pgdata": "/var/lib/postgresql/data"},
+                       default_container_name=f"{network_name}_postgres"),
+        ],
+        init_build_dicts=[build_dict("migrate", default_container_name=f"{network_name}_migrate")],
+        package_name="service",
+    )
+
+
+class TestFanout(TestCase):
+
+    def setUp(self) -> None:
+        docker_client._clients.clear()
+        delay_patcher = patch("wedpy.wedding_invite.wedding_invite.INIT_CONTAINER_DELAY", 0)
+        delay_patcher.start()
+        self.addCleanup(delay_patcher.stop)
+
+    def tearDown(self) -> None:
+        docker_client._clients.clear()
+
+    def test_run_containers(self) -> None:
+        """
+        Tests that the containers run over the asyncio engine client are run as docker-py runs them, and that they
+        are destroyed all at once.
+        :return: None
+        """
+        with FakeDockerDaemon(exiting_images=["migrate"]) as daemon, \
+                patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            for name in ("api", "postgres", "migrate"):
+                daemon.add_image(name)
+            client = docker_client.get_client()
+            for network_name in ("sync", "async"):
+                client.networks.create(network_name)
+
+            invite("sync").run_containers(runner=client.containers, network_name="sync")
+            with patch.dict(os.environ, {ENGINE_ENV: "asyncio"}):
+                invite("async").run_containers(runner=client.containers, network_name="async")
+
+            for name in ("api", "postgres", "migrate"):
+                synced = daemon.find_container(f"sync_{name}")
+                fanned = daemon.find_container(f"async_{name}")
+                self.assertEqual(synced["State"]["Status"], fanned["State"]["Status"])
+                self.assertEqual(sorted(synced["Config"]["Env"]), sorted(fanned["Config"]["Env"]))
+                for key in ("PortBindings", "NanoCpus", "Memory"):
+                    self.assertEqual(synced["HostConfig"].get(key), fanned["HostConfig"].get(key))
+                self.assertEqual("async", fanned["HostConfig"]["NetworkMode"])
+            self.assertEqual(["async_api"],
+                             daemon.find_container("async_api")["NetworkSettings"]["Networks"]["async"]["Aliases"])
+            self.assertEqual({"wedpy.network": "async"}, daemon.volumes["async_postgres_pgdata"]["Labels"])
+
+            names = [f"async_{name}" for name in ("api", "postgres", "migrate")]
+            self.assertEqual(names, fanout.run(fanout.remove_containers, names + names))
+            self.assertEqual([], fanout.run(fanout.remove_containers, names))
+            self.assertEqual(3, len(client.containers.list(all=True)))
+
+    def test_status_and_pull(self) -> None:
+        """
+        Tests that the status is collected and the images are pulled over the asyncio engine client, and that every
+        failed pull is retried and reported.
+        :return: None
+        """
+        with FakeDockerDaemon() as daemon, \
+                patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url, ENGINE_ENV: "asyncio"}):
+            references = ["bench/api", "bench/postgres", "bench/api"]
+            self.assertEqual(["bench/api", "bench/postgres"], fanout.run(fanout.pull_images, references))
+            self.assertEqual(2, daemon.calls["pull"])
+
+            service = invite("status")
+            service.builds[0].core_unit.default_image_tag = "bench/api"
+            statuses = StatusReport(invites=[service]).collect(docker_client=None)
+            self.assertEqual(["missing", "missing", "missing"], [status.state for status in statuses])
+            self.assertTrue(statuses[0].image_present)
+            self.assertEqual(1, daemon.calls["container_list"])
+
+            daemon.failing_operations.add("pull")
+            with patch.dict(os.environ, {RETRIES_ENV: "1"}), patch.object(RetryPolicy, "delay", return_value=0), \
+                    patch("builtins.print"), self.assertRaises(fanout.FanoutError) as context:
+                fanout.run(fanout.pull_images, references)
+            self.assertEqual(["bench/api", "bench/postgres"], list(context.exception.failures))
+            # every failed pull was retried once
+            self.assertEqual(2 + 4, daemon.calls["pull"])
+
+
+if __name__ == "__main__":
+    main()
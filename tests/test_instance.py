@@ -0,0 +1,104 @@
+"""
+This file defines the tests for running namespaced instances of a seating plan side by side on one docker host,
+using a fake docker daemon.
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from benchmarks.fixtures import make_workspace
+from wedpy import docker_client
+from wedpy.instance import INSTANCE_LABEL, Instance
+from wedpy.seating_plan.seating_plan import SeatingPlan
+from wedpy.wedding_invite.local_wedding_invite import LocalWeddingInvite
+
+
+class TestInstance(TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        self.state_path = os.path.join(self.root, ".wedpy", "instances")
+        docker_client._clients.clear()
+
+    def tearDown(self) -> None:
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root)
+        docker_client._clients.clear()
+
+    def test_invalid_id(self) -> None:
+        """
+        Tests that ids that are not valid in docker names are refused.
+        :return: None
+        """
+        with self.assertRaises(ValueError):
+            Instance(instance_id="shard 1")
+
+    def test_port_for(self) -> None:
+        """
+        Tests that ports are allocated once per container and never given to two instances.
+        :return: None
+        """
+        first = Instance(instance_id="a", state_path=self.state_path, port_range=(21000, 21010))
+        second = Instance(instance_id="b", state_path=self.state_path, port_range=(21000, 21010))
+
+        port = first.port_for("api", 8000)
+        self.assertEqual(first.port_for("api", 8000), port)
+        self.assertNotEqual(second.port_for("api", 8000), port)
+
+        first.release()
+        self.assertEqual(first.ports(), {})
+        self.assertEqual(len(second.ports()), 1)
+
+    @patch('wedpy.wedding_invite.wedding_invite.INIT_CONTAINER_DELAY', 0)
+    def test_parallel_instances(self) -> None:
+        """
+        Tests that two instances run side by side with their own names, ports and network aliases, and that tearing
+        one down leaves the other running.
+        :return: None
+        """
+        init_images = make_workspace(self.root, attendees=1, builds=1)
+        seating_plan_path = os.path.join(self.root, "seating_plan.yml")
+        local_wedding_invite_path = os.path.join(self.root, "wedding_invite.yml")
+
+        with FakeDockerDaemon(exiting_images=init_images) as daemon, \
+                patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            os.chdir(self.root)
+            seating_plan = SeatingPlan(seating_plan_path=seating_plan_path)
+            seating_plan.install()
+            seating_plan.build(pool=False)
+            LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path).build_images_without_pool()
+
+            instances = {}
+            for instance_id in ("a", "b"):
+                instances[instance_id] = Instance(instance_id=instance_id, state_path=self.state_path)
+                seating_plan = SeatingPlan(seating_plan_path=seating_plan_path, instance=instances[instance_id])
+                seating_plan.run_containers()
+                LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path,
+                                   instance=instances[instance_id]).run_containers(
+                    runner=seating_plan.client.containers, network_name=seating_plan.network_name
+                )
+
+            containers = {c["Name"].lstrip("/"): c for c in daemon.containers.values()}
+            self.assertEqual(len(containers), 12)
+            service = containers["a_package_0_service_0"]
+            self.assertEqual(service["Config"]["Labels"], {INSTANCE_LABEL: "a"})
+            self.assertEqual(service["NetworkSettings"]["Networks"]["a_bench_network"]["Aliases"],
+                             ["package_0_service_0"])
+            self.assertIn("b_local_init", containers)
+            self.assertEqual(set(instances["a"].ports().values()) & set(instances["b"].ports().values()), set())
+
+            seating_plan = SeatingPlan(seating_plan_path=seating_plan_path, instance=instances["a"])
+            seating_plan.destroy_containers()
+            seating_plan.destroy_network()
+
+            self.assertTrue(all(c["Name"].startswith("/b_") for c in daemon.containers.values()))
+            self.assertEqual([n["Name"] for n in daemon.networks.values()], ["b_bench_network"])
+            self.assertEqual(instances["a"].ports(), {})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+This file defines the tests for the Journal letting an interrupted command skip the work it already finished, using
+a fake docker daemon.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from benchmarks.fixtures import git
+from wedpy import docker_client
+from wedpy.core_unit import CoreUnit
+from wedpy.journal import JOURNAL_ENV, Journal
+from wedpy.seating_plan.dependency import Dependency
+from wedpy.wedding_invite.build import Build
+
+
+class TestJournal(TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.journal_path = os.path.join(self.root, ".wedpy", "journal", "wedpy-build.json")
+        self.context_path = os.path.join(self.root, "service")
+        os.makedirs(self.context_path)
+        with open(os.path.join(self.context_path, "Dockerfile"), "w") as f:
+            f.write("FROM python:3.11-slim\nCOPY . /app\n")
+        self.build = Build(unit=CoreUnit.from_dict({
+            "name": "service", "image_url": "bench/service", "git_url": "local", "default_container_name": "service",
+            "default_image_tag": "service", "build_root": "service", "build_lock": True,
+        }))
+        docker_client._clients.clear()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root)
+        docker_client._clients.clear()
+
+    def test_record(self) -> None:
+        """
+        Tests that units are recorded with what they were finished with and forgotten on clear.
+        :return: None
+        """
+        journal = Journal(path=self.journal_path)
+        self.assertFalse(journal.is_done("clone", "cerberus", "abc"))
+
+        journal.record("clone", "cerberus", "abc")
+        journal.record("image", "cerberus", "f1")
+
+        self.assertTrue(Journal(path=self.journal_path).is_done("clone", "cerberus", "abc"))
+        self.assertFalse(journal.is_done("clone", "cerberus", "def"))
+        self.assertEqual({"clone:cerberus": "abc", "image:cerberus": "f1"}, journal.entries())
+
+        journal.clear()
+        self.assertEqual({}, journal.entries())
+
+    def test_build_image(self) -> None:
+        """
+        Tests that an image built in an interrupted run is skipped, unless its inputs changed or it was removed.
+        :return: None
+        """
+        with FakeDockerDaemon() as daemon, \
+                patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url, JOURNAL_ENV: self.journal_path}):
+            self.build.build_image(self.root, None)
+            self.build.build_image(self.root, None)
+            self.assertEqual(1, daemon.calls["build"])
+
+            with open(os.path.join(self.context_path, "main.py"), "w") as f:
+                f.write("print('changed')\n")
+            self.build.build_image(self.root, None)
+            self.assertEqual(2, daemon.calls["build"])
+
+            docker_client.get_client().images.remove("service")
+            self.build.build_image(self.root, None)
+            self.assertEqual(3, daemon.calls["build"])
+
+    def test_run_container(self) -> None:
+        """
+        Tests that a container started in an interrupted run is not started again while it is running, or for an
+        init container once it exited successfully, and that a container that stopped since is run again.
+        :return: None
+        """
+        with FakeDockerDaemon(exiting_images=["init"]) as daemon, \
+                patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url, JOURNAL_ENV: self.journal_path}):
+            daemon.add_image("service")
+            client = docker_client.get_client()
+            client.networks.create("journal_network")
+            self.build.run_container(runner=client.containers, network_name="journal_network")
+            self.build.run_container(runner=client.containers, network_name="journal_network")
+            self.assertEqual(1, daemon.calls["container_create"])
+
+            client.containers.get("service").stop()
+            self.build.run_container(runner=client.containers, network_name="journal_network")
+            self.assertEqual(2, daemon.calls["container_create"])
+            self.assertEqual("running", client.containers.get("service").status)
+
+            daemon.add_image("init")
+            init_build = Build(unit=CoreUnit.from_dict({
+                "name": "init", "image_url": "bench/init", "git_url": "local", "default_container_name": "init",
+                "default_image_tag": "init", "build_root": "service", "build_lock": True,
+            }), init=True)
+            init_build.run_container(runner=client.containers, network_name="journal_network")
+            init_build.run_container(runner=client.containers, network_name="journal_network")
+            self.assertEqual(3, daemon.calls["container_create"])
+
+    def test_clone_repo(self) -> None:
+        """
+        Tests that a dependency cloned at the recorded SHA is not cloned again.
+        :return: None
+        """
+        clone_path = os.path.join(self.root, "cerberus")
+        os.makedirs(clone_path)
+        git("init", "-q", cwd=clone_path)
+        git("commit", "-q", "--allow-empty", "-m", "first", cwd=clone_path)
+        sha = subprocess.run(["git", "rev-parse", "HEAD"], cwd=clone_path, stdout=subprocess.PIPE).stdout.decode()
+        dependency = Dependency(name="cerberus", default_image_name="cerberus", git_url="https://example.com/c.git",
+                                branch="main", image_url="cerberus")
+        self.assertEqual(sha.strip(), dependency.head_sha(clone_path))
+
+        Journal(path=self.journal_path).record("clone", "cerberus", sha.strip())
+        with patch.dict(os.environ, {JOURNAL_ENV: self.journal_path}), \
+                patch("wedpy.seating_plan.dependency.shutil.rmtree") as mock_rmtree:
+            dependency.clone_repo(venue_path=self.root)
+        mock_rmtree.assert_not_called()
+        self.assertEqual(sha.strip(), dependency.head_sha(clone_path))
+
+
+if __name__ == "__main__":
+    main()
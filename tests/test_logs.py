@@ -0,0 +1,101 @@
+"""
+This file defines the tests for streaming the logs of several containers into one output.
+"""
+import datetime
+import io
+import threading
+import time
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+from wedpy.logs import LogFollower, LogStream, parse_since
+
+
+def container(chunks) -> MagicMock:
+    mock = MagicMock()
+    mock.logs.return_value = iter(chunks)
+    return mock
+
+
+class TestParseSince(TestCase):
+
+    def test_parse_since(self) -> None:
+        """
+        Tests that durations and timestamps are turned into what docker accepts.
+        :return: None
+        """
+        self.assertIsNone(parse_since(None))
+        self.assertAlmostEqual(time.time() - 600, parse_since("10m"), delta=5)
+        self.assertEqual(1700000000, parse_since("1700000000"))
+        self.assertEqual(datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+                         parse_since("2024-01-02T03:04:05Z"))
+        with self.assertRaises(ValueError):
+            parse_since("yesterday")
+
+
+class TestLogFollower(TestCase):
+
+    def test_run(self) -> None:
+        """
+        Tests that lines split across chunks are joined, prefixed with their container and filtered.
+        :return: None
+        """
+        output = io.StringIO()
+        api = container([b"GET /health 200\nERROR db conn", b"ection lost\n", b"GET /users 200"])
+        db = container([b"ERROR too many clients\r\n"])
+        follower = LogFollower(streams=[LogStream("service/api", api), LogStream("service/db", db)],
+                               grep="ERROR", since=10, output=output)
+        follower.run()
+
+        lines = sorted(output.getvalue().splitlines())
+        self.assertEqual(["service/api | ERROR db connection lost", "service/db  | ERROR too many clients"], lines)
+        api.logs.assert_called_once_with(stream=True, follow=False, since=10)
+
+    def test_run_bounded(self) -> None:
+        """
+        Tests that a container logging faster than the output is drained drops its oldest lines and says so, while a
+        quiet container still gets its lines through.
+        :return: None
+        """
+        release = threading.Event()
+
+        class SlowOutput(io.StringIO):
+            def write(self, text: str) -> int:
+                release.wait(timeout=5)
+                return super().write(text)
+
+        output = SlowOutput()
+        noisy = container([f"line {i}\n".encode() for i in range(1000)])
+        quiet = container([b"ready\n"])
+        streams = [LogStream("noisy", noisy, buffer_lines=10), LogStream("quiet", quiet, buffer_lines=10)]
+        follower = LogFollower(streams=streams, output=output)
+        thread = threading.Thread(target=follower.run)
+        thread.start()
+        time.sleep(0.2)
+        release.set()
+        thread.join(timeout=5)
+
+        lines = output.getvalue().splitlines()
+        self.assertIn("quiet | ready", lines)
+        self.assertTrue(any("lines dropped" in line for line in lines))
+        self.assertIn("noisy | line 999", lines)
+        self.assertLessEqual(len([line for line in lines if line.startswith("noisy | line")]), 20)
+
+    def test_run_failure(self) -> None:
+        """
+        Tests that a container whose logs cannot be read is reported without stopping the others.
+        :return: None
+        """
+        output = io.StringIO()
+        broken = MagicMock()
+        broken.logs.side_effect = RuntimeError("gone")
+        follower = LogFollower(streams=[LogStream("broken", broken), LogStream("ok", container([b"up\n"]))],
+                               output=output)
+        follower.run()
+
+        self.assertIn("broken | log stream failed: gone", output.getvalue())
+        self.assertIn("ok     | up", output.getvalue())
+
+
+if __name__ == "__main__":
+    main()
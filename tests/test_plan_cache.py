@@ -0,0 +1,43 @@
+"""
+This file defines the tests for keeping the parsed seating plan and wedding invites until their files change.
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from wedpy.plan_cache import load_yaml
+
+
+class TestLoadYaml(TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, "wedding_invite.yml")
+        with open(self.path, "w") as f:
+            f.write("package_name: cerberus\nbuilds: []\n")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root)
+
+    def test_load_yaml(self) -> None:
+        """
+        Tests that a file is parsed once until it changes and that callers get their own copy.
+        :return: None
+        """
+        with patch("yaml.safe_load", wraps=__import__("yaml").safe_load) as mock_safe_load:
+            data = load_yaml(self.path)
+            data["builds"].append({"name": "changed by the caller"})
+            self.assertEqual({"package_name": "cerberus", "builds": []}, load_yaml(self.path))
+            self.assertEqual(1, mock_safe_load.call_count)
+
+            with open(self.path, "w") as f:
+                f.write("package_name: cerberus\nbuilds: [{name: api}]\n")
+            os.utime(self.path, ns=(0, os.stat(self.path).st_mtime_ns + 1000))
+            self.assertEqual([{"name": "api"}], load_yaml(self.path)["builds"])
+            self.assertEqual(2, mock_safe_load.call_count)
+
+
+if __name__ == "__main__":
+    main()
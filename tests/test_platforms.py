@@ -0,0 +1,167 @@
+"""
+This file defines the tests around the host architecture detection and the platform-matrix build mode.
+"""
+import os
+import time
+from unittest import TestCase, main
+from unittest.mock import MagicMock, patch
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from tests.factories import build_job
+from wedpy import docker_client, platforms
+from wedpy.failures import FAIL_FAST, FAILURE_POLICY_ENV, KEEP_GOING, RETRIES_ENV, BuildFailures
+from wedpy.platforms import ARCH_ENV, build_matrix, daemon_arch, ensure_local_registry, host_arch, platform_build_files, \
+    platform_tag, select_build_file
+
+BUILD_FILES = {"x86_64": "Dockerfile.x86_64", "arm": "Dockerfile.aarch64"}
+
+
+class TestPlatforms(TestCase):
+
+    def setUp(self) -> None:
+        host_arch.cache_clear()
+        self.addCleanup(host_arch.cache_clear)
+
+    def test_host_arch(self) -> None:
+        """
+        Tests that the architecture of the host is read from uname even when the processor name is empty, is read
+        once, and can be set in the environment.
+        :return: None
+        """
+        with patch.dict(os.environ, {}, clear=True), \
+                patch("wedpy.platforms.platform.machine", return_value="aarch64") as machine, \
+                patch("wedpy.platforms.platform.processor", return_value=""):
+            self.assertEqual("arm64", host_arch())
+            self.assertEqual("arm64", host_arch())
+            machine.assert_called_once_with()
+        host_arch.cache_clear()
+        with patch.dict(os.environ, {ARCH_ENV: "x86_64"}):
+            self.assertEqual("amd64", host_arch())
+
+    def test_daemon_arch(self) -> None:
+        """
+        Tests that the architecture of a daemon is read from docker info once and named as a docker platform.
+        :return: None
+        """
+        platforms._daemon_arches.clear()
+        self.addCleanup(platforms._daemon_arches.clear)
+        builder = MagicMock()
+        builder.api.base_url = "http://build-box:2375"
+        builder.info.return_value = {"Architecture": "aarch64"}
+        self.assertEqual("arm64", daemon_arch(builder))
+        self.assertEqual("arm64", daemon_arch(builder))
+        builder.info.assert_called_once_with()
+
+    def test_select_build_file(self) -> None:
+        """
+        Tests that the build file of an architecture is found under any of the names the architecture goes by.
+        :return: None
+        """
+        build_files = {"x86_64": "Dockerfile.x86_64", "arm": "Dockerfile.aarch64"}
+        self.assertEqual("Dockerfile.aarch64", select_build_file(build_files, "aarch64"))
+        self.assertEqual("Dockerfile.aarch64", select_build_file(build_files, "arm64"))
+        self.assertEqual("Dockerfile.x86_64", select_build_file(build_files, "amd64"))
+        self.assertIsNone(select_build_file(build_files, "s390x"))
+        self.assertIsNone(select_build_file(build_files, ""))
+
+    def test_platform_build_files(self) -> None:
+        """
+        Tests that a build is built for every architecture it declares, or the requested ones, and that a locked
+        build is built for the requested platforms or the host's.
+        :return: None
+        """
+        api = build_job("api", build_files=BUILD_FILES)
+        lock = build_job("lock", build_files=BUILD_FILES, build_lock=True)
+        self.assertEqual({"linux/amd64": "Dockerfile.x86_64", "linux/arm64": "Dockerfile.aarch64"},
+                         platform_build_files(api))
+        self.assertEqual({"linux/arm64": "Dockerfile.aarch64"}, platform_build_files(api, ["linux/arm64"]))
+        with patch.dict(os.environ, {ARCH_ENV: "amd64"}):
+            self.assertEqual({"linux/amd64": "Dockerfile"}, platform_build_files(lock))
+        self.assertEqual({"linux/amd64": "Dockerfile", "linux/arm64": "Dockerfile"},
+                         platform_build_files(lock, ["amd64", "arm64"]))
+        self.assertEqual("localhost:5000/org/api:dev-arm64", platform_tag("localhost:5000/org/api:dev", "linux/arm64"))
+        self.assertEqual("localhost:5000/api:latest-armv7", platform_tag("localhost:5000/api", "linux/arm/v7"))
+
+    def test_build_matrix(self) -> None:
+        """
+        Tests that every declared platform of every build is pushed and combined into one image per build, and that
+        images that are pulled are skipped.
+        :return: None
+        """
+        builder = MagicMock()
+        jobs = [build_job("api", build_files=BUILD_FILES, build_args={"ENV": "ci"}),
+                build_job("postgres", build_files=BUILD_FILES, git_url=None)]
+        self.assertEqual(["localhost:5000/api"], build_matrix(jobs, builder=builder))
+
+        self.assertEqual(2, builder.build.call_count)
+        for call in builder.build.call_args_list:
+            self.assertEqual("/src/api", call[0][0])
+            self.assertEqual({"ENV": "ci"}, call[1]["build_args"])
+            self.assertTrue(call[1]["push"])
+        self.assertEqual({("Dockerfile.x86_64", "localhost:5000/api:latest-amd64", "linux/amd64"),
+                          ("Dockerfile.aarch64", "localhost:5000/api:latest-arm64", "linux/arm64")},
+                         {(call[0][1], call[0][2], call[1]["platform"]) for call in builder.build.call_args_list})
+        builder.create_manifest.assert_called_once()
+        self.assertEqual("localhost:5000/api", builder.create_manifest.call_args[0][0])
+        self.assertEqual({"localhost:5000/api:latest-amd64", "localhost:5000/api:latest-arm64"},
+                         set(builder.create_manifest.call_args[0][1]))
+
+    def test_build_matrix_failure(self) -> None:
+        """
+        Tests that every failed platform is reported and no image is combined when a platform fails.
+        :return: None
+        """
+        builder = MagicMock()
+        builder.build.side_effect = lambda *args, **kwargs: self.fail_arm(kwargs["platform"])
+        with patch.dict(os.environ, {RETRIES_ENV: "0", FAILURE_POLICY_ENV: KEEP_GOING}), \
+                self.assertRaises(BuildFailures) as context:
+            build_matrix([build_job(name, build_files=BUILD_FILES) for name in ("api", "worker")], builder=builder)
+        self.assertEqual(["api (linux/arm64)", "worker (linux/arm64)"],
+                         sorted(failure.split(":")[0] for failure in context.exception.failures))
+        self.assertEqual(4, builder.build.call_count)
+        builder.create_manifest.assert_not_called()
+
+    def test_build_matrix_fail_fast(self) -> None:
+        """
+        Tests that the platform builds still queued are cancelled once one fails under the fail-fast policy.
+        :return: None
+        """
+        builder = MagicMock()
+        builder.build.side_effect = lambda *args, **kwargs: self.fail_slowly()
+        with patch.dict(os.environ, {RETRIES_ENV: "0", FAILURE_POLICY_ENV: FAIL_FAST}), \
+                self.assertRaises(BuildFailures) as context:
+            build_matrix([build_job(name, build_files=BUILD_FILES) for name in ("api", "worker")], builder=builder,
+                         max_workers=1)
+        self.assertEqual(4, len(context.exception.failures) + len(context.exception.cancelled))
+        self.assertGreaterEqual(len(context.exception.cancelled), 2)
+        self.assertEqual(len(context.exception.failures), builder.build.call_count)
+
+    @staticmethod
+    def fail_slowly() -> None:
+        time.sleep(0.1)
+        raise RuntimeError("exec format error")
+
+    @staticmethod
+    def fail_arm(platform_name: str) -> None:
+        if platform_name == "linux/arm64":
+            raise RuntimeError("exec format error")
+
+    def test_ensure_local_registry(self) -> None:
+        """
+        Tests that a registry container is started for a registry on this machine once, and not for a remote one.
+        :return: None
+        """
+        docker_client._clients.clear()
+        self.addCleanup(docker_client._clients.clear)
+        with FakeDockerDaemon() as daemon, patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            daemon.add_image(platforms.REGISTRY_IMAGE)
+            ensure_local_registry("registry.example.com")
+            self.assertEqual(0, daemon.calls["container_create"])
+            ensure_local_registry("localhost:5000")
+            ensure_local_registry("localhost:5000")
+            self.assertEqual(1, daemon.calls["container_create"])
+            self.assertEqual("running", daemon.find_container(platforms.REGISTRY_CONTAINER)["State"]["Status"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+This file defines the tests for wedpy-publish pushing the built images to their image url, using a fake docker daemon
+standing in for the docker daemon and the registry.
+"""
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import MagicMock, patch
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from tests.factories import build_job
+from wedpy import docker_client
+from wedpy.builder_pool import BuildJob
+from wedpy.artifact_cache import FINGERPRINT_LABEL
+from wedpy.failures import FAILURE_POLICY_ENV, KEEP_GOING, RETRIES_ENV
+from wedpy.publish import PublishedImages, PublishError, PushProgress, publish
+
+
+class TestPublish(TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.published = PublishedImages(path=os.path.join(self.root, ".wedpy", "published.json"))
+        self.jobs = [self.job("api"), self.job("worker"), self.job("postgres", git_url=None)]
+        docker_client._clients.clear()
+        patcher = patch.dict(os.environ, {RETRIES_ENV: "0"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root)
+        docker_client._clients.clear()
+
+    def job(self, name: str, **fields) -> BuildJob:
+        context_path = os.path.join(self.root, name)
+        os.makedirs(context_path)
+        with open(os.path.join(context_path, "Dockerfile"), "w") as f:
+            f.write(f"FROM scratch\nLABEL name={name}\n")
+        fields = dict({"image_url": f"localhost:5000/{name}", "build_lock": True}, **fields)
+        return build_job(name, package_root=self.root, **fields)
+
+    def test_publish(self) -> None:
+        """
+        Tests that every built image is tagged with its image url, pushed and its digest recorded with the fingerprint
+        it is labelled with, that images built from unchanged inputs are skipped when only changed images are
+        published, and that pulled images are never pushed.
+        :return: None
+        """
+        with FakeDockerDaemon() as daemon, patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            daemon.add_image("api", labels={FINGERPRINT_LABEL: "api1"})
+            daemon.add_image("worker", labels={FINGERPRINT_LABEL: "worker1"}, size=300 * 1024)
+
+            digests = publish(self.jobs, published=self.published)
+            self.assertEqual({"localhost:5000/api": daemon.registry["localhost:5000/api:latest"],
+                              "localhost:5000/worker": daemon.registry["localhost:5000/worker:latest"]}, digests)
+            self.assertEqual(2, daemon.calls["image_push"])
+            entries = self.published.entries()
+            self.assertEqual(["localhost:5000/api", "localhost:5000/worker"], sorted(entries))
+            self.assertEqual(f"localhost:5000/api@{digests['localhost:5000/api']}",
+                             entries["localhost:5000/api"]["reference"])
+            self.assertEqual("api1", entries["localhost:5000/api"]["fingerprint"])
+
+            # the source changing is not enough, the image pushed is the one built
+            with open(os.path.join(self.root, "api", "main.py"), "w") as f:
+                f.write("print('changed')\n")
+            self.assertEqual({"localhost:5000/api": None, "localhost:5000/worker": None},
+                             publish(self.jobs, changed_only=True, published=self.published))
+            self.assertEqual(2, daemon.calls["image_push"])
+
+            daemon.add_image("api", labels={FINGERPRINT_LABEL: "api2"})
+            digests = publish(self.jobs, changed_only=True, published=self.published)
+            self.assertEqual({"localhost:5000/api": daemon.registry["localhost:5000/api:latest"],
+                              "localhost:5000/worker": None}, digests)
+            self.assertEqual(3, daemon.calls["image_push"])
+            self.assertEqual("api2", self.published.entries()["localhost:5000/api"]["fingerprint"])
+
+            # an image that was not built by wedpy has no fingerprint, so it is never taken as unchanged
+            daemon.add_image("worker")
+            publish(self.jobs, changed_only=True, published=self.published)
+            publish(self.jobs, changed_only=True, published=self.published)
+            self.assertEqual(5, daemon.calls["image_push"])
+
+    def test_publish_shared_image_url(self) -> None:
+        """
+        Tests that builds of the same tag may share an image url, and that builds of different tags may not.
+        :return: None
+        """
+        with FakeDockerDaemon() as daemon, patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            daemon.add_image("api", labels={FINGERPRINT_LABEL: "api1"})
+            dev_api = self.job("dev_api", image_url="localhost:5000/api", default_image_tag="api")
+            self.assertEqual(["localhost:5000/api"], list(publish([self.jobs[0], dev_api], published=self.published)))
+
+            other_api = self.job("other_api", image_url="localhost:5000/api")
+            with self.assertRaises(PublishError) as context:
+                publish([self.jobs[0], other_api], published=self.published)
+            self.assertIn("both api (api) and other_api (other_api)", str(context.exception))
+            self.assertEqual(1, daemon.calls["image_push"])
+
+    def test_publish_failures(self) -> None:
+        """
+        Tests that every failed push is reported under the keep-going policy, and that the fail-fast policy cancels
+        the pushes still queued.
+        :return: None
+        """
+        with FakeDockerDaemon() as daemon, patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            daemon.add_image("api")
+            with patch.dict(os.environ, {FAILURE_POLICY_ENV: KEEP_GOING}), \
+                    self.assertRaises(PublishError) as context:
+                publish(self.jobs, published=self.published)
+            self.assertEqual(1, len(context.exception.failures))
+            self.assertIn("No such image: worker", context.exception.failures[0])
+            self.assertEqual(["localhost:5000/api"], list(self.published.entries()))
+
+            for name in ("worker", "scheduler"):
+                daemon.add_image(name)
+            daemon.failing_operations.add("image_push")
+            # the tag is slow, so the push queued behind the one running when the first push fails is cancelled
+            daemon.latencies["image_tag"] = 0.3
+            pushes = daemon.calls["image_push"]
+            with self.assertRaises(PublishError) as context:
+                publish(self.jobs + [self.job("scheduler")], max_pushes=1, published=self.published)
+            self.assertEqual(["localhost:5000/scheduler"], context.exception.cancelled)
+            self.assertEqual(len(context.exception.failures), daemon.calls["image_push"] - pushes)
+
+    def test_push_progress(self) -> None:
+        """
+        Tests that the bytes uploaded by pushes running at the same time are added up, that layers the registry
+        already has are counted as skipped, and that a retried push is not counted twice.
+        :return: None
+        """
+        bar = MagicMock(total=0)
+        progress = PushProgress(bar=bar)
+        for image in ("api", "worker"):
+            progress.update(image, {"status": "Preparing", "progressDetail": {}, "id": "layer"})
+            progress.update(image, {"status": "Pushing", "progressDetail": {"current": 100, "total": 300},
+                                    "id": "layer"})
+        progress.update("api", {"status": "Pushing", "progressDetail": {"current": 300, "total": 300}, "id": "layer"})
+        progress.update("api", {"status": "Pushing", "progressDetail": {"current": 50, "total": 300}, "id": "layer"})
+        progress.update("api", {"status": "Layer already exists", "progressDetail": {}, "id": "base"})
+        progress.update("api", {"progressDetail": {}, "aux": {"Tag": "latest", "Digest": "sha256:abc"}})
+
+        self.assertEqual(600, bar.total)
+        self.assertEqual(400, sum(call.args[0] for call in bar.update.call_args_list))
+        self.assertEqual(1, progress.skipped)
+
+    def test_published_images(self) -> None:
+        """
+        Tests that the record of the published images keeps the other images when one is recorded again.
+        :return: None
+        """
+        self.published.record("localhost:5000/api", "one", "sha256:1")
+        self.published.record("localhost:5000/worker:v2", "two", "sha256:2")
+        self.published.record("localhost:5000/api", "three", "sha256:3")
+        with open(self.published.path) as f:
+            entries = json.load(f)
+        self.assertEqual({"fingerprint": "three", "digest": "sha256:3", "reference": "localhost:5000/api@sha256:3"},
+                         entries["localhost:5000/api"])
+        self.assertEqual("localhost:5000/worker@sha256:2", entries["localhost:5000/worker:v2"]["reference"])
+        self.assertTrue(self.published.is_current("localhost:5000/api", "three"))
+        self.assertFalse(self.published.is_current("localhost:5000/worker", "two"))
+
+
+if __name__ == "__main__":
+    main()
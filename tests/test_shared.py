@@ -0,0 +1,86 @@
+"""
+This file defines the tests for sharing the container of a shareable build between seating plans on one docker host,
+using a fake docker daemon.
+"""
+import os
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from wedpy import docker_client
+from wedpy.core_unit import CoreUnit
+from wedpy.shared import SHARED_LABEL, holders, is_shared, release
+from wedpy.wedding_invite.build import Build
+
+
+def shared_build(**fields) -> Build:
+    return Build(unit=CoreUnit.from_dict(dict({
+        "name": "postgres", "image_url": "bench/postgres", "git_url": "local", "default_container_name": "postgres",
+        "default_image_tag": "postgres", "build_root": "postgres", "shareable": True, "inside_port": 5432,
+        "outside_port": 5432, "config": {"POSTGRES_PASSWORD": "password"},
+        "data_volumes": {"pgdata": "/var/lib/postgresql/data"},
+    }, **fields)))
+
+
+class TestShared(TestCase):
+
+    def setUp(self) -> None:
+        docker_client._clients.clear()
+
+    def tearDown(self) -> None:
+        docker_client._clients.clear()
+
+    def test_run_container(self) -> None:
+        """
+        Tests that identical shareable builds of several networks run in one container, reached by their own name on
+        each network, and that the container and its data are removed once the last network releases it.
+        :return: None
+        """
+        with FakeDockerDaemon() as daemon, patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            daemon.add_image("postgres")
+            client = docker_client.get_client()
+            networks = [client.networks.create(name) for name in ("project_a", "project_b", "project_c")]
+
+            shared_build().run_container(runner=client.containers, network_name="project_a")
+            shared_build(default_container_name="billing_postgres").run_container(runner=client.containers,
+                                                                                  network_name="project_b")
+            self.assertEqual(1, daemon.calls["container_create"])
+            container = client.containers.list(all=True)[0]
+            self.assertTrue(is_shared(container))
+            self.assertEqual(["project_a", "project_b"], holders(container))
+            self.assertEqual(["billing_postgres"],
+                             container.attrs["NetworkSettings"]["Networks"]["project_b"]["Aliases"])
+            self.assertEqual(1, len(client.volumes.list(filters={"label": SHARED_LABEL})))
+
+            shared_build(config={"POSTGRES_PASSWORD": "other"}).run_container(runner=client.containers,
+                                                                              network_name="project_c")
+            self.assertEqual(2, daemon.calls["container_create"])
+            release(client.containers.list(filters={"network": "project_c"})[0], network=networks[2])
+
+            self.assertFalse(release(container, network=networks[0]))
+            self.assertEqual(["project_b"], holders(container))
+            self.assertTrue(release(container, network=networks[1]))
+            self.assertEqual([], client.containers.list(all=True))
+            self.assertEqual([], client.volumes.list())
+
+    def test_run_container_stopped(self) -> None:
+        """
+        Tests that a stopped shared container is started again when another network attaches to it.
+        :return: None
+        """
+        with FakeDockerDaemon() as daemon, patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            daemon.add_image("postgres")
+            client = docker_client.get_client()
+            client.networks.create("project_a")
+            shared_build().run_container(runner=client.containers, network_name="project_a")
+            container = client.containers.list(all=True)[0]
+            container.stop()
+
+            shared_build().run_container(runner=client.containers, network_name="project_a")
+            container.reload()
+            self.assertEqual("running", container.status)
+            self.assertEqual(1, daemon.calls["container_create"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+This file defines the tests for snapshotting the data volumes of a package once its init containers have seeded them,
+using a fake docker daemon.
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import MagicMock, patch
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from tests.factories import build_dict
+from wedpy import docker_client
+from wedpy.snapshot import VolumeSnapshots
+from wedpy.wedding_invite.wedding_invite import WeddingInvite
+
+
+SEED = {"PG_VERSION": b"16", "base/1/2619": b"seeded rows"}
+
+
+class TestVolumeSnapshots(TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.snapshots = VolumeSnapshots(directory=self.root)
+        self.invite = WeddingInvite(
+            build_dicts=[build_dict("cerberus_postgres", data_volumes={"pgdata": "/var/lib/postgresql/data"})],
+            init_build_dicts=[build_dict("cerberus_migrate")],
+            package_name="cerberus",
+        )
+        docker_client._clients.clear()
+        delay_patcher = patch("wedpy.wedding_invite.wedding_invite.INIT_CONTAINER_DELAY", 0)
+        delay_patcher.start()
+        self.addCleanup(delay_patcher.stop)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root)
+        docker_client._clients.clear()
+
+    def run_invite(self) -> None:
+        client = docker_client.get_client()
+        self.invite.run_containers(runner=client.containers, network_name="snapshot_network", snapshots=self.snapshots)
+
+    def teardown(self) -> None:
+        client = docker_client.get_client()
+        for container in client.containers.list(all=True):
+            container.remove(force=True)
+        for volume in client.volumes.list(filters={"label": "wedpy.network=snapshot_network"}):
+            volume.remove(force=True)
+
+    def test_run_containers(self) -> None:
+        """
+        Tests that the first run seeds and snapshots the data, the next run restores it without running the init
+        containers, and a new init image seeds from scratch again.
+        :return: None
+        """
+        with FakeDockerDaemon(exiting_images=["cerberus_migrate"]) as daemon, \
+                patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            daemon.add_image("cerberus_postgres")
+            daemon.add_image("cerberus_migrate")
+            docker_client.get_client().networks.create("snapshot_network")
+            # stands in for the migrations and seeds the init container writes
+            daemon.add_volume("cerberus_postgres_pgdata", labels={"wedpy.network": "snapshot_network"})
+            daemon.volume_files["cerberus_postgres_pgdata"].update(SEED)
+
+            self.run_invite()
+            self.assertEqual(2, daemon.calls["container_create"])
+            fingerprint = self.snapshots.fingerprint(self.invite, docker_client.get_client())
+            self.assertTrue(self.snapshots.has(self.invite, fingerprint))
+            self.assertFalse(daemon.find_container("cerberus_postgres")["State"]["Paused"])
+
+            self.teardown()
+            self.assertNotIn("cerberus_postgres_pgdata", daemon.volumes)
+            daemon.calls.clear()
+            self.run_invite()
+            self.assertEqual(SEED, daemon.volume_files["cerberus_postgres_pgdata"])
+            names = [c["Name"] for c in daemon.containers.values()]
+            self.assertEqual(["/cerberus_postgres"], names)
+            self.assertEqual(0, daemon.calls["container_wait"])
+
+            daemon.add_image("cerberus_migrate")
+            self.assertFalse(self.snapshots.has(self.invite,
+                                                self.snapshots.fingerprint(self.invite, docker_client.get_client())))
+
+    def test_reset(self) -> None:
+        """
+        Tests that reset rolls the data of a running container back to the snapshot.
+        :return: None
+        """
+        with FakeDockerDaemon(exiting_images=["cerberus_migrate"]) as daemon, \
+                patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            daemon.add_image("cerberus_postgres")
+            daemon.add_image("cerberus_migrate")
+            client = docker_client.get_client()
+            client.networks.create("snapshot_network")
+            self.assertFalse(self.snapshots.reset(self.invite, runner=client.containers,
+                                                  network_name="snapshot_network"))
+
+            daemon.add_volume("cerberus_postgres_pgdata", labels={"wedpy.network": "snapshot_network"})
+            daemon.volume_files["cerberus_postgres_pgdata"].update(SEED)
+            self.run_invite()
+            daemon.volume_files["cerberus_postgres_pgdata"]["base/1/2619"] = b"rows written by a test"
+
+            self.assertTrue(self.snapshots.reset(self.invite, runner=client.containers,
+                                                 network_name="snapshot_network"))
+            self.assertEqual(SEED, daemon.volume_files["cerberus_postgres_pgdata"])
+            self.assertEqual("running", client.containers.get("cerberus_postgres").status)
+
+    def test_save_failed_init(self) -> None:
+        """
+        Tests that no snapshot is taken when an init container failed.
+        :return: None
+        """
+        runner = MagicMock()
+        runner.get.return_value.wait.return_value = {"StatusCode": 1}
+
+        self.assertFalse(self.snapshots.save(self.invite, runner=runner, fingerprint="abc"))
+        runner.get.return_value.pause.assert_not_called()
+        self.assertEqual([], os.listdir(self.root))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+This file defines the tests for the status report comparing the wedding invites against the docker daemon, using a
+fake docker daemon.
+"""
+import json
+import os
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from tests.factories import build_dict
+from wedpy import docker_client
+from wedpy.status import StatusReport, normalise_tag
+from wedpy.wedding_invite.wedding_invite import WeddingInvite
+
+
+class TestStatusReport(TestCase):
+
+    def setUp(self) -> None:
+        self.invite = WeddingInvite(
+            build_dicts=[build_dict("api", outside_port=8001, inside_port=8000), build_dict("worker"),
+                         build_dict("cache")],
+            init_build_dicts=[build_dict("migrate")],
+            package_name="service"
+        )
+        docker_client._clients.clear()
+
+    def tearDown(self) -> None:
+        docker_client._clients.clear()
+
+    def test_normalise_tag(self) -> None:
+        """
+        Tests that references without a tag get the latest tag.
+        :return: None
+        """
+        self.assertEqual("api:latest", normalise_tag("api"))
+        self.assertEqual("localhost:5000/api:latest", normalise_tag("localhost:5000/api"))
+        self.assertEqual("api:v2", normalise_tag("api:v2"))
+
+    def test_collect(self) -> None:
+        """
+        Tests that running, exited, missing and stale containers and missing images are reported from one container
+        list and one image list call.
+        :return: None
+        """
+        with FakeDockerDaemon(exiting_images=["migrate"]) as daemon, \
+                patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            client = docker_client.get_client()
+            client.networks.create("status_network")
+            for name in ("api", "worker", "migrate"):
+                daemon.add_image(name)
+            for build in self.invite.builds[:2] + self.invite.init_builds:
+                build.run_container(runner=client.containers, network_name="status_network")
+            # worker was rebuilt after its container started
+            daemon.add_image("worker")
+            daemon.calls.clear()
+
+            report = StatusReport(invites=[self.invite])
+            statuses = {status.container: status for status in report.collect(docker_client=client)}
+
+            self.assertEqual(daemon.calls["container_list"], 1)
+            self.assertEqual(daemon.calls["image_list"], 1)
+            self.assertEqual(sum(daemon.calls.values()), 2)
+
+        self.assertEqual("running", statuses["api"].state)
+        self.assertTrue(statuses["api"].image_fresh)
+        self.assertEqual(["0.0.0.0:8001->8000/tcp"], statuses["api"].ports)
+        self.assertTrue(statuses["api"].healthy)
+
+        self.assertFalse(statuses["worker"].image_fresh)
+        self.assertFalse(statuses["worker"].healthy)
+
+        self.assertEqual("missing", statuses["cache"].state)
+        self.assertFalse(statuses["cache"].image_present)
+        self.assertIsNone(statuses["cache"].image_fresh)
+
+        self.assertEqual("init", statuses["migrate"].kind)
+        self.assertEqual("exited", statuses["migrate"].state)
+        self.assertEqual(0, statuses["migrate"].exit_code)
+        self.assertTrue(statuses["migrate"].healthy)
+
+        table = report.to_table().splitlines()
+        self.assertTrue(table[0].startswith("PACKAGE"))
+        self.assertIn("worker (stale)", table[2])
+        self.assertIn("cache (missing)", table[3])
+        self.assertEqual(4, len(json.loads(report.to_json())))
+
+    def test_collect_remote(self) -> None:
+        """
+        Tests that the registry images are expected for the attendees but not for the local package when remote.
+        :return: None
+        """
+        local_invite = WeddingInvite(build_dicts=[build_dict("local_api")], init_build_dicts=[],
+                                     package_name="local")
+        with FakeDockerDaemon() as daemon, patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            daemon.add_image("bench/api")
+            daemon.add_image("local_api")
+            report = StatusReport(invites=[self.invite], remote=True, local_invite=local_invite)
+            statuses = report.collect(docker_client=docker_client.get_client())
+
+        self.assertEqual(["local_api", "api"], [status.container for status in statuses[:2]])
+        self.assertEqual("local", statuses[0].package)
+        self.assertTrue(statuses[0].image_present)
+        self.assertEqual("bench/api", statuses[1].image)
+        self.assertTrue(statuses[1].image_present)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+This file defines the tests around the tracing helpers.
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from multiprocessing import Process
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from wedpy import tracing
+from wedpy.endpoints.instrument import instrument
+
+
+def traced_worker() -> None:
+    with tracing.span("build", package="taxonomist", build="taxonomist"):
+        pass
+
+
+class TestTracing(TestCase):
+
+    def setUp(self) -> None:
+        self.output_dir = tempfile.mkdtemp()
+        self.output_path = os.path.join(self.output_dir, "trace.json")
+
+    def tearDown(self) -> None:
+        directory = os.environ.pop(tracing.TRACE_DIR_ENV, None)
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+        shutil.rmtree(self.output_dir)
+
+    def test_span_switched_off(self) -> None:
+        """
+        Tests that spans do nothing when tracing is switched off.
+        :return: None
+        """
+        self.assertIsNone(tracing.trace_dir())
+        with tracing.span("clone", package="taxonomist"):
+            pass
+        tracing.finish(output_path=self.output_path)
+        self.assertFalse(os.path.exists(self.output_path))
+
+    def test_spans_across_threads_and_processes(self) -> None:
+        """
+        Tests that spans from threads and child processes are merged into one Chrome trace.
+        :return: None
+        """
+        directory = tracing.start()
+        with tracing.span("wedpy-build"):
+            thread = threading.Thread(target=traced_worker, name="worker-thread")
+            thread.start()
+            thread.join()
+            process = Process(target=traced_worker)
+            process.start()
+            process.join()
+        tracing.finish(output_path=self.output_path)
+
+        self.assertFalse(os.path.exists(directory))
+        with open(self.output_path) as f:
+            trace = json.load(f)
+        spans = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+        self.assertEqual(sorted(span["name"] for span in spans), ["build", "build", "wedpy-build"])
+        self.assertEqual(len({span["pid"] for span in spans}), 2)
+        self.assertEqual(len({(span["pid"], span["tid"]) for span in spans}), 3)
+        build = [span for span in spans if span["name"] == "build"][0]
+        self.assertEqual(build["args"], {"package": "taxonomist", "build": "taxonomist"})
+        thread_names = [event["args"]["name"] for event in trace["traceEvents"] if event["name"] == "thread_name"]
+        self.assertIn("worker-thread", thread_names)
+
+    def test_span_error(self) -> None:
+        """
+        Tests that a span records the error raised inside it.
+        :return: None
+        """
+        tracing.start()
+        with self.assertRaises(ValueError):
+            with tracing.span("pull"):
+                raise ValueError("registry down")
+        tracing.finish(output_path=self.output_path)
+
+        with open(self.output_path) as f:
+            span = json.load(f)["traceEvents"][-1]
+        self.assertEqual(span["args"]["error"], "ValueError('registry down')")
+
+    def test_instrument_output(self) -> None:
+        """
+        Tests that tracing and profiling an entry point leaves its output alone and reports on stderr.
+        :return: None
+        """
+        args = argparse.Namespace(trace=self.output_path, profile='-')
+        with patch("sys.stdout", new_callable=io.StringIO) as stdout, \
+                patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            with instrument(args, command="wedpy-status"):
+                print("[]")
+        self.assertEqual("[]\n", stdout.getvalue())
+        self.assertIn(f"trace written to {self.output_path}", stderr.getvalue())
+        self.assertIn("function calls", stderr.getvalue())
+        self.assertTrue(os.path.exists(self.output_path))
+
+
+if __name__ == '__main__':
+    main()
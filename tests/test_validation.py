@@ -0,0 +1,192 @@
+"""
+This file defines the tests around the PlanValidator class.
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+
+import yaml
+
+from wedpy.validation import PlanValidator, ValidationError
+
+
+class TestPlanValidator(TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.root)
+        os.mkdir(os.path.join(self.root, "sandbox"))
+        self.seating_plan_path = os.path.join(self.root, "seating_plan.yml")
+        self.local_invite_path = os.path.join(self.root, "wedding_invite.yml")
+        self.seating_plan = {
+            "network_name": "test_network",
+            "venue": "sandbox",
+            "post_office": "post_office",
+            "attendees": [
+                {
+                    "name": "taxonomist",
+                    "default_image_name": "taxonomist",
+                    "git_url": "https://github.com/yellow-bird-consult/taxonomist.git",
+                    "image_url": "yellowbirdconsulting/taxonomy-server",
+                    "branch": "development"
+                }
+            ]
+        }
+        self.attendee_invite = {
+            "package_name": "taxonomist",
+            "builds": [
+                {
+                    "name": "taxonomist",
+                    "default_container_name": "taxonomist",
+                    "git_url": "https://github.com/yellow-bird-consult/taxonomist.git",
+                    "image_url": "yellowbirdconsulting/taxonomy-server",
+                    "default_image_tag": "taxonomist",
+                    "build_root": ".",
+                    "outside_port": 8012,
+                    "inside_port": 8012,
+                    "build_files": {"x86_64": "builds/Dockerfile.x86_64", "arm": "builds/Dockerfile.aarch64"}
+                }
+            ]
+        }
+        self.local_invite = {
+            "package_name": "cerberus",
+            "builds": [
+                {
+                    "name": "cerberus_postgres",
+                    "default_container_name": "cerberus_postgres",
+                    "image_url": "postgres",
+                    "default_image_tag": "postgres",
+                    "outside_port": 5434,
+                    "inside_port": 5432
+                }
+            ]
+        }
+
+    def tearDown(self) -> None:
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root)
+
+    def write_files(self) -> None:
+        with open(self.seating_plan_path, "w") as f:
+            yaml.safe_dump(self.seating_plan, f)
+        with open(self.local_invite_path, "w") as f:
+            yaml.safe_dump(self.local_invite, f)
+        os.makedirs(os.path.join(self.root, "sandbox", "taxonomist"), exist_ok=True)
+        with open(os.path.join(self.root, "sandbox", "taxonomist", "wedding_invite.yml"), "w") as f:
+            yaml.safe_dump(self.attendee_invite, f)
+
+    def validator(self, **kwargs) -> PlanValidator:
+        return PlanValidator(seating_plan_path=self.seating_plan_path,
+                             local_wedding_invite_path=self.local_invite_path, cpu_arch="x86_64", **kwargs)
+
+    def test_valid_plan(self) -> None:
+        """
+        Tests that a valid plan has no errors.
+        :return: None
+        """
+        self.write_files()
+        self.assertEqual(self.validator().validate(), [])
+        self.validator().raise_for_errors()
+
+    def test_missing_and_mistyped_fields(self) -> None:
+        """
+        Tests that missing and mistyped fields are all reported together.
+        :return: None
+        """
+        del self.seating_plan["network_name"]
+        del self.attendee_invite["builds"][0]["image_url"]
+        self.local_invite["builds"][0]["outside_port"] = "5434"
+        self.write_files()
+
+        errors = self.validator().validate()
+
+        self.assertEqual(len(errors), 3)
+        self.assertIn("missing required field 'network_name'", errors[0])
+        self.assertIn("field 'outside_port' should be int, got str", errors[1])
+        self.assertIn("missing required field 'image_url'", errors[2])
+
+    def test_missing_architecture(self) -> None:
+        """
+        Tests that a build from source without a build file for the host architecture is reported unless the images
+        are pulled or the build files are not being checked.
+        :return: None
+        """
+        self.write_files()
+        errors = PlanValidator(seating_plan_path=self.seating_plan_path, cpu_arch="").validate()
+
+        self.assertEqual(len(errors), 1)
+        self.assertIn("no build file for the host architecture ''", errors[0])
+        self.assertEqual(
+            PlanValidator(seating_plan_path=self.seating_plan_path, cpu_arch="",
+                          check_build_files=False).validate(),
+            []
+        )
+
+    def test_build_secrets(self) -> None:
+        """
+        Tests that builds with secrets are refused unless they are built with the buildx backend.
+        :return: None
+        """
+        self.attendee_invite["builds"][0]["build_secrets"] = {"npmrc": "~/.npmrc"}
+        self.write_files()
+        errors = self.validator(build_backend="docker").validate()
+
+        self.assertEqual(len(errors), 1)
+        self.assertIn("'build_secrets' need the buildx build backend", errors[0])
+        self.assertEqual(self.validator(build_backend="buildx").validate(), [])
+
+    def test_duplicates(self) -> None:
+        """
+        Tests that duplicate container names and outside ports are found across the whole plan.
+        :return: None
+        """
+        self.local_invite["builds"][0]["default_container_name"] = "taxonomist"
+        self.local_invite["builds"][0]["outside_port"] = 8012
+        self.write_files()
+
+        errors = self.validator().validate()
+
+        self.assertEqual(len(errors), 2)
+        self.assertIn("duplicate container name 'taxonomist'", errors[0])
+        self.assertIn("duplicate outside port 8012", errors[1])
+
+    def test_builders(self) -> None:
+        """
+        Tests that the optional builders section is checked for missing names, bad types and duplicates.
+        :return: None
+        """
+        self.seating_plan["builders"] = [
+            {"name": "local"},
+            {"name": "remote", "base_url": "tcp://10.0.0.2:2376", "max_builds": 0},
+            {"name": "local", "max_builds": "4"},
+        ]
+        self.write_files()
+
+        errors = self.validator().validate()
+
+        self.assertEqual(len(errors), 3)
+        self.assertIn("'max_builds' should be at least 1", errors[0])
+        self.assertIn("field 'max_builds' should be int, got str", errors[1])
+        self.assertIn("duplicate builder name 'local'", errors[2])
+
+    def test_raise_for_errors(self) -> None:
+        """
+        Tests that raise_for_errors raises a ValidationError listing every error and that missing invites are
+        reported.
+        :return: None
+        """
+        self.write_files()
+        os.remove(os.path.join(self.root, "sandbox", "taxonomist", "wedding_invite.yml"))
+
+        with self.assertRaises(ValidationError) as context:
+            self.validator().raise_for_errors()
+        self.assertEqual(len(context.exception.errors), 1)
+        self.assertIn("file not found", str(context.exception))
+
+        self.validator().raise_for_errors(check_invites=False)
+
+
+if __name__ == '__main__':
+    main()
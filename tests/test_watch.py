@@ -0,0 +1,114 @@
+"""
+This file defines the tests for the Watcher rebuilding and replacing only the containers whose source changed, using
+a fake docker daemon.
+"""
+import io
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from docker.errors import APIError
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from tests.factories import build_dict
+from wedpy import docker_client
+from wedpy.watch import Watcher, WatchTarget
+from wedpy.wedding_invite.wedding_invite import WeddingInvite
+
+
+class TestWatcher(TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        for build_root in ("api", "worker", "migrations"):
+            os.makedirs(os.path.join(self.root, build_root))
+            with open(os.path.join(self.root, build_root, "Dockerfile"), "w") as f:
+                f.write("FROM python:3.11-slim\n")
+        self.invite = WeddingInvite(
+            build_dicts=[build_dict("api", build_lock=True), build_dict("worker", build_lock=True),
+                         {"name": "db", "image_url": "postgres", "default_image_tag": "postgres",
+                          "default_container_name": "db"}],
+            init_build_dicts=[build_dict("migrate", build_root="migrations", build_lock=True)],
+            package_name="service"
+        )
+        docker_client._clients.clear()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root)
+        docker_client._clients.clear()
+
+    def test_from_invite(self) -> None:
+        """
+        Tests that only builds from source are watched.
+        :return: None
+        """
+        targets = WatchTarget.from_invite(invite=self.invite, package_root=self.root)
+
+        self.assertEqual([t.build.core_unit.name for t in targets], ["api", "worker", "migrate"])
+        self.assertEqual(targets[0].build_root, os.path.join(self.root, "api"))
+        self.assertTrue(targets[0].owns(os.path.join(self.root, "api", "main.py")))
+        self.assertFalse(targets[0].owns(os.path.join(self.root, "api_v2", "main.py")))
+        self.assertTrue(targets[2].is_init)
+
+    @patch('wedpy.wedding_invite.wedding_invite.INIT_CONTAINER_DELAY', 0)
+    def test_replace_changed_build(self) -> None:
+        """
+        Tests that a burst of changes under one build root rebuilds that build once and runs the init containers of
+        the package again, while the other containers keep running.
+        :return: None
+        """
+        with FakeDockerDaemon(exiting_images=["migrate"]) as daemon, \
+                patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            client = docker_client.get_client()
+            client.networks.create("watch_network")
+            watcher = Watcher(targets=WatchTarget.from_invite(invite=self.invite, package_root=self.root),
+                              runner=client.containers, network_name="watch_network", debounce=0.1,
+                              poll_interval=0.02)
+            snapshot = watcher.snapshot()
+
+            snapshot, targets = watcher.poll(snapshot)
+            self.assertIsNone(targets)
+
+            for name in ("main.py", "models.py"):
+                with open(os.path.join(self.root, "api", name), "w") as f:
+                    f.write("print('changed')\n")
+            snapshot, targets = watcher.poll(snapshot)
+            self.assertEqual([t.build.core_unit.name for t in targets], ["api"])
+
+            watcher.replace(targets)
+
+            self.assertEqual(daemon.calls["build"], 1)
+            self.assertEqual(daemon.calls["container_start"], 2)
+            self.assertEqual(sorted(c.name for c in client.containers.list(all=True)), ["api", "migrate"])
+
+    @patch('wedpy.wedding_invite.wedding_invite.INIT_CONTAINER_DELAY', 0)
+    def test_replace_restart_failed(self) -> None:
+        """
+        Tests that a container whose image was rebuilt but which fails to start again is reported as down rather than
+        as left running, and that the init containers of its package are not run again.
+        :return: None
+        """
+        with FakeDockerDaemon(exiting_images=["migrate"]) as daemon, \
+                patch.dict(os.environ, {"DOCKER_HOST": daemon.base_url}):
+            client = docker_client.get_client()
+            client.networks.create("watch_network")
+            targets = WatchTarget.from_invite(invite=self.invite, package_root=self.root)
+            watcher = Watcher(targets=targets, runner=client.containers, network_name="watch_network")
+            daemon.add_image("bench/api:api")
+            client.containers.run("bench/api:api", name="api", network="watch_network", detach=True)
+
+            with patch("wedpy.wedding_invite.build.Build.run_container",
+                       side_effect=APIError("port is already allocated")), \
+                    patch("sys.stdout", new_callable=io.StringIO) as stdout:
+                watcher.replace(targets[:1])
+
+            self.assertIn("api failed to restart and is down", stdout.getvalue())
+            self.assertNotIn("left running", stdout.getvalue())
+            self.assertEqual(daemon.calls["build"], 1)
+            self.assertEqual([], client.containers.list(all=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@ This file defines the tests around the Build class.
 from unittest import TestCase, main
 from unittest.mock import patch, MagicMock
 
+from wedpy.artifact_cache import FINGERPRINT_LABEL
 from wedpy.wedding_invite.build import Build
 
 
@@ -11,6 +12,11 @@ class TestBuild(TestCase):
 
     def setUp(self) -> None:
         self.core_unit_mock = MagicMock()
+        self.core_unit_mock.network_alias = None
+        self.core_unit_mock.cpus = None
+        self.core_unit_mock.memory = None
+        self.core_unit_mock.build_memory = None
+        self.core_unit_mock.shareable = False
         self.build = Build(self.core_unit_mock)
 
     def test___init__(self):
@@ -20,29 +26,32 @@ class TestBuild(TestCase):
         """
         self.assertEqual(self.build.core_unit, self.core_unit_mock)
 
-    @patch('wedpy.wedding_invite.build.docker.from_env')
-    def test_pull_image(self, mock_docker_from_env) -> None:
+    @patch('wedpy.wedding_invite.build.get_client')
+    def test_pull_image(self, mock_get_client) -> None:
         """
         Tests that the pull_image method pulls the docker image from the docker registry.
         :return: None
         """
         self.build.pull_image()
-        mock_docker_from_env.return_value.images.pull.assert_called_once_with(self.core_unit_mock.image_url)
+        mock_get_client.return_value.images.pull.assert_called_once_with(self.core_unit_mock.image_url)
 
-    @patch('wedpy.wedding_invite.build.platform.processor')
-    @patch('wedpy.wedding_invite.build.docker.from_env')
+    @patch('wedpy.wedding_invite.build.fingerprint', return_value='f1')
+    @patch('wedpy.platforms.host_arch')
+    @patch('wedpy.wedding_invite.build.get_client')
     @patch('wedpy.wedding_invite.build.Build.pull_image')
-    def test_build_image(self, mock_pull_image, mock_docker_from_env, mock_processor) -> None:
+    def test_build_image(self, mock_pull_image, mock_get_client, mock_host_arch, mock_fingerprint) -> None:
         """
-        Tests that the build_image method builds the docker image from the Dockerfile.
+        Tests that the build_image method builds the docker image from the Dockerfile, labelled with the fingerprint
+        of its inputs.
         :return: None
         """
         package_root = 'root'
         tag = 'tag'
         remote = True
         self.build.core_unit.build_root = 'build_root'
-        mock_docker_from_env.return_value.images.build.return_value = (None, None)
-        mock_processor.return_value = 'arm'
+        mock_get_client.return_value.api.build.return_value = iter([])
+        # the build file declared as arm is the one for an arm64 host
+        mock_host_arch.return_value = 'arm64'
         self.build.core_unit.build_files = {'arm': 'Dockerfile.arm'}
         self.build.core_unit.default_image_tag = 'default_image_tag'
 
@@ -62,31 +71,80 @@ class TestBuild(TestCase):
         self.build.build_image(package_root=package_root, tag=tag, remote=False)
 
         mock_pull_image.assert_not_called()
-        mock_docker_from_env.return_value.images.build.assert_called_once_with(
+        mock_get_client.return_value.api.build.assert_called_once_with(
             path="root/build_root",
             dockerfile="Dockerfile",
-            tag=tag
+            tag=tag,
+            buildargs=self.core_unit_mock.build_args,
+            labels={FINGERPRINT_LABEL: 'f1'},
+            decode=True
         )
-        mock_docker_from_env.return_value.images.build.reset_mock()
+        mock_get_client.return_value.api.build.reset_mock()
 
         self.build.core_unit.build_lock = False
         self.build.build_image(package_root=package_root, tag=tag, remote=False)
 
         mock_pull_image.assert_not_called()
-        mock_docker_from_env.return_value.images.build.assert_called_once_with(
+        mock_get_client.return_value.api.build.assert_called_once_with(
             path="root/build_root",
             dockerfile="Dockerfile.arm",
-            tag=tag
+            tag=tag,
+            buildargs=self.core_unit_mock.build_args,
+            labels={FINGERPRINT_LABEL: 'f1'},
+            decode=True
         )
-        mock_docker_from_env.return_value.images.build.reset_mock()
+        mock_get_client.return_value.api.build.reset_mock()
 
         self.build.build_image(package_root=package_root, tag=None, remote=False)
-        mock_docker_from_env.return_value.images.build.assert_called_once_with(
+        mock_get_client.return_value.api.build.assert_called_once_with(
             path="root/build_root",
             dockerfile="Dockerfile.arm",
-            tag="default_image_tag"
+            tag="default_image_tag",
+            buildargs=self.core_unit_mock.build_args,
+            labels={FINGERPRINT_LABEL: 'f1'},
+            decode=True
         )
 
+    @patch('wedpy.wedding_invite.build.fingerprint', return_value='f1')
+    @patch('wedpy.platforms.host_arch', return_value='amd64')
+    @patch('wedpy.platforms._daemon_arches', {})
+    def test_build_image_on_builder_host(self, mock_host_arch, mock_fingerprint) -> None:
+        """
+        Tests that an image built on a builder host is built from the build file of the host's architecture.
+        :return: None
+        """
+        self.build.core_unit.build_root = 'build_root'
+        self.build.core_unit.git_url = "git_url"
+        self.build.core_unit.build_lock = False
+        self.build.core_unit.build_files = {'x86_64': 'Dockerfile.x86_64', 'aarch64': 'Dockerfile.aarch64'}
+        builder = MagicMock()
+        builder.api.base_url = "http://build-box:2375"
+        builder.info.return_value = {"Architecture": "arm64"}
+        builder.api.build.return_value = iter([])
+
+        self.build.build_image(package_root='root', tag='tag', remote=False, docker_client=builder)
+
+        self.assertEqual("Dockerfile.aarch64", builder.api.build.call_args[1]["dockerfile"])
+
+    @patch('wedpy.wedding_invite.build.fingerprint', return_value='f1')
+    @patch('wedpy.wedding_invite.build.get_client')
+    def test_build_image_error(self, mock_get_client, mock_fingerprint) -> None:
+        """
+        Tests that an error in the build output raises a BuildError.
+        :return: None
+        """
+        from docker.errors import BuildError
+
+        self.build.core_unit.build_root = 'build_root'
+        self.build.core_unit.build_lock = True
+        mock_get_client.return_value.api.build.return_value = iter([
+            {"stream": "Step 1/2 : FROM python"},
+            {"error": "The command '/bin/sh -c exit 1' returned a non-zero code: 1"}
+        ])
+
+        with self.assertRaises(BuildError):
+            self.build.build_image(package_root='root', tag='tag', remote=False)
+
     def test_delete_container(self) -> None:
         """
         Tests that the delete_container method deletes the container.
@@ -105,17 +163,17 @@ class TestBuild(TestCase):
         self.build.delete_container(runner=runner_mock)
         container_mock.remove.assert_not_called()
 
-    @patch('wedpy.wedding_invite.build.docker.from_env')
-    def test_delete_image(self, mock_docker_from_env) -> None:
+    @patch('wedpy.wedding_invite.build.get_client')
+    def test_delete_image(self, mock_get_client) -> None:
         """
         Tests that the delete_image method deletes the image.
         :return: None
         """
         mock_image = MagicMock()
-        mock_docker_from_env.return_value.images.get.return_value = mock_image
+        mock_get_client.return_value.images.get.return_value = mock_image
 
         self.build.delete_image()
-        mock_docker_from_env.return_value.images.remove.assert_called_once_with(mock_image.id, force=True)
+        mock_get_client.return_value.images.remove.assert_called_once_with(mock_image.id, force=True)
 
     def test_run_container(self) -> None:
         """
@@ -136,6 +194,56 @@ class TestBuild(TestCase):
             ports={f'{self.core_unit_mock.inside_port}/tcp': ('0.0.0.0', self.core_unit_mock.outside_port)},
         )
 
+    def test_run_container_dev(self) -> None:
+        """
+        Tests that the live source is mounted and the dev command is run in dev mode only.
+        :return: None
+        """
+        runner_mock = MagicMock()
+        self.core_unit_mock.dev_mounts = {"./src": "/app/src"}
+        self.core_unit_mock.dev_command = "python -m app --reload"
+
+        self.build.run_container(runner=runner_mock, network_name="test_network", dev=True, package_root="/venue/app")
+        self.assertEqual(runner_mock.run.call_args.kwargs["volumes"],
+                         {"/venue/app/src": {"bind": "/app/src", "mode": "rw"}})
+        self.assertEqual(runner_mock.run.call_args.kwargs["command"], "python -m app --reload")
+
+        self.build.run_container(runner=runner_mock, network_name="test_network")
+        self.assertNotIn("volumes", runner_mock.run.call_args.kwargs)
+        self.assertNotIn("command", runner_mock.run.call_args.kwargs)
+
+        # the images pulled in remote mode run without the source, which is not checked out
+        self.build.run_container(runner=runner_mock, network_name="test_network", remote=True, dev=True,
+                                 package_root="/post_office/app")
+        self.assertNotIn("volumes", runner_mock.run.call_args.kwargs)
+        self.assertNotIn("command", runner_mock.run.call_args.kwargs)
+
+    def test_run_container_ephemeral(self) -> None:
+        """
+        Tests that the data directories are kept in size capped tmpfs and the ephemeral config is added in the
+        ephemeral profile only.
+        :return: None
+        """
+        runner_mock = MagicMock()
+        self.core_unit_mock.config = {"POSTGRES_PASSWORD": "password"}
+        self.core_unit_mock.data_volumes = {"pgdata": "/var/lib/postgresql/data"}
+        self.core_unit_mock.tmpfs_size = "512m"
+        self.core_unit_mock.ephemeral_config = {"POSTGRES_INITDB_ARGS": "--no-sync"}
+
+        self.build.run_container(runner=runner_mock, network_name="test_network", profile="ephemeral")
+        self.assertEqual(runner_mock.run.call_args.kwargs["tmpfs"], {"/var/lib/postgresql/data": "rw,size=512m"})
+        self.assertEqual(runner_mock.run.call_args.kwargs["environment"],
+                         {"POSTGRES_PASSWORD": "password", "POSTGRES_INITDB_ARGS": "--no-sync"})
+        self.assertNotIn("volumes", runner_mock.run.call_args.kwargs)
+        runner_mock.client.volumes.create.assert_not_called()
+
+        self.build.run_container(runner=runner_mock, network_name="test_network")
+        self.assertNotIn("tmpfs", runner_mock.run.call_args.kwargs)
+        self.assertEqual(runner_mock.run.call_args.kwargs["environment"], {"POSTGRES_PASSWORD": "password"})
+        self.assertEqual(runner_mock.run.call_args.kwargs["volumes"],
+                         {f"{self.core_unit_mock.default_container_name}_pgdata":
+                          {"bind": "/var/lib/postgresql/data", "mode": "rw"}})
+
 
 if __name__ == '__main__':
     main()
@@ -27,35 +27,28 @@ class TestLocalWeddingInvite(TestCase):
         self.assertEqual(test.local_wedding_invite, mock_invite.from_yaml.return_value)
         self.assertEqual(test.num_processes, self.num_processes)
 
-    @patch('wedpy.wedding_invite.local_wedding_invite.Pool')
-    @patch('wedpy.wedding_invite.local_wedding_invite.tqdm')
-    def test_build_images(self, mock_tqdm, mock_pool):
+    @patch('wedpy.wedding_invite.local_wedding_invite.build_in_pool')
+    def test_build_images(self, mock_build_in_pool):
         """
-        Tests that the build_images method builds the images.
+        Tests that the build_images method builds the images in a pool, skipping the main builds in dev mode.
         :return: None
         """
         build_one = MagicMock()
+        build_one.skipped_in_dev = True
         build_two = MagicMock()
+        build_two.skipped_in_dev = False
 
         self.mock_invite.from_yaml().builds.__add__.return_value = [build_one, build_two]
 
         self.test.build_images()
-        mock_pool.assert_called_once_with(processes=self.num_processes)
-
-        self.assertEqual(mock_pool().__enter__().apply_async.call_args_list[0][0][0], build_one.build_image)
-        self.assertEqual(mock_pool().__enter__().apply_async.call_args_list[1][0][0], build_two.build_image)
-        self.assertEqual(mock_pool().__enter__().apply_async.call_args_list[0][1], {'args': ('.', None, False)})
-        self.assertEqual(mock_pool().__enter__().apply_async.call_args_list[1][1], {'args': ('.', None, False)})
-
-        mock_tqdm.assert_called_once_with([
-                mock_pool().__enter__().apply_async.return_value,
-                mock_pool().__enter__().apply_async.return_value
-            ],
-            desc=f"{self.mock_invite.from_yaml().package_name} builds",
-            unit='item',
-            total=2
+        mock_build_in_pool.assert_called_once_with(
+            [build_one, build_two], args=('.', None, False),
+            desc=f"{self.mock_invite.from_yaml().package_name} builds", processes=self.num_processes
         )
 
+        self.test.build_images(dev=True)
+        self.assertEqual([build_two], mock_build_in_pool.call_args[0][0])
+
     def test_run_containers(self):
         """
         Tests that the run_containers method runs the containers.
@@ -64,7 +57,9 @@ class TestLocalWeddingInvite(TestCase):
         runner = MagicMock()
         network_name = "network_name"
         self.test.run_containers(runner=runner, network_name=network_name)
-        self.mock_invite.from_yaml().run_containers.assert_called_once_with(runner=runner, network_name=network_name)
+        self.mock_invite.from_yaml().run_containers.assert_called_once_with(runner=runner, network_name=network_name,
+                                                                         dev=False, snapshots=None,
+                                                                         profile="default")
 
     def test_destroy_init_containers(self):
         """
@@ -0,0 +1,314 @@
+"""
+This file defines the Agent class, an optional long running wedpy process that answers commands over a unix socket
+with a line of JSON per request and per response, and the request function the entry points use to ask it.
+
+The agent keeps what every command would otherwise pay for again: the imported modules, the parsed seating plan and
+wedding invites (reparsed only when a file changes), the docker client and the containers and images of the docker
+host. The container and image lists are only listed again after the docker events stream reports a change to them. The
+agent answers the commands that only read: wedpy-status and wedpy-logs without -f. An entry point asks the agent first
+and runs the command in its own process if no agent is running, and always runs the commands that change the docker
+host itself.
+"""
+import json
+import os
+import socket
+import sys
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from docker import DockerClient
+
+
+# set to "off" to make the entry points run every command in their own process
+AGENT_ENV = "WEDPY_AGENT"
+
+# where the socket of the agent is, relative to the directory wedpy is run from
+SOCKET_PATH = os.path.join(".wedpy", "agent.sock")
+
+# seconds an entry point waits for the agent to answer before giving up on it
+REQUEST_TIMEOUT = 60
+
+
+def socket_path() -> str:
+    """
+    Gets the socket of the agent serving the directory wedpy is run from.
+
+    :return: the path of the socket
+    """
+    return os.path.join(os.getcwd(), SOCKET_PATH)
+
+
+def request(command: str, args: Optional[dict] = None, path: Optional[str] = None,
+            timeout: float = REQUEST_TIMEOUT) -> Optional[dict]:
+    """
+    Asks the agent to run a command.
+
+    :param command: the name of the command
+    :param args: the arguments of the command
+    :param path: the socket of the agent, defaults to the one of the directory wedpy is run from
+    :param timeout: seconds to wait for the answer
+    :return: the answer of the agent, with "ok" and either "output" or "error", or None if no agent is running
+    """
+    if os.environ.get(AGENT_ENV) == "off":
+        return None
+    path = socket_path() if path is None else path
+    if not os.path.exists(path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.settimeout(timeout)
+            connection.connect(path)
+            connection.sendall(json.dumps({"command": command, "args": args or {}}).encode() + b"\n")
+            with connection.makefile("rb") as f:
+                line = f.readline()
+    except OSError:
+        return None
+    if len(line) == 0:
+        return None
+    return json.loads(line)
+
+
+def answer(command: str, args: dict) -> bool:
+    """
+    Asks the agent to run a command and prints its answer as the entry point would have printed it.
+
+    :param command: the name of the command
+    :param args: the arguments of the command
+    :return: True if the agent answered, False if no agent is running and the entry point runs the command itself
+    """
+    response = request(command, args=args)
+    if response is None:
+        return False
+    if response.get("stderr"):
+        sys.stderr.write(response["stderr"])
+    if response["ok"] is False:
+        sys.exit(response["error"])
+    if len(response["output"]) > 0:
+        print(response["output"])
+    return True
+
+
+class ContainerState:
+    """
+    The ContainerState class keeps the container and image list summaries of the docker host, listing them again
+    only after the docker events stream reports a change. If the stream is not running every read lists them.
+
+    Attributes:
+        docker_client (DockerClient): the docker client of the host the containers run on
+    """
+    def __init__(self, docker_client: "DockerClient") -> None:
+        """
+        The constructor for the ContainerState class.
+
+        :param docker_client: the docker client of the host the containers run on
+        """
+        self.docker_client: "DockerClient" = docker_client
+        self._lock = threading.Lock()
+        self._lists: Dict[str, Optional[List[dict]]] = {"container": None, "image": None}
+        self._generations: Dict[str, int] = {"container": 0, "image": 0}
+        self._watching = threading.Event()
+        self._events = None
+
+    def start(self) -> None:
+        """
+        Starts following the docker events stream in the background.
+
+        :return: None
+        """
+        self._events = self.docker_client.events(decode=True, filters={"type": ["container", "image"]})
+        self._watching.set()
+        threading.Thread(target=self._follow, name="wedpy-agent-events", daemon=True).start()
+
+    def stop(self) -> None:
+        """
+        Stops following the docker events stream.
+
+        :return: None
+        """
+        self._watching.clear()
+        if self._events is not None:
+            self._events.close()
+
+    def _follow(self) -> None:
+        try:
+            for event in self._events:
+                self.invalidate(event.get("Type", "container"))
+        except Exception:
+            pass
+        finally:
+            self._watching.clear()
+            self.invalidate("container")
+            self.invalidate("image")
+
+    def invalidate(self, kind: str) -> None:
+        """
+        Forgets a list after a change to it.
+
+        :param kind: "container" or "image"
+        :return: None
+        """
+        with self._lock:
+            if kind in self._lists:
+                self._lists[kind] = None
+                self._generations[kind] += 1
+
+    def _read(self, kind: str, list_all: Callable[[], List[dict]]) -> List[dict]:
+        with self._lock:
+            cached = self._lists[kind]
+            generation = self._generations[kind]
+        if cached is not None and self._watching.is_set():
+            return cached
+        summaries = list_all()
+        with self._lock:
+            # a change reported while listing may not be in the list, so it is not kept
+            if self._generations[kind] == generation:
+                self._lists[kind] = summaries
+        return summaries
+
+    def containers(self) -> List[dict]:
+        """
+        Gets the summaries of every container on the docker host.
+
+        :return: the container list summaries
+        """
+        return self._read("container", lambda: self.docker_client.api.containers(all=True))
+
+    def images(self) -> List[dict]:
+        """
+        Gets the summaries of every image on the docker host.
+
+        :return: the image list summaries
+        """
+        return self._read("image", self.docker_client.api.images)
+
+
+def _status(args: dict, state: ContainerState) -> str:
+    import argparse
+
+    from wedpy.endpoints.status import report
+
+    return report(argparse.Namespace(instance=None, **args), state=state)
+
+
+def _logs(args: dict, state: ContainerState) -> str:
+    import argparse
+    import io
+
+    from wedpy.endpoints.logs import show
+
+    # following the logs never finishes, so the entry point follows them itself
+    output = io.StringIO()
+    show(argparse.Namespace(instance=None, follow=False, **args), output=output)
+    return output.getvalue().rstrip("\n")
+
+
+# the commands the agent answers, each taking the arguments of the request and the container state
+COMMANDS: Dict[str, Callable[[dict, ContainerState], str]] = {
+    "ping": lambda args, state: "pong",
+    "status": _status,
+    "logs": _logs,
+}
+
+
+class Agent:
+    """
+    The Agent class serves the commands of the entry points of one directory over a unix socket. Commands are run
+    one at a time, as each entry point would run in its own process, and what they print is sent back as their
+    output.
+
+    Attributes:
+        path (str): the path of the socket
+        state (ContainerState): the containers and images of the docker host
+    """
+    def __init__(self, path: str, docker_client: "DockerClient") -> None:
+        """
+        The constructor for the Agent class.
+
+        :param path: the path of the socket
+        :param docker_client: the docker client of the host the containers run on
+        """
+        self.path: str = path
+        self.state: ContainerState = ContainerState(docker_client=docker_client)
+        self._command_lock = threading.Lock()
+        self._server = None
+
+    def handle(self, message: dict) -> dict:
+        """
+        Runs the command of a request.
+
+        :param message: the request, with the name of the command and its arguments
+        :return: the response, with "ok" and either "output" or "error", and "stderr" if the command printed to it
+        """
+        import contextlib
+        import io
+
+        command = COMMANDS.get(message.get("command"))
+        if command is None:
+            return {"ok": False, "error": f"unknown command {message.get('command')}"}
+        printed, notices = io.StringIO(), io.StringIO()
+        with self._command_lock, contextlib.redirect_stdout(printed), contextlib.redirect_stderr(notices):
+            try:
+                result = command(message.get("args") or {}, self.state)
+                response = {"ok": True, "output": printed.getvalue() + result}
+            except SystemExit as e:
+                response = {"ok": False, "error": printed.getvalue() + str(e.code)}
+            except Exception as e:
+                response = {"ok": False, "error": printed.getvalue() + f"{type(e).__name__}: {e}"}
+        # what the command printed to stderr, such as the selection notice, is printed to stderr by the entry point
+        if len(notices.getvalue()) > 0:
+            response["stderr"] = notices.getvalue()
+        return response
+
+    def serve_forever(self) -> None:
+        """
+        Serves requests until the agent is shut down, taking over the socket from an agent that is no longer running.
+
+        :return: None
+        """
+        import socketserver
+
+        if request("ping", path=self.path) is not None:
+            raise RuntimeError(f"an agent is already serving {self.path}")
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        agent = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                line = self.rfile.readline()
+                if len(line) == 0:
+                    return
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    response = {"ok": False, "error": "invalid request"}
+                else:
+                    if message.get("command") == "shutdown":
+                        response = {"ok": True, "output": "agent stopped"}
+                        threading.Thread(target=agent.shutdown, daemon=True).start()
+                    else:
+                        response = agent.handle(message)
+                self.wfile.write(json.dumps(response).encode() + b"\n")
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.path, Handler)
+        self._server.daemon_threads = True
+        self.state.start()
+        try:
+            self._server.serve_forever()
+        finally:
+            self.state.stop()
+            self._server.server_close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def shutdown(self) -> None:
+        """
+        Stops serving requests.
+
+        :return: None
+        """
+        if self._server is not None:
+            self._server.shutdown()
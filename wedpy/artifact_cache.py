@@ -0,0 +1,250 @@
+"""
+This file defines the ArtifactCache class which keeps compressed docker save bundles of built images in a directory
+keyed by a fingerprint of everything that goes into the build, so an image built on one machine can be loaded on
+another instead of being rebuilt.
+
+The cache is switched on by setting the WEDPY_ARTIFACT_CACHE environment variable to a directory, which can be on a
+shared filesystem. WEDPY_ARTIFACT_CACHE_MAX_BYTES caps the size of the directory, the least recently used bundles are
+removed first.
+
+The fingerprint of every build context is kept in memory together with the size, modification time and mode of the
+files it was hashed from, so a context whose files have not changed is not read again, which spares the agent and
+commands that fingerprint the same build several times from hashing every file again.
+"""
+import gzip
+import hashlib
+import json
+import os
+import platform
+import tempfile
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from wedpy import tracing
+
+if TYPE_CHECKING:
+    from docker import DockerClient
+
+
+ARTIFACT_CACHE_ENV = "WEDPY_ARTIFACT_CACHE"
+ARTIFACT_CACHE_MAX_BYTES_ENV = "WEDPY_ARTIFACT_CACHE_MAX_BYTES"
+
+# the size the cache directory is kept under unless WEDPY_ARTIFACT_CACHE_MAX_BYTES is set
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+
+# bumped whenever the inputs of the fingerprint change so old bundles are never loaded for new builds
+FINGERPRINT_VERSION = "wedpy-artifact-v1"
+
+# the label a built image carries the fingerprint of its inputs in, so what it was built from can be told later
+FINGERPRINT_LABEL = "wedpy.fingerprint"
+
+CHUNK_SIZE = 1024 * 1024
+
+# the last fingerprint of every build context and the files it was hashed from, keyed by context and build inputs
+_fingerprints: Dict[str, Tuple[tuple, str]] = {}
+_fingerprints_lock = threading.Lock()
+
+
+def fingerprint(context_path: str, dockerfile: str, build_args: Optional[Dict[str, str]] = None) -> str:
+    """
+    Hashes everything that goes into a build: the files docker would send as the build context (honouring
+    .dockerignore), the Dockerfile used, the build arguments and the architecture of the machine. Base images are
+    not hashed, so a bundle built before a base image was updated is still loaded.
+
+    :param context_path: the directory the image is built from
+    :param dockerfile: the path of the Dockerfile relative to the build context
+    :param build_args: the build arguments passed to docker
+    :return: the hex sha256 of the build inputs
+    """
+    from docker.utils.build import exclude_paths
+
+    inputs = json.dumps({
+        "version": FINGERPRINT_VERSION,
+        "dockerfile": dockerfile,
+        "build_args": build_args or {},
+        "machine": platform.machine(),
+    }, sort_keys=True)
+
+    exclude = []
+    dockerignore = os.path.join(context_path, ".dockerignore")
+    if os.path.exists(dockerignore):
+        with open(dockerignore) as f:
+            exclude = [line.strip() for line in f.read().splitlines() if line.strip() and line.strip()[0] != "#"]
+
+    relative_paths = sorted(exclude_paths(context_path, exclude, dockerfile=dockerfile))
+    files = []
+    for relative_path in relative_paths:
+        try:
+            stat = os.lstat(os.path.join(context_path, relative_path))
+        except OSError:
+            continue
+        files.append((relative_path, stat.st_size, stat.st_mtime_ns, stat.st_mode))
+    key = f"{os.path.abspath(context_path)}\0{inputs}"
+    with _fingerprints_lock:
+        cached = _fingerprints.get(key)
+    if cached is not None and cached[0] == tuple(files):
+        return cached[1]
+
+    digest = hashlib.sha256()
+    digest.update(inputs.encode())
+    for relative_path in relative_paths:
+        path = os.path.join(context_path, relative_path)
+        if os.path.islink(path):
+            digest.update(f"link {relative_path} {os.readlink(path)}\0".encode())
+        elif os.path.isfile(path):
+            executable = os.access(path, os.X_OK)
+            digest.update(f"file {relative_path} {executable}\0".encode())
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+    with _fingerprints_lock:
+        _fingerprints[key] = (tuple(files), digest.hexdigest())
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """
+    The ArtifactCache class stores and loads gzipped docker save bundles of built images keyed by build fingerprint.
+    Every bundle has a JSON file next to it holding its sha256, which is checked before the bundle is loaded so a
+    truncated or corrupted bundle is removed and rebuilt rather than loaded.
+
+    Attributes:
+        directory (str): the directory the bundles are kept in
+        max_bytes (int): the size the directory is kept under by removing the least recently used bundles
+    """
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """
+        The constructor for the ArtifactCache class.
+
+        :param directory: the directory the bundles are kept in
+        :param max_bytes: the size the directory is kept under by removing the least recently used bundles
+        """
+        self.directory: str = directory
+        self.max_bytes: int = max_bytes
+
+    @classmethod
+    def from_env(cls) -> Optional["ArtifactCache"]:
+        """
+        Creates the ArtifactCache configured by the environment.
+
+        :return: the cache or None if the cache is switched off
+        """
+        directory = os.environ.get(ARTIFACT_CACHE_ENV)
+        if directory is None or directory == "":
+            return None
+        return cls(directory=directory,
+                   max_bytes=int(os.environ.get(ARTIFACT_CACHE_MAX_BYTES_ENV, DEFAULT_MAX_BYTES)))
+
+    def bundle_path(self, build_fingerprint: str) -> str:
+        return os.path.join(self.directory, build_fingerprint[:2], f"{build_fingerprint}.tar.gz")
+
+    def metadata_path(self, build_fingerprint: str) -> str:
+        return os.path.join(self.directory, build_fingerprint[:2], f"{build_fingerprint}.json")
+
+    def load(self, build_fingerprint: str, tag: str, docker_client: "DockerClient") -> bool:
+        """
+        Loads the bundle of a build into docker and tags the image.
+
+        :param build_fingerprint: the fingerprint of the build
+        :param tag: the tag the image should have
+        :param docker_client: the docker client of the host to load the image onto
+        :return: True if the image was loaded, False if there is no valid bundle for the build
+        """
+        from docker.utils import parse_repository_tag
+
+        bundle_path = self.bundle_path(build_fingerprint)
+        metadata_path = self.metadata_path(build_fingerprint)
+        try:
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        with tracing.span("artifact load", image=tag, fingerprint=build_fingerprint):
+            if self._sha256(bundle_path) != metadata.get("sha256"):
+                print(f"removing corrupted artifact {bundle_path}")
+                self._remove(build_fingerprint)
+                return False
+            # docker load accepts gzipped archives so the bundle is streamed as it is stored
+            with open(bundle_path, "rb") as f:
+                images = docker_client.images.load(f)
+            repository, image_tag = parse_repository_tag(tag)
+            for image in images:
+                if tag not in image.tags:
+                    image.tag(repository, tag=image_tag)
+        os.utime(bundle_path)
+        return True
+
+    def store(self, build_fingerprint: str, tag: str, docker_client: "DockerClient") -> None:
+        """
+        Saves a built image as a gzipped bundle. The bundle is written to a temporary file and moved into place so
+        other machines sharing the directory never see a partly written bundle.
+
+        :param build_fingerprint: the fingerprint of the build
+        :param tag: the tag of the built image
+        :param docker_client: the docker client of the host the image was built on
+        :return: None
+        """
+        bundle_path = self.bundle_path(build_fingerprint)
+        os.makedirs(os.path.dirname(bundle_path), exist_ok=True)
+        with tracing.span("artifact store", image=tag, fingerprint=build_fingerprint):
+            image = docker_client.images.get(tag)
+            descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(bundle_path), suffix=".tmp")
+            try:
+                with os.fdopen(descriptor, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb",
+                                                                      compresslevel=3, mtime=0) as f:
+                    for chunk in image.save(named=True):
+                        f.write(chunk)
+                metadata = {"sha256": self._sha256(temporary_path), "size": os.path.getsize(temporary_path),
+                            "tag": tag, "created": time.time()}
+                os.replace(temporary_path, bundle_path)
+            except BaseException:
+                if os.path.exists(temporary_path):
+                    os.remove(temporary_path)
+                raise
+            temporary_metadata_path = f"{temporary_path}.json"
+            with open(temporary_metadata_path, "w") as f:
+                json.dump(metadata, f)
+            os.replace(temporary_metadata_path, self.metadata_path(build_fingerprint))
+        self.evict()
+
+    def evict(self) -> List[str]:
+        """
+        Removes the least recently used bundles until the directory is under the maximum size.
+
+        :return: the fingerprints of the removed bundles
+        """
+        bundles = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".tar.gz"):
+                    stat = os.stat(os.path.join(root, name))
+                    bundles.append((stat.st_mtime, stat.st_size, name[:-len(".tar.gz")]))
+        total = sum(size for _, size, _ in bundles)
+        removed = []
+        for _, size, build_fingerprint in sorted(bundles):
+            if total <= self.max_bytes:
+                break
+            self._remove(build_fingerprint)
+            total -= size
+            removed.append(build_fingerprint)
+        return removed
+
+    def _remove(self, build_fingerprint: str) -> None:
+        for path in (self.bundle_path(build_fingerprint), self.metadata_path(build_fingerprint)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _sha256(path: str) -> Optional[str]:
+        digest = hashlib.sha256()
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        return digest.hexdigest()
@@ -0,0 +1,372 @@
+"""
+This file defines the BuilderPool class which spreads image builds across several docker hosts and moves the finished
+images to the docker host that runs the containers.
+"""
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+
+from wedpy import tracing
+from wedpy.docker_client import get_client
+from wedpy.wedding_invite.build import Build
+
+if TYPE_CHECKING:
+    from docker import DockerClient
+
+
+# the expected duration of a build that has never been recorded
+DEFAULT_BUILD_SECONDS = 60.0
+
+
+class BuilderHost:
+    """
+    The BuilderHost class is a docker host that images can be built on.
+
+    Attributes:
+        name (str): the name of the builder used in logs
+        base_url (Optional[str]): the URL of the docker daemon, for example "tcp://10.0.0.2:2376" or
+                                  "ssh://user@host", None means the docker host that runs the containers
+        max_builds (int): the maximum number of builds run on the host at the same time
+        cert_path (Optional[str]): the directory holding ca.pem, cert.pem and key.pem to connect over TLS
+        active (int): the number of builds running on the host
+        expected_seconds (float): the expected duration of the builds running on the host
+        healthy (bool): False once the host could not be reached, so no more builds are sent to it
+    """
+    def __init__(self, name: str, base_url: Optional[str] = None, max_builds: int = 2,
+                 cert_path: Optional[str] = None) -> None:
+        """
+        The constructor for the BuilderHost class.
+
+        :param name: the name of the builder used in logs
+        :param base_url: the URL of the docker daemon, None means the docker host that runs the containers
+        :param max_builds: the maximum number of builds run on the host at the same time
+        :param cert_path: the directory holding ca.pem, cert.pem and key.pem to connect over TLS
+        """
+        self.name: str = name
+        self.base_url: Optional[str] = base_url
+        self.max_builds: int = max_builds
+        self.cert_path: Optional[str] = cert_path
+        self.active: int = 0
+        self.expected_seconds: float = 0.0
+        self.healthy: bool = True
+        self._client: Optional["DockerClient"] = None
+
+    @property
+    def is_run_host(self) -> bool:
+        return self.base_url is None
+
+    @property
+    def client(self) -> "DockerClient":
+        if self.is_run_host is True:
+            return get_client()
+        if self._client is None:
+            import docker
+
+            tls = None
+            if self.cert_path is not None:
+                tls = docker.tls.TLSConfig(
+                    client_cert=(os.path.join(self.cert_path, "cert.pem"), os.path.join(self.cert_path, "key.pem")),
+                    ca_cert=os.path.join(self.cert_path, "ca.pem"),
+                    verify=True
+                )
+            self._client = docker.DockerClient(base_url=self.base_url, tls=tls,
+                                               use_ssh_client=self.base_url.startswith("ssh://"))
+        return self._client
+
+    @property
+    def load(self) -> float:
+        """
+        The expected seconds of work per build slot for the builds running on the host.
+        """
+        return self.expected_seconds / self.max_builds
+
+    @classmethod
+    def from_dict(cls, builder_dict: dict) -> "BuilderHost":
+        """
+        Creates a BuilderHost from an entry of the builders section of the seating plan.
+
+        :param builder_dict: the entry of the builders section
+        :return: the BuilderHost
+        """
+        return cls(name=builder_dict['name'], base_url=builder_dict.get('base_url'),
+                   max_builds=builder_dict.get('max_builds', 2), cert_path=builder_dict.get('cert_path'))
+
+
+class BuildDurations:
+    """
+    The BuildDurations class records how long each image took to build so the longest builds can be started first.
+
+    Attributes:
+        path (str): the path of the JSON file the durations are stored in
+        durations (Dict[str, float]): the recorded seconds keyed by image tag
+    """
+    def __init__(self, path: str) -> None:
+        """
+        The constructor for the BuildDurations class.
+
+        :param path: the path of the JSON file the durations are stored in
+        """
+        self.path: str = path
+        self.durations: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                self.durations = json.load(f)
+
+    def expected(self, tag: str) -> float:
+        """
+        Gets the expected duration of a build.
+
+        :param tag: the image tag of the build
+        :return: the recorded duration, or the mean of all recorded durations if the build has not been recorded
+        """
+        with self._lock:
+            if tag in self.durations:
+                return self.durations[tag]
+            if len(self.durations) > 0:
+                return sum(self.durations.values()) / len(self.durations)
+        return DEFAULT_BUILD_SECONDS
+
+    def record(self, tag: str, seconds: float) -> None:
+        """
+        Records the duration of a build, smoothed with the previous recording.
+
+        :param tag: the image tag of the build
+        :param seconds: how long the build took
+        :return: None
+        """
+        with self._lock:
+            previous = self.durations.get(tag)
+            self.durations[tag] = seconds if previous is None else (previous + seconds) / 2
+
+    def save(self) -> None:
+        """
+        Writes the durations to the JSON file.
+
+        :return: None
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock:
+            with open(self.path, "w") as f:
+                json.dump(self.durations, f, indent=2)
+
+
+class BuildJob:
+    """
+    The BuildJob class is a build waiting to be run by the BuilderPool.
+
+    Attributes:
+        build (Build): the build to run
+        package_root (str): the root directory of the package the build belongs to
+        tag (str): the tag of the image built
+        expected_seconds (float): how long the build is expected to take
+        tried (Set[str]): the names of the hosts the build has failed on
+    """
+    def __init__(self, build: Build, package_root: str, tag: Optional[str] = None) -> None:
+        """
+        The constructor for the BuildJob class.
+
+        :param build: the build to run
+        :param package_root: the root directory of the package the build belongs to
+        :param tag: the tag of the image built, defaults to the default image tag of the build
+        """
+        self.build: Build = build
+        self.package_root: str = package_root
+        self.tag: str = build.core_unit.default_image_tag if tag is None else tag
+        self.expected_seconds: float = DEFAULT_BUILD_SECONDS
+        self.tried: Set[str] = set()
+
+    @property
+    def is_pull(self) -> bool:
+        return self.build.core_unit.git_url is None
+
+
+class BuilderPoolError(Exception):
+    """
+    The BuilderPoolError is raised when one or more builds failed on every host they were tried on.
+
+    Attributes:
+        failures (List[str]): a description of every build that failed
+    """
+    def __init__(self, failures: List[str]) -> None:
+        """
+        The constructor for the BuilderPoolError class.
+
+        :param failures: a description of every build that failed
+        """
+        self.failures: List[str] = failures
+        super().__init__(f"{len(failures)} build(s) failed:\n" + "\n".join(f"  - {f}" for f in failures))
+
+
+class BuilderPool:
+    """
+    The BuilderPool class spreads builds across several docker hosts. The builds expected to take longest are started
+    first, each on the host with a free build slot and the least expected work per slot. Images built on a host other
+    than the one running the containers are moved there with docker save and docker load. If a host cannot be reached
+    or its daemon errors, the build falls back to another host. A Dockerfile that fails to build is not retried as it
+    would fail the same way everywhere.
+
+    Attributes:
+        hosts (List[BuilderHost]): the docker hosts builds can run on
+        durations (BuildDurations): the recorded build durations used to order the builds
+    """
+    def __init__(self, hosts: List[BuilderHost], durations: BuildDurations) -> None:
+        """
+        The constructor for the BuilderPool class.
+
+        :param hosts: the docker hosts builds can run on
+        :param durations: the recorded build durations used to order the builds
+        """
+        self.hosts: List[BuilderHost] = hosts
+        self.durations: BuildDurations = durations
+        self._condition = threading.Condition()
+        self._failures: List[str] = []
+
+    def build(self, jobs: List[BuildJob]) -> None:
+        """
+        Runs the builds across the hosts, waiting for all of them to finish.
+
+        :param jobs: the builds to run
+        :return: None
+        """
+        from tqdm import tqdm
+
+        pulls = [job for job in jobs if job.is_pull is True]
+        pending = [job for job in jobs if job.is_pull is False]
+        for job in pending:
+            job.expected_seconds = self.durations.expected(job.tag)
+        pending.sort(key=lambda job: job.expected_seconds, reverse=True)
+
+        self._failures = []
+        threads: List[threading.Thread] = []
+        progress = tqdm(total=len(jobs), desc="distributed builds", unit="item")
+
+        # images from a registry are pulled straight onto the host that runs the containers
+        for job in pulls:
+            thread = threading.Thread(target=self._pull, args=(job, progress), name=f"wedpy-pull-{job.tag}")
+            thread.start()
+            threads.append(thread)
+
+        with self._condition:
+            while len(pending) > 0 or any(host.active > 0 for host in self.hosts):
+                progressed = False
+                for job in list(pending):
+                    host = self._choose_host(job)
+                    if host is None:
+                        if not any(h.healthy and h.name not in job.tried for h in self.hosts):
+                            pending.remove(job)
+                            self._failures.append(f"{job.tag}: no builder host left to try")
+                            progressed = True
+                        continue
+                    pending.remove(job)
+                    host.active += 1
+                    host.expected_seconds += job.expected_seconds
+                    thread = threading.Thread(target=self._run, args=(job, host, pending, progress),
+                                              name=f"wedpy-build-{host.name}")
+                    thread.start()
+                    threads.append(thread)
+                    progressed = True
+                if progressed is False:
+                    self._condition.wait()
+
+        for thread in threads:
+            thread.join()
+        progress.close()
+        self.durations.save()
+        if len(self._failures) > 0:
+            raise BuilderPoolError(failures=self._failures)
+
+    def _choose_host(self, job: BuildJob) -> Optional[BuilderHost]:
+        """
+        Chooses the healthy host with a free build slot and the least expected work per slot that the job has not
+        failed on.
+
+        :param job: the build to place
+        :return: the host or None if no host can take the build right now
+        """
+        candidates = [host for host in self.hosts
+                      if host.healthy is True and host.name not in job.tried and host.active < host.max_builds]
+        if len(candidates) == 0:
+            return None
+        return min(candidates, key=lambda host: (host.load, not host.is_run_host))
+
+    def _run(self, job: BuildJob, host: BuilderHost, pending: List[BuildJob], progress) -> None:
+        """
+        Runs a build on a host and moves the image to the host that runs the containers.
+
+        :param job: the build to run
+        :param host: the host to run it on
+        :param pending: the builds waiting for a host, the job is put back here if the host fails
+        :param progress: the progress bar of the pool
+        :return: None
+        """
+        from docker.errors import BuildError
+
+        start = time.perf_counter()
+        retry = False
+        try:
+            with tracing.span("distributed build", host=host.name, **job.build.trace_tags):
+                job.build.build_image(job.package_root, job.tag, False, docker_client=host.client)
+            self.durations.record(job.tag, time.perf_counter() - start)
+            if host.is_run_host is False:
+                self._transfer(job=job, host=host)
+            progress.update(1)
+        except BuildError as e:
+            self._fail(f"{job.tag}: {e.msg}")
+        except Exception as e:
+            print(f"Error building {job.tag} on {host.name}: {e}")
+            job.tried.add(host.name)
+            host.healthy = self._is_reachable(host)
+            retry = True
+        finally:
+            with self._condition:
+                host.active -= 1
+                host.expected_seconds -= job.expected_seconds
+                if retry is True:
+                    pending.append(job)
+                self._condition.notify_all()
+
+    def _transfer(self, job: BuildJob, host: BuilderHost) -> None:
+        """
+        Moves an image from the host it was built on to the host that runs the containers.
+
+        :param job: the build whose image is moved
+        :param host: the host the image was built on
+        :return: None
+        """
+        with tracing.span("image transfer", host=host.name, image=job.tag, **job.build.trace_tags):
+            image = host.client.images.get(job.tag)
+            get_client().images.load(image.save(named=True))
+
+    def _pull(self, job: BuildJob, progress) -> None:
+        """
+        Pulls an image onto the host that runs the containers.
+
+        :param job: the build whose image is pulled
+        :param progress: the progress bar of the pool
+        :return: None
+        """
+        try:
+            job.build.build_image(job.package_root, job.tag, False)
+            progress.update(1)
+        except Exception as e:
+            self._fail(f"{job.tag}: {e}")
+
+    def _fail(self, failure: str) -> None:
+        with self._condition:
+            self._failures.append(failure)
+
+    @staticmethod
+    def _is_reachable(host: BuilderHost) -> bool:
+        """
+        Checks whether a host still answers after a build failed on it.
+
+        :param host: the host to check
+        :return: True if the host answers a ping
+        """
+        try:
+            return host.client.ping() is True
+        except Exception:
+            return False
@@ -0,0 +1,278 @@
+"""
+This file defines the BuildxBuilder class which builds images with BuildKit through docker buildx instead of the
+legacy builder docker-py drives. BuildKit runs the independent stages of a multi-stage Dockerfile in parallel, only
+builds the stages the target needs and supports RUN --mount=type=cache and secret mounts.
+
+The build backend is chosen with the WEDPY_BUILD_BACKEND environment variable, docker (the default) or buildx.
+WEDPY_BUILDX_BUILDER names the buildx builder instance to build with and WEDPY_BUILD_CACHE a directory the build
+cache of every image is exported to and imported from. Exporting the cache needs a builder with the docker-container
+driver, such as one created with docker buildx create --driver docker-container.
+"""
+import os
+import re
+import shutil
+import subprocess
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from wedpy import tracing
+
+if TYPE_CHECKING:
+    from docker import DockerClient
+
+BUILD_BACKEND_ENV = "WEDPY_BUILD_BACKEND"
+BUILDX_BUILDER_ENV = "WEDPY_BUILDX_BUILDER"
+BUILD_CACHE_ENV = "WEDPY_BUILD_CACHE"
+
+DOCKER_BACKEND = "docker"
+BUILDX_BACKEND = "buildx"
+BACKENDS = (DOCKER_BACKEND, BUILDX_BACKEND)
+
+# secrets read from an environment variable rather than a file are written as env:NAME
+SECRET_ENV_PREFIX = "env:"
+
+# the lines of the plain progress output that start a step, such as "#8 [build 2/4] RUN npm ci", and that end one,
+# such as "#8 DONE 12.3s", "#8 CACHED" or "#8 ERROR: ..."
+STEP_START = re.compile(r"^#(\d+) (\[.+)$")
+STEP_END = re.compile(r"^#(\d+) (DONE|CACHED|ERROR|CANCELED)\b")
+
+# the lines of output kept to explain a failed build
+ERROR_LINES = 40
+
+# the base url docker-py gives a client reached over ssh
+SSH_BASE_URL = "http+docker://ssh"
+
+# the variables the docker CLI reads the daemon and its TLS settings from, replaced together for a builder host
+DOCKER_CLI_VARIABLES = ("DOCKER_HOST", "DOCKER_TLS_VERIFY", "DOCKER_TLS", "DOCKER_CERT_PATH", "DOCKER_CONTEXT")
+
+
+def build_backend() -> str:
+    """
+    Gets the build backend set in the environment, docker if none is set.
+
+    :return: the build backend
+    """
+    backend = os.environ.get(BUILD_BACKEND_ENV) or DOCKER_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"{BUILD_BACKEND_ENV} must be one of {', '.join(BACKENDS)}, got '{backend}'")
+    return backend
+
+
+def docker_environment(docker_client: Optional["DockerClient"]) -> Dict[str, str]:
+    """
+    Gets the environment variables the docker CLI needs to reach the daemon of a docker client: DOCKER_HOST for a
+    daemon reached over TCP, and DOCKER_CERT_PATH and DOCKER_TLS_VERIFY for one reached over TLS, such as a builder
+    host with a cert_path holding ca.pem, cert.pem and key.pem.
+
+    :param docker_client: the docker client, None for the daemon in the environment
+    :return: the variables to set, none if the CLI reaches the daemon through the environment
+    """
+    if docker_client is None:
+        return {}
+    api = docker_client.api
+    if api.base_url == SSH_BASE_URL:
+        # docker-py does not keep the ssh URL it was given, so the CLI cannot be pointed at the same daemon
+        raise ValueError("buildx cannot build on a builder host reached over ssh, reach it over tcp or build with "
+                         f"{BUILD_BACKEND_ENV}={DOCKER_BACKEND}")
+    if api.base_url.startswith("http://"):
+        return {"DOCKER_HOST": "tcp://" + api.base_url[len("http://"):]}
+    if api.base_url.startswith("https://"):
+        environment = {"DOCKER_HOST": "tcp://" + api.base_url[len("https://"):]}
+        if api.verify:
+            environment["DOCKER_TLS_VERIFY"] = "1"
+        else:
+            environment["DOCKER_TLS"] = "1"
+        if api.cert:
+            client_cert = api.cert[0] if isinstance(api.cert, tuple) else api.cert
+            environment["DOCKER_CERT_PATH"] = os.path.dirname(client_cert)
+        return environment
+    return {}
+
+
+class BuildxBuilder:
+    """
+    The BuildxBuilder class builds images with docker buildx and loads them into the image store of the daemon.
+
+    Attributes:
+        builder (Optional[str]): the buildx builder instance to build with, None for the current one
+        cache_dir (Optional[str]): the directory the build cache of every image is kept in, None to keep no cache
+                                   outside the builder
+        executable (str): the docker CLI
+    """
+    def __init__(self, builder: Optional[str] = None, cache_dir: Optional[str] = None,
+                 executable: str = "docker") -> None:
+        """
+        The constructor for the BuildxBuilder class.
+
+        :param builder: the buildx builder instance to build with, defaults to the current one
+        :param cache_dir: the directory the build cache of every image is kept in
+        :param executable: the docker CLI
+        """
+        self.builder: Optional[str] = builder
+        self.cache_dir: Optional[str] = cache_dir
+        self.executable: str = executable
+
+    @staticmethod
+    def from_env() -> "BuildxBuilder":
+        """
+        Gets the builder with the builder instance and the cache directory set in the environment.
+
+        :return: the builder
+        """
+        cache_dir = os.environ.get(BUILD_CACHE_ENV) or None
+        return BuildxBuilder(builder=os.environ.get(BUILDX_BUILDER_ENV) or None,
+                             cache_dir=None if cache_dir is None else os.path.abspath(cache_dir))
+
+    def cache_path(self, tag: str) -> Optional[str]:
+        """
+        Gets the directory the build cache of an image is kept in.
+
+        :param tag: the tag of the image
+        :return: the directory or None if no cache directory is set
+        """
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", tag))
+
+    def command(self, context_path: str, dockerfile: str, tag: str, build_args: Optional[Dict[str, str]] = None,
+                secrets: Optional[Dict[str, str]] = None, platform: Optional[str] = None,
+                push: bool = False, labels: Optional[Dict[str, str]] = None) -> List[str]:
+        """
+        Gets the docker buildx build command of an image.
+
+        :param context_path: the directory the image is built from
+        :param dockerfile: the path of the Dockerfile relative to the build context
+        :param tag: the tag of the image
+        :param build_args: the build arguments
+        :param secrets: a map of secret ids to the files they are read from, or env:NAME to read them from an
+                        environment variable, relative paths being resolved against the build context
+        :param platform: the docker platform to build for, such as linux/arm64, None for the platform of the builder
+        :param push: whether to push the image to its registry instead of loading it into docker
+        :param labels: the labels of the image
+        :return: the command
+        """
+        command = [self.executable, "buildx", "build", "--progress=plain", "--push" if push is True else "--load",
+                   "--tag", tag, "--file", os.path.join(context_path, dockerfile)]
+        if self.builder is not None:
+            command += ["--builder", self.builder]
+        if platform is not None:
+            command += ["--platform", platform]
+        for key, value in (build_args or {}).items():
+            command += ["--build-arg", f"{key}={value}"]
+        for key, value in (labels or {}).items():
+            command += ["--label", f"{key}={value}"]
+        for secret_id, source in (secrets or {}).items():
+            if source.startswith(SECRET_ENV_PREFIX):
+                command += ["--secret", f"id={secret_id},env={source[len(SECRET_ENV_PREFIX):]}"]
+            else:
+                path = os.path.join(context_path, os.path.expanduser(source))
+                command += ["--secret", f"id={secret_id},src={path}"]
+        cache_path = self.cache_path(tag)
+        if cache_path is not None:
+            # a cache that was never exported cannot be imported
+            if os.path.exists(os.path.join(cache_path, "index.json")):
+                command += ["--cache-from", f"type=local,src={cache_path}"]
+            command += ["--cache-to", f"type=local,dest={cache_path}.new,mode=max"]
+        return command + [context_path]
+
+    def build(self, context_path: str, dockerfile: str, tag: str, build_args: Optional[Dict[str, str]] = None,
+              secrets: Optional[Dict[str, str]] = None, docker_client: Optional["DockerClient"] = None,
+              trace_tags: Optional[dict] = None, platform: Optional[str] = None, push: bool = False,
+              labels: Optional[Dict[str, str]] = None) -> None:
+        """
+        Builds an image, recording a span for every step BuildKit runs, and replaces the build cache of the image
+        with the one the build exported.
+
+        :param context_path: the directory the image is built from
+        :param dockerfile: the path of the Dockerfile relative to the build context
+        :param tag: the tag of the image
+        :param build_args: the build arguments
+        :param secrets: a map of secret ids to the files or environment variables they are read from
+        :param docker_client: the docker client of the host to build on, defaults to the daemon in the environment
+        :param trace_tags: the tags attached to the spans of the steps
+        :param platform: the docker platform to build for, None for the platform of the builder
+        :param push: whether to push the image to its registry instead of loading it into docker
+        :param labels: the labels of the image
+        :return: None
+        """
+        command = self.command(context_path, dockerfile, tag, build_args=build_args, secrets=secrets,
+                               platform=platform, push=push, labels=labels)
+        self._run(command, docker_client=docker_client, trace_tags=trace_tags or {})
+
+        cache_path = self.cache_path(tag)
+        if cache_path is not None and os.path.isdir(f"{cache_path}.new"):
+            # the exported cache replaces the one imported so the directory does not keep growing
+            shutil.rmtree(cache_path, ignore_errors=True)
+            os.replace(f"{cache_path}.new", cache_path)
+
+    def create_manifest(self, reference: str, sources: List[str],
+                        docker_client: Optional["DockerClient"] = None) -> None:
+        """
+        Combines images already pushed to a registry into one multi-architecture image.
+
+        :param reference: the reference of the multi-architecture image
+        :param sources: the references of the images of every platform
+        :param docker_client: the docker client of the host, defaults to the daemon in the environment
+        :return: None
+        """
+        command = [self.executable, "buildx", "imagetools", "create", "--tag", reference]
+        if self.builder is not None:
+            command += ["--builder", self.builder]
+        self._run(command + sources, docker_client=docker_client)
+
+    def _run(self, command: List[str], docker_client: Optional["DockerClient"] = None,
+             trace_tags: Optional[dict] = None) -> None:
+        """
+        Runs a docker CLI command against the daemon of a docker client, raising a BuildError with its output if it
+        fails.
+
+        :param command: the command
+        :param docker_client: the docker client of the host, defaults to the daemon in the environment
+        :param trace_tags: the tags attached to the spans of the build steps in the output
+        :return: None
+        """
+        from docker.errors import BuildError
+
+        try:
+            overrides = docker_environment(docker_client)
+        except ValueError as e:
+            raise BuildError(str(e), [])
+        environment = dict(os.environ)
+        if len(overrides) > 0:
+            # the daemon of the builder host replaces the one in the environment together with its TLS settings
+            for variable in DOCKER_CLI_VARIABLES:
+                environment.pop(variable, None)
+            environment.update(overrides)
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=environment)
+        except FileNotFoundError:
+            raise BuildError(f"the docker CLI '{self.executable}' is needed to build with buildx", [])
+        output = self._follow_progress(process.stdout, trace_tags or {})
+        if process.wait() != 0:
+            raise BuildError("\n".join(output[-ERROR_LINES:]), [{"stream": line} for line in output])
+
+    @staticmethod
+    def _follow_progress(stream, trace_tags: dict) -> List[str]:
+        """
+        Reads the plain progress output of a build until it finishes, recording a span for every step. The steps of
+        stages built in parallel overlap.
+
+        :param stream: the output of the build
+        :param trace_tags: the tags attached to the spans
+        :return: the lines of output
+        """
+        output: List[str] = []
+        running: Dict[str, tuple] = {}
+        for raw in stream:
+            line = raw.decode(errors="replace").rstrip()
+            output.append(line)
+            start = STEP_START.match(line)
+            if start is not None and start.group(1) not in running:
+                running[start.group(1)] = (start.group(2), time.time_ns())
+                continue
+            end = STEP_END.match(line)
+            if end is not None and end.group(1) in running:
+                step, step_start = running.pop(end.group(1))
+                tracing.record("build step", step_start, time.time_ns(),
+                               dict(trace_tags, step=step, result=end.group(2).lower()))
+        return output
@@ -0,0 +1,175 @@
+"""
+This file defines the HostCapacity and CapacityLimiter classes which admit builds and containers against the cores
+and free memory of the host, so running more work than the host can hold queues instead of pushing it into swap.
+
+The detected capacity can be overridden with the WEDPY_CPUS and WEDPY_MEMORY environment variables, for example on
+a CI runner that shares its host with other jobs.
+"""
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple, Union
+
+CPUS_ENV = "WEDPY_CPUS"
+MEMORY_ENV = "WEDPY_MEMORY"
+
+# what a build without limits is assumed to use
+DEFAULT_BUILD_CPUS = 1.0
+DEFAULT_BUILD_MEMORY = 1024 ** 3
+
+MEMORY_UNITS = {"": 1, "b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+MEMORY_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)(?:i?b)?\s*$", re.IGNORECASE)
+
+# the cpus and bytes of memory a piece of work needs
+Demand = Tuple[float, int]
+
+
+def parse_memory(value: Optional[Union[int, str]]) -> Optional[int]:
+    """
+    Parses a memory size in the format docker accepts, such as 512m, 2g or a number of bytes.
+
+    :param value: the memory size
+    :return: the number of bytes or None if no size was given
+    """
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    match = MEMORY_PATTERN.match(value)
+    if match is None:
+        raise ValueError(f"invalid memory size '{value}', use a number of bytes or a size such as 512m or 2g")
+    return int(float(match.group(1)) * MEMORY_UNITS[match.group(2).lower()])
+
+
+class HostCapacity:
+    """
+    The HostCapacity class is the cores and memory available to run builds and containers.
+
+    Attributes:
+        cpus (float): the number of cores
+        memory (int): the bytes of memory free when wedpy started
+    """
+    def __init__(self, cpus: float, memory: int) -> None:
+        """
+        The constructor for the HostCapacity class.
+
+        :param cpus: the number of cores
+        :param memory: the bytes of free memory
+        """
+        self.cpus: float = cpus
+        self.memory: int = memory
+
+    @classmethod
+    def detect(cls) -> "HostCapacity":
+        """
+        Detects the cores this process may run on and the memory available without swapping.
+
+        :return: the capacity of the host
+        """
+        cpus = os.environ.get(CPUS_ENV)
+        memory = os.environ.get(MEMORY_ENV)
+        return cls(cpus=float(cpus) if cpus is not None else cls._detect_cpus(),
+                   memory=parse_memory(memory) if memory is not None else cls._detect_memory())
+
+    @staticmethod
+    def _detect_cpus() -> float:
+        if hasattr(os, "sched_getaffinity"):
+            return float(len(os.sched_getaffinity(0)))
+        return float(os.cpu_count() or 1)
+
+    @staticmethod
+    def _detect_memory() -> int:
+        try:
+            with open("/proc/meminfo") as f:
+                for line in f:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        try:
+            # without /proc, as on macOS, only the total is known so half of it is assumed to be free
+            return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // 2
+        except (ValueError, OSError, AttributeError):
+            return 4 * 1024 ** 3
+
+
+class CapacityLimiter:
+    """
+    The CapacityLimiter class hands out the cores and memory of the host. Work waits until enough is free, but only
+    while other work is running that will give its share back, so a single piece of work larger than the host, or
+    work queued behind containers that hold their memory for good, still runs rather than waiting forever.
+
+    Attributes:
+        capacity (HostCapacity): the capacity being handed out
+        free_cpus (float): the cores not handed out
+        free_memory (int): the bytes of memory not handed out
+        in_flight (int): the number of admitted pieces of work that will give their share back
+    """
+    def __init__(self, capacity: Optional[HostCapacity] = None) -> None:
+        """
+        The constructor for the CapacityLimiter class.
+
+        :param capacity: the capacity to hand out, defaults to the detected capacity of the host
+        """
+        self.capacity: HostCapacity = HostCapacity.detect() if capacity is None else capacity
+        self.free_cpus: float = self.capacity.cpus
+        self.free_memory: int = self.capacity.memory
+        self.in_flight: int = 0
+        self._condition = threading.Condition()
+
+    @property
+    def max_workers(self) -> int:
+        """
+        The most pieces of work with the default demand of a build that can run at once.
+        """
+        return max(1, int(self.capacity.cpus // DEFAULT_BUILD_CPUS))
+
+    def fits(self, demand: Demand) -> bool:
+        cpus, memory = demand
+        return cpus <= self.free_cpus and memory <= self.free_memory
+
+    def acquire(self, demand: Demand, hold: bool = False) -> None:
+        """
+        Waits until the demand fits in the free capacity and hands it out.
+
+        :param demand: the cpus and bytes of memory needed
+        :param hold: whether the work keeps its share for the rest of the run, as running containers do
+        :return: None
+        """
+        with self._condition:
+            while not self.fits(demand) and self.in_flight > 0:
+                self._condition.wait()
+            self.free_cpus -= demand[0]
+            self.free_memory -= demand[1]
+            if hold is False:
+                self.in_flight += 1
+
+    def release(self, demand: Demand, hold: bool = False) -> None:
+        """
+        Gives back the share of a finished piece of work.
+
+        :param demand: the cpus and bytes of memory that were acquired
+        :param hold: whether the share was acquired to be held, as by a container that has exited or failed to start
+        :return: None
+        """
+        with self._condition:
+            self.free_cpus += demand[0]
+            self.free_memory += demand[1]
+            if hold is False:
+                self.in_flight -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def reserve(self, demand: Demand) -> Iterator[None]:
+        """
+        Holds a share of the capacity for the body of the with block.
+
+        :param demand: the cpus and bytes of memory needed
+        :return: None
+        """
+        self.acquire(demand)
+        try:
+            yield
+        finally:
+            self.release(demand)
@@ -1,7 +1,9 @@
 """
 This file defines the CoreUnit class which is responsible for storing the data for each build in the wedding invite.
 """
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Union
+
+from wedpy.capacity import parse_memory
 
 
 class CoreUnit:
@@ -21,12 +23,42 @@ class CoreUnit:
         outside_port (int): the port to be exposed on the host machine
         inside_port (int): the port to be exposed on the container
         main (bool): whether or not this is the main build
+        dev_mounts (Dict[str, str]): a map of host paths, relative to the package root, to container paths that are
+                                     bind mounted over the image in dev mode so source changes are live
+        dev_command (Optional[Union[str, List[str]]]): the command run instead of the image command in dev mode
+        cpus (Optional[float]): the most cores the container may use
+        memory (Optional[int]): the most bytes of memory the container may use
+        build_cpus (Optional[float]): the cores the build needs, used to decide how many builds run at once
+        build_memory (Optional[int]): the most bytes of memory the build may use
+        depends_on (List[str]): the packages, builds or containers the build needs running, on top of the containers
+                                referred to in its config
+        data_volumes (Dict[str, str]): a map of volume names to the container paths of the data directories kept in
+                                       named volumes, which can be snapshotted once the init builds have run
+        tmpfs_size (Optional[str]): the size cap of each data directory when it is kept in tmpfs in the ephemeral
+                                    profile, such as 512m
+        ephemeral_config (Dict[str, str]): configuration options added to the config in the ephemeral profile, such as
+                                           settings turning off fsync
+        shareable (bool): whether one container is shared by every seating plan on the docker host that runs the
+                          build with the same image and config
+        labels (Dict[str, str]): the labels given to the container, set when running as an instance
+        network_alias (Optional[str]): the name the container is reached by on its network when its container name
+                                       is prefixed for an instance
+        build_secrets (Dict[str, str]): a map of secret ids to the files, relative to the build root, or env:NAME
+                                        environment variables mounted into RUN --mount=type=secret steps by the
+                                        buildx build backend
     """
     def __init__(self, name: str, git_url: str, image_url: str, branch: str,
                  default_image_tag: str, build_root: str, build_files: Optional[Dict[str, str]],
                  build_lock: bool, config: Dict[str, str],
                  outside_port: Optional[int], inside_port: Optional[int],
-                 default_container_name: str, main: bool, build_args: dict) -> None:
+                 default_container_name: str, main: bool, build_args: dict,
+                 dev_mounts: Optional[Dict[str, str]] = None,
+                 dev_command: Optional[Union[str, List[str]]] = None, cpus: Optional[float] = None,
+                 memory: Optional[int] = None, build_cpus: Optional[float] = None,
+                 build_memory: Optional[int] = None, depends_on: Optional[List[str]] = None,
+                 data_volumes: Optional[Dict[str, str]] = None, tmpfs_size: Optional[str] = None,
+                 ephemeral_config: Optional[Dict[str, str]] = None, shareable: bool = False,
+                 build_secrets: Optional[Dict[str, str]] = None) -> None:
         """
         The constructor for the CoreUnit class.
 
@@ -44,6 +76,18 @@ class CoreUnit:
         :param default_container_name: the default name of the container
         :param main: whether or not this is the main build
         :param build_args: a map of build arguments to be passed into the docker build
+        :param dev_mounts: a map of host paths to container paths bind mounted in dev mode
+        :param dev_command: the command run instead of the image command in dev mode
+        :param cpus: the most cores the container may use
+        :param memory: the most bytes of memory the container may use
+        :param build_cpus: the cores the build needs
+        :param build_memory: the most bytes of memory the build may use
+        :param depends_on: the packages, builds or containers the build needs running
+        :param data_volumes: a map of volume names to the container paths of the data directories
+        :param tmpfs_size: the size cap of each data directory kept in tmpfs in the ephemeral profile
+        :param ephemeral_config: configuration options added to the config in the ephemeral profile
+        :param shareable: whether the container is shared by the seating plans on the docker host
+        :param build_secrets: a map of secret ids to the files or environment variables they are read from
         """
         self.name: str = name
         self.git_url: str = git_url
@@ -59,6 +103,20 @@ class CoreUnit:
         self.default_container_name: str = default_container_name
         self.main: bool = main
         self.build_args: dict = build_args
+        self.dev_mounts: Dict[str, str] = {} if dev_mounts is None else dev_mounts
+        self.dev_command: Optional[Union[str, List[str]]] = dev_command
+        self.cpus: Optional[float] = cpus
+        self.memory: Optional[int] = memory
+        self.build_cpus: Optional[float] = build_cpus
+        self.build_memory: Optional[int] = build_memory
+        self.depends_on: List[str] = [] if depends_on is None else depends_on
+        self.data_volumes: Dict[str, str] = {} if data_volumes is None else data_volumes
+        self.tmpfs_size: Optional[str] = tmpfs_size
+        self.ephemeral_config: Dict[str, str] = {} if ephemeral_config is None else ephemeral_config
+        self.shareable: bool = shareable
+        self.labels: Dict[str, str] = {}
+        self.network_alias: Optional[str] = None
+        self.build_secrets: Dict[str, str] = {} if build_secrets is None else build_secrets
 
     def __str__(self):
         return f"Name: {self.name}\nGit URL: {self.git_url}\nImage URL: {self.image_url}\n" \
@@ -88,8 +146,21 @@ class CoreUnit:
         default_container_name: str = build_dict['default_container_name']
         main: bool = build_dict.get('main', False)
         build_args: dict = build_dict.get('build_args', {})
+        dev_mounts: Dict[str, str] = build_dict.get('dev_mounts', {})
+        dev_command: Optional[Union[str, List[str]]] = build_dict.get('dev_command')
+        cpus: Optional[float] = build_dict.get('cpus')
+        memory: Optional[int] = parse_memory(build_dict.get('memory'))
+        build_cpus: Optional[float] = build_dict.get('build_cpus')
+        build_memory: Optional[int] = parse_memory(build_dict.get('build_memory'))
+        depends_on: List[str] = build_dict.get('depends_on', [])
+        data_volumes: Dict[str, str] = build_dict.get('data_volumes', {})
+        tmpfs_size: Optional[str] = build_dict.get('tmpfs_size')
+        ephemeral_config: Dict[str, str] = build_dict.get('ephemeral_config', {})
+        shareable: bool = build_dict.get('shareable', False)
+        build_secrets: Dict[str, str] = build_dict.get('build_secrets', {})
 
         return cls(name, git_url, image_url, branch, default_image_tag,
                    build_root, build_files, build_lock, config,
                    outside_port, inside_port, default_container_name, main,
-                   build_args)
+                   build_args, dev_mounts, dev_command, cpus, memory, build_cpus, build_memory, depends_on,
+                   data_volumes, tmpfs_size, ephemeral_config, shareable, build_secrets)
@@ -0,0 +1,44 @@
+"""
+This file defines the get_client function which lazily creates the docker client so commands that never talk to
+docker do not need a running docker daemon or pay the cost of importing docker-py, and the switch that moves the
+fan-out paths onto the asyncio engine client.
+"""
+import os
+from typing import TYPE_CHECKING, Dict
+
+if TYPE_CHECKING:
+    from docker import DockerClient
+
+
+# set to "asyncio" to make the run, teardown, status and pull paths call the Engine API all at once over the asyncio
+# engine client instead of one call at a time through docker-py
+ENGINE_ENV = "WEDPY_ENGINE"
+
+_clients: Dict[int, "DockerClient"] = {}
+
+
+def engine_enabled() -> bool:
+    """
+    Checks whether the fan-out paths run over the asyncio engine client.
+
+    :return: True if WEDPY_ENGINE is set to asyncio
+    """
+    return os.environ.get(ENGINE_ENV) == "asyncio"
+
+
+def get_client() -> "DockerClient":
+    """
+    Gets the docker client for this process, creating it from the environment on first use. Clients are keyed by
+    process ID so pool workers forked from a process that already has a client open their own connection.
+
+    :return: the docker client
+    """
+    pid = os.getpid()
+    client = _clients.get(pid)
+    if client is None:
+        import docker
+
+        client = docker.from_env()
+        _clients.clear()
+        _clients[pid] = client
+    return client
@@ -0,0 +1,31 @@
+"""
+This file defines the endpoint for wedpy-agent which runs the agent answering the commands of the other entry points
+in this directory, or stops it.
+"""
+import argparse
+import sys
+
+from wedpy import agent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-stop', action='store_true', help='stop the agent serving this directory')
+    args = parser.parse_args()
+
+    path = agent.socket_path()
+    if args.stop is True:
+        response = agent.request("shutdown", path=path)
+        print("no agent is running" if response is None else response["output"])
+        return None
+
+    from wedpy.docker_client import get_client
+
+    server = agent.Agent(path=path, docker_client=get_client())
+    print(f"agent serving {path}, stop it with wedpy-agent -stop")
+    try:
+        server.serve_forever()
+    except RuntimeError as e:
+        sys.exit(str(e))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,37 @@
+"""
+This file defines the -backend, -builder and -build_cache options shared by the entry points that build images.
+"""
+import argparse
+import os
+
+from wedpy.buildkit import BACKENDS, BUILD_BACKEND_ENV, BUILD_CACHE_ENV, BUILDX_BUILDER_ENV
+
+
+def add_backend_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the -backend, -builder and -build_cache options to the parser of an entry point.
+
+    :param parser: the parser of the entry point
+    :return: None
+    """
+    parser.add_argument('-backend', '--backend', choices=BACKENDS, default=None,
+                        help='build with the legacy docker builder or with BuildKit through docker buildx')
+    parser.add_argument('-builder', '--builder', default=None, metavar='NAME',
+                        help='the buildx builder instance to build with, defaults to the current one')
+    parser.add_argument('-build_cache', '--build-cache', default=None, metavar='DIR',
+                        help='export the buildx build cache of every image to this directory and import it from there')
+
+
+def backend_from_args(args: argparse.Namespace) -> None:
+    """
+    Sets the build backend of an entry point in the environment, so the build pool workers pick it up.
+
+    :param args: the parsed arguments of the entry point
+    :return: None
+    """
+    if args.backend is not None:
+        os.environ[BUILD_BACKEND_ENV] = args.backend
+    if args.builder is not None:
+        os.environ[BUILDX_BUILDER_ENV] = args.builder
+    if args.build_cache is not None:
+        os.environ[BUILD_CACHE_ENV] = os.path.abspath(args.build_cache)
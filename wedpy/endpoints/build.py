@@ -3,8 +3,21 @@ This file defines the endpoint for wedpy-build which builds the images for a pac
 """
 import argparse
 import os
+import sys
+from typing import List
 
+from wedpy.artifact_cache import ARTIFACT_CACHE_ENV
+from wedpy.builder_pool import BuilderPoolError
+from wedpy.capacity import CapacityLimiter
+from wedpy.endpoints.backend import add_backend_arguments, backend_from_args
+from wedpy.endpoints.failures import add_failure_arguments, failures_from_args
+from wedpy.endpoints.instrument import add_instrument_arguments, instrument
+from wedpy.endpoints.journal import add_journal_argument, journal_from_args
+from wedpy.endpoints.selection import add_selection_arguments, select_from_args
+from wedpy.failures import FAIL_FAST, BuildFailures, failure_policy
+from wedpy.platforms import DEFAULT_REGISTRY, build_matrix, ensure_local_registry
 from wedpy.seating_plan.seating_plan import SeatingPlan
+from wedpy.validation import PlanValidator, ValidationError
 from wedpy.wedding_invite.local_wedding_invite import LocalWeddingInvite
 
 
@@ -13,25 +26,83 @@ def main() -> None:
     parser.add_argument('-remote', action='store_true')
     parser.add_argument('-dev', action='store_true')
     parser.add_argument('-no_pool', action='store_true')
+    parser.add_argument('-artifact_cache', default=None, metavar='DIR',
+                        help='load images built from the same inputs from this directory and save new builds to it')
+    parser.add_argument('-platforms', nargs='?', const='all', default=None, metavar='LIST',
+                        help='build every architecture declared in build_files, or the comma separated platforms '
+                             'given, with buildx and push them to the registry as one multi-architecture image')
+    parser.add_argument('-registry', default=DEFAULT_REGISTRY,
+                        help='the registry the multi-architecture images are pushed to, one is started on this '
+                             'machine if it is on localhost')
+    add_selection_arguments(parser)
+    add_journal_argument(parser)
+    add_backend_arguments(parser)
+    add_failure_arguments(parser)
+    add_instrument_arguments(parser)
 
     args = parser.parse_args()
+    backend_from_args(args)
+    failures_from_args(args)
 
-    remote: bool = args.remote if args.remote else False
-    dev: bool = args.dev if args.dev else False
-    pool: bool = False if args.no_pool else True
+    if args.artifact_cache is not None:
+        # set in the environment so the build pool workers pick it up
+        os.environ[ARTIFACT_CACHE_ENV] = os.path.abspath(args.artifact_cache)
 
-    seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
-    local_wedding_invite_path: str = str(os.path.join(os.getcwd(), 'wedding_invite.yml'))
+    with instrument(args, command='wedpy-build'):
+        remote: bool = args.remote if args.remote else False
+        dev: bool = args.dev if args.dev else False
+        pool: bool = False if args.no_pool else True
 
-    local_wedding_invite = LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path)
+        seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
+        local_wedding_invite_path: str = str(os.path.join(os.getcwd(), 'wedding_invite.yml'))
 
-    if pool is True:
-        local_wedding_invite.build_images(dev=dev)
-    else:
-        local_wedding_invite.build_images_without_pool(dev=dev)
+        # a platform-matrix build does not need a build file for the architecture of this machine
+        validator = PlanValidator(seating_plan_path=seating_plan_path,
+                                  local_wedding_invite_path=local_wedding_invite_path, remote=remote, dev=dev,
+                                  check_build_files=args.platforms is None)
+        try:
+            validator.raise_for_errors()
+        except ValidationError as e:
+            sys.exit(str(e))
 
-    seating_plan = SeatingPlan(seating_plan_path=seating_plan_path)
-    if remote is True:
-        seating_plan.venue = seating_plan.post_office_path
-        seating_plan.full_venue_path = seating_plan.full_post_office_path
-    seating_plan.build(remote=remote, pool=pool)
+        journal = journal_from_args(args, command='wedpy-build')
+        local_wedding_invite = LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path)
+        seating_plan = SeatingPlan(seating_plan_path=seating_plan_path)
+        if remote is True:
+            seating_plan.venue = seating_plan.post_office_path
+            seating_plan.full_venue_path = seating_plan.full_post_office_path
+        select_from_args(args, seating_plan=seating_plan, local_wedding_invite=local_wedding_invite)
+
+        try:
+            if args.platforms is not None:
+                ensure_local_registry(args.registry)
+                images = build_matrix(jobs=local_wedding_invite.build_jobs(dev=dev) + seating_plan.build_jobs(),
+                                      registry=args.registry,
+                                      platforms=None if args.platforms == 'all' else args.platforms.split(','),
+                                      max_workers=CapacityLimiter().max_workers)
+                for image in images:
+                    print(f"pushed {image}")
+            elif len(seating_plan.builder_hosts) > 0 and remote is False:
+                seating_plan.build_distributed(
+                    jobs=local_wedding_invite.build_jobs(dev=dev) + seating_plan.build_jobs()
+                )
+            else:
+                local_failures: List[str] = []
+                try:
+                    if pool is True:
+                        local_wedding_invite.build_images(dev=dev)
+                    else:
+                        local_wedding_invite.build_images_without_pool(dev=dev)
+                except BuildFailures as e:
+                    if failure_policy() == FAIL_FAST:
+                        raise
+                    local_failures = e.failures
+                try:
+                    seating_plan.build(remote=remote, pool=pool)
+                except BuildFailures as e:
+                    raise BuildFailures(failures=local_failures + e.failures, cancelled=e.cancelled)
+                if len(local_failures) > 0:
+                    raise BuildFailures(failures=local_failures)
+        except (BuilderPoolError, BuildFailures) as e:
+            sys.exit(str(e))
+        journal.clear()
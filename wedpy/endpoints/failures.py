@@ -0,0 +1,40 @@
+"""
+This file defines the -failure_policy and -retries options shared by the entry points that build, pull or clone.
+"""
+import argparse
+import os
+import sys
+
+from wedpy.failures import FAILURE_POLICY_ENV, POLICIES, RETRIES_ENV
+
+
+def add_failure_arguments(parser: argparse.ArgumentParser, policy: bool = True) -> None:
+    """
+    Adds the -failure_policy and -retries options to the parser of an entry point.
+
+    :param parser: the parser of the entry point
+    :param policy: whether the entry point runs independent work a failure policy applies to
+    :return: None
+    """
+    if policy is True:
+        parser.add_argument('-failure_policy', '--failure-policy', choices=POLICIES, default=None,
+                            help='fail-fast cancels the queued work once something fails, keep-going finishes the '
+                                 'rest and reports every failure')
+    parser.add_argument('-retries', '--retries', type=int, default=None, metavar='N',
+                        help='the most times a build, pull or clone failing with a transient error is retried')
+
+
+def failures_from_args(args: argparse.Namespace) -> None:
+    """
+    Sets the failure policy and the retries of an entry point in the environment, so the build pool workers pick
+    them up.
+
+    :param args: the parsed arguments of the entry point
+    :return: None
+    """
+    if getattr(args, 'failure_policy', None) is not None:
+        os.environ[FAILURE_POLICY_ENV] = args.failure_policy
+    if args.retries is not None:
+        if args.retries < 0:
+            sys.exit("-retries must not be negative")
+        os.environ[RETRIES_ENV] = str(args.retries)
@@ -1,13 +1,34 @@
 """
 This file defines the endpoint for wedpy-install which installs the package.
 """
+import argparse
 import os
+import sys
 
+from wedpy.endpoints.failures import add_failure_arguments, failures_from_args
+from wedpy.endpoints.instrument import add_instrument_arguments, instrument
+from wedpy.endpoints.journal import add_journal_argument, journal_from_args
 from wedpy.seating_plan.seating_plan import SeatingPlan
+from wedpy.validation import PlanValidator, ValidationError
 
 
 def main() -> None:
-    seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
+    parser = argparse.ArgumentParser()
+    add_journal_argument(parser)
+    add_failure_arguments(parser, policy=False)
+    add_instrument_arguments(parser)
+    args = parser.parse_args()
+    failures_from_args(args)
 
-    seating_plan = SeatingPlan(seating_plan_path=seating_plan_path)
-    seating_plan.install()
+    with instrument(args, command='wedpy-install'):
+        seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
+
+        try:
+            PlanValidator(seating_plan_path=seating_plan_path).raise_for_errors(check_invites=False)
+        except ValidationError as e:
+            sys.exit(str(e))
+
+        journal = journal_from_args(args, command='wedpy-install')
+        seating_plan = SeatingPlan(seating_plan_path=seating_plan_path)
+        seating_plan.install()
+        journal.clear()
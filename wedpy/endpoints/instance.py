@@ -0,0 +1,35 @@
+"""
+This file defines the --instance option shared by the entry points that run, stop or tear down containers.
+"""
+import argparse
+import sys
+from typing import Optional
+
+from wedpy.instance import Instance
+
+
+def add_instance_argument(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the --instance option to the parser of an entry point.
+
+    :param parser: the parser of the entry point
+    :return: None
+    """
+    parser.add_argument('-instance', '--instance', default=None, metavar='ID',
+                        help='namespace the containers, network and host ports so several copies of the seating plan '
+                             'can run on one docker host')
+
+
+def instance_from_args(args: argparse.Namespace) -> Optional[Instance]:
+    """
+    Creates the instance requested on the command line.
+
+    :param args: the parsed arguments of the entry point
+    :return: the instance or None if no instance was requested
+    """
+    if args.instance is None:
+        return None
+    try:
+        return Instance(instance_id=args.instance)
+    except ValueError as e:
+        sys.exit(str(e))
@@ -0,0 +1,57 @@
+"""
+This file defines the --trace and --profile options shared by every wedpy entry point.
+"""
+import argparse
+import sys
+from contextlib import contextmanager
+from typing import Iterator
+
+from wedpy import tracing
+
+
+def add_instrument_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the --trace and --profile options to the parser of an entry point.
+
+    :param parser: the parser of the entry point
+    :return: None
+    """
+    parser.add_argument('--trace', default=None, metavar='OUT.json',
+                        help='write a Chrome trace of every phase to this file (viewable in Perfetto)')
+    parser.add_argument('--profile', nargs='?', const='-', default=None, metavar='OUT.prof',
+                        help='run under cProfile, printing the top functions or writing the stats to a file')
+
+
+@contextmanager
+def instrument(args: argparse.Namespace, command: str) -> Iterator[None]:
+    """
+    Runs the body of the with block with the tracing and profiling requested on the command line.
+
+    :param args: the parsed arguments of the entry point
+    :param command: the name of the entry point, used for the span covering the whole command
+    :return: None
+    """
+    if args.trace is not None:
+        tracing.start()
+    profiler = None
+    if args.profile is not None:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        with tracing.span(command):
+            yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            if args.profile == '-':
+                import pstats
+
+                pstats.Stats(profiler, stream=sys.stderr).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(30)
+            else:
+                profiler.dump_stats(args.profile)
+        if args.trace is not None:
+            tracing.finish(output_path=args.trace)
+            # printed to stderr so the output of entry points such as wedpy-status -json stays machine readable
+            print(f"trace written to {args.trace}", file=sys.stderr)
@@ -0,0 +1,37 @@
+"""
+This file defines the -restart option shared by the entry points that keep a journal of finished work to resume from.
+"""
+import argparse
+import os
+
+from wedpy.journal import JOURNAL_ENV, Journal
+
+
+def add_journal_argument(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the -restart option to the parser of an entry point.
+
+    :param parser: the parser of the entry point
+    :return: None
+    """
+    parser.add_argument('-restart', '--restart', action='store_true',
+                        help='ignore the work an interrupted or failed run finished and start from the beginning')
+
+
+def journal_from_args(args: argparse.Namespace, command: str) -> Journal:
+    """
+    Switches on the journal of an entry point, clearing it first if a restart was requested.
+
+    :param args: the parsed arguments of the entry point
+    :param command: the name of the entry point
+    :return: the journal, to be cleared once the entry point has finished everything
+    """
+    instance = getattr(args, 'instance', None)
+    journal = Journal.for_command(command if instance is None else f"{command}.{instance}")
+    if args.restart is True:
+        journal.clear()
+    elif os.path.exists(journal.path):
+        print(f"resuming the previous {command}, finished work is skipped (use -restart to start over)")
+    # set in the environment so the build pool workers pick it up
+    os.environ[JOURNAL_ENV] = journal.path
+    return journal
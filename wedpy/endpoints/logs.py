@@ -0,0 +1,88 @@
+"""
+This file defines the endpoint for wedpy-logs which streams the logs of every container on the network of the seating
+plan into one output. The logs are answered by the agent when one is running, unless they are followed.
+"""
+import argparse
+import os
+import sys
+from typing import IO, Dict, Optional
+
+from wedpy import agent
+from wedpy.endpoints.instance import add_instance_argument, instance_from_args
+from wedpy.endpoints.instrument import add_instrument_arguments, instrument
+from wedpy.endpoints.selection import add_selection_arguments, select_from_args
+from wedpy.logs import DEFAULT_BUFFER_LINES, LogFollower, LogStream, parse_since
+from wedpy.seating_plan.seating_plan import SeatingPlan
+from wedpy.selection import Selection
+from wedpy.wedding_invite.local_wedding_invite import LocalWeddingInvite
+
+
+def show(args: argparse.Namespace, output: Optional[IO[str]] = None) -> None:
+    """
+    Writes the logs of every container on the network of the seating plan.
+
+    :param args: the parsed arguments of the entry point
+    :param output: where the lines are written, defaults to stdout
+    :return: None
+    """
+    instance = instance_from_args(args)
+    try:
+        since = parse_since(args.since)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
+    local_wedding_invite_path: str = str(os.path.join(os.getcwd(), 'wedding_invite.yml'))
+
+    seating_plan = SeatingPlan(seating_plan_path=seating_plan_path, instance=instance)
+    local_wedding_invite = None
+    if os.path.exists(local_wedding_invite_path):
+        local_wedding_invite = LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path,
+                                                  instance=instance)
+    select_from_args(args, seating_plan=seating_plan, local_wedding_invite=local_wedding_invite)
+
+    invites = seating_plan.invites
+    if local_wedding_invite is not None:
+        invites = [local_wedding_invite.local_wedding_invite] + invites
+    prefixes: Dict[str, str] = {
+        build.core_unit.default_container_name: f"{invite.package_name}/{Selection.key(build)}"
+        for invite in invites for build in invite.builds + invite.init_builds
+    }
+
+    streams = [
+        LogStream(prefix=prefixes.get(container.name, container.name), container=container,
+                  buffer_lines=args.buffer_lines)
+        for container in seating_plan.containers
+    ]
+    if len(streams) == 0:
+        sys.exit(f"no containers are running on {seating_plan.network_name}")
+
+    follower = LogFollower(streams=streams, since=since, grep=args.grep, follow=args.follow, output=output)
+    try:
+        follower.run()
+    except KeyboardInterrupt:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-f', '-follow', dest='follow', action='store_true', help='keep streaming new lines')
+    parser.add_argument('-since', '--since', default=None,
+                        help='only show lines logged since a duration ago, such as 10m, or a timestamp')
+    parser.add_argument('-grep', '--grep', default=None, metavar='PATTERN',
+                        help='only show lines matching this regular expression')
+    parser.add_argument('-buffer_lines', type=int, default=DEFAULT_BUFFER_LINES,
+                        help='lines kept waiting per container before the oldest are dropped')
+    add_instance_argument(parser)
+    add_selection_arguments(parser)
+    add_instrument_arguments(parser)
+
+    args = parser.parse_args()
+
+    with instrument(args, command='wedpy-logs'):
+        # the agent serves the seating plan as it is, instances are namespaced in this process
+        if args.instance is None and args.follow is False and \
+                agent.answer("logs", args={"since": args.since, "grep": args.grep, "buffer_lines": args.buffer_lines,
+                                           "only": args.only, "exclude": args.exclude}):
+            return None
+        show(args)
@@ -1,13 +1,27 @@
 """
 This file defines the endpoint for wedpy-post which compiles all the wedding invites from dependencies.
 """
+import argparse
 import os
+import sys
 
+from wedpy.endpoints.instrument import add_instrument_arguments, instrument
 from wedpy.seating_plan.seating_plan import SeatingPlan
+from wedpy.validation import PlanValidator, ValidationError
 
 
 def main() -> None:
-    seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
+    parser = argparse.ArgumentParser()
+    add_instrument_arguments(parser)
+    args = parser.parse_args()
 
-    seating_plan = SeatingPlan(seating_plan_path=seating_plan_path)
-    seating_plan.post_invites()
+    with instrument(args, command='wedpy-post'):
+        seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
+
+        try:
+            PlanValidator(seating_plan_path=seating_plan_path, check_build_files=False).raise_for_errors()
+        except ValidationError as e:
+            sys.exit(str(e))
+
+        seating_plan = SeatingPlan(seating_plan_path=seating_plan_path)
+        seating_plan.post_invites()
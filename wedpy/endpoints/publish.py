@@ -0,0 +1,57 @@
+"""
+This file defines the endpoint for wedpy-publish which pushes the built images of a package to their image_url.
+"""
+import argparse
+import os
+import sys
+
+from wedpy.endpoints.failures import add_failure_arguments, failures_from_args
+from wedpy.endpoints.instrument import add_instrument_arguments, instrument
+from wedpy.endpoints.selection import add_selection_arguments, select_from_args
+from wedpy.publish import DEFAULT_MAX_PUSHES, PUBLISHED_PATH, PublishError, publish
+from wedpy.seating_plan.seating_plan import SeatingPlan
+from wedpy.validation import PlanValidator, ValidationError
+from wedpy.wedding_invite.local_wedding_invite import LocalWeddingInvite
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-dev', action='store_true')
+    parser.add_argument('-changed', action='store_true',
+                        help=f'only push the images built from different inputs than when they were last published, '
+                             f'as recorded in {PUBLISHED_PATH}')
+    parser.add_argument('-max_pushes', type=int, default=DEFAULT_MAX_PUSHES, metavar='N',
+                        help='the most images pushed at the same time')
+    add_selection_arguments(parser)
+    add_failure_arguments(parser)
+    add_instrument_arguments(parser)
+
+    args = parser.parse_args()
+    if args.max_pushes < 1:
+        parser.error('-max_pushes must be at least 1')
+    failures_from_args(args)
+
+    with instrument(args, command='wedpy-publish'):
+        dev: bool = args.dev if args.dev else False
+
+        seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
+        local_wedding_invite_path: str = str(os.path.join(os.getcwd(), 'wedding_invite.yml'))
+
+        validator = PlanValidator(seating_plan_path=seating_plan_path,
+                                  local_wedding_invite_path=local_wedding_invite_path, remote=False, dev=dev)
+        try:
+            validator.raise_for_errors()
+        except ValidationError as e:
+            sys.exit(str(e))
+
+        local_wedding_invite = LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path)
+        seating_plan = SeatingPlan(seating_plan_path=seating_plan_path)
+        select_from_args(args, seating_plan=seating_plan, local_wedding_invite=local_wedding_invite)
+
+        try:
+            digests = publish(jobs=local_wedding_invite.build_jobs(dev=dev) + seating_plan.build_jobs(),
+                              changed_only=args.changed, max_pushes=args.max_pushes)
+        except PublishError as e:
+            sys.exit(str(e))
+        for image_url, digest in sorted(digests.items()):
+            print(f"{image_url} unchanged" if digest is None else f"pushed {image_url}@{digest}")
@@ -0,0 +1,56 @@
+"""
+This file defines the endpoint for wedpy-reset which rolls the data volumes of the running containers back to the
+snapshot taken by wedpy-run -snapshots once the init containers had seeded them.
+"""
+import argparse
+import os
+import sys
+
+from wedpy.endpoints.instance import add_instance_argument, instance_from_args
+from wedpy.endpoints.instrument import add_instrument_arguments, instrument
+from wedpy.endpoints.selection import add_selection_arguments, select_from_args
+from wedpy.seating_plan.seating_plan import SeatingPlan
+from wedpy.snapshot import VolumeSnapshots
+from wedpy.wedding_invite.local_wedding_invite import LocalWeddingInvite
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-remote', action='store_true')
+    add_instance_argument(parser)
+    add_selection_arguments(parser)
+    add_instrument_arguments(parser)
+
+    args = parser.parse_args()
+
+    with instrument(args, command='wedpy-reset'):
+        instance = instance_from_args(args)
+        remote: bool = args.remote if args.remote else False
+
+        seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
+        local_wedding_invite_path: str = str(os.path.join(os.getcwd(), 'wedding_invite.yml'))
+
+        seating_plan = SeatingPlan(seating_plan_path=seating_plan_path, instance=instance)
+        local_wedding_invite = None
+        if os.path.exists(local_wedding_invite_path):
+            local_wedding_invite = LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path,
+                                                      instance=instance)
+        select_from_args(args, seating_plan=seating_plan, local_wedding_invite=local_wedding_invite)
+
+        # the main builds are always built locally
+        invites = [(invite, remote) for invite in seating_plan.invites]
+        if local_wedding_invite is not None and local_wedding_invite.has_builds is True:
+            invites.append((local_wedding_invite.local_wedding_invite, False))
+
+        snapshots = VolumeSnapshots.in_cwd()
+        missing = []
+        for invite, invite_remote in invites:
+            if len(snapshots.stateful_builds(invite)) == 0:
+                continue
+            if snapshots.reset(invite, runner=seating_plan.client.containers, network_name=seating_plan.network_name,
+                               remote=invite_remote) is True:
+                print(f"{invite.package_name} reset to its snapshot")
+            else:
+                missing.append(invite.package_name)
+        if len(missing) > 0:
+            sys.exit(f"no snapshot of {', '.join(missing)} for the current images, run wedpy-run -snapshots first")
@@ -1,7 +1,15 @@
 import argparse
 import os
+import sys
 
+from wedpy.endpoints.instance import add_instance_argument, instance_from_args
+from wedpy.endpoints.instrument import add_instrument_arguments, instrument
+from wedpy.endpoints.journal import add_journal_argument, journal_from_args
+from wedpy.endpoints.selection import add_selection_arguments, select_from_args
 from wedpy.seating_plan.seating_plan import SeatingPlan
+from wedpy.snapshot import VolumeSnapshots
+from wedpy.validation import PlanValidator, ValidationError
+from wedpy.wedding_invite.build import DEFAULT_PROFILE, EPHEMERAL_PROFILE, PROFILES
 from wedpy.wedding_invite.local_wedding_invite import LocalWeddingInvite
 
 
@@ -9,22 +17,50 @@ def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument('-remote', action='store_true')
     parser.add_argument('-dev', action='store_true')
+    parser.add_argument('-snapshots', action='store_true',
+                        help='restore data volumes from their snapshot instead of running the init containers, or '
+                             'snapshot them once the init containers succeed')
+    parser.add_argument('-storage', choices=PROFILES, default=DEFAULT_PROFILE,
+                        help='the storage profile, ephemeral keeps the data directories of builds in tmpfs')
+    add_instance_argument(parser)
+    add_selection_arguments(parser)
+    add_journal_argument(parser)
+    add_instrument_arguments(parser)
 
     args = parser.parse_args()
+    if args.snapshots is True and args.storage == EPHEMERAL_PROFILE:
+        parser.error('-snapshots cannot be used with the ephemeral storage profile')
 
-    dev = args.dev if args.dev else False
-    remote = args.remote if args.remote else False
+    with instrument(args, command='wedpy-run'):
+        instance = instance_from_args(args)
+        dev = args.dev if args.dev else False
+        remote = args.remote if args.remote else False
 
-    seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
-    local_wedding_invite_path: str = str(os.path.join(os.getcwd(), 'wedding_invite.yml'))
+        seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
+        local_wedding_invite_path: str = str(os.path.join(os.getcwd(), 'wedding_invite.yml'))
 
-    seating_plan = SeatingPlan(seating_plan_path=seating_plan_path)
-    if remote is True:
-        seating_plan.venue = seating_plan.post_office_path
-        seating_plan.full_venue_path = seating_plan.full_post_office_path
-    seating_plan.run_containers(remote=remote)
+        validator = PlanValidator(seating_plan_path=seating_plan_path,
+                                  local_wedding_invite_path=local_wedding_invite_path, remote=remote, dev=dev,
+                                  check_build_files=False)
+        try:
+            validator.raise_for_errors()
+        except ValidationError as e:
+            sys.exit(str(e))
 
-    local_wedding_invite = LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path)
-    local_wedding_invite.run_containers(
-        runner=seating_plan.client.containers, network_name=seating_plan.network_name, dev=dev
-    )
+        journal = journal_from_args(args, command='wedpy-run')
+        seating_plan = SeatingPlan(seating_plan_path=seating_plan_path, instance=instance)
+        if remote is True:
+            seating_plan.venue = seating_plan.post_office_path
+            seating_plan.full_venue_path = seating_plan.full_post_office_path
+        local_wedding_invite = LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path,
+                                                  instance=instance)
+        select_from_args(args, seating_plan=seating_plan, local_wedding_invite=local_wedding_invite)
+
+        snapshots = VolumeSnapshots.in_cwd() if args.snapshots is True else None
+        seating_plan.run_containers(remote=remote, dev=dev, snapshots=snapshots, profile=args.storage)
+        if local_wedding_invite.has_builds is True:
+            local_wedding_invite.run_containers(
+                runner=seating_plan.client.containers, network_name=seating_plan.network_name, dev=dev,
+                snapshots=snapshots, profile=args.storage
+            )
+        journal.clear()
@@ -0,0 +1,53 @@
+"""
+This file defines the --only and --except options shared by the entry points that build, run, stop or tear down
+containers.
+"""
+import argparse
+import sys
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from wedpy.seating_plan.seating_plan import SeatingPlan
+    from wedpy.selection import Selection
+    from wedpy.wedding_invite.local_wedding_invite import LocalWeddingInvite
+
+
+def add_selection_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the --only and --except options to the parser of an entry point.
+
+    :param parser: the parser of the entry point
+    :return: None
+    """
+    parser.add_argument('-only', '--only', action='append', default=[], metavar='PACKAGE|BUILD',
+                        help='only process this package, build or container and what it depends on, can be repeated')
+    parser.add_argument('-except', '--except', dest='exclude', action='append', default=[],
+                        metavar='PACKAGE|BUILD', help='skip this package, build or container, can be repeated')
+
+
+def select_from_args(args: argparse.Namespace, seating_plan: "SeatingPlan",
+                     local_wedding_invite: Optional["LocalWeddingInvite"] = None) -> Optional["Selection"]:
+    """
+    Narrows the seating plan and the local wedding invite down to the builds selected on the command line.
+
+    :param args: the parsed arguments of the entry point
+    :param seating_plan: the seating plan to narrow down
+    :param local_wedding_invite: the local wedding invite to narrow down, if the entry point uses it
+    :return: the resolved selection or None if nothing was selected
+    """
+    # imported here so entry points answered by the agent do not load the wedding invites
+    from wedpy.selection import Selection
+
+    selection = Selection(only=args.only, exclude=args.exclude)
+    if selection.is_active is False:
+        return None
+    try:
+        seating_plan.select(selection, local_invite=None if local_wedding_invite is None
+                            else local_wedding_invite.local_wedding_invite)
+    except ValueError as e:
+        sys.exit(str(e))
+    if local_wedding_invite is not None:
+        local_wedding_invite.select(selection)
+    # printed to stderr so the output of entry points such as wedpy-status -json stays machine readable
+    print(f"selected {len(selection.selected)} builds: {', '.join(sorted(selection.selected))}", file=sys.stderr)
+    return selection
@@ -0,0 +1,79 @@
+"""
+This file defines the endpoint for wedpy-status which shows which images and containers of the seating plan exist
+and whether they are running. The status is answered by the agent when one is running.
+"""
+import argparse
+import os
+from typing import TYPE_CHECKING, Optional
+
+from wedpy import agent
+from wedpy.endpoints.instance import add_instance_argument, instance_from_args
+from wedpy.endpoints.instrument import add_instrument_arguments, instrument
+from wedpy.endpoints.selection import add_selection_arguments, select_from_args
+
+if TYPE_CHECKING:
+    from wedpy.agent import ContainerState
+
+
+def report(args: argparse.Namespace, state: Optional["ContainerState"] = None) -> str:
+    """
+    Collects the status of the seating plan.
+
+    :param args: the parsed arguments of the entry point
+    :param state: the containers and images kept by the agent, None to list them from the docker daemon
+    :return: the status as a table or as JSON
+    """
+    from wedpy.seating_plan.seating_plan import SeatingPlan
+    from wedpy.status import StatusReport
+    from wedpy.wedding_invite.local_wedding_invite import LocalWeddingInvite
+
+    instance = instance_from_args(args)
+    remote: bool = args.remote if args.remote else False
+    dev: bool = args.dev if args.dev else False
+
+    seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
+    local_wedding_invite_path: str = str(os.path.join(os.getcwd(), 'wedding_invite.yml'))
+
+    seating_plan = SeatingPlan(seating_plan_path=seating_plan_path, instance=instance)
+    if remote is True:
+        seating_plan.venue = seating_plan.post_office_path
+        seating_plan.full_venue_path = seating_plan.full_post_office_path
+    local_wedding_invite = None
+    if os.path.exists(local_wedding_invite_path):
+        local_wedding_invite = LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path,
+                                                  instance=instance)
+    select_from_args(args, seating_plan=seating_plan, local_wedding_invite=local_wedding_invite)
+
+    local_invite = None
+    if local_wedding_invite is not None:
+        local_invite = local_wedding_invite.local_wedding_invite
+        # main builds are run by hand in dev mode
+        if dev is True:
+            local_invite.builds = [build for build in local_invite.builds if build.skipped_in_dev is False]
+
+    status_report = StatusReport(invites=seating_plan.invites, remote=remote, local_invite=local_invite)
+    if state is None:
+        status_report.collect(docker_client=seating_plan.client)
+    else:
+        status_report.match(container_summaries=state.containers(), image_summaries=state.images())
+    return status_report.to_json() if args.json is True else status_report.to_table()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-remote', action='store_true')
+    parser.add_argument('-dev', action='store_true')
+    parser.add_argument('-json', action='store_true', help='print the status as JSON instead of a table')
+    add_instance_argument(parser)
+    add_selection_arguments(parser)
+    add_instrument_arguments(parser)
+
+    args = parser.parse_args()
+
+    with instrument(args, command='wedpy-status'):
+        # the agent serves the seating plan as it is, instances are namespaced in this process
+        if args.instance is None and agent.answer("status", args={"remote": args.remote, "dev": args.dev,
+                                                                  "json": args.json, "only": args.only,
+                                                                  "exclude": args.exclude}):
+            return None
+        print(report(args))
@@ -1,11 +1,29 @@
+import argparse
 import os
 
+from wedpy.endpoints.instance import add_instance_argument, instance_from_args
+from wedpy.endpoints.instrument import add_instrument_arguments, instrument
+from wedpy.endpoints.selection import add_selection_arguments, select_from_args
 from wedpy.seating_plan.seating_plan import SeatingPlan
+from wedpy.wedding_invite.local_wedding_invite import LocalWeddingInvite
 
 
 def main() -> None:
-    seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
+    parser = argparse.ArgumentParser()
+    add_instance_argument(parser)
+    add_selection_arguments(parser)
+    add_instrument_arguments(parser)
+    args = parser.parse_args()
 
-    seating_plan = SeatingPlan(seating_plan_path=seating_plan_path)
-    seating_plan.stop_containers()
+    with instrument(args, command='wedpy-stop'):
+        instance = instance_from_args(args)
+        seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
+        local_wedding_invite_path: str = str(os.path.join(os.getcwd(), 'wedding_invite.yml'))
 
+        seating_plan = SeatingPlan(seating_plan_path=seating_plan_path, instance=instance)
+        # the local wedding invite is only read to resolve selectors that refer to the local package
+        local_wedding_invite = None
+        if (args.only or args.exclude) and os.path.exists(local_wedding_invite_path):
+            local_wedding_invite = LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path)
+        select_from_args(args, seating_plan=seating_plan, local_wedding_invite=local_wedding_invite)
+        seating_plan.stop_containers()
@@ -1,16 +1,35 @@
+import argparse
 import os
 
+from wedpy.endpoints.instance import add_instance_argument, instance_from_args
+from wedpy.endpoints.instrument import add_instrument_arguments, instrument
+from wedpy.endpoints.selection import add_selection_arguments, select_from_args
 from wedpy.seating_plan.seating_plan import SeatingPlan
 from wedpy.wedding_invite.local_wedding_invite import LocalWeddingInvite
 
 
 def main() -> None:
-    seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
-    local_wedding_invite_path: str = str(os.path.join(os.getcwd(), 'wedding_invite.yml'))
+    parser = argparse.ArgumentParser()
+    add_instance_argument(parser)
+    add_selection_arguments(parser)
+    add_instrument_arguments(parser)
+    args = parser.parse_args()
 
-    seating_plan = SeatingPlan(seating_plan_path=seating_plan_path)
-    seating_plan.destroy_containers()
-    seating_plan.destroy_network()
+    with instrument(args, command='wedpy-teardown'):
+        instance = instance_from_args(args)
+        seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
+        local_wedding_invite_path: str = str(os.path.join(os.getcwd(), 'wedding_invite.yml'))
 
-    local_wedding_invite = LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path)
-    local_wedding_invite.destroy_init_containers()
+        seating_plan = SeatingPlan(seating_plan_path=seating_plan_path, instance=instance)
+        local_wedding_invite = None
+        if instance is None or os.path.exists(local_wedding_invite_path):
+            local_wedding_invite = LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path)
+        selection = select_from_args(args, seating_plan=seating_plan, local_wedding_invite=local_wedding_invite)
+        seating_plan.destroy_containers()
+        # containers outside the selection are left running on the network
+        if selection is None:
+            seating_plan.destroy_network()
+
+        # the init containers of an instance carry its label so destroy_containers has already removed them
+        if instance is None:
+            local_wedding_invite.destroy_init_containers()
@@ -0,0 +1,77 @@
+"""
+This file defines the endpoint for wedpy-up which installs, posts, builds and runs the whole seating plan in one
+pipelined command.
+"""
+import argparse
+import os
+import sys
+
+from wedpy.artifact_cache import ARTIFACT_CACHE_ENV
+from wedpy.endpoints.instance import add_instance_argument, instance_from_args
+from wedpy.endpoints.backend import add_backend_arguments, backend_from_args
+from wedpy.endpoints.failures import add_failure_arguments, failures_from_args
+from wedpy.endpoints.instrument import add_instrument_arguments, instrument
+from wedpy.endpoints.journal import add_journal_argument, journal_from_args
+from wedpy.seating_plan.pipeline import Pipeline, PipelineError
+from wedpy.seating_plan.seating_plan import SeatingPlan
+from wedpy.validation import PlanValidator, ValidationError
+from wedpy.wedding_invite.build import DEFAULT_PROFILE, PROFILES
+from wedpy.wedding_invite.local_wedding_invite import LocalWeddingInvite
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-dev', action='store_true')
+    parser.add_argument('-max_clones', type=int, default=4)
+    parser.add_argument('-max_builds', type=int, default=None,
+                        help='the most images built at once, defaults to what the cores and free memory allow')
+    parser.add_argument('-max_runs', type=int, default=8)
+    parser.add_argument('-storage', choices=PROFILES, default=DEFAULT_PROFILE,
+                        help='the storage profile, ephemeral keeps the data directories of builds in tmpfs')
+    parser.add_argument('-artifact_cache', default=None, metavar='DIR',
+                        help='load images built from the same inputs from this directory and save new builds to it')
+    add_instance_argument(parser)
+    add_journal_argument(parser)
+    add_backend_arguments(parser)
+    add_failure_arguments(parser)
+    add_instrument_arguments(parser)
+
+    args = parser.parse_args()
+    backend_from_args(args)
+    failures_from_args(args)
+
+    if args.artifact_cache is not None:
+        # set in the environment so the build pool workers pick it up
+        os.environ[ARTIFACT_CACHE_ENV] = os.path.abspath(args.artifact_cache)
+
+    with instrument(args, command='wedpy-up'):
+        instance = instance_from_args(args)
+        dev: bool = args.dev if args.dev else False
+
+        seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
+        local_wedding_invite_path: str = str(os.path.join(os.getcwd(), 'wedding_invite.yml'))
+
+        # the invites of the attendees do not exist until they are cloned so they are checked as they arrive
+        validator = PlanValidator(seating_plan_path=seating_plan_path,
+                                  local_wedding_invite_path=local_wedding_invite_path, dev=dev)
+        try:
+            validator.raise_for_errors(check_invites=False)
+            errors = validator.validate_invite_file(local_wedding_invite_path, local=True)
+            if len(errors) > 0:
+                raise ValidationError(errors=errors)
+        except ValidationError as e:
+            sys.exit(str(e))
+
+        journal = journal_from_args(args, command='wedpy-up')
+        seating_plan = SeatingPlan(seating_plan_path=seating_plan_path, instance=instance)
+        local_wedding_invite = LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path,
+                                                  instance=instance)
+
+        pipeline = Pipeline(seating_plan=seating_plan, local_wedding_invite=local_wedding_invite, validator=validator,
+                            dev=dev, max_clones=args.max_clones, max_builds=args.max_builds, max_runs=args.max_runs,
+                            profile=args.storage)
+        try:
+            pipeline.run()
+        except PipelineError as e:
+            sys.exit(str(e))
+        journal.clear()
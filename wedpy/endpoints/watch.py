@@ -0,0 +1,61 @@
+"""
+This file defines the endpoint for wedpy-watch which rebuilds and restarts only the containers whose source changed.
+"""
+import argparse
+import os
+import sys
+
+from wedpy.endpoints.backend import add_backend_arguments, backend_from_args
+from wedpy.endpoints.instance import add_instance_argument, instance_from_args
+from wedpy.endpoints.instrument import add_instrument_arguments, instrument
+from wedpy.seating_plan.seating_plan import SeatingPlan
+from wedpy.validation import PlanValidator, ValidationError
+from wedpy.watch import Watcher, WatchTarget
+from wedpy.wedding_invite.local_wedding_invite import LocalWeddingInvite
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-dev', action='store_true')
+    parser.add_argument('-debounce', type=float, default=0.5,
+                        help='seconds without changes to wait for before rebuilding')
+    parser.add_argument('-poll_interval', type=float, default=0.5,
+                        help='seconds between scans of the build roots')
+    add_instance_argument(parser)
+    add_backend_arguments(parser)
+    add_instrument_arguments(parser)
+
+    args = parser.parse_args()
+    backend_from_args(args)
+
+    with instrument(args, command='wedpy-watch'):
+        instance = instance_from_args(args)
+        dev: bool = args.dev if args.dev else False
+
+        seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
+        local_wedding_invite_path: str = str(os.path.join(os.getcwd(), 'wedding_invite.yml'))
+
+        validator = PlanValidator(seating_plan_path=seating_plan_path,
+                                  local_wedding_invite_path=local_wedding_invite_path, dev=dev)
+        try:
+            validator.raise_for_errors()
+        except ValidationError as e:
+            sys.exit(str(e))
+
+        seating_plan = SeatingPlan(seating_plan_path=seating_plan_path, instance=instance)
+        local_wedding_invite = LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path,
+                                                  instance=instance)
+
+        targets = WatchTarget.from_invite(invite=local_wedding_invite.local_wedding_invite, package_root=".",
+                                          dev=dev)
+        for invite in seating_plan.invites:
+            package_root = str(os.path.join(seating_plan.full_venue_path, invite.package_name))
+            targets += WatchTarget.from_invite(invite=invite, package_root=package_root)
+
+        watcher = Watcher(targets=targets, runner=seating_plan.client.containers,
+                          network_name=seating_plan.network_name, debounce=args.debounce,
+                          poll_interval=args.poll_interval, dev=dev)
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            print("stopped watching")
@@ -1,15 +1,22 @@
+import argparse
 import os
 
+from wedpy.endpoints.instrument import add_instrument_arguments, instrument
 from wedpy.seating_plan.seating_plan import SeatingPlan
 from wedpy.wedding_invite.local_wedding_invite import LocalWeddingInvite
 
 
 def main() -> None:
-    seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
-    local_wedding_invite_path: str = str(os.path.join(os.getcwd(), 'wedding_invite.yml'))
+    parser = argparse.ArgumentParser()
+    add_instrument_arguments(parser)
+    args = parser.parse_args()
 
-    seating_plan = SeatingPlan(seating_plan_path=seating_plan_path)
-    seating_plan.wipe_images()
+    with instrument(args, command='wedpy-wipe'):
+        seating_plan_path: str = str(os.path.join(os.getcwd(), 'seating_plan.yml'))
+        local_wedding_invite_path: str = str(os.path.join(os.getcwd(), 'wedding_invite.yml'))
 
-    local_wedding_invite = LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path)
-    local_wedding_invite.wipe_images()
+        seating_plan = SeatingPlan(seating_plan_path=seating_plan_path)
+        seating_plan.wipe_images()
+
+        local_wedding_invite = LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path)
+        local_wedding_invite.wipe_images()
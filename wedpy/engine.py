@@ -0,0 +1,562 @@
+"""
+This file defines the AsyncEngineClient class, an asyncio client for the Docker Engine API that speaks HTTP/1.1 over
+the docker socket itself, so hundreds of calls can be in flight at once from one thread without docker-py.
+
+The client keeps a pool of keep-alive connections, at most max_connections of them, and every call waits for a free
+connection. A call that times out or is cancelled closes its connection instead of returning it to the pool, so a
+half read response is never reused. Streaming endpoints (build, pull, logs and events) are async iterators holding
+their connection until they are read to the end or closed.
+
+The run, teardown, status and pull paths use it through wedpy.fanout when WEDPY_ENGINE is set to asyncio.
+"""
+import asyncio
+import codecs
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlencode, urlparse
+
+# the Engine API version every path is prefixed with, the default of docker-py
+API_VERSION = "1.41"
+
+DEFAULT_HOST = "unix:///var/run/docker.sock"
+
+# the most connections, and so calls, open to the docker daemon at once
+MAX_CONNECTIONS = 64
+
+# seconds a call may take before it is cancelled, for streams the most seconds to wait for the next chunk
+REQUEST_TIMEOUT = 60
+
+
+class EngineError(Exception):
+    """
+    The EngineError is raised when the docker daemon answers a call with an error.
+
+    Attributes:
+        status (int): the HTTP status code of the response
+        message (str): the error message of the docker daemon
+    """
+    def __init__(self, status: int, message: str) -> None:
+        """
+        The constructor for the EngineError class.
+
+        :param status: the HTTP status code of the response
+        :param message: the error message of the docker daemon
+        """
+        super().__init__(f"{status}: {message}")
+        self.status: int = status
+        self.message: str = message
+
+
+class EngineNotFound(EngineError):
+    """
+    The EngineNotFound is raised when the container, image, network or volume of a call does not exist.
+    """
+
+
+def split_reference(reference: str) -> Tuple[str, str]:
+    """
+    Splits an image reference into the repository and the tag or digest the pull endpoint takes.
+
+    :param reference: the image reference, for example "postgres", "postgres:15" or "postgres@sha256:..."
+    :return: the repository and the tag, "latest" if the reference has none
+    """
+    if "@" in reference:
+        repository, digest = reference.split("@", 1)
+        return repository, digest
+    repository, _, tag = reference.rpartition(":")
+    if repository == "" or "/" in tag:
+        return reference, "latest"
+    return repository, tag
+
+
+async def _decode_json(chunks: AsyncIterator[bytes]) -> AsyncIterator[dict]:
+    """
+    Decodes a stream of JSON objects, which docker splits into chunks without regard for where an object ends.
+
+    :param chunks: the chunks of the response body
+    :return: the decoded objects
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += text.decode(chunk)
+        while True:
+            buffer = buffer.lstrip()
+            if buffer == "":
+                break
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except ValueError:
+                break
+            buffer = buffer[end:]
+            yield obj
+
+
+async def _demux(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[str, bytes]]:
+    """
+    Splits the multiplexed log stream of a container without a TTY into its frames.
+
+    :param chunks: the chunks of the response body
+    :return: the name of the stream and the data of every frame
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= 8:
+            size = int.from_bytes(buffer[4:8], "big")
+            if len(buffer) < 8 + size:
+                break
+            yield ("stderr" if buffer[0] == 2 else "stdout"), buffer[8:8 + size]
+            buffer = buffer[8 + size:]
+
+
+class Response:
+    """
+    The Response class is the status, headers and body of an answer from the docker daemon, read from its
+    connection as it is consumed.
+
+    Attributes:
+        method (str): the HTTP method of the request
+        status (int): the HTTP status code
+        headers (Dict[str, str]): the headers with lower case names
+        complete (bool): whether the body has been read to the end, so the connection can be reused
+    """
+    def __init__(self, method: str, status: int, headers: Dict[str, str], reader: asyncio.StreamReader) -> None:
+        """
+        The constructor for the Response class.
+
+        :param method: the HTTP method of the request
+        :param status: the HTTP status code
+        :param headers: the headers with lower case names
+        :param reader: the connection the body is read from
+        """
+        self.method: str = method
+        self.status: int = status
+        self.headers: Dict[str, str] = headers
+        self.complete: bool = False
+        self._reader: asyncio.StreamReader = reader
+
+    @property
+    def reusable(self) -> bool:
+        return self.complete is True and self.headers.get("connection", "").lower() != "close"
+
+    async def chunks(self, timeout: Optional[float] = None) -> AsyncIterator[bytes]:
+        """
+        Reads the body as it arrives.
+
+        :param timeout: the most seconds to wait for each chunk, None to wait for as long as it takes
+        :return: the chunks of the body
+        """
+        reader = self._reader
+
+        async def read(coroutine):
+            return await asyncio.wait_for(coroutine, timeout)
+
+        if self.method == "HEAD" or self.status in (204, 304) or self.status < 200:
+            self.complete = True
+            return
+        if self.headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                line = await read(reader.readline())
+                if line == b"":
+                    raise ConnectionResetError("the docker daemon closed the connection in the middle of an answer")
+                size = int(line.split(b";")[0].strip(), 16)
+                if size == 0:
+                    while (await read(reader.readline())) not in (b"\r\n", b"\n", b""):
+                        pass
+                    self.complete = True
+                    return
+                data = await read(reader.readexactly(size))
+                await read(reader.readexactly(2))
+                yield data
+        elif "content-length" in self.headers:
+            length = int(self.headers["content-length"])
+            if length > 0:
+                data = await read(reader.readexactly(length))
+                self.complete = True
+                yield data
+            self.complete = True
+        else:
+            while True:
+                data = await read(reader.read(64 * 1024))
+                if data == b"":
+                    # the body ends with the connection, which cannot be reused
+                    self.headers["connection"] = "close"
+                    self.complete = True
+                    return
+                yield data
+
+    async def read(self, timeout: Optional[float] = None) -> bytes:
+        """
+        Reads the whole body.
+
+        :param timeout: the most seconds to wait for each chunk
+        :return: the body
+        """
+        return b"".join([chunk async for chunk in self.chunks(timeout=timeout)])
+
+
+class AsyncEngineClient:
+    """
+    The AsyncEngineClient class calls the Docker Engine API from asyncio. It must be used from the event loop it
+    first makes a call in and closed when done, for example with "async with AsyncEngineClient.from_env() as engine".
+
+    Attributes:
+        base_url (str): the address of the docker daemon, a unix socket or a plain tcp address
+        max_connections (int): the most connections open to the docker daemon at once
+        timeout (float): seconds a call may take before it is cancelled
+    """
+    def __init__(self, base_url: Optional[str] = None, max_connections: int = MAX_CONNECTIONS,
+                 timeout: float = REQUEST_TIMEOUT) -> None:
+        """
+        The constructor for the AsyncEngineClient class.
+
+        :param base_url: the address of the docker daemon, defaults to DOCKER_HOST or the default docker socket
+        :param max_connections: the most connections open to the docker daemon at once
+        :param timeout: seconds a call may take before it is cancelled
+        """
+        self.base_url: str = base_url or os.environ.get("DOCKER_HOST") or DEFAULT_HOST
+        self.max_connections: int = max_connections
+        self.timeout: float = timeout
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    @classmethod
+    def from_env(cls, max_connections: int = MAX_CONNECTIONS) -> "AsyncEngineClient":
+        """
+        Creates a client for the docker daemon in the environment, as docker-py does.
+
+        :param max_connections: the most connections open to the docker daemon at once
+        :return: the client
+        """
+        if os.environ.get("DOCKER_TLS_VERIFY"):
+            raise ValueError("the asyncio engine client does not support TLS, unset WEDPY_ENGINE to use docker-py")
+        return cls(max_connections=max_connections)
+
+    async def __aenter__(self) -> "AsyncEngineClient":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    @property
+    def idle_connections(self) -> int:
+        return len(self._idle)
+
+    async def close(self) -> None:
+        """
+        Closes the idle connections.
+
+        :return: None
+        """
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        url = urlparse(self.base_url)
+        if url.scheme in ("unix", "http+unix"):
+            return await asyncio.open_unix_connection(url.path)
+        if url.scheme in ("tcp", "http"):
+            return await asyncio.open_connection(url.hostname, url.port or 2375)
+        raise ValueError(f"unsupported docker host {self.base_url}, use a unix socket or a plain tcp address")
+
+    async def _send(self, writer: asyncio.StreamWriter, method: str, path: str, params: Optional[dict],
+                    body: Optional[bytes], content_type: str) -> None:
+        target = f"/v{API_VERSION}{path}"
+        if params:
+            target += "?" + urlencode({key: value for key, value in params.items() if value is not None})
+        lines = [f"{method} {target} HTTP/1.1", "Host: docker", "User-Agent: wedpy"]
+        if body is not None or method in ("POST", "PUT"):
+            body = body or b""
+            lines += [f"Content-Type: {content_type}", f"Content-Length: {len(body)}"]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + (body or b""))
+        await writer.drain()
+
+    @staticmethod
+    async def _read_head(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str]]:
+        status_line = await reader.readline()
+        if status_line == b"":
+            raise ConnectionResetError("the docker daemon closed the connection")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                return status, headers
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    @asynccontextmanager
+    async def _call(self, method: str, path: str, params: Optional[dict] = None, body: Optional[bytes] = None,
+                    content_type: str = "application/json", timeout: Optional[float] = None
+                    ) -> AsyncIterator[Response]:
+        """
+        Makes a call, giving the response once its head arrives. When the with block ends the connection goes back
+        to the pool if the body was read to the end and is closed otherwise.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        async with self._slots:
+            reused = len(self._idle) > 0
+            reader, writer = self._idle.pop() if reused else await self._connect()
+            response: Optional[Response] = None
+            try:
+                try:
+                    await self._send(writer, method, path, params, body, content_type)
+                    status, headers = await asyncio.wait_for(self._read_head(reader), timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    if reused is False:
+                        raise
+                    # the daemon closed the idle connection, the call is made again on a new one
+                    writer.close()
+                    reader, writer = await self._connect()
+                    await self._send(writer, method, path, params, body, content_type)
+                    status, headers = await asyncio.wait_for(self._read_head(reader), timeout)
+                response = Response(method=method, status=status, headers=headers, reader=reader)
+                yield response
+            finally:
+                # an error answer read to the end leaves the connection as good as any other
+                if response is not None and response.reusable is True:
+                    self._idle.append((reader, writer))
+                else:
+                    writer.close()
+
+    @staticmethod
+    async def _raise_for_status(response: Response, timeout: Optional[float]) -> None:
+        if response.status < 400:
+            return None
+        body = await response.read(timeout=timeout)
+        try:
+            message = json.loads(body).get("message", "")
+        except ValueError:
+            message = body.decode(errors="replace")
+        if response.status == 404:
+            raise EngineNotFound(response.status, message)
+        raise EngineError(response.status, message)
+
+    async def request(self, method: str, path: str, params: Optional[dict] = None, body=None,
+                      timeout: Optional[float] = None) -> Optional[object]:
+        """
+        Makes a call and reads its whole answer.
+
+        :param method: the HTTP method
+        :param path: the path of the endpoint, without the API version
+        :param params: the query parameters, None values are left out
+        :param body: the JSON body of the call
+        :param timeout: seconds the call may take, defaults to the timeout of the client
+        :return: the decoded JSON answer, the text of a plain text answer or None for an empty one
+        """
+        timeout = self.timeout if timeout is None else timeout
+        data = None if body is None else json.dumps(body).encode()
+
+        async def call():
+            async with self._call(method, path, params=params, body=data) as response:
+                await self._raise_for_status(response, timeout=None)
+                answer = await response.read()
+                content_type = response.headers.get("content-type", "")
+            if len(answer) == 0:
+                return None
+            return json.loads(answer) if content_type.startswith("application/json") else answer.decode()
+
+        return await asyncio.wait_for(call(), timeout)
+
+    async def stream(self, method: str, path: str, params: Optional[dict] = None, body: Optional[bytes] = None,
+                     content_type: str = "application/json", timeout: Optional[float] = REQUEST_TIMEOUT
+                     ) -> AsyncIterator[bytes]:
+        """
+        Makes a call and reads its answer as it arrives.
+
+        :param method: the HTTP method
+        :param path: the path of the endpoint, without the API version
+        :param params: the query parameters, None values are left out
+        :param body: the raw body of the call
+        :param content_type: the content type of the body
+        :param timeout: the most seconds to wait for the answer to start and for each chunk, None to wait for as long
+                        as it takes
+        :return: the chunks of the answer
+        """
+        async with self._call(method, path, params=params, body=body, content_type=content_type,
+                              timeout=timeout) as response:
+            await self._raise_for_status(response, timeout=timeout)
+            async for chunk in response.chunks(timeout=timeout):
+                yield chunk
+
+    # system
+
+    async def ping(self) -> bool:
+        """
+        Checks that the docker daemon answers.
+
+        :return: True if it answered OK
+        """
+        return await self.request("GET", "/_ping") == "OK"
+
+    async def version(self) -> dict:
+        return await self.request("GET", "/version")
+
+    async def events(self, filters: Optional[Dict[str, List[str]]] = None) -> AsyncIterator[dict]:
+        """
+        Follows the events stream of the docker daemon.
+
+        :param filters: the filters of the events, such as {"type": ["container"]}
+        :return: the events as they happen
+        """
+        params = {"filters": json.dumps(filters)} if filters else None
+        async for event in _decode_json(self.stream("GET", "/events", params=params, timeout=None)):
+            yield event
+
+    # images
+
+    async def images(self, filters: Optional[Dict[str, List[str]]] = None) -> List[dict]:
+        """
+        Lists the images on the docker host.
+
+        :param filters: the filters of the list
+        :return: the image list summaries
+        """
+        return await self.request("GET", "/images/json", params={"filters": json.dumps(filters) if filters else None})
+
+    async def inspect_image(self, reference: str) -> dict:
+        return await self.request("GET", f"/images/{quote(reference, safe='/:@')}/json")
+
+    async def image_exists(self, reference: str) -> bool:
+        try:
+            await self.inspect_image(reference)
+        except EngineNotFound:
+            return False
+        return True
+
+    async def pull(self, reference: str, timeout: Optional[float] = None) -> List[dict]:
+        """
+        Pulls an image from its registry.
+
+        :param reference: the image reference
+        :param timeout: the most seconds to wait for each line of progress, defaults to the timeout of the client
+        :return: the progress lines of the pull
+        """
+        repository, tag = split_reference(reference)
+        progress = []
+        chunks = self.stream("POST", "/images/create", params={"fromImage": repository, "tag": tag},
+                             timeout=self.timeout if timeout is None else timeout)
+        async for line in _decode_json(chunks):
+            if "error" in line:
+                raise EngineError(500, line["error"])
+            progress.append(line)
+        return progress
+
+    async def build(self, context: bytes, tag: Optional[str] = None, dockerfile: str = "Dockerfile",
+                    buildargs: Optional[Dict[str, str]] = None, labels: Optional[Dict[str, str]] = None,
+                    timeout: Optional[float] = None) -> AsyncIterator[dict]:
+        """
+        Builds an image, yielding the build output as it arrives. A line with an "error" is the last line of a
+        failed build.
+
+        :param context: the build context as a tar archive
+        :param tag: the tag of the image
+        :param dockerfile: the path of the Dockerfile in the context
+        :param buildargs: the build arguments
+        :param labels: the labels of the image
+        :param timeout: the most seconds to wait for each line of output, defaults to the timeout of the client
+        :return: the decoded build output
+        """
+        params = {"t": tag, "dockerfile": dockerfile, "buildargs": json.dumps(buildargs) if buildargs else None,
+                  "labels": json.dumps(labels) if labels else None}
+        chunks = self.stream("POST", "/build", params=params, body=context, content_type="application/x-tar",
+                             timeout=self.timeout if timeout is None else timeout)
+        async for line in _decode_json(chunks):
+            yield line
+
+    # containers
+
+    async def containers(self, all: bool = False, filters: Optional[Dict[str, List[str]]] = None) -> List[dict]:
+        """
+        Lists the containers on the docker host.
+
+        :param all: whether to list the stopped containers as well
+        :param filters: the filters of the list, such as {"network": ["wedpy"]}
+        :return: the container list summaries
+        """
+        params = {"all": "1" if all is True else "0", "filters": json.dumps(filters) if filters else None}
+        return await self.request("GET", "/containers/json", params=params)
+
+    async def inspect_container(self, name: str) -> dict:
+        return await self.request("GET", f"/containers/{quote(name)}/json")
+
+    async def create_container(self, body: dict, name: Optional[str] = None) -> str:
+        """
+        Creates a container.
+
+        :param body: the configuration of the container in the format of the Engine API
+        :param name: the name of the container
+        :return: the ID of the container
+        """
+        return (await self.request("POST", "/containers/create", params={"name": name}, body=body))["Id"]
+
+    async def start_container(self, name: str) -> None:
+        await self.request("POST", f"/containers/{quote(name)}/start")
+
+    async def stop_container(self, name: str, timeout: int = 10) -> None:
+        """
+        Stops a container, killing it if it has not stopped after the timeout.
+
+        :param name: the name or ID of the container
+        :param timeout: seconds to wait for the container to stop
+        :return: None
+        """
+        await self.request("POST", f"/containers/{quote(name)}/stop", params={"t": timeout},
+                           timeout=self.timeout + timeout)
+
+    async def remove_container(self, name: str, force: bool = False) -> None:
+        await self.request("DELETE", f"/containers/{quote(name)}", params={"force": "1" if force is True else "0"})
+
+    async def wait_container(self, name: str, timeout: Optional[float] = None) -> dict:
+        """
+        Waits for a container to exit.
+
+        :param name: the name or ID of the container
+        :param timeout: seconds to wait, defaults to the timeout of the client
+        :return: the answer of the wait endpoint, with the StatusCode of the container
+        """
+        return await self.request("POST", f"/containers/{quote(name)}/wait", timeout=timeout)
+
+    async def logs(self, name: str, follow: bool = False, since: Optional[int] = None,
+                   tail: Optional[int] = None) -> AsyncIterator[Tuple[str, bytes]]:
+        """
+        Reads the logs of a container.
+
+        :param name: the name or ID of the container
+        :param follow: whether to keep reading as the container writes more
+        :param since: the unix timestamp to read from, None to read all the logs
+        :param tail: the number of lines to read from the end, None to read all the logs
+        :return: the name of the stream and the data of every write to it
+        """
+        tty = ((await self.inspect_container(name)).get("Config") or {}).get("Tty", False)
+        params = {"stdout": "1", "stderr": "1", "follow": "1" if follow is True else "0", "since": since,
+                  "tail": tail}
+        chunks = self.stream("GET", f"/containers/{quote(name)}/logs", params=params,
+                             timeout=None if follow is True else self.timeout)
+        if tty is True:
+            async for chunk in chunks:
+                yield "stdout", chunk
+            return
+        async for frame in _demux(chunks):
+            yield frame
+
+    # networks and volumes
+
+    async def inspect_network(self, name: str) -> dict:
+        return await self.request("GET", f"/networks/{quote(name)}")
+
+    async def create_volume(self, name: str, labels: Optional[Dict[str, str]] = None) -> dict:
+        """
+        Creates a named volume, returning the existing one if the name is taken.
+
+        :param name: the name of the volume
+        :param labels: the labels of the volume
+        :return: the volume
+        """
+        return await self.request("POST", "/volumes/create", body={"Name": name, "Labels": labels or {}})
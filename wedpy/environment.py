@@ -0,0 +1,319 @@
+"""
+This file defines the Environment class, the Python API for bringing the seating plan and the local wedding invite of
+a repository up and down from code such as a test suite, instead of running the wedpy entry points.
+
+Example:
+    environment = Environment(root=".", instance="tests")
+    environment.up()
+    environment.wait_ready()
+    host, port = environment.endpoint("cerberus_api")
+    ...
+    environment.down()
+"""
+import copy
+import os
+import socket
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from wedpy.instance import Instance
+from wedpy.seating_plan.seating_plan import SeatingPlan
+from wedpy.selection import Selection
+from wedpy.snapshot import VolumeSnapshots
+from wedpy.status import ServiceStatus, StatusReport
+from wedpy.wedding_invite.build import DEFAULT_PROFILE, Build
+from wedpy.wedding_invite.local_wedding_invite import LocalWeddingInvite
+from wedpy.wedding_invite.wedding_invite import WeddingInvite
+
+# where the id of the last run that prepared the environment is recorded, relative to the root of the repository
+PREPARED_PATH = os.path.join(".wedpy", "prepared")
+
+
+class Environment:
+    """
+    The Environment class runs the seating plan and the local wedding invite of a repository, optionally as an
+    instance so several environments can share a docker host. The paths in the seating plan are relative to the root
+    of the repository, so every method works from the root and changes the working directory of the process while
+    it runs.
+
+    Attributes:
+        root (str): the root of the repository holding seating_plan.yml and wedding_invite.yml
+        instance (Optional[Instance]): the instance the environment is namespaced to, None to use the names in the
+                                       seating plan and wedding invites
+        remote (bool): whether the attendees are run from the registry images instead of being built locally
+        dev (bool): whether the main builds are skipped or run with their live source mounted
+        profile (str): the storage profile the containers are run with
+        snapshots (Optional[VolumeSnapshots]): the snapshots the data volumes are restored from and reset to, None
+                                               to always run the init containers
+        seating_plan (SeatingPlan): the seating plan of the repository
+        local_wedding_invite (Optional[LocalWeddingInvite]): the wedding invite of the repository, None if it has none
+    """
+    def __init__(self, root: str = ".", instance: Optional[str] = None, remote: bool = False, dev: bool = False,
+                 profile: str = DEFAULT_PROFILE, snapshots: bool = False) -> None:
+        """
+        The constructor for the Environment class.
+
+        :param root: the root of the repository holding seating_plan.yml and wedding_invite.yml
+        :param instance: the id of the instance to namespace the environment to, None to use the names as they are
+        :param remote: whether the attendees are run from the registry images instead of being built locally
+        :param dev: whether the main builds are skipped or run with their live source mounted
+        :param profile: the storage profile the containers are run with
+        :param snapshots: whether the data volumes are restored from a snapshot instead of running the init
+                          containers, which also lets reset roll them back
+        """
+        self.root: str = os.path.abspath(root)
+        self.remote: bool = remote
+        self.dev: bool = dev
+        self.profile: str = profile
+        with self._in_root():
+            self.instance: Optional[Instance] = None if instance is None else Instance(instance_id=instance)
+            self.snapshots: Optional[VolumeSnapshots] = VolumeSnapshots.in_cwd() if snapshots is True else None
+            self.seating_plan: SeatingPlan = SeatingPlan(
+                seating_plan_path=os.path.join(self.root, 'seating_plan.yml'), instance=self.instance
+            )
+            if remote is True:
+                self.seating_plan.venue = self.seating_plan.post_office_path
+                self.seating_plan.full_venue_path = self.seating_plan.full_post_office_path
+            local_wedding_invite_path = os.path.join(self.root, 'wedding_invite.yml')
+            self.local_wedding_invite: Optional[LocalWeddingInvite] = None
+            if os.path.exists(local_wedding_invite_path):
+                self.local_wedding_invite = LocalWeddingInvite(local_wedding_invite_path=local_wedding_invite_path,
+                                                               instance=self.instance)
+
+    @contextmanager
+    def _in_root(self) -> Iterator[None]:
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        try:
+            yield
+        finally:
+            os.chdir(cwd)
+
+    @property
+    def invites(self) -> List[WeddingInvite]:
+        """
+        The wedding invites of the environment, the local one first.
+        """
+        with self._in_root():
+            invites = self.seating_plan.invites
+        if self.local_wedding_invite is not None:
+            invites = [self.local_wedding_invite.local_wedding_invite] + invites
+        return invites
+
+    def statuses(self) -> List[ServiceStatus]:
+        """
+        Gets the status of every build of the environment.
+
+        :return: the status of every build
+        """
+        local_invite = None
+        if self.local_wedding_invite is not None:
+            local_invite = self.local_wedding_invite.local_wedding_invite
+            # main builds are run by hand in dev mode
+            if self.dev is True:
+                local_invite = copy.copy(local_invite)
+                local_invite.builds = [build for build in local_invite.builds if build.skipped_in_dev is False]
+        with self._in_root():
+            report = StatusReport(invites=self.seating_plan.invites, remote=self.remote, local_invite=local_invite)
+            return report.collect(docker_client=self.seating_plan.client)
+
+    def is_running(self) -> bool:
+        """
+        Checks whether the environment is already up: every container is running the image currently tagged and
+        every init container succeeded.
+
+        :return: True if the environment can be used as it is
+        """
+        statuses = self.statuses()
+        return len(statuses) > 0 and all(status.healthy for status in statuses)
+
+    def prepare(self, run_id: Optional[str] = None) -> bool:
+        """
+        Clones the attendees, posts their invites and builds the images, or pulls them when remote. The images and
+        the venue are shared by every instance, so processes bringing up their own instances at the same time, such
+        as the xdist workers of a test run, pass the id of their run and only the first of them prepares while the
+        others wait for it.
+
+        :param run_id: the id shared by the processes preparing the environment at the same time, None to prepare
+        :return: True if the environment was prepared, False if another process of the run already prepared it
+        """
+        if run_id is None:
+            with self._in_root():
+                self._prepare()
+            return True
+
+        import fcntl
+
+        prepared_path = os.path.join(self.root, PREPARED_PATH)
+        os.makedirs(os.path.dirname(prepared_path), exist_ok=True)
+        with open(f"{prepared_path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if os.path.exists(prepared_path):
+                with open(prepared_path) as f:
+                    if f.read() == run_id:
+                        return False
+            with self._in_root():
+                self._prepare()
+            # only recorded once everything is built, so the next process tries again if this one failed
+            with open(prepared_path, "w") as f:
+                f.write(run_id)
+        return True
+
+    def _prepare(self) -> None:
+        if self.remote is False:
+            self.seating_plan.install()
+            self.seating_plan.post_invites()
+            if self.local_wedding_invite is not None:
+                self.local_wedding_invite.build_images(dev=self.dev)
+        self.seating_plan.build(remote=self.remote)
+
+    def up(self, build: bool = True, reuse: bool = True, run_id: Optional[str] = None) -> bool:
+        """
+        Brings the environment up, unless it is already running and may be reused. The containers left over from an
+        environment that is not running as expected, such as a stopped container, a failed init container or one
+        running an image that was rebuilt since, are destroyed first so they are run again.
+
+        :param build: whether to clone, post and build (or pull when remote) the images first
+        :param reuse: whether an environment that is already running is kept as it is
+        :param run_id: the id shared by the processes bringing up their own instances at the same time, so only the
+                       first of them clones, posts and builds, see prepare
+        :return: True if the environment was brought up, False if the running one was reused
+        """
+        statuses = self.statuses()
+        if reuse is True and len(statuses) > 0 and all(status.healthy for status in statuses):
+            return False
+        if build is True:
+            self.prepare(run_id=run_id)
+        if any(status.state != "missing" for status in statuses):
+            self._destroy_leftovers(statuses)
+        with self._in_root():
+            self.seating_plan.run_containers(remote=self.remote, dev=self.dev, snapshots=self.snapshots,
+                                             profile=self.profile)
+            if self.local_wedding_invite is not None and self.local_wedding_invite.has_builds is True:
+                self.local_wedding_invite.run_containers(
+                    runner=self.seating_plan.client.containers, network_name=self.seating_plan.network_name,
+                    dev=self.dev, snapshots=self.snapshots, profile=self.profile
+                )
+        return True
+
+    def _destroy_leftovers(self, statuses: List[ServiceStatus]) -> None:
+        from docker.errors import NotFound
+
+        self.down()
+        # stopped containers are no longer attached to the network, so they are not found by down
+        client = self.seating_plan.client
+        for status in statuses:
+            if status.state in ("missing", "running"):
+                continue
+            try:
+                client.containers.get(status.container).remove(force=True)
+            except NotFound:
+                continue
+            print(f"{status.container} destroyed successfully.")
+
+    def down(self) -> None:
+        """
+        Destroys the containers and the network of the environment, freeing the ports of its instance.
+
+        :return: None
+        """
+        with self._in_root():
+            self.seating_plan.destroy_containers()
+            self.seating_plan.destroy_network()
+            # the init containers of an instance carry its label so destroy_containers has already removed them
+            if self.instance is None and self.local_wedding_invite is not None:
+                self.local_wedding_invite.destroy_init_containers()
+
+    def reset(self) -> None:
+        """
+        Rolls the data volumes of the running containers back to their snapshot, taken the first time the
+        environment was brought up with snapshots.
+
+        :return: None
+        """
+        if self.snapshots is None:
+            raise RuntimeError("the environment was created without snapshots, there is nothing to reset to")
+        local_invite = None if self.local_wedding_invite is None else self.local_wedding_invite.local_wedding_invite
+        missing = []
+        with self._in_root():
+            for invite in self.invites:
+                if len(self.snapshots.stateful_builds(invite)) == 0:
+                    continue
+                if self.snapshots.reset(invite, runner=self.seating_plan.client.containers,
+                                        network_name=self.seating_plan.network_name,
+                                        remote=self.remote and invite is not local_invite) is False:
+                    missing.append(invite.package_name)
+        if len(missing) > 0:
+            raise RuntimeError(f"no snapshot of {', '.join(missing)} for the current images")
+
+    def build(self, name: str) -> Build:
+        """
+        Finds a build of the environment.
+
+        :param name: the name of the container of the build in the wedding invite
+        :return: the build
+        """
+        for invite in self.invites:
+            for build in invite.builds:
+                if Selection.key(build) == name:
+                    return build
+        raise KeyError(f"no build named {name}")
+
+    def endpoint(self, name: str) -> Tuple[str, int]:
+        """
+        Gets the address a service is reached at from the host, using the port allocated to the instance.
+
+        :param name: the name of the container of the build in the wedding invite
+        :return: the host and port
+        """
+        outside_port = self.build(name).core_unit.outside_port
+        if outside_port is None:
+            raise KeyError(f"{name} has no outside_port")
+        return "localhost", outside_port
+
+    def endpoints(self) -> Dict[str, Tuple[str, int]]:
+        """
+        Gets the address of every service of the environment with an outside port.
+
+        :return: the host and port of every service keyed by the name of its container in the wedding invite
+        """
+        return {
+            Selection.key(build): ("localhost", build.core_unit.outside_port)
+            for invite in self.invites for build in invite.builds if build.core_unit.outside_port is not None
+        }
+
+    def url(self, name: str, scheme: str = "http") -> str:
+        """
+        Gets the URL a service is reached at from the host.
+
+        :param name: the name of the container of the build in the wedding invite
+        :param scheme: the scheme of the URL
+        :return: the URL
+        """
+        host, port = self.endpoint(name)
+        return f"{scheme}://{host}:{port}"
+
+    def wait_ready(self, names: Optional[List[str]] = None, timeout: float = 60, interval: float = 0.2) -> None:
+        """
+        Waits until services accept connections on their outside ports.
+
+        :param names: the names of the containers of the services to wait for, None for every service with an
+                      outside port
+        :param timeout: seconds to wait for every service before giving up
+        :param interval: seconds between attempts to connect
+        :return: None
+        """
+        endpoints = self.endpoints()
+        if names is not None:
+            endpoints = {name: self.endpoint(name) for name in names}
+        deadline = time.monotonic() + timeout
+        for name, (host, port) in endpoints.items():
+            while True:
+                try:
+                    with socket.create_connection((host, port), timeout=interval):
+                        break
+                except OSError:
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"{name} did not accept connections on {host}:{port} in {timeout}s")
+                    time.sleep(interval)
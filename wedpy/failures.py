@@ -0,0 +1,197 @@
+"""
+This file defines the failure policies and the retries shared by the build, pull and clone paths.
+
+A failure policy decides what happens to the rest of the work once one build fails: fail-fast cancels the queued
+and running builds straight away, keep-going finishes every build that does not depend on the failed one and reports
+every failure together. The build pools fail fast unless told otherwise, while the pipeline of wedpy-up keeps going.
+Transient errors, such as a daemon or registry that is briefly unavailable or a network that drops a git clone, are
+retried with exponential backoff before they count as failures.
+
+The policy and the number of retries can be set with the WEDPY_FAILURE_POLICY and WEDPY_RETRIES environment
+variables, so the build pool workers pick them up.
+"""
+import asyncio
+import os
+import random
+import time
+from typing import Awaitable, Callable, List, Optional
+
+FAILURE_POLICY_ENV = "WEDPY_FAILURE_POLICY"
+RETRIES_ENV = "WEDPY_RETRIES"
+
+FAIL_FAST = "fail-fast"
+KEEP_GOING = "keep-going"
+POLICIES = (FAIL_FAST, KEEP_GOING)
+
+DEFAULT_RETRIES = 2
+BASE_DELAY = 1.0
+MAX_DELAY = 30.0
+
+# the statuses a daemon or registry answers with when it is overloaded or briefly unavailable
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+# what docker, registries and git print when the network or the other end failed rather than the build itself
+TRANSIENT_MESSAGES = (
+    "timeout", "timed out", "connection reset", "connection refused", "connection aborted", "broken pipe",
+    "temporary failure", "tls handshake", "too many requests", "service unavailable", "bad gateway",
+    "unexpected eof", "early eof", "could not resolve host", "the remote end hung up", "rpc failed",
+)
+
+
+def failure_policy(default: str = FAIL_FAST) -> str:
+    """
+    Gets the failure policy set in the environment.
+
+    :param default: the policy used when none is set
+    :return: the failure policy
+    """
+    policy = os.environ.get(FAILURE_POLICY_ENV) or default
+    if policy not in POLICIES:
+        raise ValueError(f"{FAILURE_POLICY_ENV} must be one of {', '.join(POLICIES)}, got '{policy}'")
+    return policy
+
+
+def is_transient_message(message: str) -> bool:
+    """
+    Checks whether an error message describes a failure worth retrying.
+
+    :param message: the error message
+    :return: True if the message describes a transient failure
+    """
+    message = message.lower()
+    return any(pattern in message for pattern in TRANSIENT_MESSAGES)
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Checks whether an error is worth retrying: a dropped or refused connection, a timeout, an overloaded daemon or
+    registry, or a build that failed because its network did.
+
+    :param error: the error
+    :return: True if the error is transient
+    """
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(error, "status", None)
+    if isinstance(status, int):
+        return status in TRANSIENT_STATUSES
+    return is_transient_message(str(error))
+
+
+class RetryPolicy:
+    """
+    The RetryPolicy class retries calls that fail with a transient error, waiting exponentially longer between the
+    attempts.
+
+    Attributes:
+        retries (int): the most times a call is retried
+        base_delay (float): the seconds waited before the first retry, doubled for every retry after it
+        max_delay (float): the most seconds waited before a retry
+    """
+    def __init__(self, retries: int = DEFAULT_RETRIES, base_delay: float = BASE_DELAY,
+                 max_delay: float = MAX_DELAY) -> None:
+        """
+        The constructor for the RetryPolicy class.
+
+        :param retries: the most times a call is retried
+        :param base_delay: the seconds waited before the first retry
+        :param max_delay: the most seconds waited before a retry
+        """
+        self.retries: int = retries
+        self.base_delay: float = base_delay
+        self.max_delay: float = max_delay
+
+    @staticmethod
+    def from_env() -> "RetryPolicy":
+        """
+        Gets the retry policy with the number of retries set in the environment.
+
+        :return: the retry policy
+        """
+        value = os.environ.get(RETRIES_ENV)
+        if value is None or value == "":
+            return RetryPolicy()
+        if not value.isdigit():
+            raise ValueError(f"{RETRIES_ENV} must be a number of retries, got '{value}'")
+        return RetryPolicy(retries=int(value))
+
+    def delay(self, attempt: int) -> float:
+        """
+        Gets the seconds to wait before a retry, with some jitter so builds that failed together do not all retry
+        at the same moment.
+
+        :param attempt: the number of the retry, starting at 1
+        :return: the seconds to wait
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def call(self, description: str, function: Callable, *args, **kwargs):
+        """
+        Calls a function, retrying it while it fails with a transient error and retries are left.
+
+        :param description: what the call does, printed when it is retried
+        :param function: the function to call
+        :param args: the arguments of the function
+        :param kwargs: the keyword arguments of the function
+        :return: what the function returns
+        """
+        attempt = 0
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.retries or is_transient(e) is False:
+                    raise
+                delay = self.delay(attempt)
+                print(f"{description} failed with a transient error, retrying in {delay:.1f}s "
+                      f"({attempt}/{self.retries}): {e}")
+                time.sleep(delay)
+
+    async def call_async(self, description: str, function: Callable[..., Awaitable], *args, **kwargs):
+        """
+        Awaits a coroutine function, retrying it while it fails with a transient error and retries are left.
+
+        :param description: what the call does, printed when it is retried
+        :param function: the coroutine function to await
+        :param args: the arguments of the function
+        :param kwargs: the keyword arguments of the function
+        :return: what the function returns
+        """
+        attempt = 0
+        while True:
+            try:
+                return await function(*args, **kwargs)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.retries or is_transient(e) is False:
+                    raise
+                delay = self.delay(attempt)
+                print(f"{description} failed with a transient error, retrying in {delay:.1f}s "
+                      f"({attempt}/{self.retries}): {e}")
+                await asyncio.sleep(delay)
+
+
+class BuildFailures(Exception):
+    """
+    The BuildFailures is raised when one or more builds failed.
+
+    Attributes:
+        failures (List[str]): a description of every build that failed
+        cancelled (List[str]): the builds cancelled by the fail-fast policy before they finished
+    """
+    def __init__(self, failures: List[str], cancelled: Optional[List[str]] = None) -> None:
+        """
+        The constructor for the BuildFailures class.
+
+        :param failures: a description of every build that failed
+        :param cancelled: the builds cancelled by the fail-fast policy before they finished
+        """
+        self.failures: List[str] = failures
+        self.cancelled: List[str] = [] if cancelled is None else cancelled
+        message = f"{len(failures)} build(s) failed:\n" + "\n".join(f"  - {f}" for f in failures)
+        if len(self.cancelled) > 0:
+            message += f"\n{len(self.cancelled)} build(s) cancelled: {', '.join(self.cancelled)}"
+        super().__init__(message)
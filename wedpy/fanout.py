@@ -0,0 +1,163 @@
+"""
+This file defines the fan-out helpers the run, teardown, status and pull paths use when WEDPY_ENGINE is set to
+asyncio. Each one makes every Engine API call of its path at once over one asyncio engine client, bounded by the
+connections of the client, instead of one call at a time through docker-py, and waits for all of them before
+reporting every failure together.
+"""
+import asyncio
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from wedpy import tracing
+from wedpy.engine import MAX_CONNECTIONS, AsyncEngineClient, EngineNotFound
+from wedpy.failures import RetryPolicy
+from wedpy.wedding_invite.build import DEFAULT_PROFILE, Build
+
+if TYPE_CHECKING:
+    from wedpy.journal import Journal
+
+
+class FanoutError(Exception):
+    """
+    The FanoutError is raised when one or more of the calls of a fan-out failed.
+
+    Attributes:
+        failures (Dict[str, BaseException]): the error of every call that failed, keyed by what it was called on
+    """
+    def __init__(self, failures: Dict[str, BaseException]) -> None:
+        """
+        The constructor for the FanoutError class.
+
+        :param failures: the error of every call that failed, keyed by what it was called on
+        """
+        self.failures: Dict[str, BaseException] = failures
+        super().__init__(f"{len(failures)} call(s) failed:\n" +
+                         "\n".join(f"  - {name}: {error}" for name, error in failures.items()))
+
+
+def run(function: Callable[..., Awaitable], *args, max_connections: int = MAX_CONNECTIONS, **kwargs):
+    """
+    Runs a fan-out in its own event loop with an engine client for the docker daemon in the environment.
+
+    :param function: the fan-out, taking the engine client as its first argument
+    :param args: the other arguments of the fan-out
+    :param max_connections: the most calls in flight at once
+    :param kwargs: the other keyword arguments of the fan-out
+    :return: what the fan-out returns
+    """
+    async def main():
+        async with AsyncEngineClient.from_env(max_connections=max_connections) as engine:
+            return await function(engine, *args, **kwargs)
+
+    return asyncio.run(main())
+
+
+async def gather(calls: Dict[str, Awaitable], timeout: Optional[float] = None) -> Dict[str, object]:
+    """
+    Waits for every call, cancelling any that takes longer than the timeout.
+
+    :param calls: the calls keyed by what they are called on
+    :param timeout: the most seconds each call may take, None to wait for as long as it takes
+    :return: the result of every call keyed like the calls
+    """
+    names = list(calls)
+    results = await asyncio.gather(*(asyncio.wait_for(calls[name], timeout) for name in names),
+                                   return_exceptions=True)
+    failures = {name: result for name, result in zip(names, results) if isinstance(result, BaseException)}
+    if len(failures) > 0:
+        raise FanoutError(failures=failures)
+    return dict(zip(names, results))
+
+
+async def list_state(engine: AsyncEngineClient) -> Tuple[List[dict], List[dict]]:
+    """
+    Lists the containers and the images of the docker host at the same time.
+
+    :param engine: the asyncio engine client
+    :return: the container list summaries and the image list summaries
+    """
+    containers, images = await asyncio.gather(engine.containers(all=True), engine.images())
+    return containers, images
+
+
+async def pull_images(engine: AsyncEngineClient, references: List[str],
+                      journal: Optional["Journal"] = None) -> List[str]:
+    """
+    Pulls images from their registries at the same time, retrying the pulls that fail with a transient error. Images
+    the journal records as pulled that still exist are skipped.
+
+    :param engine: the asyncio engine client
+    :param references: the references of the images
+    :param journal: the journal of the command, None if it is switched off
+    :return: the references of the images pulled
+    """
+    retry = RetryPolicy.from_env()
+
+    async def pull(reference: str) -> bool:
+        if journal is not None and journal.is_done("pull", reference, "pulled") is True \
+                and await engine.image_exists(reference) is True:
+            return False
+        with tracing.span("pull", image=reference):
+            await retry.call_async(f"{reference} pull", engine.pull, reference)
+        if journal is not None:
+            journal.record("pull", reference, "pulled")
+        return True
+
+    pulled = await gather({reference: pull(reference) for reference in dict.fromkeys(references)})
+    return [reference for reference, done in pulled.items() if done is True]
+
+
+async def stop_containers(engine: AsyncEngineClient, names: List[str]) -> None:
+    """
+    Stops containers at the same time.
+
+    :param engine: the asyncio engine client
+    :param names: the names of the containers
+    :return: None
+    """
+    await gather({name: engine.stop_container(name) for name in names})
+
+
+async def remove_containers(engine: AsyncEngineClient, names: List[str]) -> List[str]:
+    """
+    Stops and removes containers at the same time, skipping those that do not exist.
+
+    :param engine: the asyncio engine client
+    :param names: the names of the containers
+    :return: the names of the containers removed
+    """
+    async def remove(name: str) -> bool:
+        with tracing.span("teardown", container=name):
+            try:
+                await engine.stop_container(name)
+                await engine.remove_container(name, force=True)
+            except EngineNotFound:
+                return False
+        return True
+
+    removed = await gather({name: remove(name) for name in dict.fromkeys(names)})
+    return [name for name, done in removed.items() if done is True]
+
+
+async def run_builds(engine: AsyncEngineClient, builds: List[Build], network_name: str, remote: bool = False,
+                     dev: bool = False, package_root: str = ".", profile: str = DEFAULT_PROFILE,
+                     progress: Optional[Callable[[], None]] = None) -> None:
+    """
+    Runs the containers of builds at the same time.
+
+    :param engine: the asyncio engine client
+    :param builds: the builds, none of them shareable
+    :param network_name: the name of the network to run the containers in
+    :param remote: whether to run the images from the registry instead of the locally built ones
+    :param dev: whether to mount the live source of builds with dev mounts
+    :param package_root: root directory of the package, used to resolve the dev mounts
+    :param profile: the storage profile the containers are run with
+    :param progress: called each time a container has started
+    :return: None
+    """
+    async def run_build(build: Build) -> None:
+        await build.run_container_async(engine, network_name=network_name, remote=remote, dev=dev,
+                                        package_root=package_root, profile=profile)
+        if progress is not None:
+            progress()
+
+    await gather({build.core_unit.default_container_name: run_build(build) for build in builds})
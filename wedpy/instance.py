@@ -0,0 +1,161 @@
+"""
+This file defines the Instance class which namespaces a seating plan so several copies of it can run on one docker
+host at the same time, for example to shard integration tests across parallel environments on a CI box.
+
+Every container and the network are prefixed with the instance id and labelled with it, each container keeps its
+original name as an alias on the instance network so config values referring to sibling containers still resolve,
+and outside ports are allocated from a pool so instances never fight over a host port.
+"""
+import json
+import os
+import re
+import socket
+import threading
+from typing import TYPE_CHECKING, Dict, Tuple
+
+if TYPE_CHECKING:
+    from wedpy.wedding_invite.wedding_invite import WeddingInvite
+
+
+INSTANCE_LABEL = "wedpy.instance"
+
+# where the ports allocated to each instance are recorded, relative to the directory wedpy is run from
+INSTANCES_PATH = os.path.join(".wedpy", "instances")
+
+# the host ports handed out to instances
+DEFAULT_PORT_RANGE: Tuple[int, int] = (20000, 29999)
+
+VALID_ID = re.compile(r"^[a-zA-Z0-9][a-zA-Z0-9_.-]*$")
+
+_allocation_lock = threading.Lock()
+
+
+class Instance:
+    """
+    The Instance class namespaces the containers, network and ports of a seating plan.
+
+    Attributes:
+        instance_id (str): the id of the instance, used as the prefix of every name
+        state_path (str): the directory the allocated ports of every instance are recorded in
+        port_range (Tuple[int, int]): the first and last host port that can be allocated
+    """
+    def __init__(self, instance_id: str, state_path: str = INSTANCES_PATH,
+                 port_range: Tuple[int, int] = DEFAULT_PORT_RANGE) -> None:
+        """
+        The constructor for the Instance class.
+
+        :param instance_id: the id of the instance, used as the prefix of every name
+        :param state_path: the directory the allocated ports of every instance are recorded in
+        :param port_range: the first and last host port that can be allocated
+        """
+        if VALID_ID.match(instance_id) is None:
+            raise ValueError(f"invalid instance id '{instance_id}', use letters, digits, '_', '.' and '-'")
+        self.instance_id: str = instance_id
+        self.state_path: str = state_path
+        self.port_range: Tuple[int, int] = port_range
+
+    @property
+    def labels(self) -> Dict[str, str]:
+        return {INSTANCE_LABEL: self.instance_id}
+
+    @property
+    def label_filter(self) -> Dict[str, str]:
+        return {"label": f"{INSTANCE_LABEL}={self.instance_id}"}
+
+    @property
+    def ports_path(self) -> str:
+        return os.path.join(self.state_path, f"{self.instance_id}.json")
+
+    def prefix(self, name: str) -> str:
+        """
+        Prefixes a container or network name with the instance id.
+
+        :param name: the name used outside of an instance
+        :return: the name used by the instance
+        """
+        return f"{self.instance_id}_{name}"
+
+    def namespace(self, invite: "WeddingInvite") -> "WeddingInvite":
+        """
+        Renames, labels and reallocates the outside ports of every build in a wedding invite. The builds keep their
+        original container name as their alias on the instance network.
+
+        :param invite: the wedding invite to namespace, changed in place
+        :return: the wedding invite
+        """
+        for build in invite.builds + invite.init_builds:
+            core_unit = build.core_unit
+            if core_unit.network_alias is not None:
+                continue
+            core_unit.network_alias = core_unit.default_container_name
+            core_unit.default_container_name = self.prefix(core_unit.default_container_name)
+            core_unit.labels = dict(core_unit.labels, **self.labels)
+            # a shared container is reached on the port it was started with whichever instance started it
+            if core_unit.outside_port is not None and core_unit.shareable is False:
+                core_unit.outside_port = self.port_for(core_unit.network_alias, core_unit.outside_port)
+        return invite
+
+    def port_for(self, container_name: str, outside_port: int) -> int:
+        """
+        Gets the host port allocated to an outside port of a container, allocating one the first time. The
+        allocation is recorded so running, stopping and restarting the instance keep using the same port.
+
+        :param container_name: the original name of the container
+        :param outside_port: the outside port in the wedding invite
+        :return: the host port allocated to the instance
+        """
+        import fcntl
+
+        key = f"{container_name}:{outside_port}"
+        os.makedirs(self.state_path, exist_ok=True)
+        # the thread lock covers the pipeline and the file lock covers other wedpy processes on the same host
+        with _allocation_lock, open(os.path.join(self.state_path, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            allocations = self._load_allocations()
+            own = allocations.setdefault(self.instance_id, {})
+            if key in own:
+                return own[key]
+            taken = {port for ports in allocations.values() for port in ports.values()}
+            for port in range(self.port_range[0], self.port_range[1] + 1):
+                if port not in taken and self._is_free(port):
+                    own[key] = port
+                    with open(self.ports_path, "w") as f:
+                        json.dump(own, f, indent=2)
+                    return port
+        raise RuntimeError(f"no free host port left in {self.port_range[0]}-{self.port_range[1]} for {key}")
+
+    def ports(self) -> Dict[str, int]:
+        """
+        Gets the host ports allocated to the instance.
+
+        :return: a map of "container:outside_port" to the allocated host port
+        """
+        return self._load_allocations().get(self.instance_id, {})
+
+    def release(self) -> None:
+        """
+        Releases the host ports allocated to the instance so other instances can use them.
+
+        :return: None
+        """
+        if os.path.exists(self.ports_path):
+            os.remove(self.ports_path)
+
+    def _load_allocations(self) -> Dict[str, Dict[str, int]]:
+        allocations = {}
+        if not os.path.isdir(self.state_path):
+            return allocations
+        for name in os.listdir(self.state_path):
+            if name.endswith(".json"):
+                with open(os.path.join(self.state_path, name)) as f:
+                    allocations[name[:-len(".json")]] = json.load(f)
+        return allocations
+
+    @staticmethod
+    def _is_free(port: int) -> bool:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+            try:
+                probe.bind(("0.0.0.0", port))
+            except OSError:
+                return False
+        return True
@@ -0,0 +1,118 @@
+"""
+This file defines the Journal class which records the units of work a command has finished, so running the command
+again after it was interrupted or failed skips what is already done and retries only the rest.
+
+The journal is switched on by setting the WEDPY_JOURNAL environment variable to the path of the journal file, which
+the entry points do so the build pool workers pick it up. Each entry holds what the unit was finished with (the SHA a
+repo was cloned at, the fingerprint an image was built from, the image a container was started from), so a unit whose
+inputs changed since is done again.
+"""
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+
+JOURNAL_ENV = "WEDPY_JOURNAL"
+
+# where the journal of each command is kept, relative to the directory wedpy is run from
+JOURNALS_PATH = os.path.join(".wedpy", "journal")
+
+_journal_lock = threading.Lock()
+
+
+class Journal:
+    """
+    The Journal class is a JSON file of finished units of work keyed by stage and name, such as "clone:cerberus".
+    It is written by several build processes at once, so every write takes a file lock and merges with what is on
+    disk before replacing the file.
+
+    Attributes:
+        path (str): the path of the journal file
+    """
+    def __init__(self, path: str) -> None:
+        """
+        The constructor for the Journal class.
+
+        :param path: the path of the journal file
+        """
+        self.path: str = path
+
+    @classmethod
+    def from_env(cls) -> Optional["Journal"]:
+        """
+        Creates the Journal configured by the environment.
+
+        :return: the journal or None if the journal is switched off
+        """
+        path = os.environ.get(JOURNAL_ENV)
+        if path is None or path == "":
+            return None
+        return cls(path=path)
+
+    @classmethod
+    def for_command(cls, command: str) -> "Journal":
+        """
+        Gets the journal of an entry point in the directory wedpy is run from.
+
+        :param command: the name of the entry point, such as wedpy-build
+        :return: the journal
+        """
+        return cls(path=os.path.join(os.getcwd(), JOURNALS_PATH, f"{command}.json"))
+
+    def entries(self) -> Dict[str, str]:
+        """
+        Reads the finished units.
+
+        :return: what each unit was finished with, keyed by stage and name
+        """
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def is_done(self, stage: str, name: str, value: str) -> bool:
+        """
+        Checks whether a unit was finished with the same inputs.
+
+        :param stage: the stage of the unit, such as clone, image, pull or container
+        :param name: the name of the unit
+        :param value: what the unit is being done with now
+        :return: True if the journal records the unit as finished with the same value
+        """
+        return self.entries().get(f"{stage}:{name}") == value
+
+    def record(self, stage: str, name: str, value: str) -> None:
+        """
+        Records a unit as finished.
+
+        :param stage: the stage of the unit
+        :param name: the name of the unit
+        :param value: what the unit was finished with
+        :return: None
+        """
+        import fcntl
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # the thread lock covers the pipeline and the file lock covers the build pool processes
+        with _journal_lock, open(f"{self.path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            entries = self.entries()
+            entries[f"{stage}:{name}"] = value
+            descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(descriptor, "w") as f:
+                json.dump(entries, f, indent=2, sort_keys=True)
+            os.replace(temporary_path, self.path)
+
+    def clear(self) -> None:
+        """
+        Forgets every finished unit, done when a command finishes everything or is asked to restart.
+
+        :return: None
+        """
+        for path in (self.path, f"{self.path}.lock"):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,179 @@
+"""
+This file defines the LogFollower class which streams the logs of several containers at once and interleaves them
+into one output, each line prefixed with the package and container it came from.
+
+Every container is read by its own thread into a bounded buffer. The buffers are drained in turn, a batch at a time,
+so a noisy container cannot starve the others, and once a buffer is full its oldest lines are dropped, and counted,
+instead of growing without limit.
+"""
+import datetime
+import re
+import sys
+import threading
+import time
+from collections import deque
+from typing import IO, TYPE_CHECKING, Deque, Iterable, List, Optional, Pattern, Union
+
+if TYPE_CHECKING:
+    from docker.models.containers import Container
+
+
+# the most lines kept waiting for each container before its oldest lines are dropped
+DEFAULT_BUFFER_LINES = 10000
+
+# the most lines printed from one container before moving on to the next
+BATCH_LINES = 100
+
+DURATION_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_since(value: Optional[str]) -> Optional[Union[int, datetime.datetime]]:
+    """
+    Parses the --since option, either a duration such as 30s, 10m or 2h before now, a unix timestamp or an ISO 8601
+    timestamp.
+
+    :param value: the value of the option
+    :return: the unix timestamp or datetime to pass to docker, None to show all the logs
+    """
+    if value is None:
+        return None
+    match = DURATION_PATTERN.match(value)
+    if match is not None:
+        return int(time.time() - float(match.group(1)) * DURATION_UNITS[match.group(2)])
+    if value.isdigit():
+        return int(value)
+    try:
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"invalid --since '{value}', use a duration such as 10m or a timestamp")
+
+
+class LogStream:
+    """
+    The LogStream class is the buffered log output of one container.
+
+    Attributes:
+        prefix (str): the text put in front of every line, the package and container name
+        container (Container): the container whose logs are read
+        lines (Deque[str]): the lines read and not yet printed
+        dropped (int): the number of lines dropped because the buffer was full, since the last lines were printed
+        done (bool): whether the log stream has ended
+    """
+    def __init__(self, prefix: str, container: "Container", buffer_lines: int = DEFAULT_BUFFER_LINES) -> None:
+        """
+        The constructor for the LogStream class.
+
+        :param prefix: the text put in front of every line
+        :param container: the container whose logs are read
+        :param buffer_lines: the most lines kept waiting before the oldest are dropped
+        """
+        self.prefix: str = prefix
+        self.container: "Container" = container
+        self.lines: Deque[str] = deque(maxlen=buffer_lines)
+        self.dropped: int = 0
+        self.done: bool = False
+
+
+class LogFollower:
+    """
+    The LogFollower class reads the logs of several containers concurrently and writes them to one output.
+
+    Attributes:
+        streams (List[LogStream]): the containers being read
+        since (Optional[Union[int, datetime.datetime]]): only show lines logged after this time
+        grep (Optional[Pattern]): only show lines matching this pattern
+        follow (bool): whether to keep waiting for new lines once the existing logs have been read
+        output (IO[str]): where the lines are written
+    """
+    def __init__(self, streams: List[LogStream], since: Optional[Union[int, datetime.datetime]] = None,
+                 grep: Optional[str] = None, follow: bool = False, output: Optional[IO[str]] = None) -> None:
+        """
+        The constructor for the LogFollower class.
+
+        :param streams: the containers to read
+        :param since: only show lines logged after this time
+        :param grep: a regular expression that lines must match to be shown
+        :param follow: whether to keep waiting for new lines
+        :param output: where the lines are written, defaults to stdout
+        """
+        self.streams: List[LogStream] = streams
+        self.since: Optional[Union[int, datetime.datetime]] = since
+        self.grep: Optional[Pattern] = None if grep is None else re.compile(grep)
+        self.follow: bool = follow
+        self.output: IO[str] = sys.stdout if output is None else output
+        self._condition = threading.Condition()
+
+    def run(self) -> None:
+        """
+        Reads every stream until they all end, or until interrupted when following.
+
+        :return: None
+        """
+        threads = [
+            threading.Thread(target=self._read, args=(stream,), name=f"wedpy-logs-{stream.prefix}", daemon=True)
+            for stream in self.streams
+        ]
+        for thread in threads:
+            thread.start()
+        width = max((len(stream.prefix) for stream in self.streams), default=0)
+        while True:
+            with self._condition:
+                while not any(stream.lines or stream.dropped for stream in self.streams) \
+                        and not all(stream.done for stream in self.streams):
+                    self._condition.wait()
+                if all(stream.done and not stream.lines and not stream.dropped for stream in self.streams):
+                    break
+                batch = []
+                for stream in self.streams:
+                    prefix = stream.prefix.ljust(width)
+                    if stream.dropped > 0:
+                        batch.append(f"{prefix} | ... {stream.dropped} lines dropped, output was too slow")
+                        stream.dropped = 0
+                    for _ in range(min(BATCH_LINES, len(stream.lines))):
+                        batch.append(f"{prefix} | {stream.lines.popleft()}")
+            # written outside the lock so a slow terminal does not hold up the readers
+            self.output.write("".join(f"{line}\n" for line in batch))
+            self.output.flush()
+
+    def _read(self, stream: LogStream) -> None:
+        """
+        Reads the log of one container into its buffer.
+
+        :param stream: the stream to read
+        :return: None
+        """
+        try:
+            chunks = stream.container.logs(stream=True, follow=self.follow, since=self.since)
+            for line in self._lines(chunks):
+                if self.grep is not None and self.grep.search(line) is None:
+                    continue
+                with self._condition:
+                    if len(stream.lines) == stream.lines.maxlen:
+                        stream.dropped += 1
+                    stream.lines.append(line)
+                    self._condition.notify()
+        except Exception as e:
+            with self._condition:
+                stream.lines.append(f"log stream failed: {e}")
+        finally:
+            with self._condition:
+                stream.done = True
+                self._condition.notify()
+
+    @staticmethod
+    def _lines(chunks: Iterable[bytes]) -> Iterable[str]:
+        """
+        Splits the chunks of a log stream into lines, which docker does not align the chunks to.
+
+        :param chunks: the chunks of the log stream
+        :return: the lines
+        """
+        partial = b""
+        for chunk in chunks:
+            partial += chunk
+            *lines, partial = partial.split(b"\n")
+            for line in lines:
+                yield line.decode("utf-8", errors="replace").rstrip("\r")
+        if partial:
+            yield partial.decode("utf-8", errors="replace").rstrip("\r")
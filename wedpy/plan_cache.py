@@ -0,0 +1,36 @@
+"""
+This file defines the load_yaml function which parses the seating plan and the wedding invites. The parsed data of
+each file is kept until the file changes, so the agent, which answers many commands from one process, only parses a
+file again once it has been edited. A command run on its own parses each file once as before.
+"""
+import copy
+import os
+import threading
+from typing import Any, Dict, Tuple
+
+
+_parsed: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+_parsed_lock = threading.Lock()
+
+
+def load_yaml(path: str) -> Any:
+    """
+    Loads a yaml file, reusing the data parsed the last time if the file has not changed since.
+
+    :param path: the path to the yaml file
+    :return: a copy of the parsed data, which the caller may change
+    """
+    import yaml
+
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _parsed_lock:
+        cached = _parsed.get(path)
+    if cached is not None and cached[0] == version:
+        return copy.deepcopy(cached[1])
+    with open(path, 'r') as f:
+        data = yaml.safe_load(f)
+    with _parsed_lock:
+        _parsed[path] = (version, data)
+    return copy.deepcopy(data)
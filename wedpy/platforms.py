@@ -0,0 +1,245 @@
+"""
+This file defines the detection of the host architecture, the lookup of the build file for an architecture and the
+platform-matrix build mode, which builds every architecture declared in the build_files of the builds at the same
+time and combines them into one multi-architecture image in a registry.
+
+The keys of build_files are the names teammates gave their machines' architectures, such as x86_64, amd64, arm or
+aarch64, so they are matched by the docker platform they stand for rather than by name. The architecture of the host
+is read once per process, and can be set with the WEDPY_ARCH environment variable when it is detected wrongly, for
+example under emulation.
+"""
+import functools
+import os
+import platform
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from wedpy import tracing
+from wedpy.buildkit import BuildxBuilder
+from wedpy.failures import FAIL_FAST, BuildFailures, RetryPolicy, failure_policy
+
+if TYPE_CHECKING:
+    from docker import DockerClient
+
+    from wedpy.builder_pool import BuildJob
+
+ARCH_ENV = "WEDPY_ARCH"
+
+# the docker platform architecture of every name an architecture goes by
+ARCH_ALIASES = {
+    "x86_64": "amd64", "amd64": "amd64", "x64": "amd64", "i386": "386", "i686": "386", "386": "386",
+    "arm": "arm64", "arm64": "arm64", "aarch64": "arm64", "armv8": "arm64", "armv8l": "arm64",
+    "armv7": "arm/v7", "armv7l": "arm/v7", "armhf": "arm/v7", "arm/v7": "arm/v7",
+    "ppc64le": "ppc64le", "s390x": "s390x", "riscv64": "riscv64",
+}
+
+# the registry the multi-architecture images are pushed to unless another one is given
+DEFAULT_REGISTRY = "localhost:5000"
+REGISTRY_CONTAINER = "wedpy-registry"
+REGISTRY_IMAGE = "registry:2"
+
+# the architecture of every daemon asked, keyed by its base url
+_daemon_arches: Dict[str, str] = {}
+_daemon_arches_lock = threading.Lock()
+
+
+def normalize_arch(arch: str) -> str:
+    """
+    Gets the docker platform architecture an architecture name stands for.
+
+    :param arch: the name of the architecture, such as x86_64, arm or linux/arm64
+    :return: the docker platform architecture, such as amd64 or arm64, or the name itself if it is not known
+    """
+    arch = arch.strip().lower()
+    if arch.startswith("linux/"):
+        arch = arch[len("linux/"):]
+    return ARCH_ALIASES.get(arch, arch)
+
+
+@functools.lru_cache(maxsize=None)
+def host_arch() -> str:
+    """
+    Gets the docker platform architecture of the host. platform.processor() is empty on many Linux distributions,
+    so the machine name uname reports is used, falling back to the processor name.
+
+    :return: the docker platform architecture of the host, such as amd64 or arm64
+    """
+    arch = os.environ.get(ARCH_ENV) or platform.machine() or platform.processor()
+    return normalize_arch(arch)
+
+
+def daemon_arch(docker_client: "DockerClient") -> str:
+    """
+    Gets the docker platform architecture of the daemon of a docker client, which is the architecture the images
+    built on it are built for. It is asked once per daemon.
+
+    :param docker_client: the docker client of the daemon
+    :return: the docker platform architecture of the daemon, such as amd64 or arm64
+    """
+    base_url = docker_client.api.base_url
+    with _daemon_arches_lock:
+        if base_url not in _daemon_arches:
+            _daemon_arches[base_url] = normalize_arch(docker_client.info().get("Architecture") or host_arch())
+        return _daemon_arches[base_url]
+
+
+def docker_platform(arch: str) -> str:
+    """
+    Gets the docker platform an architecture name stands for.
+
+    :param arch: the name of the architecture
+    :return: the docker platform, such as linux/amd64
+    """
+    return f"linux/{normalize_arch(arch)}"
+
+
+def select_build_file(build_files: Dict[str, str], arch: Optional[str] = None) -> Optional[str]:
+    """
+    Gets the build file declared for an architecture, under whichever name the architecture was declared.
+
+    :param build_files: a map of architecture names to build files
+    :param arch: the architecture, defaults to the architecture of the host
+    :return: the build file or None if none is declared for the architecture
+    """
+    if arch is None:
+        arch = host_arch()
+    if arch in build_files:
+        return build_files[arch]
+    wanted = normalize_arch(arch)
+    for name, build_file in build_files.items():
+        if normalize_arch(str(name)) == wanted:
+            return build_file
+    return None
+
+
+def platform_build_files(job: "BuildJob", platforms: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Gets the build file of every platform a build is built for in the platform-matrix mode. A build declaring a
+    build file per architecture is built for every declared architecture, or the requested ones it declares. A
+    locked build has one build file for every architecture and is built for the requested platforms, or the host's.
+
+    :param job: the build
+    :param platforms: the platforms requested, None for every declared one
+    :return: a map of docker platforms to build files
+    """
+    core_unit = job.build.core_unit
+    if core_unit.build_lock is True or not core_unit.build_files:
+        requested = [host_arch()] if platforms is None else platforms
+        return {docker_platform(arch): "Dockerfile" for arch in requested}
+    declared = {docker_platform(str(arch)): build_file for arch, build_file in core_unit.build_files.items()}
+    if platforms is None:
+        return declared
+    requested = {docker_platform(arch) for arch in platforms}
+    return {name: build_file for name, build_file in declared.items() if name in requested}
+
+
+def platform_tag(reference: str, docker_platform_name: str) -> str:
+    """
+    Gets the tag the image of one platform is pushed under before it is combined into the multi-architecture image.
+
+    :param reference: the reference of the multi-architecture image
+    :param docker_platform_name: the docker platform, such as linux/arm64
+    :return: the reference of the image of the platform, such as localhost:5000/api:latest-arm64
+    """
+    from wedpy.engine import split_reference
+
+    repository, tag = split_reference(reference)
+    return f"{repository}:{tag}-{docker_platform_name.split('/', 1)[1].replace('/', '')}"
+
+
+def ensure_local_registry(registry: str, docker_client: Optional["DockerClient"] = None) -> None:
+    """
+    Starts a registry container standing in for the team registry when the registry is on this machine and nothing
+    is serving it yet.
+
+    :param registry: the registry, such as localhost:5000
+    :param docker_client: the docker client, defaults to the docker client from the environment
+    :return: None
+    """
+    from docker.errors import NotFound
+
+    from wedpy.docker_client import get_client
+
+    host, _, port = registry.partition(":")
+    if host not in ("localhost", "127.0.0.1"):
+        return None
+    docker_client = get_client() if docker_client is None else docker_client
+    try:
+        container = docker_client.containers.get(REGISTRY_CONTAINER)
+    except NotFound:
+        docker_client.containers.run(REGISTRY_IMAGE, name=REGISTRY_CONTAINER, detach=True,
+                                     ports={"5000/tcp": int(port or 5000)}, restart_policy={"Name": "unless-stopped"})
+        return None
+    if container.status != "running":
+        container.start()
+
+
+def build_matrix(jobs: List["BuildJob"], registry: str = DEFAULT_REGISTRY, platforms: Optional[List[str]] = None,
+                 max_workers: int = 4, builder: Optional[BuildxBuilder] = None) -> List[str]:
+    """
+    Builds every platform of every build at the same time with buildx, pushing the image of each platform to the
+    registry, and then combines the platforms of each build into one multi-architecture image. Platforms other than
+    the host's are built by the nodes of the buildx builder for that platform, or emulated with QEMU.
+
+    :param jobs: the builds, images that are pulled rather than built are skipped
+    :param registry: the registry the images are pushed to
+    :param platforms: the platforms to build, None for every platform each build declares
+    :param max_workers: the most platform builds run at the same time
+    :param builder: the buildx builder, defaults to the one set in the environment
+    :return: the references of the multi-architecture images
+    """
+    builder = BuildxBuilder.from_env() if builder is None else builder
+    retry = RetryPolicy.from_env()
+    policy = failure_policy()
+
+    # every (job, platform) pair is a build of its own, combined per job once all of them are pushed
+    builds: List[Tuple["BuildJob", str, str, str]] = []
+    references: Dict[int, str] = {}
+    for job in jobs:
+        if job.is_pull is True:
+            continue
+        reference = f"{registry}/{job.tag}"
+        references[id(job)] = reference
+        for platform_name, build_file in platform_build_files(job, platforms).items():
+            builds.append((job, platform_name, build_file, platform_tag(reference, platform_name)))
+
+    def build_platform(job: "BuildJob", platform_name: str, build_file: str, tag: str) -> None:
+        core_unit = job.build.core_unit
+        with tracing.span("platform build", platform=platform_name, **job.build.trace_tags):
+            retry.call(f"{tag} build", builder.build, os.path.join(job.package_root, core_unit.build_root),
+                       build_file, tag, build_args=core_unit.build_args, secrets=core_unit.build_secrets,
+                       trace_tags=dict(job.build.trace_tags, platform=platform_name), platform=platform_name,
+                       push=True)
+
+    failures: List[str] = []
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(builds))),
+                                  thread_name_prefix="wedpy-platform")
+    with executor:
+        futures = {executor.submit(build_platform, *build): build for build in builds}
+        for future in as_completed(futures):
+            job, platform_name, _, _ = futures[future]
+            if future.cancelled() is True:
+                continue
+            error = future.exception()
+            if error is not None:
+                failures.append(f"{job.tag} ({platform_name}): {error}")
+                if policy == FAIL_FAST:
+                    # the queued builds are cancelled one by one, as_completed never yields futures cancelled by
+                    # shutdown(cancel_futures=True) because no worker picks them up to report it
+                    for pending in futures:
+                        pending.cancel()
+    if len(failures) > 0:
+        raise BuildFailures(failures=failures, cancelled=[f"{job.tag} ({name})" for future, (job, name, _, _)
+                                                          in futures.items() if future.cancelled() is True])
+
+    manifests = []
+    for job in jobs:
+        if id(job) not in references:
+            continue
+        reference = references[id(job)]
+        tags = [tag for built, _, _, tag in builds if built is job]
+        with tracing.span("manifest", image=reference, **job.build.trace_tags):
+            retry.call(f"{reference} manifest", builder.create_manifest, reference, tags)
+        manifests.append(reference)
+    return manifests
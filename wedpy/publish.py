@@ -0,0 +1,288 @@
+"""
+This file defines the publishing of built images for wedpy-publish: every image built from a git_url is tagged with
+the image_url of its build and pushed to its registry, several at a time, and the digest the registry gave it is
+recorded so other projects can pin the exact image they ran against.
+
+The digests are kept in .wedpy/published.json together with the fingerprint of the inputs each image was built from,
+read from the label wedpy-build puts on the image, so images built from the same inputs as when they were last published
+can be skipped. docker asks the registry for every layer before uploading it, so the layers the registry already has are
+not sent again, and the pushes running at the same time report the bytes they upload to one progress bar.
+"""
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from wedpy import tracing
+from wedpy.artifact_cache import FINGERPRINT_LABEL
+from wedpy.failures import FAIL_FAST, RetryPolicy, failure_policy
+
+if TYPE_CHECKING:
+    from docker import DockerClient
+
+    from wedpy.builder_pool import BuildJob
+
+# where the digests of the published images are kept, relative to the directory wedpy is run from
+PUBLISHED_PATH = os.path.join(".wedpy", "published.json")
+
+DEFAULT_MAX_PUSHES = 4
+
+# the status docker reports for a layer the registry already has
+LAYER_EXISTS = "Layer already exists"
+
+_published_lock = threading.Lock()
+
+
+class PushError(Exception):
+    """
+    The PushError is raised when the docker daemon reports that a push failed, such as when the registry refused it.
+    """
+
+
+class PublishError(Exception):
+    """
+    The PublishError is raised when one or more images could not be published.
+
+    Attributes:
+        failures (List[str]): a description of every push that failed
+        cancelled (List[str]): the images cancelled by the fail-fast policy before they were pushed
+    """
+    def __init__(self, failures: List[str], cancelled: Optional[List[str]] = None) -> None:
+        """
+        The constructor for the PublishError class.
+
+        :param failures: a description of every push that failed
+        :param cancelled: the images cancelled by the fail-fast policy before they were pushed
+        """
+        self.failures: List[str] = failures
+        self.cancelled: List[str] = [] if cancelled is None else cancelled
+        message = f"{len(failures)} image(s) could not be published:\n" + "\n".join(f"  - {f}" for f in failures)
+        if len(self.cancelled) > 0:
+            message += f"\n{len(self.cancelled)} push(es) cancelled: {', '.join(self.cancelled)}"
+        super().__init__(message)
+
+
+class PublishedImages:
+    """
+    The PublishedImages class is a JSON file of the images published from this directory, keyed by image url. Each
+    entry holds the fingerprint of the inputs the image was built from, the digest the registry gave it and the
+    reference pinning that digest.
+
+    Attributes:
+        path (str): the path of the file
+    """
+    def __init__(self, path: str) -> None:
+        """
+        The constructor for the PublishedImages class.
+
+        :param path: the path of the file
+        """
+        self.path: str = path
+
+    @classmethod
+    def in_working_directory(cls) -> "PublishedImages":
+        """
+        Gets the published images of the directory wedpy is run from.
+
+        :return: the published images
+        """
+        return cls(path=os.path.join(os.getcwd(), PUBLISHED_PATH))
+
+    def entries(self) -> Dict[str, dict]:
+        """
+        Reads the published images.
+
+        :return: the fingerprint, digest and pinned reference of every published image, keyed by image url
+        """
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def is_current(self, image_url: str, build_fingerprint: Optional[str]) -> bool:
+        """
+        Checks whether an image was last published from the same inputs.
+
+        :param image_url: the image url of the build
+        :param build_fingerprint: the fingerprint of the inputs the image was built from, None if it is not known
+        :return: True if the image was last published from the same inputs, never for an image of unknown inputs
+        """
+        if build_fingerprint is None:
+            return False
+        return self.entries().get(image_url, {}).get("fingerprint") == build_fingerprint
+
+    def record(self, image_url: str, build_fingerprint: Optional[str], digest: str) -> None:
+        """
+        Records an image as published.
+
+        :param image_url: the image url of the build
+        :param build_fingerprint: the fingerprint of the inputs the image was built from, None if it is not known
+        :param digest: the digest the registry gave the image
+        :return: None
+        """
+        from wedpy.engine import split_reference
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        repository, _ = split_reference(image_url)
+        with _published_lock:
+            entries = self.entries()
+            entries[image_url] = {"fingerprint": build_fingerprint, "digest": digest,
+                                  "reference": f"{repository}@{digest}"}
+            descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(descriptor, "w") as f:
+                json.dump(entries, f, indent=2, sort_keys=True)
+            os.replace(temporary_path, self.path)
+
+
+class PushProgress:
+    """
+    The PushProgress class adds the bytes uploaded by every push running at the same time up into one progress bar.
+
+    Attributes:
+        bar (tqdm): the progress bar, its total grows as the pushes report the size of their layers
+        layers (Dict[Tuple[str, str], int]): the bytes uploaded of every layer, keyed by image and layer
+        skipped (int): the layers the registry already had
+    """
+    def __init__(self, bar) -> None:
+        """
+        The constructor for the PushProgress class.
+
+        :param bar: the progress bar
+        """
+        self.bar = bar
+        self.layers: Dict[Tuple[str, str], int] = {}
+        self.skipped: int = 0
+        self._lock = threading.Lock()
+
+    def update(self, image: str, event: dict) -> None:
+        """
+        Moves the progress bar on by what one event of a push reports.
+
+        :param image: the image being pushed
+        :param event: the decoded event of the push
+        :return: None
+        """
+        layer = event.get("id")
+        detail = event.get("progressDetail") or {}
+        with self._lock:
+            if event.get("status") == LAYER_EXISTS:
+                self.skipped += 1
+                self.bar.set_postfix(layers_skipped=self.skipped)
+                return None
+            if layer is None or "current" not in detail:
+                return None
+            key = (image, layer)
+            if key not in self.layers and detail.get("total"):
+                self.bar.total = (self.bar.total or 0) + detail["total"]
+                self.bar.refresh()
+            uploaded = self.layers.get(key, 0)
+            # a retried push starts its layers again, which is not counted twice
+            self.layers[key] = max(uploaded, detail["current"])
+            self.bar.update(self.layers[key] - uploaded)
+
+
+def push_image(docker_client: "DockerClient", tag: str, image_url: str, progress: PushProgress) -> str:
+    """
+    Tags a built image with the image url of its build and pushes it.
+
+    :param docker_client: the docker client
+    :param tag: the tag or the id of the image
+    :param image_url: the reference the image is pushed to
+    :param progress: the progress of the pushes
+    :return: the digest the registry gave the image
+    """
+    from wedpy.engine import split_reference
+
+    repository, image_tag = split_reference(image_url)
+    docker_client.api.tag(tag, repository, image_tag)
+    digest: Optional[str] = None
+    for event in docker_client.api.push(repository, tag=image_tag, stream=True, decode=True):
+        if "error" in event:
+            raise PushError((event.get("errorDetail") or {}).get("message") or event["error"])
+        digest = (event.get("aux") or {}).get("Digest", digest)
+        progress.update(image_url, event)
+    if digest is None:
+        raise PushError(f"the push of {image_url} finished without a digest")
+    return digest
+
+
+def publish(jobs: List["BuildJob"], changed_only: bool = False, max_pushes: int = DEFAULT_MAX_PUSHES,
+            published: Optional[PublishedImages] = None,
+            docker_client: Optional["DockerClient"] = None) -> Dict[str, Optional[str]]:
+    """
+    Pushes the built image of every build to its image url, several at a time, and records their digests with the
+    fingerprint each image is labelled with.
+
+    :param jobs: the builds, images that are pulled rather than built are skipped, several builds may only share an
+                 image url if they build the same tag
+    :param changed_only: whether to skip the images whose inputs have not changed since they were last published
+    :param max_pushes: the most pushes run at the same time
+    :param published: the record of the published images, defaults to the one in the working directory
+    :param docker_client: the docker client, defaults to the docker client from the environment
+    :return: the digest of every image pushed, or None for the images skipped as unchanged, keyed by image url
+    """
+    from tqdm import tqdm
+
+    from wedpy.docker_client import get_client
+
+    docker_client = get_client() if docker_client is None else docker_client
+    published = PublishedImages.in_working_directory() if published is None else published
+    retry = RetryPolicy.from_env()
+    policy = failure_policy()
+
+    builds: Dict[str, "BuildJob"] = {}
+    conflicts: List[str] = []
+    for job in jobs:
+        if job.is_pull is True:
+            continue
+        image_url = job.build.core_unit.image_url
+        other = builds.setdefault(image_url, job)
+        # builds of the same tag, such as the dev and main build of a package, push the same image
+        if other.tag != job.tag:
+            conflicts.append(f"{image_url} is the image url of both {other.build.core_unit.name} ({other.tag}) and "
+                             f"{job.build.core_unit.name} ({job.tag}), only one of them can be published to it")
+    if len(conflicts) > 0:
+        raise PublishError(failures=conflicts)
+    if len(builds) == 0:
+        return {}
+
+    def publish_build(job: "BuildJob", progress: PushProgress) -> Optional[str]:
+        core_unit = job.build.core_unit
+        # the image is pushed by id, so the fingerprint recorded is the one of the image pushed even if it is rebuilt
+        image = docker_client.images.get(job.tag)
+        build_fingerprint = (image.labels or {}).get(FINGERPRINT_LABEL)
+        if changed_only is True and published.is_current(core_unit.image_url, build_fingerprint) is True:
+            return None
+        with tracing.span("push", image=core_unit.image_url, **job.build.trace_tags):
+            digest = retry.call(f"{core_unit.image_url} push", push_image, docker_client, image.id,
+                                core_unit.image_url, progress)
+        published.record(core_unit.image_url, build_fingerprint, digest)
+        return digest
+
+    digests: Dict[str, Optional[str]] = {}
+    failures: List[str] = []
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_pushes, len(builds))), thread_name_prefix="wedpy-push")
+    with executor, tqdm(total=0, desc="publish", unit="B", unit_scale=True, unit_divisor=1024) as bar:
+        progress = PushProgress(bar=bar)
+        futures = {executor.submit(publish_build, job, progress): image_url for image_url, job in builds.items()}
+        for future in as_completed(futures):
+            image_url = futures[future]
+            if future.cancelled() is True:
+                continue
+            error = future.exception()
+            if error is not None:
+                failures.append(f"{image_url}: {error}")
+                if policy == FAIL_FAST:
+                    for pending in futures:
+                        pending.cancel()
+                continue
+            digests[image_url] = future.result()
+    if len(failures) > 0:
+        raise PublishError(failures=failures,
+                           cancelled=[image_url for future, image_url in futures.items()
+                                      if future.cancelled() is True])
+    return digests
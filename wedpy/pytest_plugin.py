@@ -0,0 +1,72 @@
+"""
+This file defines the pytest plugin of wedpy, registered through the pytest11 entry point, which gives test suites a
+session scoped wedpy_environment fixture with the seating plan of the repository up and ready.
+
+An environment that is already running with the current images is reused, so repeated test sessions skip building
+and starting the containers, and it is left running after the session unless --wedpy-down is given. Under
+pytest-xdist every worker runs its own instance of the environment, named after the worker, so the workers never
+share containers, networks or ports. The venue and the images are shared, so the first worker clones and builds them
+while the others wait, and then every worker only starts the containers of its own instance.
+"""
+import os
+from typing import TYPE_CHECKING, Iterator, Optional
+
+import pytest
+
+if TYPE_CHECKING:
+    from wedpy.environment import Environment
+
+
+# the environment variable pytest-xdist sets to the id of the worker, such as gw0
+XDIST_WORKER_ENV = "PYTEST_XDIST_WORKER"
+
+# the environment variable pytest-xdist sets to the id of the test run, the same for every worker of a session
+XDIST_RUN_ENV = "PYTEST_XDIST_TESTRUNUID"
+
+
+def pytest_addoption(parser: "pytest.Parser") -> None:
+    group = parser.getgroup("wedpy")
+    group.addoption('--wedpy-root', default=".", help='the directory holding seating_plan.yml')
+    group.addoption('--wedpy-instance', default=None,
+                    help='the instance to run the environment as, defaults to the xdist worker if any')
+    group.addoption('--wedpy-remote', action='store_true', help='run the attendees from the registry images')
+    group.addoption('--wedpy-storage', default="default", choices=["default", "ephemeral"],
+                    help='the storage profile the containers are run with')
+    group.addoption('--wedpy-no-build', action='store_true', help='run the images as they are without building')
+    group.addoption('--wedpy-down', action='store_true', help='destroy the environment at the end of the session')
+    group.addoption('--wedpy-timeout', type=float, default=60,
+                    help='seconds to wait for the services to accept connections')
+
+
+def worker_instance(config: "pytest.Config") -> Optional[str]:
+    """
+    Gets the instance the environment of this test process runs as.
+
+    :param config: the pytest config
+    :return: the instance given on the command line, else the xdist worker id, else None
+    """
+    instance = config.getoption("--wedpy-instance")
+    worker = os.environ.get(XDIST_WORKER_ENV)
+    if instance is not None and worker is not None:
+        return f"{instance}_{worker}"
+    return instance if instance is not None else worker
+
+
+@pytest.fixture(scope="session")
+def wedpy_environment(request: "pytest.FixtureRequest") -> Iterator["Environment"]:
+    """
+    The environment of the repository, brought up once per session or xdist worker and waited on until every
+    service accepts connections.
+    """
+    from wedpy.environment import Environment
+
+    config = request.config
+    environment = Environment(root=config.getoption("--wedpy-root"), instance=worker_instance(config),
+                              remote=config.getoption("--wedpy-remote"), profile=config.getoption("--wedpy-storage"))
+    # the workers of a run share the images, so they are built once rather than by every worker at the same time
+    run_id = os.environ.get(XDIST_RUN_ENV) if os.environ.get(XDIST_WORKER_ENV) is not None else None
+    environment.up(build=not config.getoption("--wedpy-no-build"), run_id=run_id)
+    environment.wait_ready(timeout=config.getoption("--wedpy-timeout"))
+    yield environment
+    if config.getoption("--wedpy-down") is True:
+        environment.down()
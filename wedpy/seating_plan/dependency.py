@@ -5,7 +5,12 @@ and extract the wedding invites from those repositories.
 import os.path
 import shutil
 import subprocess
+import time
+from typing import Optional
 
+from wedpy import tracing
+from wedpy.failures import RetryPolicy, is_transient_message
+from wedpy.journal import Journal
 from wedpy.wedding_invite.wedding_invite import WeddingInvite
 
 
@@ -58,27 +63,50 @@ class Dependency:
 
         clone_path = str(os.path.join(venue_path, self.name))
 
-        if os.path.exists(clone_path):
-            shutil.rmtree(clone_path)
-
-        # Run the git clone command using Popen
-        process = subprocess.Popen(f"cd {venue_path} && git clone {self.git_url}", stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE, shell=True)
-        # Wait for the process to complete and capture the output
-        stdout, stderr = process.communicate()
+        journal = Journal.from_env()
+        if journal is not None:
+            sha = self.head_sha(clone_path)
+            if sha is not None and journal.is_done("clone", self.name, sha) is True:
+                print(f'{self.name} already cloned at {sha[:12]}')
+                return None
+
+        retry = RetryPolicy.from_env()
+        attempt = 0
+        while True:
+            if os.path.exists(clone_path):
+                shutil.rmtree(clone_path)
+
+            # Run the git clone command using Popen
+            with tracing.span("clone", package=self.name, git_url=self.git_url):
+                process = subprocess.Popen(f"cd {venue_path} && git clone {self.git_url}", stdout=subprocess.PIPE,
+                                           stderr=subprocess.PIPE, shell=True)
+                # Wait for the process to complete and capture the output
+                stdout, stderr = process.communicate()
+
+            attempt += 1
+            if process.returncode == 0 or attempt > retry.retries or not is_transient_message(stderr.decode()):
+                break
+            delay = retry.delay(attempt)
+            print(f'Cloning {self.name} failed with a transient error, retrying in {delay:.1f}s '
+                  f'({attempt}/{retry.retries}): {stderr.decode().strip()}')
+            time.sleep(delay)
 
         # Print the output
         if process.returncode == 0:
             print(f'Successfully cloned {self.name} to {venue_path}')
 
-            process = subprocess.Popen(f"cd {clone_path} && git checkout {self.branch}",
-                                       stdout=subprocess.PIPE,
-                                       stderr=subprocess.PIPE,
-                                       shell=True)
-            # Wait for the process to complete and capture the output
-            stdout, stderr = process.communicate()
+            with tracing.span("checkout", package=self.name, branch=self.branch):
+                process = subprocess.Popen(f"cd {clone_path} && git checkout {self.branch}",
+                                           stdout=subprocess.PIPE,
+                                           stderr=subprocess.PIPE,
+                                           shell=True)
+                # Wait for the process to complete and capture the output
+                stdout, stderr = process.communicate()
             if process.returncode == 0:
                 print(f'Successfully checked out {self.branch} branch for {self.name}')
+                sha = None if journal is None else self.head_sha(clone_path)
+                if sha is not None:
+                    journal.record("clone", self.name, sha)
             else:
                 print(f'Error checking out {self.branch} branch for {self.name}:')
                 print(stdout.decode())
@@ -88,6 +116,22 @@ class Dependency:
             print(stdout.decode())
             print(stderr.decode())
 
+    @staticmethod
+    def head_sha(clone_path: str) -> Optional[str]:
+        """
+        Gets the commit checked out in a clone.
+
+        :param clone_path: the path of the clone
+        :return: the SHA of the commit or None if there is no clone
+        """
+        if not os.path.isdir(os.path.join(clone_path, ".git")):
+            return None
+        process = subprocess.run(["git", "rev-parse", "HEAD"], cwd=clone_path, stdout=subprocess.PIPE,
+                                 stderr=subprocess.DEVNULL)
+        if process.returncode != 0:
+            return None
+        return process.stdout.decode().strip()
+
     def invite_path(self, venue_path: str) -> str:
         """
         Gets the path to the wedding invite of the dependency.
@@ -0,0 +1,322 @@
+"""
+This file defines the Pipeline class which streams every attendee of a seating plan through install, post, build
+and run so the phases overlap instead of each one finishing before the next begins.
+"""
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, as_completed, wait
+from typing import Dict, List, Optional
+
+from wedpy import tracing
+from wedpy.capacity import CapacityLimiter
+from wedpy.failures import FAIL_FAST, KEEP_GOING, RetryPolicy, failure_policy as policy_from_env
+from wedpy.seating_plan.dependency import Dependency
+from wedpy.seating_plan.seating_plan import SeatingPlan
+from wedpy.validation import PlanValidator, ValidationError
+from wedpy.wedding_invite.build import DEFAULT_PROFILE, Build
+from wedpy.wedding_invite.local_wedding_invite import LocalWeddingInvite
+from wedpy.wedding_invite.wedding_invite import INIT_CONTAINER_DELAY, WeddingInvite
+
+
+class PipelineError(Exception):
+    """
+    The PipelineError is raised when one or more packages failed in the pipeline.
+
+    Attributes:
+        failures (List[str]): a description of every package that failed
+    """
+    def __init__(self, failures: List[str]) -> None:
+        """
+        The constructor for the PipelineError class.
+
+        :param failures: a description of every package that failed
+        """
+        self.failures: List[str] = failures
+        super().__init__(f"{len(failures)} package(s) failed:\n" + "\n".join(f"  - {f}" for f in failures))
+
+
+class Pipeline:
+    """
+    The Pipeline class streams every attendee of a seating plan through clone, post, build and run. An attendee's
+    invite is posted as soon as its clone finishes and its builds are queued straight away. Each container starts as
+    soon as its own image is ready, and the init containers of a package start once the containers of that package
+    are running, the package being up once they have exited successfully. The images of the local wedding invite are
+    built alongside the attendees', but its containers only start once every attendee is up, as wedpy-run starts
+    them. Clones, builds and container starts share concurrency limits across all packages.
+
+    With the keep-going failure policy, a failing package does not stop the others and every failure is reported
+    together. With fail-fast, the first failure cancels the clones and builds still queued.
+
+    Attributes:
+        seating_plan (SeatingPlan): the seating plan of the attendees to bring up
+        local_wedding_invite (Optional[LocalWeddingInvite]): the wedding invite of the main repo
+        validator (Optional[PlanValidator]): checks each invite as soon as it is posted
+        dev (bool): whether or not to skip the main builds of the local wedding invite
+        init_delay (float): seconds to wait after the containers of a package start before its init containers
+        max_builds (Optional[int]): the maximum number of images built or pulled at the same time, None to run as
+                                    many as the host capacity allows
+        capacity (CapacityLimiter): admits builds and container starts against the cores and memory of the host
+        profile (str): the storage profile the containers are run with
+        failure_policy (str): what happens to the other packages once one fails, fail-fast or keep-going
+        retry (RetryPolicy): the retries of builds failing with a transient error
+    """
+    def __init__(self, seating_plan: SeatingPlan, local_wedding_invite: Optional[LocalWeddingInvite] = None,
+                 validator: Optional[PlanValidator] = None, dev: bool = False, max_clones: int = 4,
+                 max_builds: Optional[int] = None, max_runs: int = 8, init_delay: float = INIT_CONTAINER_DELAY,
+                 capacity: Optional[CapacityLimiter] = None, profile: str = DEFAULT_PROFILE,
+                 failure_policy: Optional[str] = None, retry: Optional[RetryPolicy] = None) -> None:
+        """
+        The constructor for the Pipeline class.
+
+        :param seating_plan: the seating plan of the attendees to bring up
+        :param local_wedding_invite: the wedding invite of the main repo
+        :param validator: checks each invite as soon as it is posted, the local invite is expected to be checked
+        :param dev: whether or not to skip the main builds of the local wedding invite
+        :param max_clones: the maximum number of repos cloned at the same time
+        :param max_builds: the maximum number of images built or pulled at the same time, defaults to what the host
+                           capacity allows
+        :param max_runs: the maximum number of containers started at the same time
+        :param init_delay: seconds to wait after the containers of a package start before its init containers
+        :param capacity: admits builds and container starts, defaults to the detected capacity of the host
+        :param profile: the storage profile the containers are run with
+        :param failure_policy: what happens to the other packages once one fails, defaults to the policy set in the
+                               environment or keep-going
+        :param retry: the retries of builds failing with a transient error, defaults to the retries set in the
+                      environment
+        """
+        self.seating_plan: SeatingPlan = seating_plan
+        self.local_wedding_invite: Optional[LocalWeddingInvite] = local_wedding_invite
+        self.validator: Optional[PlanValidator] = validator
+        self.dev: bool = dev
+        self.init_delay: float = init_delay
+        self.capacity: CapacityLimiter = CapacityLimiter() if capacity is None else capacity
+        self.max_builds: int = self.capacity.max_workers if max_builds is None else max_builds
+        self.profile: str = profile
+        self.failure_policy: str = policy_from_env(default=KEEP_GOING) if failure_policy is None else failure_policy
+        self.retry: RetryPolicy = RetryPolicy.from_env() if retry is None else retry
+        self._cancelled = threading.Event()
+        self._clone_slots = threading.BoundedSemaphore(max_clones)
+        self._run_slots = threading.BoundedSemaphore(max_runs)
+        self._validator_lock = threading.Lock()
+        self._builds: Optional[ThreadPoolExecutor] = None
+
+    def run(self) -> None:
+        """
+        Brings up every package in the seating plan and the local wedding invite.
+
+        :return: None
+        """
+        _ = self.seating_plan.network
+        dependencies = self.seating_plan.dependencies
+        packages = len(dependencies) + (0 if self.local_wedding_invite is None else 1)
+
+        failures: List[str] = []
+        self._builds = ThreadPoolExecutor(max_workers=self.max_builds, thread_name_prefix="wedpy-build")
+        with self._builds, ThreadPoolExecutor(max_workers=max(packages, 1),
+                                              thread_name_prefix="wedpy-package") as coordinators:
+            futures = {coordinators.submit(self.run_attendee, dependency): dependency.name
+                       for dependency in dependencies}
+            if self.local_wedding_invite is not None:
+                # the local package runs against the attendees, so its containers wait for them as wedpy-run does
+                invite = self.local_wedding_invite.local_wedding_invite
+                futures[coordinators.submit(self.run_package, invite, ".", self.dev, dict(futures))] = \
+                    invite.package_name
+
+            for future in as_completed(futures):
+                error = future.exception()
+                if error is None:
+                    continue
+                if isinstance(error, CancelledError) and self._cancelled.is_set():
+                    failures.append(f"{futures[future]}: cancelled after another package failed")
+                    continue
+                failures.append(f"{futures[future]}: {error}")
+                if self.failure_policy == FAIL_FAST and not self._cancelled.is_set():
+                    self._cancelled.set()
+                    self._builds.shutdown(wait=False, cancel_futures=True)
+
+        if len(failures) > 0:
+            raise PipelineError(failures=failures)
+
+    def run_attendee(self, dependency: Dependency) -> None:
+        """
+        Clones an attendee, posts its wedding invite and then builds and runs its containers.
+
+        :param dependency: the attendee to bring up
+        :return: None
+        """
+        with self._clone_slots:
+            self._raise_if_cancelled()
+            dependency.clone_repo(venue_path=self.seating_plan.full_venue_path)
+        self._raise_if_cancelled()
+        self.seating_plan.post_invite(dependency=dependency)
+
+        if self.validator is not None:
+            with self._validator_lock:
+                errors = self.validator.validate_invite_file(
+                    dependency.invite_path(venue_path=self.seating_plan.full_venue_path)
+                )
+            if len(errors) > 0:
+                raise ValidationError(errors=errors)
+
+        invite = self.seating_plan.namespace(
+            dependency.get_wedding_invite(venue_path=self.seating_plan.full_venue_path)
+        )
+        package_root = str(os.path.join(self.seating_plan.full_venue_path, invite.package_name))
+        self.run_package(invite, package_root)
+
+    def run_package(self, invite: WeddingInvite, package_root: str, skip_main: bool = False,
+                    after: Optional[Dict[Future, str]] = None) -> None:
+        """
+        Queues the builds of a package and starts each container as soon as its image is ready and the packages it
+        runs after are up. The init containers are started once every container of the package is running. Once a
+        container fails, the builds of the package still queued are cancelled.
+
+        :param invite: the wedding invite of the package
+        :param package_root: the root directory of the package
+        :param skip_main: whether or not to skip the main builds of the package that have no dev mounts
+        :param after: the runs of the packages whose containers have to be up first, keyed by package name
+        :return: None
+        """
+        builds = [build for build in invite.builds if not (skip_main is True and build.skipped_in_dev is True)]
+        build_futures: List[Future] = [self._submit(self.build, build, package_root) for build in builds]
+        init_futures: List[Future] = [self._submit(self.build, build, package_root) for build in invite.init_builds]
+
+        first_error: Optional[BaseException] = None
+        try:
+            if after:
+                self._wait_for_packages(after)
+            with ThreadPoolExecutor(max_workers=max(len(builds), 1), thread_name_prefix="wedpy-run") as runs:
+                run_futures = [runs.submit(self.run_when_built, future, build, package_root)
+                               for future, build in zip(build_futures, builds)]
+                for future in as_completed(run_futures):
+                    if future.exception() is not None and first_error is None:
+                        first_error = future.exception()
+                        self._cancel(build_futures + init_futures)
+            if first_error is not None:
+                raise first_error
+        except BaseException:
+            self._cancel(build_futures + init_futures)
+            raise
+        print(f"{invite.package_name} containers running")
+
+        if len(invite.init_builds) == 0:
+            return None
+        with tracing.span("readiness wait", package=invite.package_name):
+            time.sleep(self.init_delay)
+        self._raise_if_cancelled()
+        for build, future in zip(invite.init_builds, init_futures):
+            future.result()
+            self.run_container(build, package_root)
+        print(f"{invite.package_name} init containers running")
+        for build in invite.init_builds:
+            self.wait_for_exit(build)
+        print(f"{invite.package_name} init containers finished")
+
+    def _wait_for_packages(self, runs: Dict[Future, str]) -> None:
+        """
+        Waits until the runs of other packages finish, failing if any of them failed.
+
+        :param runs: the runs of the packages keyed by package name
+        :return: None
+        """
+        wait(runs)
+        self._raise_if_cancelled()
+        failed = [name for future, name in runs.items() if future.exception() is not None]
+        if len(failed) > 0:
+            raise RuntimeError(f"not started because {', '.join(failed)} failed")
+
+    @staticmethod
+    def _cancel(futures: List[Future]) -> None:
+        """
+        Cancels the builds still queued.
+
+        :param futures: the futures of the builds
+        :return: None
+        """
+        for future in futures:
+            future.cancel()
+
+    def _raise_if_cancelled(self) -> None:
+        """
+        Stops a package once the fail-fast policy cancelled the pipeline.
+
+        :return: None
+        """
+        if self._cancelled.is_set():
+            raise CancelledError()
+
+    def _submit(self, function, *args) -> Future:
+        """
+        Queues a build unless the fail-fast policy cancelled the pipeline.
+
+        :param function: the build step to queue
+        :param args: the arguments of the build step
+        :return: the future of the build step
+        """
+        self._raise_if_cancelled()
+        try:
+            return self._builds.submit(function, *args)
+        except RuntimeError:
+            # the build queue was shut down by a failure in another package since the check above
+            self._raise_if_cancelled()
+            raise
+
+    def build(self, build: Build, package_root: str) -> None:
+        """
+        Builds the image for a build once the host has the capacity for it.
+
+        :param build: the build to build
+        :param package_root: the root directory of the package the build belongs to
+        :return: None
+        """
+        with self.capacity.reserve(build.build_demand()):
+            self.retry.call(f"{build.core_unit.default_image_tag} build", build.build_image, package_root, None, False)
+
+    def run_when_built(self, build_future: Future, build: Build, package_root: str) -> None:
+        """
+        Waits for the image of a build and then runs its container.
+
+        :param build_future: the future of the build of the image
+        :param build: the build to run
+        :param package_root: the root directory of the package the build belongs to
+        :return: None
+        """
+        build_future.result()
+        self._raise_if_cancelled()
+        self.run_container(build, package_root)
+
+    def run_container(self, build: Build, package_root: str) -> None:
+        """
+        Runs the container for a build in the network of the seating plan, with its live source mounted in dev mode.
+
+        :param build: the build to run the container for
+        :param package_root: the root directory of the package the build belongs to
+        :return: None
+        """
+        # a running container keeps the cores and memory it is limited to, so builds queued after it fit around it
+        self.capacity.acquire(build.run_demand, hold=True)
+        try:
+            with self._run_slots:
+                build.run_container(runner=self.seating_plan.client.containers,
+                                    network_name=self.seating_plan.network_name, dev=self.dev,
+                                    package_root=package_root, profile=self.profile)
+        except BaseException:
+            self.capacity.release(build.run_demand, hold=True)
+            raise
+
+    def wait_for_exit(self, build: Build) -> None:
+        """
+        Waits for an init container to exit and gives back the cores and memory it held.
+
+        :param build: the init build of the container
+        :return: None
+        """
+        name = build.core_unit.default_container_name
+        try:
+            with tracing.span("init wait", container=name, **build.trace_tags):
+                result = self.seating_plan.client.containers.get(name).wait()
+        finally:
+            self.capacity.release(build.run_demand, hold=True)
+        if result.get("StatusCode", 0) != 0:
+            raise RuntimeError(f"{name} exited with status {result['StatusCode']}")
@@ -2,16 +2,31 @@
 This file defines the SeatingPlan class for managing dependencies needed to run a service.
 """
 import os
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
 import shutil
 
-import docker
-import yaml
-from docker.errors import NotFound
-
+from wedpy import tracing
+from wedpy.builder_pool import BuildDurations, BuilderHost, BuilderPool, BuildJob
+from wedpy.docker_client import engine_enabled, get_client
+from wedpy.failures import FAIL_FAST, BuildFailures, failure_policy
+from wedpy.journal import Journal
+from wedpy.instance import Instance
+from wedpy.plan_cache import load_yaml
 from wedpy.seating_plan.dependency import Dependency
+from wedpy.selection import Selection
+from wedpy.shared import is_shared, release
+from wedpy.wedding_invite.build import DATA_VOLUME_LABEL, DEFAULT_PROFILE
 from wedpy.wedding_invite.wedding_invite import WeddingInvite
 
+if TYPE_CHECKING:
+    from docker import DockerClient
+
+    from wedpy.snapshot import VolumeSnapshots
+
+
+# where the durations of past builds are recorded, relative to the directory wedpy is run from
+DURATIONS_PATH = os.path.join(".wedpy", "build_durations.json")
+
 
 class SeatingPlan:
     """
@@ -21,17 +36,28 @@ class SeatingPlan:
         network_name (str): the name of the network to manage the docker containers for service
         venue (str): the path to where the cloned dependency repos will be stored
         dependencies (List[Dependency]): the list of dependencies needed to run the service
-        client (docker.client.DockerClient): the docker client used to manage the docker containers and builds
+        client (docker.client.DockerClient): the docker client used to manage the docker containers and builds,
+                                             created on first use so commands that do not need docker do not
+                                             connect to the docker daemon
         full_venue_path (str): the full path to the venue directory
+        builder_hosts (List[BuilderHost]): the docker hosts to spread builds across, empty to build on the docker
+                                           host from the environment
+        instance (Optional[Instance]): the instance the containers and network are namespaced to, None to use the
+                                       names in the seating plan and wedding invites
+        selection (Optional[Selection]): the resolved subset of builds and containers to work on, None to work on
+                                         all of them
     """
-    def __init__(self, seating_plan_path: str) -> None:
+    def __init__(self, seating_plan_path: str, instance: Optional[Instance] = None) -> None:
         """
         The constructor for the SeatingPlan class.
 
         :param seating_plan_path: the path to the seating plan file.
+        :param instance: the instance the containers and network are namespaced to
         """
         self.config: dict = self.load_config(seating_plan_path)
-        self.network_name: str = self.config['network_name']
+        self.instance: Optional[Instance] = instance
+        self.network_name: str = self.config['network_name'] if instance is None \
+            else instance.prefix(self.config['network_name'])
         self.venue: str = self.config['venue']
         self.dependencies: List[Dependency] = [Dependency(
             name=dep["name"], default_image_name=dep["default_image_name"],
@@ -39,8 +65,10 @@ class SeatingPlan:
             image_url=dep["image_url"]) for dep in self.config['attendees']]
         self.post_office_path: str = self.config['post_office']
         self.full_post_office_path: str = str(os.path.join(os.getcwd(), self.config['post_office']))
-        self.client = docker.from_env()
+        self._client: Optional["DockerClient"] = None
         self.full_venue_path: str = str(os.path.join(os.getcwd(), self.venue))
+        self.builder_hosts: List[BuilderHost] = [BuilderHost.from_dict(b) for b in self.config.get('builders', [])]
+        self.selection: Optional[Selection] = None
 
     @staticmethod
     def load_config(config_file) -> dict:
@@ -50,21 +78,77 @@ class SeatingPlan:
         :param config_file: the path to the seating plan file.
         :return: the data from the seating plan file.
         """
-        with open(config_file) as f:
-            return yaml.safe_load(f)
+        return load_yaml(config_file)
+
+    @property
+    def client(self) -> "DockerClient":
+        if self._client is None:
+            self._client = get_client()
+        return self._client
 
     @property
     def invites(self) -> List[WeddingInvite]:
-        return [depencency.get_wedding_invite(venue_path=self.venue) for depencency in self.dependencies]
+        invites = [self.namespace(depencency.get_wedding_invite(venue_path=self.venue))
+                   for depencency in self.dependencies]
+        if self.selection is None:
+            return invites
+        invites = [self.selection.filter(invite) for invite in invites]
+        return [invite for invite in invites if len(invite.builds) + len(invite.init_builds) > 0]
 
     @property
     def network(self):
+        from docker.errors import NotFound
+
         try:
             return self.client.networks.get(self.network_name)
         except NotFound:
-            self.client.networks.create(self.network_name)
+            if self.instance is None:
+                self.client.networks.create(self.network_name)
+            else:
+                self.client.networks.create(self.network_name, labels=self.instance.labels)
             return self.client.networks.get(self.network_name)
 
+    @property
+    def containers(self) -> list:
+        """
+        The containers managed by the seating plan: the containers on its network, or every container labelled with
+        the instance when running as an instance, including the exited init containers.
+        """
+        if self.instance is None:
+            containers = self.network.containers
+        else:
+            containers = self.client.containers.list(all=True, filters=self.instance.label_filter)
+        if self.selection is None:
+            return containers
+        names = {name if self.instance is None else self.instance.prefix(name) for name in self.selection.selected}
+        return [container for container in containers if container.name in names]
+
+    def select(self, selection: Selection, local_invite: Optional[WeddingInvite] = None) -> None:
+        """
+        Narrows the seating plan down to the builds and containers of a selection and everything they depend on.
+
+        :param selection: the selection to resolve against the wedding invites of the attendees
+        :param local_invite: the wedding invite of the local package, which can be selected and depended on too
+        :return: None
+        """
+        self.selection = None
+        invites = self.invites
+        if local_invite is not None:
+            invites = [local_invite] + invites
+        selection.resolve(invites)
+        self.selection = selection
+
+    def namespace(self, invite: WeddingInvite) -> WeddingInvite:
+        """
+        Namespaces the containers of a wedding invite to the instance of the seating plan.
+
+        :param invite: the wedding invite
+        :return: the wedding invite, namespaced if the seating plan runs as an instance
+        """
+        if self.instance is None:
+            return invite
+        return self.instance.namespace(invite)
+
     def post_invites(self) -> None:
         """
         Posts the wedding invites for the dependencies to the self.post_office_path.
@@ -72,43 +156,95 @@ class SeatingPlan:
         :return: None
         """
         for dependency in self.dependencies:
-            dst_folder = os.path.join(self.full_post_office_path, dependency.name)
-            if not os.path.exists(dst_folder):
-                os.mkdir(dst_folder)
-            dst_path = os.path.join(dst_folder, "wedding_invite.yml")
-            shutil.copy(dependency.invite_path(venue_path=self.full_venue_path), dst_path)
+            self.post_invite(dependency=dependency)
+
+    def post_invite(self, dependency: Dependency) -> None:
+        """
+        Posts the wedding invite for a single dependency to the self.post_office_path.
+
+        :param dependency: the dependency to post the wedding invite for
+        :return: None
+        """
+        dst_folder = os.path.join(self.full_post_office_path, dependency.name)
+        if not os.path.exists(dst_folder):
+            os.mkdir(dst_folder)
+        dst_path = os.path.join(dst_folder, "wedding_invite.yml")
+        shutil.copy(dependency.invite_path(venue_path=self.full_venue_path), dst_path)
 
-    def run_containers(self, remote: bool = False) -> None:
+    def run_containers(self, remote: bool = False, dev: bool = False,
+                       snapshots: Optional["VolumeSnapshots"] = None, profile: str = DEFAULT_PROFILE) -> None:
         """
         Runs the containers for the service.
 
+        :param remote: whether to run the images from the registry instead of the locally built ones
+        :param dev: whether to mount the live source of builds with dev mounts
+        :param snapshots: if given, packages with data volumes are restored from or snapshotted into them
+        :param profile: the storage profile the containers are run with
         :return: None
         """
         _ = self.network
         for invite in self.invites:
-            invite.run_containers(runner=self.client.containers, network_name=self.network_name, remote=remote)
+            invite.run_containers(runner=self.client.containers, network_name=self.network_name, remote=remote,
+                                  dev=dev, package_root=str(os.path.join(self.full_venue_path, invite.package_name)),
+                                  snapshots=snapshots, profile=profile)
 
     def stop_containers(self) -> None:
         """
-        Stops the containers belonging to the network.
+        Stops the containers belonging to the network, leaving the shared containers running for the other seating
+        plans using them.
 
         :return: None
         """
-        for container in self.network.containers:
+        containers = [container for container in self.containers if is_shared(container) is False]
+        if engine_enabled() is True:
+            from wedpy import fanout
+
+            fanout.run(fanout.stop_containers, [container.name for container in containers])
+            return None
+        for container in containers:
             container.stop()
 
     def destroy_containers(self) -> None:
         """
-        Destroys the containers belonging to the network.
+        Destroys the containers belonging to the network. Shared containers are released instead and only destroyed
+        once no other seating plan uses them.
 
         :return: None
         """
-        for container in self.network.containers:
-            container.stop()
-            container.remove(force=True)
+        containers = []
+        for container in self.containers:
+            if is_shared(container) is True:
+                release(container, network=self.network)
+            else:
+                containers.append(container)
+        if engine_enabled() is True:
+            self._destroy_containers_at_once(containers)
+            return None
+        for container in containers:
+            with tracing.span("teardown", container=container.name):
+                container.stop()
+                container.remove(force=True)
             print(f"{container.name} destroyed successfully.")
-        for invite in self.invites:
-            invite.destroy_init_containers()
+        # the init containers of an instance carry its label so they were removed above
+        if self.instance is None:
+            for invite in self.invites:
+                invite.destroy_init_containers()
+
+    def _destroy_containers_at_once(self, containers: list) -> None:
+        """
+        Destroys containers, and the init containers when not running as an instance, all at once over the asyncio
+        engine client.
+
+        :param containers: the containers to destroy
+        :return: None
+        """
+        from wedpy import fanout
+
+        names = [container.name for container in containers]
+        if self.instance is None:
+            names += [build.core_unit.default_container_name for invite in self.invites for build in invite.init_builds]
+        for name in fanout.run(fanout.remove_containers, names):
+            print(f"{name} destroyed successfully.")
 
     def destroy_network(self) -> None:
         """
@@ -116,7 +252,16 @@ class SeatingPlan:
 
         :return: None
         """
-        self.network.remove()
+        with tracing.span("teardown", network=self.network_name):
+            # shared containers outside a selection or an instance label are still attached
+            for container in self.network.containers:
+                if is_shared(container) is True:
+                    release(container, network=self.network)
+            self.network.remove()
+            for volume in self.client.volumes.list(filters={"label": f"{DATA_VOLUME_LABEL}={self.network_name}"}):
+                volume.remove(force=True)
+        if self.instance is not None:
+            self.instance.release()
 
     def wipe_images(self) -> None:
         """
@@ -144,8 +289,59 @@ class SeatingPlan:
         :param pool: if True, the images will be built using the multiprocessing pool.
         :return: None
         """
+        if len(self.builder_hosts) > 0 and remote is False:
+            self.build_distributed(jobs=self.build_jobs())
+            return None
+        if remote is True and engine_enabled() is True:
+            self.pull_images()
+            return None
+        failures: List[str] = []
         for invite in self.invites:
-            if pool is True:
-                invite.build_images(venue_path=self.full_venue_path, remote=remote)
-            else:
-                invite.build_images_without_pool(venue_path=self.full_venue_path, remote=remote)
+            try:
+                if pool is True:
+                    invite.build_images(venue_path=self.full_venue_path, remote=remote)
+                else:
+                    invite.build_images_without_pool(venue_path=self.full_venue_path, remote=remote)
+            except BuildFailures as e:
+                # keep-going builds the other packages and reports the failures of every package together
+                if failure_policy() == FAIL_FAST:
+                    raise
+                failures += e.failures
+        if len(failures) > 0:
+            raise BuildFailures(failures=failures)
+
+    def pull_images(self) -> None:
+        """
+        Pulls the images of every dependency in the seating plan from the registry all at once over the asyncio
+        engine client.
+
+        :return: None
+        """
+        from wedpy import fanout
+
+        references = [build.core_unit.image_url for invite in self.invites
+                      for build in invite.builds + invite.init_builds]
+        pulled = fanout.run(fanout.pull_images, references, journal=Journal.from_env())
+        print(f"{len(pulled)} image(s) pulled, {len(set(references)) - len(pulled)} already pulled")
+
+    def build_jobs(self) -> List[BuildJob]:
+        """
+        Gets the builds of every dependency in the seating plan as jobs for the builder pool.
+
+        :return: the build jobs
+        """
+        jobs = []
+        for invite in self.invites:
+            package_root = str(os.path.join(self.full_venue_path, invite.package_name))
+            jobs += [BuildJob(build=build, package_root=package_root) for build in invite.builds + invite.init_builds]
+        return jobs
+
+    def build_distributed(self, jobs: List[BuildJob]) -> None:
+        """
+        Runs builds across the builder hosts in the seating plan.
+
+        :param jobs: the builds to run
+        :return: None
+        """
+        durations = BuildDurations(path=os.path.join(os.getcwd(), DURATIONS_PATH))
+        BuilderPool(hosts=self.builder_hosts, durations=durations).build(jobs=jobs)
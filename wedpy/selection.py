@@ -0,0 +1,147 @@
+"""
+This file defines the Selection class which narrows a command down to a subset of the services in the seating plan,
+together with everything those services need to run.
+
+A selector is the name of a package, the name of a build or the container name of a build. The dependencies of a
+build are the builds listed in its depends_on field and the builds whose container name appears in one of its config
+values, such as a database URL pointing at a postgres container.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+from wedpy.wedding_invite.build import Build
+from wedpy.wedding_invite.wedding_invite import WeddingInvite
+
+
+class Selection:
+    """
+    The Selection class resolves the --only and --except selectors to the smallest set of builds, init builds and
+    containers needed. Every build matching --only is kept along with its dependencies, followed transitively, and
+    the init builds of every package with a kept build. Builds matching --except are dropped even when something
+    depends on them, for example when that dependency is already running elsewhere.
+
+    Attributes:
+        only (List[str]): the selectors to keep with their dependencies, empty to start from every build
+        exclude (List[str]): the selectors to drop
+        selected (Optional[Set[str]]): the container names of the kept builds, as named in the wedding invites, None
+                                       until the selection is resolved
+    """
+    def __init__(self, only: Optional[List[str]] = None, exclude: Optional[List[str]] = None) -> None:
+        """
+        The constructor for the Selection class.
+
+        :param only: the selectors to keep with their dependencies
+        :param exclude: the selectors to drop
+        """
+        self.only: List[str] = [] if only is None else only
+        self.exclude: List[str] = [] if exclude is None else exclude
+        self.selected: Optional[Set[str]] = None
+
+    @property
+    def is_active(self) -> bool:
+        return len(self.only) > 0 or len(self.exclude) > 0
+
+    @staticmethod
+    def key(build: Build) -> str:
+        """
+        Gets the name a build is selected by, which is its container name before any instance prefix.
+
+        :param build: the build
+        :return: the container name in the wedding invite
+        """
+        core_unit = build.core_unit
+        return core_unit.network_alias if core_unit.network_alias is not None else core_unit.default_container_name
+
+    def resolve(self, invites: Iterable[WeddingInvite]) -> Set[str]:
+        """
+        Resolves the selectors against every wedding invite of the seating plan, including the local one.
+
+        :param invites: the wedding invites
+        :return: the container names of the kept builds
+        """
+        invites = list(invites)
+        builds: Dict[str, Build] = {}
+        packages: Dict[str, str] = {}
+        for invite in invites:
+            for build in invite.builds + invite.init_builds:
+                builds[self.key(build)] = build
+                packages[self.key(build)] = invite.package_name
+
+        excluded = set()
+        for selector in self.exclude:
+            excluded |= self._match(selector, invites)
+
+        if len(self.only) == 0:
+            kept = set(builds) - excluded
+        else:
+            pending = []
+            for selector in self.only:
+                pending.extend(self._match(selector, invites))
+            kept = set()
+            while len(pending) > 0:
+                name = pending.pop()
+                if name in kept or name in excluded:
+                    continue
+                kept.add(name)
+                pending.extend(self.dependencies(builds[name], invites))
+                # a package is only usable once its init builds, such as database migrations, have run
+                if builds[name] not in self._invite(packages[name], invites).init_builds:
+                    pending.extend(self.key(b) for b in self._invite(packages[name], invites).init_builds)
+
+        self.selected = kept
+        return kept
+
+    def dependencies(self, build: Build, invites: List[WeddingInvite]) -> Set[str]:
+        """
+        Gets the container names of the builds a build depends on, declared in depends_on or referred to by host name
+        in its config values.
+
+        :param build: the build
+        :param invites: the wedding invites to look the dependencies up in
+        :return: the container names of the dependencies
+        """
+        names = set()
+        for selector in build.core_unit.depends_on:
+            names |= self._match(selector, invites)
+        values = " ".join(str(value) for value in build.core_unit.config.values())
+        for invite in invites:
+            for other in invite.builds + invite.init_builds:
+                name = self.key(other)
+                if re.search(rf"(?<![\w.-]){re.escape(name)}(?![\w-])", values) is not None:
+                    names.add(name)
+        names.discard(self.key(build))
+        return names
+
+    def filter(self, invite: WeddingInvite) -> WeddingInvite:
+        """
+        Drops the builds of a wedding invite that are not selected.
+
+        :param invite: the wedding invite, changed in place
+        :return: the wedding invite
+        """
+        if self.selected is None:
+            return invite
+        invite.builds = [build for build in invite.builds if self.key(build) in self.selected]
+        invite.init_builds = [build for build in invite.init_builds if self.key(build) in self.selected]
+        return invite
+
+    def _match(self, selector: str, invites: List[WeddingInvite]) -> Set[str]:
+        """
+        Gets the container names of the builds a selector refers to.
+
+        :param selector: a package name, build name or container name
+        :param invites: the wedding invites to look the selector up in
+        :return: the container names
+        """
+        names = set()
+        for invite in invites:
+            for build in invite.builds + invite.init_builds:
+                if selector in (invite.package_name, build.core_unit.name, self.key(build)):
+                    names.add(self.key(build))
+        if len(names) == 0:
+            raise ValueError(f"'{selector}' is not a package, build or container in the seating plan")
+        return names
+
+    @staticmethod
+    def _invite(package_name: str, invites: List[WeddingInvite]) -> WeddingInvite:
+        return next(invite for invite in invites if invite.package_name == package_name)
@@ -0,0 +1,84 @@
+"""
+This file defines the helpers for the containers of shareable builds, which are run once per docker host and attached
+to the network of every seating plan that needs an identical container.
+
+A shared container is labelled with a fingerprint of everything it is run with, so a seating plan finds an identical
+container left by another project. Docker labels cannot be changed once a container is created, so the reference
+count is kept by docker itself as the networks the container is attached to: each seating plan holds one reference
+through its network, releasing it disconnects the container and the last release removes the container.
+"""
+import hashlib
+import json
+from typing import TYPE_CHECKING, List
+
+from wedpy import tracing
+
+if TYPE_CHECKING:
+    from docker.models.containers import Container
+    from docker.models.networks import Network
+
+
+# the label of a shared container holding the fingerprint of what it was run with
+SHARED_LABEL = "wedpy.shared"
+
+
+def shared_fingerprint(image_id: str, environment: dict, run_options: dict) -> str:
+    """
+    Fingerprints what a shared container is run with, so only identical containers are shared.
+
+    :param image_id: the ID of the image the container is run from
+    :param environment: the environment variables of the container
+    :param run_options: everything else the container is run with, such as its ports, limits and mounts
+    :return: the fingerprint
+    """
+    data = {"image": image_id, "environment": environment, "options": run_options}
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def is_shared(container: "Container") -> bool:
+    """
+    Checks whether a container is shared between seating plans.
+
+    :param container: the container
+    :return: True if the container is shared
+    """
+    return SHARED_LABEL in (container.labels or {})
+
+
+def holders(container: "Container") -> List[str]:
+    """
+    Gets the networks holding a reference to a shared container.
+
+    :param container: the shared container
+    :return: the names of the networks it is attached to
+    """
+    container.reload()
+    return sorted(container.attrs["NetworkSettings"]["Networks"].keys())
+
+
+def release(container: "Container", network: "Network") -> bool:
+    """
+    Releases the reference a network holds on a shared container, removing the container and its data volumes if it
+    was the last one.
+
+    :param container: the shared container
+    :param network: the network of the seating plan releasing it
+    :return: True if the container was removed
+    """
+    from docker.errors import APIError, NotFound
+
+    with tracing.span("shared release", container=container.name, network=network.name):
+        if network.name in holders(container):
+            network.disconnect(container)
+        if len(holders(container)) > 0:
+            print(f"{container.name} is still used by {', '.join(holders(container))}")
+            return False
+        fingerprint = container.labels[SHARED_LABEL]
+        container.remove(force=True)
+        for volume in container.client.volumes.list(filters={"label": f"{SHARED_LABEL}={fingerprint}"}):
+            try:
+                volume.remove(force=True)
+            except (APIError, NotFound):
+                pass
+    print(f"{container.name} destroyed successfully.")
+    return True
@@ -0,0 +1,221 @@
+"""
+This file defines the VolumeSnapshots class which keeps a copy of the named data volumes of the stateful builds of a
+package, such as its postgres data directory, taken once the init containers have migrated and seeded them.
+
+A snapshot is keyed by a fingerprint of the stateful builds and the init builds of the package: their images, config
+and data volumes. Running the package again with the same fingerprint restores the snapshot into fresh volumes and
+skips the readiness wait and the init containers, and wedpy-reset rolls the volumes of running containers back to the
+snapshot between test runs. Any change to the migrations changes the image of the init build and so the fingerprint,
+which makes the next run seed from scratch and take a new snapshot.
+"""
+import hashlib
+import json
+import os
+from typing import TYPE_CHECKING, List
+
+from wedpy import tracing
+from wedpy.selection import Selection
+from wedpy.wedding_invite.build import DATA_VOLUME_LABEL, Build
+
+if TYPE_CHECKING:
+    from docker import DockerClient
+    from docker.models.containers import ContainerCollection
+
+    from wedpy.wedding_invite.wedding_invite import WeddingInvite
+
+
+# where the snapshots are kept, relative to the directory wedpy is run from
+SNAPSHOTS_PATH = os.path.join(".wedpy", "snapshots")
+
+
+class VolumeSnapshots:
+    """
+    The VolumeSnapshots class stores the data volumes of each package as one tar archive per volume under
+    <directory>/<package>/<fingerprint>/. The archives are taken with the container paused, so they are crash
+    consistent: a database restored from them recovers the same way it would after a power cut.
+
+    Attributes:
+        directory (str): the directory the snapshots are kept in
+    """
+    def __init__(self, directory: str) -> None:
+        """
+        The constructor for the VolumeSnapshots class.
+
+        :param directory: the directory the snapshots are kept in
+        """
+        self.directory: str = directory
+
+    @classmethod
+    def in_cwd(cls) -> "VolumeSnapshots":
+        """
+        Gets the snapshots kept in the directory wedpy is run from.
+
+        :return: the snapshots
+        """
+        return cls(directory=os.path.join(os.getcwd(), SNAPSHOTS_PATH))
+
+    @staticmethod
+    def stateful_builds(invite: "WeddingInvite") -> List[Build]:
+        """
+        Gets the builds of a package that keep their data in named data volumes, other than shared containers whose
+        data belongs to every seating plan using them.
+
+        :param invite: the wedding invite of the package
+        :return: the stateful builds
+        """
+        return [build for build in invite.builds
+                if len(build.core_unit.data_volumes) > 0 and build.core_unit.shareable is False]
+
+    @staticmethod
+    def image(build: Build, remote: bool) -> str:
+        """
+        Gets the image a build is run from.
+
+        :param build: the build
+        :param remote: whether the image is run from the registry instead of being built locally
+        :return: the image reference
+        """
+        return build.core_unit.image_url if remote is True else build.core_unit.default_image_tag
+
+    def fingerprint(self, invite: "WeddingInvite", docker_client: "DockerClient", remote: bool = False) -> str:
+        """
+        Fingerprints what the data of a package is made from, so a snapshot is only restored into the same setup.
+
+        :param invite: the wedding invite of the package
+        :param docker_client: the docker client the images are looked up with
+        :param remote: whether the images are run from the registry instead of being built locally
+        :return: the fingerprint
+        """
+        builds = []
+        for build in self.stateful_builds(invite) + invite.init_builds:
+            builds.append({
+                "name": Selection.key(build),
+                "image": docker_client.images.get(self.image(build, remote)).id,
+                "config": build.core_unit.config,
+                "data_volumes": build.core_unit.data_volumes,
+            })
+        digest = hashlib.sha256(json.dumps({"package": invite.package_name, "builds": builds},
+                                           sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def archive_path(self, invite: "WeddingInvite", fingerprint: str, build: Build, key: str) -> str:
+        """
+        Gets where the archive of a data volume is kept.
+
+        :param invite: the wedding invite of the package
+        :param fingerprint: the fingerprint of the package
+        :param build: the stateful build
+        :param key: the name of the data volume in the wedding invite
+        :return: the path of the archive
+        """
+        return os.path.join(self.directory, invite.package_name, fingerprint, f"{Selection.key(build)}_{key}.tar")
+
+    def has(self, invite: "WeddingInvite", fingerprint: str) -> bool:
+        """
+        Checks whether every data volume of a package has a snapshot.
+
+        :param invite: the wedding invite of the package
+        :param fingerprint: the fingerprint of the package
+        :return: True if the package can be restored from the snapshot
+        """
+        return all(os.path.exists(self.archive_path(invite, fingerprint, build, key))
+                   for build in self.stateful_builds(invite) for key in build.core_unit.data_volumes)
+
+    def restore(self, invite: "WeddingInvite", runner: "ContainerCollection", network_name: str, fingerprint: str,
+                remote: bool = False) -> None:
+        """
+        Restores the snapshot of a package into the data volumes that do not exist yet, those left by an earlier run
+        keep their data. The containers of the stateful builds must not be running.
+
+        :param invite: the wedding invite of the package
+        :param runner: the runner of the network
+        :param network_name: the name of the network, recorded on the volumes so teardown can remove them
+        :param fingerprint: the fingerprint of the package
+        :param remote: whether the images are run from the registry instead of being built locally
+        :return: None
+        """
+        from docker.errors import NotFound
+
+        for build in self.stateful_builds(invite):
+            for key, container_path in build.core_unit.data_volumes.items():
+                name = build.volume_name(key)
+                try:
+                    runner.client.volumes.get(name)
+                    continue
+                except NotFound:
+                    pass
+                with tracing.span("snapshot restore", volume=name, **build.trace_tags):
+                    runner.client.volumes.create(name=name, labels={DATA_VOLUME_LABEL: network_name})
+                    # the archive is unpacked by a container that is created and never started
+                    helper = runner.create(image=self.image(build, remote), command="true",
+                                           volumes={name: {"bind": container_path, "mode": "rw"}})
+                    try:
+                        with open(self.archive_path(invite, fingerprint, build, key), "rb") as f:
+                            helper.put_archive(os.path.dirname(container_path.rstrip("/")), f.read())
+                    finally:
+                        helper.remove(force=True)
+
+    def save(self, invite: "WeddingInvite", runner: "ContainerCollection", fingerprint: str) -> bool:
+        """
+        Takes the snapshot of a package once every init container exited successfully.
+
+        :param invite: the wedding invite of the package
+        :param runner: the runner of the network
+        :param fingerprint: the fingerprint of the package
+        :return: True if the snapshot was taken
+        """
+        for build in invite.init_builds:
+            result = runner.get(build.core_unit.default_container_name).wait()
+            if result.get("StatusCode") != 0:
+                print(f"{build.core_unit.default_container_name} failed, no snapshot of {invite.package_name} taken")
+                return False
+        for build in self.stateful_builds(invite):
+            container = runner.get(build.core_unit.default_container_name)
+            with tracing.span("snapshot save", container=container.name, **build.trace_tags):
+                container.pause()
+                try:
+                    for key, container_path in build.core_unit.data_volumes.items():
+                        path = self.archive_path(invite, fingerprint, build, key)
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        stream, _ = container.get_archive(container_path)
+                        # written next to the archive and moved into place so a partial archive is never restored
+                        with open(f"{path}.tmp", "wb") as f:
+                            for chunk in stream:
+                                f.write(chunk)
+                        os.replace(f"{path}.tmp", path)
+                finally:
+                    container.unpause()
+        print(f"{invite.package_name} snapshot taken")
+        return True
+
+    def reset(self, invite: "WeddingInvite", runner: "ContainerCollection", network_name: str,
+              remote: bool = False) -> bool:
+        """
+        Rolls the data volumes of a running package back to its snapshot by replacing the containers of its stateful
+        builds and their volumes.
+
+        :param invite: the wedding invite of the package
+        :param runner: the runner of the network
+        :param network_name: the name of the network
+        :param remote: whether the images are run from the registry instead of being built locally
+        :return: True if the package was reset, False if it has no snapshot
+        """
+        from docker.errors import NotFound
+
+        fingerprint = self.fingerprint(invite, runner.client, remote=remote)
+        if self.has(invite, fingerprint) is False:
+            return False
+        for build in self.stateful_builds(invite):
+            try:
+                runner.get(build.core_unit.default_container_name).remove(force=True)
+            except NotFound:
+                pass
+            for key in build.core_unit.data_volumes:
+                try:
+                    runner.client.volumes.get(build.volume_name(key)).remove(force=True)
+                except NotFound:
+                    pass
+        self.restore(invite, runner=runner, network_name=network_name, fingerprint=fingerprint, remote=remote)
+        for build in self.stateful_builds(invite):
+            build.run_container(runner=runner, network_name=network_name, remote=remote)
+        return True
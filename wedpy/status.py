@@ -0,0 +1,214 @@
+"""
+This file defines the StatusReport class which compares the builds and init builds of every wedding invite against
+the images and containers the docker daemon actually has. The whole report is made from one container list and one
+image list call, so it stays fast however many services the seating plan has.
+"""
+import json
+import re
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from wedpy.docker_client import engine_enabled
+from wedpy.wedding_invite.build import Build
+from wedpy.wedding_invite.wedding_invite import WeddingInvite
+
+if TYPE_CHECKING:
+    from docker import DockerClient
+
+
+EXIT_CODE_PATTERN = re.compile(r"^Exited \((-?\d+)\)")
+
+COLUMNS = ("PACKAGE", "CONTAINER", "KIND", "IMAGE", "STATE", "EXIT", "PORTS")
+
+
+def normalise_tag(reference: str) -> str:
+    """
+    Adds the latest tag to an image reference without one, as docker does.
+
+    :param reference: the image reference
+    :return: the reference with a tag
+    """
+    from docker.utils import parse_repository_tag
+
+    repository, tag = parse_repository_tag(reference)
+    if tag is None:
+        return f"{repository}:latest"
+    # a digest is kept as it is
+    return reference
+
+
+class ServiceStatus:
+    """
+    The ServiceStatus class is the expected and actual state of one build.
+
+    Attributes:
+        package (str): the name of the package the build belongs to
+        container (str): the name of the container of the build
+        kind (str): "build" for a service and "init" for an init job
+        image (str): the image the container is run from
+        image_present (bool): whether the docker daemon has the image
+        image_fresh (Optional[bool]): whether the container runs the image currently tagged, None without a container
+        state (str): the state of the container, "missing" if there is no container
+        exit_code (Optional[int]): the exit code of a container that has exited
+        ports (List[str]): the port bindings of the container, such as "0.0.0.0:8012->8012/tcp"
+    """
+    def __init__(self, package: str, container: str, kind: str, image: str, image_present: bool,
+                 image_fresh: Optional[bool], state: str, exit_code: Optional[int], ports: List[str]) -> None:
+        """
+        The constructor for the ServiceStatus class.
+
+        :param package: the name of the package the build belongs to
+        :param container: the name of the container of the build
+        :param kind: "build" for a service and "init" for an init job
+        :param image: the image the container is run from
+        :param image_present: whether the docker daemon has the image
+        :param image_fresh: whether the container runs the image currently tagged
+        :param state: the state of the container
+        :param exit_code: the exit code of a container that has exited
+        :param ports: the port bindings of the container
+        """
+        self.package: str = package
+        self.container: str = container
+        self.kind: str = kind
+        self.image: str = image
+        self.image_present: bool = image_present
+        self.image_fresh: Optional[bool] = image_fresh
+        self.state: str = state
+        self.exit_code: Optional[int] = exit_code
+        self.ports: List[str] = ports
+
+    @property
+    def healthy(self) -> bool:
+        """
+        Whether the build is as expected: a service running from its current image or an init job that succeeded.
+        """
+        if self.image_present is False or self.image_fresh is False:
+            return False
+        if self.kind == "init":
+            return self.state == "exited" and self.exit_code == 0
+        return self.state == "running"
+
+    def to_dict(self) -> dict:
+        return {
+            "package": self.package, "container": self.container, "kind": self.kind, "image": self.image,
+            "image_present": self.image_present, "image_fresh": self.image_fresh, "state": self.state,
+            "exit_code": self.exit_code, "ports": self.ports, "healthy": self.healthy,
+        }
+
+    def row(self) -> List[str]:
+        if self.image_present is False:
+            image = f"{self.image} (missing)"
+        elif self.image_fresh is False:
+            image = f"{self.image} (stale)"
+        else:
+            image = self.image
+        return [self.package, self.container, self.kind, image, self.state,
+                "" if self.exit_code is None else str(self.exit_code), ", ".join(self.ports)]
+
+
+class StatusReport:
+    """
+    The StatusReport class collects the status of every build in a set of wedding invites.
+
+    Attributes:
+        invites (List[WeddingInvite]): the wedding invites of the attendees whose builds are expected to be running
+        remote (bool): whether the containers of the attendees are run from the registry images instead of the
+                       locally built ones
+        local_invite (Optional[WeddingInvite]): the wedding invite of the local package, always run from the locally
+                                                built images
+        statuses (List[ServiceStatus]): the status of every build, filled in by collect
+    """
+    def __init__(self, invites: List[WeddingInvite], remote: bool = False,
+                 local_invite: Optional[WeddingInvite] = None) -> None:
+        """
+        The constructor for the StatusReport class.
+
+        :param invites: the wedding invites of the attendees whose builds are expected to be running
+        :param remote: whether the containers of the attendees are run from the registry images
+        :param local_invite: the wedding invite of the local package
+        """
+        self.invites: List[WeddingInvite] = invites
+        self.remote: bool = remote
+        self.local_invite: Optional[WeddingInvite] = local_invite
+        self.statuses: List[ServiceStatus] = []
+
+    def collect(self, docker_client: "DockerClient") -> List[ServiceStatus]:
+        """
+        Lists the containers and images of the docker daemon once and matches them to the builds.
+
+        :param docker_client: the docker client of the host the containers run on
+        :return: the status of every build
+        """
+        if engine_enabled() is True:
+            from wedpy import fanout
+
+            containers, images = fanout.run(fanout.list_state)
+            return self.match(container_summaries=containers, image_summaries=images)
+        # the low level API returns the list summaries as they are, without an inspect call per container
+        return self.match(container_summaries=docker_client.api.containers(all=True),
+                          image_summaries=docker_client.api.images())
+
+    def match(self, container_summaries: List[dict], image_summaries: List[dict]) -> List[ServiceStatus]:
+        """
+        Matches the builds to container and image list summaries, such as those the agent keeps.
+
+        :param container_summaries: the summaries of every container on the docker host
+        :param image_summaries: the summaries of every image on the docker host
+        :return: the status of every build
+        """
+        containers: Dict[str, dict] = {}
+        for summary in container_summaries:
+            for name in summary.get("Names") or []:
+                containers[name.lstrip("/")] = summary
+        image_ids: Dict[str, str] = {}
+        for image in image_summaries:
+            for tag in image.get("RepoTags") or []:
+                image_ids[tag] = image["Id"]
+
+        self.statuses = []
+        invites = [(invite, self.remote) for invite in self.invites]
+        if self.local_invite is not None:
+            invites.insert(0, (self.local_invite, False))
+        for invite, remote in invites:
+            for kind, builds in (("build", invite.builds), ("init", invite.init_builds)):
+                for build in builds:
+                    self.statuses.append(
+                        self._status(invite.package_name, kind, build, remote, containers, image_ids)
+                    )
+        return self.statuses
+
+    @staticmethod
+    def _status(package: str, kind: str, build: Build, remote: bool, containers: Dict[str, dict],
+                image_ids: Dict[str, str]) -> ServiceStatus:
+        image = build.core_unit.image_url if remote is True else build.core_unit.default_image_tag
+        image_id = image_ids.get(normalise_tag(image))
+        name = build.core_unit.default_container_name
+        summary = containers.get(name)
+        if summary is None:
+            return ServiceStatus(package=package, container=name, kind=kind, image=image,
+                                 image_present=image_id is not None, image_fresh=None, state="missing",
+                                 exit_code=None, ports=[])
+        match = EXIT_CODE_PATTERN.match(summary.get("Status") or "")
+        ports = [
+            f"{port.get('IP') or '0.0.0.0'}:{port['PublicPort']}->{port['PrivatePort']}/{port.get('Type', 'tcp')}"
+            for port in summary.get("Ports") or [] if port.get("PublicPort") is not None
+        ]
+        return ServiceStatus(package=package, container=name, kind=kind, image=image,
+                             image_present=image_id is not None,
+                             image_fresh=None if image_id is None else summary.get("ImageID") == image_id,
+                             state=summary.get("State", "unknown"),
+                             exit_code=None if match is None else int(match.group(1)), ports=sorted(set(ports)))
+
+    def to_json(self) -> str:
+        return json.dumps([status.to_dict() for status in self.statuses], indent=2)
+
+    def to_table(self) -> str:
+        """
+        Formats the statuses as a table with a column per field.
+
+        :return: the table
+        """
+        rows = [list(COLUMNS)] + [status.row() for status in self.statuses]
+        widths = [max(len(row[column]) for row in rows) for column in range(len(COLUMNS))]
+        return "\n".join(
+            "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows
+        )
@@ -0,0 +1,157 @@
+"""
+This file defines the tracing helpers which record timed spans for every wedpy phase and export them in the Chrome
+trace-event format so a run can be viewed in Perfetto or chrome://tracing.
+
+Tracing is switched on by setting the WEDPY_TRACE_DIR environment variable to a directory. Every process appends
+its finished spans to its own file in that directory, so spans recorded in pool workers and threads are all kept,
+and the files are merged into one trace when the command finishes.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+TRACE_DIR_ENV = "WEDPY_TRACE_DIR"
+
+_write_lock = threading.Lock()
+
+
+def trace_dir() -> Optional[str]:
+    """
+    Gets the directory spans are written to.
+
+    :return: the trace directory or None if tracing is switched off
+    """
+    return os.environ.get(TRACE_DIR_ENV)
+
+
+@contextmanager
+def span(name: str, **tags) -> Iterator[None]:
+    """
+    Records the time spent in the body of the with block as a span. Does nothing if tracing is switched off.
+
+    :param name: the name of the phase, for example "clone" or "build step"
+    :param tags: tags attached to the span such as the package and build names
+    :return: None
+    """
+    directory = trace_dir()
+    if directory is None:
+        yield
+        return
+    start = time.time_ns()
+    error: Optional[BaseException] = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        if error is not None:
+            tags["error"] = repr(error)
+        record(name=name, start_ns=start, end_ns=time.time_ns(), tags=tags, directory=directory)
+
+
+def record(name: str, start_ns: int, end_ns: int, tags: Optional[dict] = None,
+           directory: Optional[str] = None) -> None:
+    """
+    Records a finished span as a Chrome complete event in the span file of this process.
+
+    :param name: the name of the phase
+    :param start_ns: the wall-clock time the span started in nanoseconds
+    :param end_ns: the wall-clock time the span ended in nanoseconds
+    :param tags: tags attached to the span
+    :param directory: the trace directory, defaults to the one in the environment
+    :return: None
+    """
+    directory = trace_dir() if directory is None else directory
+    if directory is None:
+        return None
+    tags = {} if tags is None else tags
+    event = {
+        "name": name,
+        "cat": "wedpy",
+        "ph": "X",
+        "ts": start_ns / 1000,
+        "dur": (end_ns - start_ns) / 1000,
+        "pid": os.getpid(),
+        "tid": threading.get_native_id(),
+        "args": {key: str(value) for key, value in tags.items()},
+        "thread_name": threading.current_thread().name,
+    }
+    with _write_lock:
+        with open(os.path.join(directory, f"{os.getpid()}.jsonl"), "a") as f:
+            f.write(json.dumps(event) + "\n")
+
+
+def start() -> str:
+    """
+    Switches tracing on for this process and every process it starts.
+
+    :return: the directory the spans are written to
+    """
+    directory = tempfile.mkdtemp(prefix="wedpy-trace-")
+    os.environ[TRACE_DIR_ENV] = directory
+    return directory
+
+
+def finish(output_path: str) -> None:
+    """
+    Switches tracing off and merges the spans of every process into a Chrome trace file.
+
+    :param output_path: the path to write the Chrome trace JSON to
+    :return: None
+    """
+    directory = os.environ.pop(TRACE_DIR_ENV, None)
+    if directory is None:
+        return None
+    events = load_events(directory)
+    shutil.rmtree(directory, ignore_errors=True)
+    write_chrome_trace(events=events, output_path=output_path)
+
+
+def load_events(directory: str) -> List[dict]:
+    """
+    Loads the spans written by every process.
+
+    :param directory: the trace directory
+    :return: the recorded events sorted by start time
+    """
+    events = []
+    for filename in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, filename)) as f:
+            for line in f:
+                # a worker killed part way through a write leaves a partial last line
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return sorted(events, key=lambda event: event["ts"])
+
+
+def write_chrome_trace(events: List[dict], output_path: str) -> None:
+    """
+    Writes the events to a file in the Chrome trace-event format with the process and thread names as metadata.
+
+    :param events: the recorded events
+    :param output_path: the path to write the trace to
+    :return: None
+    """
+    metadata = []
+    seen_processes = set()
+    seen_threads = set()
+    for event in events:
+        thread_name = event.pop("thread_name", None)
+        if event["pid"] not in seen_processes:
+            seen_processes.add(event["pid"])
+            metadata.append({"name": "process_name", "ph": "M", "pid": event["pid"], "tid": 0,
+                             "args": {"name": f"wedpy ({event['pid']})"}})
+        if (event["pid"], event["tid"]) not in seen_threads and thread_name is not None:
+            seen_threads.add((event["pid"], event["tid"]))
+            metadata.append({"name": "thread_name", "ph": "M", "pid": event["pid"], "tid": event["tid"],
+                             "args": {"name": thread_name}})
+    with open(output_path, "w") as f:
+        json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,381 @@
+"""
+This file defines the PlanValidator class which checks the seating plan and wedding invites for errors before any
+clone, build or run is started.
+"""
+import os
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from wedpy import buildkit
+from wedpy.buildkit import BUILDX_BACKEND
+from wedpy.capacity import parse_memory
+from wedpy.platforms import host_arch, select_build_file
+
+
+class ValidationError(Exception):
+    """
+    The ValidationError is raised when the seating plan or one of the wedding invites is invalid.
+
+    Attributes:
+        errors (List[str]): every error found in the seating plan and wedding invites
+    """
+    def __init__(self, errors: List[str]) -> None:
+        """
+        The constructor for the ValidationError class.
+
+        :param errors: every error found in the seating plan and wedding invites
+        """
+        self.errors: List[str] = errors
+        super().__init__(
+            f"{len(errors)} error(s) found in the seating plan and wedding invites:\n" +
+            "\n".join(f"  - {error}" for error in errors)
+        )
+
+
+SEATING_PLAN_FIELDS: Dict[str, Tuple[type, ...]] = {
+    "network_name": (str,),
+    "venue": (str,),
+    "post_office": (str,),
+    "attendees": (list,),
+}
+
+ATTENDEE_FIELDS: Dict[str, Tuple[type, ...]] = {
+    "name": (str,),
+    "default_image_name": (str,),
+    "git_url": (str, type(None)),
+    "branch": (str, type(None)),
+    "image_url": (str,),
+}
+
+BUILDER_FIELDS: Dict[str, Tuple[type, ...]] = {
+    "base_url": (str,),
+    "max_builds": (int,),
+    "cert_path": (str,),
+}
+
+REQUIRED_BUILD_FIELDS: Dict[str, Tuple[type, ...]] = {
+    "name": (str,),
+    "image_url": (str,),
+    "default_image_tag": (str,),
+    "default_container_name": (str,),
+}
+
+OPTIONAL_BUILD_FIELDS: Dict[str, Tuple[type, ...]] = {
+    "default_image_name": (str,),
+    "git_url": (str,),
+    "branch": (str,),
+    "build_root": (str,),
+    "build_files": (dict,),
+    "build_lock": (bool,),
+    "config": (dict,),
+    "outside_port": (int,),
+    "inside_port": (int,),
+    "main": (bool,),
+    "build_args": (dict,),
+    "dev_mounts": (dict,),
+    "dev_command": (str, list),
+    "cpus": (int, float),
+    "memory": (int, str),
+    "build_cpus": (int, float),
+    "build_memory": (int, str),
+    "depends_on": (list,),
+    "data_volumes": (dict,),
+    "tmpfs_size": (str,),
+    "ephemeral_config": (dict,),
+    "shareable": (bool,),
+    "build_secrets": (dict,),
+}
+
+
+class PlanValidator:
+    """
+    The PlanValidator class is used to check the seating plan and wedding invites for errors before any expensive
+    work is done. Every error is collected so they can all be reported together.
+
+    Attributes:
+        seating_plan_path (str): the path to the seating plan file
+        local_wedding_invite_path (Optional[str]): the path to the local wedding invite file
+        remote (bool): whether the images will be pulled from the registry, if True the invites are read from the
+                       post office and no build files are needed
+        dev (bool): whether the main builds of the local wedding invite are skipped
+        check_build_files (bool): whether to check that builds from source have a build file for the host
+        cpu_arch (str): the CPU architecture of the host used to look up the build files
+        build_backend (str): the backend the images are built with
+        errors (List[str]): the errors found so far
+    """
+    def __init__(self, seating_plan_path: str, local_wedding_invite_path: Optional[str] = None,
+                 remote: bool = False, dev: bool = False, check_build_files: bool = True,
+                 cpu_arch: Optional[str] = None, build_backend: Optional[str] = None) -> None:
+        """
+        The constructor for the PlanValidator class.
+
+        :param seating_plan_path: the path to the seating plan file
+        :param local_wedding_invite_path: the path to the local wedding invite file
+        :param remote: whether the images will be pulled from the registry
+        :param dev: whether the main builds of the local wedding invite are skipped
+        :param check_build_files: whether to check that builds from source have a build file for the host
+        :param cpu_arch: the CPU architecture of the host, defaults to the architecture of this machine
+        :param build_backend: the backend the images are built with, defaults to the one set in the environment
+        """
+        self.seating_plan_path: str = seating_plan_path
+        self.local_wedding_invite_path: Optional[str] = local_wedding_invite_path
+        self.remote: bool = remote
+        self.dev: bool = dev
+        self.check_build_files: bool = check_build_files
+        self.cpu_arch: str = host_arch() if cpu_arch is None else cpu_arch
+        self.build_backend: str = buildkit.build_backend() if build_backend is None else build_backend
+        self.errors: List[str] = []
+        self._container_names: Dict[str, str] = {}
+        self._outside_ports: Dict[int, str] = {}
+
+    def validate(self, check_invites: bool = True) -> List[str]:
+        """
+        Validates the seating plan and, if requested, the wedding invites of the attendees and the local package.
+
+        :param check_invites: whether to check the wedding invites of the attendees as well as the seating plan
+        :return: the errors found
+        """
+        self.errors = []
+        self._container_names = {}
+        self._outside_ports = {}
+
+        seating_plan = self._load_yaml(self.seating_plan_path)
+        if seating_plan is None:
+            return self.errors
+        attendees = self.validate_seating_plan(seating_plan)
+
+        if check_invites is False:
+            return self.errors
+
+        if self.local_wedding_invite_path is not None:
+            self.validate_invite_file(self.local_wedding_invite_path, local=True)
+
+        invite_root = seating_plan.get("post_office") if self.remote is True else seating_plan.get("venue")
+        if not isinstance(invite_root, str):
+            return self.errors
+        for attendee in attendees:
+            invite_path = os.path.join(os.getcwd(), invite_root, attendee["name"], "wedding_invite.yml")
+            self.validate_invite_file(invite_path)
+        return self.errors
+
+    def raise_for_errors(self, check_invites: bool = True) -> None:
+        """
+        Validates the seating plan and wedding invites and raises if anything is wrong.
+
+        :param check_invites: whether to check the wedding invites of the attendees as well as the seating plan
+        :return: None
+        """
+        errors = self.validate(check_invites=check_invites)
+        if len(errors) > 0:
+            raise ValidationError(errors=errors)
+
+    def validate_seating_plan(self, seating_plan: dict) -> List[dict]:
+        """
+        Checks the fields of the seating plan.
+
+        :param seating_plan: the data loaded from the seating plan file
+        :return: the attendees that are valid enough to look up their wedding invites
+        """
+        location = self.seating_plan_path
+        if not isinstance(seating_plan, dict):
+            self.errors.append(f"{location}: expected a mapping at the top level")
+            return []
+        self._check_fields(seating_plan, SEATING_PLAN_FIELDS, location, required=True)
+
+        self.validate_builders(seating_plan.get("builders", []))
+
+        attendees = seating_plan.get("attendees")
+        if not isinstance(attendees, list):
+            return []
+
+        valid_attendees = []
+        seen_names = set()
+        for index, attendee in enumerate(attendees):
+            attendee_location = f"{location}: attendees[{index}]"
+            if not isinstance(attendee, dict):
+                self.errors.append(f"{attendee_location}: expected a mapping")
+                continue
+            before = len(self.errors)
+            self._check_fields(attendee, ATTENDEE_FIELDS, attendee_location, required=True)
+            name = attendee.get("name")
+            if isinstance(name, str):
+                if name in seen_names:
+                    self.errors.append(f"{attendee_location}: duplicate attendee name '{name}'")
+                seen_names.add(name)
+            if len(self.errors) == before:
+                valid_attendees.append(attendee)
+        return valid_attendees
+
+    def validate_builders(self, builders: list) -> None:
+        """
+        Checks the optional builders section of the seating plan listing the docker hosts to build on.
+
+        :param builders: the builders section of the seating plan
+        :return: None
+        """
+        location = f"{self.seating_plan_path}: builders"
+        if not isinstance(builders, list):
+            self.errors.append(f"{location}: expected a list")
+            return None
+        seen_names = set()
+        for index, builder in enumerate(builders):
+            builder_location = f"{location}[{index}]"
+            if not isinstance(builder, dict):
+                self.errors.append(f"{builder_location}: expected a mapping")
+                continue
+            self._check_fields(builder, {"name": (str,)}, builder_location, required=True)
+            self._check_fields(builder, BUILDER_FIELDS, builder_location, required=False)
+            if builder.get("name") in seen_names:
+                self.errors.append(f"{builder_location}: duplicate builder name '{builder['name']}'")
+            seen_names.add(builder.get("name"))
+            max_builds = builder.get("max_builds")
+            if isinstance(max_builds, int) and max_builds < 1:
+                self.errors.append(f"{builder_location}: 'max_builds' should be at least 1")
+
+    def validate_invite_file(self, path: str, local: bool = False) -> List[str]:
+        """
+        Loads and checks a wedding invite file. Container names and outside ports are compared against every invite
+        checked before it, so invites can be checked one at a time as they become available.
+
+        :param path: the path to the wedding invite file
+        :param local: whether this is the local wedding invite of the main repo
+        :return: the errors found in this wedding invite
+        """
+        before = len(self.errors)
+        invite = self._load_yaml(path)
+        if invite is not None:
+            self.validate_invite(invite, location=path, local=local)
+        return self.errors[before:]
+
+    def validate_invite(self, invite: dict, location: str, local: bool = False) -> None:
+        """
+        Checks the fields of a wedding invite and its builds.
+
+        :param invite: the data loaded from the wedding invite file
+        :param location: the path of the wedding invite used in error messages
+        :param local: whether this is the local wedding invite of the main repo
+        :return: None
+        """
+        if not isinstance(invite, dict):
+            self.errors.append(f"{location}: expected a mapping at the top level")
+            return None
+        self._check_fields(invite, {"package_name": (str,)}, location, required=True)
+
+        for section in ("builds", "init_builds"):
+            build_dicts = invite.get(section, [])
+            if build_dicts is None:
+                continue
+            if not isinstance(build_dicts, list):
+                self.errors.append(f"{location}: '{section}' should be a list")
+                continue
+            for index, build_dict in enumerate(build_dicts):
+                self.validate_build(build_dict, location=f"{location}: {section}[{index}]", local=local)
+
+    def validate_build(self, build_dict: dict, location: str, local: bool = False) -> None:
+        """
+        Checks the fields of a build and records its container name and outside port to find duplicates across the
+        whole seating plan.
+
+        :param build_dict: the build loaded from the wedding invite
+        :param location: the location of the build used in error messages
+        :param local: whether the build belongs to the local wedding invite of the main repo
+        :return: None
+        """
+        if not isinstance(build_dict, dict):
+            self.errors.append(f"{location}: expected a mapping")
+            return None
+        self._check_fields(build_dict, REQUIRED_BUILD_FIELDS, location, required=True)
+        self._check_fields(build_dict, OPTIONAL_BUILD_FIELDS, location, required=False)
+
+        if build_dict.get("outside_port") is not None and build_dict.get("inside_port") is None:
+            self.errors.append(f"{location}: 'outside_port' is set but 'inside_port' is missing")
+
+        for field in ("memory", "build_memory"):
+            if isinstance(build_dict.get(field), str):
+                try:
+                    parse_memory(build_dict[field])
+                except ValueError as e:
+                    self.errors.append(f"{location}: field '{field}': {e}")
+
+        skipped = local is True and self.dev is True and build_dict.get("main", False) is True \
+            and not build_dict.get("dev_mounts")
+        builds_locally = self.check_build_files is True and build_dict.get("git_url") is not None \
+            and (self.remote is False or local is True)
+        if builds_locally is True and skipped is False and build_dict.get("build_lock", False) is not True:
+            build_files = build_dict.get("build_files")
+            if build_files is None:
+                self.errors.append(f"{location}: 'build_files' is required to build from source")
+            elif isinstance(build_files, dict) and select_build_file(build_files, self.cpu_arch) is None:
+                self.errors.append(
+                    f"{location}: no build file for the host architecture '{self.cpu_arch}' "
+                    f"(declared: {', '.join(str(key) for key in build_files)})"
+                )
+        if builds_locally is True and skipped is False and build_dict.get("build_root") is None:
+            self.errors.append(f"{location}: 'build_root' is required to build from source")
+        if builds_locally is True and skipped is False and build_dict.get("build_secrets") \
+                and self.build_backend != BUILDX_BACKEND:
+            self.errors.append(f"{location}: 'build_secrets' need the buildx build backend, the docker backend "
+                               f"cannot mount secrets")
+
+        container_name = build_dict.get("default_container_name")
+        if isinstance(container_name, str):
+            if container_name in self._container_names:
+                self.errors.append(
+                    f"{location}: duplicate container name '{container_name}' "
+                    f"(also used by {self._container_names[container_name]})"
+                )
+            else:
+                self._container_names[container_name] = location
+
+        outside_port = build_dict.get("outside_port")
+        if isinstance(outside_port, int) and not isinstance(outside_port, bool):
+            if outside_port in self._outside_ports:
+                self.errors.append(
+                    f"{location}: duplicate outside port {outside_port} "
+                    f"(also used by {self._outside_ports[outside_port]})"
+                )
+            else:
+                self._outside_ports[outside_port] = location
+
+    def _check_fields(self, data: dict, fields: Dict[str, Tuple[type, ...]], location: str,
+                      required: bool) -> None:
+        """
+        Checks that the fields are present (if required) and of the right type.
+
+        :param data: the mapping to check
+        :param fields: a map of field names to the types that are allowed for the field
+        :param location: the location of the mapping used in error messages
+        :param required: whether the fields must be present
+        :return: None
+        """
+        for field, types in fields.items():
+            if field not in data:
+                if required is True:
+                    self.errors.append(f"{location}: missing required field '{field}'")
+                continue
+            value = data[field]
+            if value is None and required is False:
+                continue
+            # bool is a subclass of int so it is ruled out explicitly for integer fields
+            if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+                expected = " or ".join("null" if t is type(None) else t.__name__ for t in types)
+                self.errors.append(
+                    f"{location}: field '{field}' should be {expected}, got {type(value).__name__}"
+                )
+
+    def _load_yaml(self, path: str) -> Optional[dict]:
+        """
+        Loads a yaml file, recording an error if it cannot be read or parsed.
+
+        :param path: the path to the yaml file
+        :return: the loaded data or None if it could not be loaded
+        """
+        try:
+            with open(path, "r") as f:
+                return yaml.safe_load(f)
+        except FileNotFoundError:
+            self.errors.append(f"{path}: file not found")
+        except yaml.YAMLError as e:
+            self.errors.append(f"{path}: invalid yaml: {e}")
+        return None
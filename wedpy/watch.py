@@ -0,0 +1,247 @@
+"""
+This file defines the Watcher class which watches the build roots of the local wedding invite and of the dependencies
+in the venue, and rebuilds and replaces only the containers whose source changed while the rest of the network keeps
+running.
+"""
+import os
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from wedpy import tracing
+from wedpy.wedding_invite.build import Build
+from wedpy.wedding_invite.wedding_invite import WeddingInvite
+
+if TYPE_CHECKING:
+    from docker.models.containers import ContainerCollection
+
+
+# directories that never hold build inputs worth rebuilding for
+IGNORED_DIRECTORIES = {".git", "__pycache__", ".mypy_cache", ".pytest_cache", "node_modules", ".wedpy"}
+
+# a map of file paths to their modification time and size
+Snapshot = Dict[str, Tuple[float, int]]
+
+
+class WatchTarget:
+    """
+    The WatchTarget class is a build whose build root is watched for changes.
+
+    Attributes:
+        build (Build): the build rebuilt when its source changes
+        package_root (str): the root directory of the package the build belongs to
+        build_root (str): the absolute path of the directory the build is built from
+        invite (WeddingInvite): the wedding invite the build belongs to, whose init builds are run again after the
+                                build is replaced
+    """
+    def __init__(self, build: Build, package_root: str, invite: WeddingInvite) -> None:
+        """
+        The constructor for the WatchTarget class.
+
+        :param build: the build rebuilt when its source changes
+        :param package_root: the root directory of the package the build belongs to
+        :param invite: the wedding invite the build belongs to
+        """
+        self.build: Build = build
+        self.package_root: str = package_root
+        self.build_root: str = os.path.abspath(os.path.join(package_root, build.core_unit.build_root or "."))
+        self.invite: WeddingInvite = invite
+
+    @property
+    def is_init(self) -> bool:
+        return self.build in self.invite.init_builds
+
+    def owns(self, path: str) -> bool:
+        """
+        Checks whether a changed file is part of the build context of the build.
+
+        :param path: the absolute path of the changed file
+        :return: True if the file is inside the build root
+        """
+        return path == self.build_root or path.startswith(self.build_root + os.sep)
+
+    @classmethod
+    def from_invite(cls, invite: WeddingInvite, package_root: str, dev: bool = False) -> List["WatchTarget"]:
+        """
+        Creates the targets for every build from source in a wedding invite.
+
+        :param invite: the wedding invite
+        :param package_root: the root directory of the package
+        :param dev: whether or not to skip the main builds without dev mounts, which are run by hand in dev mode
+        :return: the targets
+        """
+        return [
+            cls(build=build, package_root=package_root, invite=invite) for build in invite.builds + invite.init_builds
+            if build.core_unit.git_url is not None and not (dev is True and build.skipped_in_dev is True)
+        ]
+
+
+class Watcher:
+    """
+    The Watcher class polls the build roots of the targets for changes. Once a burst of changes has settled, every
+    target whose build root holds a changed file is rebuilt and its container replaced, followed by the init
+    containers of the same wedding invite. Containers of other builds are left running.
+
+    Attributes:
+        targets (List[WatchTarget]): the builds being watched
+        runner (ContainerCollection): the container collection of the docker client the containers run in
+        network_name (str): the name of the docker network the containers are connected to
+        debounce (float): the seconds without changes to wait for before rebuilding
+        poll_interval (float): the seconds between scans of the build roots
+        dev (bool): whether the containers are replaced with their dev mounts and dev command
+    """
+    def __init__(self, targets: List[WatchTarget], runner: "ContainerCollection", network_name: str,
+                 debounce: float = 0.5, poll_interval: float = 0.5, dev: bool = False) -> None:
+        """
+        The constructor for the Watcher class.
+
+        :param targets: the builds being watched
+        :param runner: the container collection of the docker client the containers run in
+        :param network_name: the name of the docker network the containers are connected to
+        :param debounce: the seconds without changes to wait for before rebuilding
+        :param poll_interval: the seconds between scans of the build roots
+        :param dev: whether the containers are replaced with their dev mounts and dev command
+        """
+        self.targets: List[WatchTarget] = targets
+        self.runner: "ContainerCollection" = runner
+        self.network_name: str = network_name
+        self.debounce: float = debounce
+        self.poll_interval: float = poll_interval
+        self.dev: bool = dev
+
+    def snapshot(self) -> Snapshot:
+        """
+        Records the modification time and size of every file under the watched build roots.
+
+        :return: the snapshot
+        """
+        snapshot: Snapshot = {}
+        for root in sorted({target.build_root for target in self.targets}):
+            for directory, directories, files in os.walk(root):
+                directories[:] = [d for d in directories if d not in IGNORED_DIRECTORIES]
+                for name in files:
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    snapshot[path] = (stat.st_mtime, stat.st_size)
+        return snapshot
+
+    @staticmethod
+    def changed_paths(before: Snapshot, after: Snapshot) -> Set[str]:
+        """
+        Gets the files that were added, removed or modified between two snapshots.
+
+        :param before: the earlier snapshot
+        :param after: the later snapshot
+        :return: the changed paths
+        """
+        return {path for path in before.keys() | after.keys() if before.get(path) != after.get(path)}
+
+    def owners(self, paths: Set[str]) -> List[WatchTarget]:
+        """
+        Gets the targets whose build context holds any of the changed files.
+
+        :param paths: the changed paths
+        :return: the targets to rebuild in the order they were given
+        """
+        return [target for target in self.targets if any(target.owns(path) for path in paths)]
+
+    def replace(self, targets: List[WatchTarget]) -> None:
+        """
+        Rebuilds the images of the targets and replaces their containers, then runs the init containers of their
+        wedding invites again.
+
+        :param targets: the targets to rebuild
+        :return: None
+        """
+        from docker.errors import DockerException
+
+        from wedpy.wedding_invite import wedding_invite
+
+        init_builds: Dict[int, Tuple[WeddingInvite, List[Build], str]] = {}
+        for target in targets:
+            name = target.build.core_unit.default_container_name
+            try:
+                with tracing.span("watch rebuild", **target.build.trace_tags):
+                    target.build.build_image(target.package_root, None)
+            except DockerException as e:
+                print(f"{name} failed to rebuild, the old container is left running: {e}")
+                continue
+            try:
+                self._replace_container(build=target.build, package_root=target.package_root)
+            except DockerException as e:
+                # the old container is removed before the new one runs, so nothing is left running
+                print(f"{name} failed to restart and is down until its next change: {e}")
+                continue
+            print(f"{name} rebuilt and restarted")
+            if target.is_init is False:
+                _, builds, _ = init_builds.setdefault(id(target.invite), (target.invite, [], target.package_root))
+                builds.extend(b for b in target.invite.init_builds if b not in builds)
+        # init builds rebuilt above already ran against the new containers
+        rebuilt = {target.build for target in targets}
+        for invite, builds, package_root in init_builds.values():
+            builds = [build for build in builds if build not in rebuilt]
+            if len(builds) == 0:
+                continue
+            with tracing.span("readiness wait", package=invite.package_name):
+                time.sleep(wedding_invite.INIT_CONTAINER_DELAY)
+            for build in builds:
+                try:
+                    self._replace_container(build=build, package_root=package_root)
+                except DockerException as e:
+                    print(f"{build.core_unit.default_container_name} failed to run again: {e}")
+
+    def _replace_container(self, build: Build, package_root: str) -> None:
+        from docker.errors import NotFound
+
+        try:
+            build.delete_container(runner=self.runner)
+        except NotFound:
+            pass
+        build.run_container(runner=self.runner, network_name=self.network_name, dev=self.dev,
+                            package_root=package_root)
+
+    def poll(self, snapshot: Snapshot) -> Tuple[Snapshot, Optional[List[WatchTarget]]]:
+        """
+        Scans the build roots once. If anything changed, keeps scanning until nothing has changed for the debounce
+        time so a burst of saves results in one rebuild.
+
+        :param snapshot: the snapshot from the previous scan
+        :return: the new snapshot and the targets to rebuild, or None if nothing changed
+        """
+        current = self.snapshot()
+        changed = self.changed_paths(snapshot, current)
+        if len(changed) == 0:
+            return current, None
+        quiet_since = time.monotonic()
+        while time.monotonic() - quiet_since < self.debounce:
+            time.sleep(min(self.poll_interval, self.debounce))
+            latest = self.snapshot()
+            more = self.changed_paths(current, latest)
+            if len(more) > 0:
+                changed |= more
+                quiet_since = time.monotonic()
+            current = latest
+        return current, self.owners(changed)
+
+    def run(self, max_polls: Optional[int] = None) -> None:
+        """
+        Watches the build roots until interrupted.
+
+        :param max_polls: the number of scans to stop after, None to watch forever
+        :return: None
+        """
+        snapshot = self.snapshot()
+        print(f"watching {len({target.build_root for target in self.targets})} build roots "
+              f"for {len(self.targets)} builds, press Ctrl+C to stop")
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            snapshot, targets = self.poll(snapshot)
+            if targets:
+                self.replace(targets)
+                # files written by the build itself should not trigger another rebuild
+                snapshot = self.snapshot()
+            polls += 1
+            if max_polls is None or polls < max_polls:
+                time.sleep(self.poll_interval)
@@ -2,14 +2,34 @@
 This file defines the Build class, which is used to build/pull a docker image and run a container for each build.
 """
 import os
-import platform
-from typing import Optional
-
-import docker
-from docker.client import ContainerCollection
-from docker.errors import ImageNotFound
+import shlex
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Tuple
 
+from wedpy import tracing
+from wedpy.artifact_cache import FINGERPRINT_LABEL, ArtifactCache, fingerprint
+from wedpy.buildkit import BUILDX_BACKEND, BuildxBuilder, build_backend
+from wedpy.capacity import DEFAULT_BUILD_CPUS, DEFAULT_BUILD_MEMORY, Demand
 from wedpy.core_unit import CoreUnit
+from wedpy.docker_client import get_client
+from wedpy.journal import Journal
+from wedpy.platforms import daemon_arch, host_arch, select_build_file
+from wedpy.shared import SHARED_LABEL, holders, shared_fingerprint
+
+if TYPE_CHECKING:
+    from docker import DockerClient
+    from docker.models.containers import Container, ContainerCollection
+
+    from wedpy.engine import AsyncEngineClient
+
+
+# the label of the named data volumes holding the network they were created for, so teardown can remove them
+DATA_VOLUME_LABEL = "wedpy.network"
+
+# the storage profiles a container can be run with, the ephemeral profile keeps the data directories in memory
+DEFAULT_PROFILE = "default"
+EPHEMERAL_PROFILE = "ephemeral"
+PROFILES = (DEFAULT_PROFILE, EPHEMERAL_PROFILE)
 
 
 class Build:
@@ -18,14 +38,50 @@ class Build:
 
     Attributes:
         core_unit (CoreUnit): the CoreUnit data loaded from the wedding invite for each build object to build.
+        package_name (Optional[str]): the name of the package the build belongs to
+        init (bool): whether the build is an init build, whose container runs to completion rather than staying up
     """
-    def __init__(self, unit: CoreUnit) -> None:
+    def __init__(self, unit: CoreUnit, package_name: Optional[str] = None, init: bool = False) -> None:
         """
         The constructor for the Build class.
 
         :param unit: the CoreUnit data loaded from the wedding invite for each build object to build.
+        :param package_name: the name of the package the build belongs to
+        :param init: whether the build is an init build, whose container runs to completion rather than staying up
         """
         self.core_unit: CoreUnit = unit
+        self.package_name: Optional[str] = package_name
+        self.init: bool = init
+
+    @property
+    def trace_tags(self) -> dict:
+        return {"package": self.package_name, "build": self.core_unit.name}
+
+    @property
+    def run_demand(self) -> Demand:
+        """
+        The cores and memory the running container holds on to, nothing unless it has limits.
+        """
+        return self.core_unit.cpus or 0.0, self.core_unit.memory or 0
+
+    def build_demand(self, remote: bool = False) -> Demand:
+        """
+        Gets the cores and memory the build needs while it runs.
+
+        :param remote: whether the image is pulled from the registry instead of built
+        :return: the cpus and bytes of memory, pulls only need a small share of a core
+        """
+        if self.core_unit.git_url is None or remote is True:
+            return DEFAULT_BUILD_CPUS / 4, 0
+        return self.core_unit.build_cpus or DEFAULT_BUILD_CPUS, self.core_unit.build_memory or DEFAULT_BUILD_MEMORY
+
+    @property
+    def skipped_in_dev(self) -> bool:
+        """
+        Whether the build is left out in dev mode, which is the case for main builds that are run by hand unless
+        they mount their live source into the image.
+        """
+        return self.core_unit.main is True and len(self.core_unit.dev_mounts) == 0
 
     def pull_image(self) -> None:
         """
@@ -33,44 +89,167 @@ class Build:
 
         :return: None
         """
-        docker_client = docker.from_env()
-        docker_client.images.pull(self.core_unit.image_url)
+        docker_client = get_client()
+        with tracing.span("pull", image=self.core_unit.image_url, **self.trace_tags):
+            docker_client.images.pull(self.core_unit.image_url)
 
-    def build_image(self, package_root: str, tag: Optional[str], remote: bool = False) -> None:
+    def build_image(self, package_root: str, tag: Optional[str], remote: bool = False,
+                    docker_client: Optional["DockerClient"] = None) -> None:
         """
-        Builds the docker image from the Dockerfile.
+        Builds the docker image from the Dockerfile, or loads it from the artifact cache if the cache is switched on
+        and holds a bundle built from the same inputs. If the journal is switched on and records the image as built
+        from the same inputs, and the image still exists, nothing is done. Built images are labelled with the
+        fingerprint of their inputs, which wedpy-publish records for the image it pushes.
 
         :param package_root: root directory of the package
         :param tag: tag to use for the image build
         :param remote: whether to pull the image from the registry or build it locally if True, pull it
+        :param docker_client: the docker client of the host to build on, defaults to the docker client from the
+                              environment
         :return: None
         """
+        journal = Journal.from_env()
         if self.core_unit.git_url is None or remote is True:
+            if journal is not None and journal.is_done("pull", self.core_unit.image_url, "pulled") is True \
+                    and self._image_exists(get_client(), self.core_unit.image_url) is True:
+                return None
             self.pull_image()
+            if journal is not None:
+                journal.record("pull", self.core_unit.image_url, "pulled")
             return None
 
         build_context_path = str(os.path.join(package_root, self.core_unit.build_root))
-
-        if self.core_unit.build_lock is True:
-            dockerfile_path = "Dockerfile"
-        else:
-            cpu_arch = platform.processor()
-            dockerfile_path = self.core_unit.build_files[cpu_arch]
+        # a builder host picks the build file for its own architecture rather than this machine's
+        dockerfile_path = self.build_file(docker_client=docker_client)
 
         if tag is None:
             image_tag = self.core_unit.default_image_tag
         else:
             image_tag = tag
 
-        docker_client = docker.from_env()
-        image, build_logs = docker_client.images.build(
-            path=build_context_path,
-            dockerfile=dockerfile_path,
-            tag=image_tag,
-            buildargs=self.core_unit.build_args
-        )
+        if docker_client is None:
+            docker_client = get_client()
+
+        artifact_cache = ArtifactCache.from_env()
+        build_fingerprint = fingerprint(context_path=build_context_path, dockerfile=dockerfile_path,
+                                        build_args=self.core_unit.build_args)
+        labels = {FINGERPRINT_LABEL: build_fingerprint}
+        if journal is not None and journal.is_done("image", image_tag, build_fingerprint) is True \
+                and self._image_exists(docker_client, image_tag) is True:
+            return None
+        if artifact_cache is not None:
+            if artifact_cache.load(build_fingerprint, tag=image_tag, docker_client=docker_client) is True:
+                if journal is not None:
+                    journal.record("image", image_tag, build_fingerprint)
+                return None
+
+        backend = build_backend()
+        with tracing.span("build", image=image_tag, backend=backend, **self.trace_tags):
+            if backend == BUILDX_BACKEND:
+                BuildxBuilder.from_env().build(context_path=build_context_path, dockerfile=dockerfile_path,
+                                               tag=image_tag, build_args=self.core_unit.build_args,
+                                               secrets=self.core_unit.build_secrets, docker_client=docker_client,
+                                               trace_tags=self.trace_tags, labels=labels)
+            else:
+                self._build_with_docker(docker_client, build_context_path, dockerfile_path, image_tag, labels=labels)
+
+        if artifact_cache is not None:
+            try:
+                artifact_cache.store(build_fingerprint, tag=image_tag, docker_client=docker_client)
+            except Exception as e:
+                # the cache only saves other machines a build, so the image just built is used all the same
+                print(f"warning: {image_tag} could not be stored in the artifact cache: {e}")
+        if journal is not None:
+            journal.record("image", image_tag, build_fingerprint)
+
+    def build_file(self, docker_client: Optional["DockerClient"] = None) -> str:
+        """
+        Gets the Dockerfile the image is built from.
+
+        :param docker_client: the docker client of the host the image is built on, None for this machine
+        :return: the path of the Dockerfile relative to the build context
+        """
+        if self.core_unit.build_lock is True:
+            return "Dockerfile"
+        arch = None if docker_client is None else daemon_arch(docker_client)
+        dockerfile_path = select_build_file(self.core_unit.build_files, arch)
+        if dockerfile_path is None:
+            raise ValueError(f"{self.core_unit.name} has no build file for the architecture '{arch or host_arch()}' "
+                             f"(declared: {', '.join(self.core_unit.build_files)})")
+        return dockerfile_path
 
-    def delete_container(self, runner: ContainerCollection) -> None:
+    def _build_with_docker(self, docker_client: "DockerClient", build_context_path: str, dockerfile_path: str,
+                           image_tag: str, labels: Optional[Dict[str, str]] = None) -> None:
+        """
+        Builds the docker image with the legacy builder of the docker daemon.
+
+        :param docker_client: the docker client of the host to build on
+        :param build_context_path: the directory the image is built from
+        :param dockerfile_path: the path of the Dockerfile relative to the build context
+        :param image_tag: the tag of the image
+        :param labels: the labels of the image
+        :return: None
+        """
+        limits = {}
+        if self.core_unit.build_memory is not None:
+            limits["container_limits"] = {"memory": self.core_unit.build_memory,
+                                          "memswap": self.core_unit.build_memory}
+        # the low level API is streamed so the time spent on each step of the Dockerfile can be traced
+        with tracing.span("context upload", image=image_tag, **self.trace_tags):
+            build_logs = docker_client.api.build(
+                path=build_context_path,
+                dockerfile=dockerfile_path,
+                tag=image_tag,
+                buildargs=self.core_unit.build_args,
+                labels=labels,
+                decode=True,
+                **limits
+            )
+        self._follow_build_logs(build_logs=build_logs)
+
+    @staticmethod
+    def _image_exists(docker_client: "DockerClient", reference: str) -> bool:
+        """
+        Checks whether an image is on the docker host, for the journal to skip builds and pulls it already finished.
+
+        :param docker_client: the docker client of the docker host
+        :param reference: the tag or image url of the image
+        :return: True if the image is on the docker host
+        """
+        from docker.errors import ImageNotFound
+
+        try:
+            docker_client.images.get(reference)
+        except ImageNotFound:
+            return False
+        return True
+
+    def _follow_build_logs(self, build_logs: Iterable[dict]) -> None:
+        """
+        Reads the build output until the build finishes, recording a span for every step of the Dockerfile.
+
+        :param build_logs: the decoded build output streamed from the docker daemon
+        :return: None
+        """
+        from docker.errors import BuildError
+
+        logs = []
+        step: Optional[str] = None
+        step_start = time.time_ns()
+        for chunk in build_logs:
+            logs.append(chunk)
+            if "error" in chunk:
+                raise BuildError(chunk["error"], logs)
+            line = chunk.get("stream", "")
+            if line.startswith("Step "):
+                now = time.time_ns()
+                if step is not None:
+                    tracing.record("build step", step_start, now, dict(self.trace_tags, step=step))
+                step, step_start = line.strip(), now
+        if step is not None:
+            tracing.record("build step", step_start, time.time_ns(), dict(self.trace_tags, step=step))
+
+    def delete_container(self, runner: "ContainerCollection") -> None:
         """
         Deletes the container.
 
@@ -87,35 +266,378 @@ class Build:
 
         :return: None
         """
-        client = docker.from_env()
+        from docker.errors import ImageNotFound
+
+        client = get_client()
         try:
-            image = client.images.get(self.core_unit.default_image_tag)
-            client.images.remove(image.id, force=True)
+            with tracing.span("image removal", image=self.core_unit.default_image_tag, **self.trace_tags):
+                image = client.images.get(self.core_unit.default_image_tag)
+                client.images.remove(image.id, force=True)
             print(f"{self.core_unit.default_container_name} deleted successfully.")
         except ImageNotFound as e:
             print(f"Error deleting {self.core_unit.default_container_name}: {e}")
 
-    def run_container(self, runner: ContainerCollection, network_name: str, remote: bool = False) -> None:
+    def dev_volumes(self, package_root: str) -> Dict[str, dict]:
+        """
+        Gets the bind mounts of the live source used in dev mode.
+
+        :param package_root: root directory of the package, the host paths of the mounts are relative to it
+        :return: the volumes in the format taken by docker, keyed by absolute host path
+        """
+        return {
+            os.path.abspath(os.path.join(package_root, host_path)): {"bind": container_path, "mode": "rw"}
+            for host_path, container_path in self.core_unit.dev_mounts.items()
+        }
+
+    def volume_name(self, key: str) -> str:
+        """
+        Gets the name of a named data volume of the build, unique to its container so instances do not share data.
+
+        :param key: the name of the data volume in the wedding invite
+        :return: the name of the docker volume
+        """
+        return f"{self.core_unit.default_container_name}_{key}"
+
+    def shared_container_name(self, fingerprint: str) -> str:
+        """
+        Gets the name of the container of a shareable build, the same in every seating plan that shares it.
+
+        :param fingerprint: the fingerprint of what the container is run with
+        :return: the name of the shared container
+        """
+        return f"wedpy_shared_{self.core_unit.name}_{fingerprint[:12]}"
+
+    def data_volumes(self, runner: "ContainerCollection", network_name: str,
+                     shared: Optional[str] = None) -> Dict[str, dict]:
+        """
+        Creates the named data volumes of the build if they do not exist yet.
+
+        :param runner: the runner of the network the container runs in
+        :param network_name: the name of the network, recorded on the volumes so teardown can remove them
+        :param shared: the fingerprint of the shared container the volumes belong to, they then outlive the network
+                       and are removed with the container
+        :return: the volumes in the format taken by docker, keyed by volume name
+        """
+        volumes = {}
+        for name, (labels, container_path) in self.data_volume_specs(network_name=network_name,
+                                                                     shared=shared).items():
+            # creating a volume that exists returns the existing volume with its data
+            runner.client.volumes.create(name=name, labels=labels)
+            volumes[name] = {"bind": container_path, "mode": "rw"}
+        return volumes
+
+    def data_volume_specs(self, network_name: str, shared: Optional[str] = None) -> Dict[str, Tuple[dict, str]]:
+        """
+        Gets the names and labels of the named data volumes of the build.
+
+        :param network_name: the name of the network, recorded on the volumes so teardown can remove them
+        :param shared: the fingerprint of the shared container the volumes belong to
+        :return: the labels of each volume and the path it is mounted at, keyed by volume name
+        """
+        specs = {}
+        for key, container_path in self.core_unit.data_volumes.items():
+            if shared is None:
+                specs[self.volume_name(key)] = ({DATA_VOLUME_LABEL: network_name}, container_path)
+            else:
+                specs[f"{self.shared_container_name(shared)}_{key}"] = ({SHARED_LABEL: shared}, container_path)
+        return specs
+
+    def tmpfs_mounts(self) -> Dict[str, str]:
+        """
+        Gets the tmpfs mounts replacing the data volumes of the build in the ephemeral profile.
+
+        :return: the mount options keyed by container path, in the format taken by docker
+        """
+        options = "rw" if self.core_unit.tmpfs_size is None else f"rw,size={self.core_unit.tmpfs_size}"
+        return {container_path: options for container_path in self.core_unit.data_volumes.values()}
+
+    def run_options(self, remote: bool = False, dev: bool = False, package_root: str = ".",
+                    profile: str = DEFAULT_PROFILE) -> Tuple[str, Dict[str, str], dict]:
+        """
+        Gets what the container is run with, apart from its data volumes which are created when it is run.
+
+        :param remote: whether to run the image from the registry instead of the locally built one
+        :param dev: whether to mount the live source and run the dev command, ignored for images from the registry
+        :param package_root: root directory of the package, used to resolve the dev mounts
+        :param profile: the storage profile, in the ephemeral profile the data directories are kept in tmpfs and the
+                        ephemeral config of the build is added to its config
+        :return: the image, the environment variables and the mounts, limits and command of the container
+        """
+        if remote is True:
+            image = self.core_unit.image_url
+        else:
+            image = self.core_unit.default_image_tag
+        environment = self.core_unit.config
+        options = {}
+        if self.core_unit.cpus is not None:
+            options["nano_cpus"] = int(self.core_unit.cpus * 1e9)
+        if self.core_unit.memory is not None:
+            options["mem_limit"] = self.core_unit.memory
+        if profile == EPHEMERAL_PROFILE:
+            environment = dict(self.core_unit.config, **self.core_unit.ephemeral_config)
+            if len(self.core_unit.data_volumes) > 0:
+                options["tmpfs"] = self.tmpfs_mounts()
+        # an image from the registry has no source checked out next to it, the post office only holds the invites
+        live_source = dev is True and remote is False
+        if live_source is True and len(self.core_unit.dev_mounts) > 0:
+            options["volumes"] = self.dev_volumes(package_root=package_root)
+        if live_source is True and self.core_unit.dev_command is not None:
+            options["command"] = self.core_unit.dev_command
+        return image, environment, options
+
+    def run_container(self, runner: "ContainerCollection", network_name: str, remote: bool = False,
+                      dev: bool = False, package_root: str = ".", profile: str = DEFAULT_PROFILE) -> None:
         """
         Runs the container.
 
         :param runner: the runner of the network to run the container in.
         :param network_name: the name of the network to run the container in.
+        :param remote: whether to run the image from the registry instead of the locally built one
+        :param dev: whether to mount the live source and run the dev command
+        :param package_root: root directory of the package, used to resolve the dev mounts
+        :param profile: the storage profile, in the ephemeral profile the data directories are kept in tmpfs and the
+                        ephemeral config of the build is added to its config
         :return: None
         """
         if self.core_unit.outside_port is None:
             ports = None
         else:
             ports = {f'{self.core_unit.inside_port}/tcp': ('0.0.0.0', self.core_unit.outside_port)}
-        if remote is True:
-            image = self.core_unit.image_url
-        else:
-            image = self.core_unit.default_image_tag
-        runner.run(
+        image, environment, options = self.run_options(remote=remote, dev=dev, package_root=package_root,
+                                                       profile=profile)
+        if self.core_unit.shareable is True:
+            self._run_shared(runner=runner, network_name=network_name, image=image, environment=environment,
+                             **options)
+            return None
+        if profile != EPHEMERAL_PROFILE and len(self.core_unit.data_volumes) > 0:
+            options["volumes"] = dict(self.data_volumes(runner=runner, network_name=network_name),
+                                      **options.get("volumes", {}))
+        journal = Journal.from_env()
+        name = self.core_unit.default_container_name
+        if journal is not None and journal.is_done("container", name, image) is True:
+            container = self._get_container(runner)
+            if container is not None:
+                if self._container_done(container.attrs["State"]) is True:
+                    return None
+                # a container that stopped or failed since it was started is run again
+                container.remove(force=True)
+        with tracing.span("container create/start", container=self.core_unit.default_container_name,
+                          **self.trace_tags):
+            if self.core_unit.network_alias is not None:
+                self._run_with_alias(runner=runner, network_name=network_name, image=image,
+                                     environment=environment, **options)
+            else:
+                runner.run(
+                    image=image,
+                    environment=environment,
+                    detach=True,
+                    network=network_name,
+                    name=self.core_unit.default_container_name,
+                    ports=ports,
+                    **options
+                )
+        if journal is not None:
+            journal.record("container", name, image)
+
+    def container_body(self, network_name: str, image: str, environment: Dict[str, str],
+                       volumes: Optional[Dict[str, dict]] = None, command=None, nano_cpus: Optional[int] = None,
+                       mem_limit: Optional[int] = None, tmpfs: Optional[Dict[str, str]] = None) -> dict:
+        """
+        Gets the configuration the Engine API creates the container from, the same container run_container runs.
+
+        :param network_name: the name of the network to run the container in
+        :param image: the image to run
+        :param environment: the environment variables of the container
+        :param volumes: the data volumes and the bind mounts of the live source in dev mode
+        :param command: the command run instead of the image command in dev mode
+        :param nano_cpus: the most cores the container may use in billionths of a core
+        :param mem_limit: the most bytes of memory the container may use
+        :param tmpfs: the tmpfs mounts of the data directories in the ephemeral profile
+        :return: the body of the container create call
+        """
+        host_config = {"NetworkMode": network_name}
+        body = {"Image": image, "Env": [f"{key}={value}" for key, value in environment.items()],
+                "Labels": self.core_unit.labels, "HostConfig": host_config}
+        if self.core_unit.outside_port is not None:
+            port = f"{self.core_unit.inside_port}/tcp"
+            body["ExposedPorts"] = {port: {}}
+            host_config["PortBindings"] = {port: [{"HostIp": "0.0.0.0", "HostPort": str(self.core_unit.outside_port)}]}
+        if volumes:
+            host_config["Binds"] = [f"{source}:{mount['bind']}:{mount['mode']}" for source, mount in volumes.items()]
+        if command is not None:
+            body["Cmd"] = shlex.split(command) if isinstance(command, str) else command
+        if nano_cpus is not None:
+            host_config["NanoCpus"] = nano_cpus
+        if mem_limit is not None:
+            host_config["Memory"] = mem_limit
+        if tmpfs is not None:
+            host_config["Tmpfs"] = tmpfs
+        body["NetworkingConfig"] = {"EndpointsConfig": {network_name: {
+            "Aliases": [self.core_unit.network_alias or self.core_unit.default_container_name]
+        }}}
+        return body
+
+    async def run_container_async(self, engine: "AsyncEngineClient", network_name: str, remote: bool = False,
+                                  dev: bool = False, package_root: str = ".", profile: str = DEFAULT_PROFILE) -> None:
+        """
+        Runs the container over the asyncio engine client, so the containers of many builds can be started at once.
+        Shareable builds are run with run_container, as docker-py finds and attaches their shared containers.
+
+        :param engine: the asyncio engine client
+        :param network_name: the name of the network to run the container in.
+        :param remote: whether to run the image from the registry instead of the locally built one
+        :param dev: whether to mount the live source and run the dev command
+        :param package_root: root directory of the package, used to resolve the dev mounts
+        :param profile: the storage profile the container is run with
+        :return: None
+        """
+        from wedpy.engine import EngineNotFound
+
+        if self.core_unit.shareable is True:
+            raise ValueError(f"{self.core_unit.name} is shareable, run it with run_container")
+        image, environment, options = self.run_options(remote=remote, dev=dev, package_root=package_root,
+                                                       profile=profile)
+        if profile != EPHEMERAL_PROFILE and len(self.core_unit.data_volumes) > 0:
+            volumes = {}
+            for name, (labels, container_path) in self.data_volume_specs(network_name=network_name).items():
+                await engine.create_volume(name, labels=labels)
+                volumes[name] = {"bind": container_path, "mode": "rw"}
+            options["volumes"] = dict(volumes, **options.get("volumes", {}))
+        journal = Journal.from_env()
+        name = self.core_unit.default_container_name
+        if journal is not None and journal.is_done("container", name, image) is True:
+            try:
+                state = (await engine.inspect_container(name))["State"]
+            except EngineNotFound:
+                state = None
+            if state is not None:
+                if self._container_done(state) is True:
+                    return None
+                await engine.remove_container(name, force=True)
+        with tracing.span("container create/start", container=name, **self.trace_tags):
+            container_id = await engine.create_container(
+                self.container_body(network_name=network_name, image=image, environment=environment, **options),
+                name=name
+            )
+            await engine.start_container(container_id)
+        if journal is not None:
+            journal.record("container", name, image)
+
+    def _get_container(self, runner: "ContainerCollection") -> Optional["Container"]:
+        """
+        Gets the container of the build, for the journal to check whether it still needs to be run.
+
+        :param runner: the runner of the network the container was run in
+        :return: the container, or None if it is not on the docker host
+        """
+        from docker.errors import NotFound
+
+        try:
+            return runner.get(self.core_unit.default_container_name)
+        except NotFound:
+            return None
+
+    def _container_done(self, state: dict) -> bool:
+        """
+        Checks whether a container the journal recorded as started does not need to be run again.
+
+        :param state: the State of the container, as the docker daemon reports it on inspect
+        :return: True if the container is running, or if it is the container of an init build that exited successfully
+        """
+        if state.get("Running") is True:
+            return True
+        return self.init is True and state.get("Status") == "exited" and state.get("ExitCode") == 0
+
+    def _run_shared(self, runner: "ContainerCollection", network_name: str, image: str, environment: Dict[str, str],
+                    **options) -> None:
+        """
+        Attaches the container of a shareable build to the network, starting it first if no identical container is
+        on the docker host yet. The container is reached by its original name on every network it is attached to.
+
+        :param runner: the runner of the network to attach the container to
+        :param network_name: the name of the network to attach the container to
+        :param image: the image to run
+        :param environment: the environment variables of the container
+        :param options: the mounts, limits and command the container is run with
+        :return: None
+        """
+        from docker.errors import APIError
+
+        alias = self.core_unit.network_alias or self.core_unit.default_container_name
+        fingerprint = shared_fingerprint(
+            image_id=runner.client.images.get(image).id, environment=environment,
+            run_options=dict(options, inside_port=self.core_unit.inside_port,
+                             outside_port=self.core_unit.outside_port, data_volumes=self.core_unit.data_volumes)
+        )
+        name = self.shared_container_name(fingerprint)
+        containers = runner.list(all=True, filters={"label": f"{SHARED_LABEL}={fingerprint}"})
+        if len(containers) == 0:
+            if "tmpfs" not in options and len(self.core_unit.data_volumes) > 0:
+                options["volumes"] = dict(self.data_volumes(runner=runner, network_name=network_name,
+                                                            shared=fingerprint), **options.get("volumes", {}))
+            try:
+                with tracing.span("container create/start", container=name, **self.trace_tags):
+                    self._run_with_alias(runner=runner, network_name=network_name, image=image,
+                                         environment=environment, name=name, labels={SHARED_LABEL: fingerprint},
+                                         **options)
+                print(f"{alias} started as the shared container {name}")
+                return None
+            except APIError as e:
+                if e.status_code != 409:
+                    raise
+                # another seating plan started the same container at the same time
+                containers = runner.list(all=True, filters={"label": f"{SHARED_LABEL}={fingerprint}"})
+        container = containers[0]
+        with tracing.span("shared attach", container=name, **self.trace_tags):
+            if container.status != "running":
+                container.start()
+            if network_name not in holders(container):
+                runner.client.networks.get(network_name).connect(container, aliases=[alias])
+        print(f"{alias} is the shared container {name}, used by {', '.join(holders(container))}")
+
+    def _run_with_alias(self, runner: "ContainerCollection", network_name: str, image: str,
+                        environment: Dict[str, str], volumes: Optional[Dict[str, dict]] = None, command=None,
+                        nano_cpus: Optional[int] = None, mem_limit: Optional[int] = None,
+                        tmpfs: Optional[Dict[str, str]] = None, name: Optional[str] = None,
+                        labels: Optional[Dict[str, str]] = None) -> None:
+        """
+        Runs the container with its labels and its network alias, which the high level API cannot set when the
+        container is created.
+
+        :param runner: the runner of the network to run the container in.
+        :param network_name: the name of the network to run the container in.
+        :param image: the image to run
+        :param environment: the environment variables of the container
+        :param volumes: the data volumes and the bind mounts of the live source in dev mode
+        :param command: the command run instead of the image command in dev mode
+        :param nano_cpus: the most cores the container may use in billionths of a core
+        :param mem_limit: the most bytes of memory the container may use
+        :param tmpfs: the tmpfs mounts of the data directories in the ephemeral profile
+        :param name: the name of the container, defaults to the container name of the build
+        :param labels: the labels of the container, defaults to the labels of the build
+        :return: None
+        """
+        api = runner.client.api
+        port_bindings = None
+        exposed_ports = None
+        if self.core_unit.outside_port is not None:
+            port_bindings = {self.core_unit.inside_port: ('0.0.0.0', self.core_unit.outside_port)}
+            exposed_ports = [self.core_unit.inside_port]
+        host_config = api.create_host_config(port_bindings=port_bindings, binds=volumes, network_mode=network_name,
+                                             nano_cpus=nano_cpus, mem_limit=mem_limit, tmpfs=tmpfs)
+        networking_config = api.create_networking_config({
+            network_name: api.create_endpoint_config(
+                aliases=[self.core_unit.network_alias or self.core_unit.default_container_name]
+            )
+        })
+        container = api.create_container(
             image=image,
-            environment=self.core_unit.config,
-            detach=True,
-            network=network_name,
-            name=self.core_unit.default_container_name,
-            ports=ports,
+            environment=environment,
+            name=self.core_unit.default_container_name if name is None else name,
+            ports=exposed_ports,
+            labels=self.core_unit.labels if labels is None else labels,
+            command=command,
+            host_config=host_config,
+            networking_config=networking_config,
         )
+        api.start(container["Id"])
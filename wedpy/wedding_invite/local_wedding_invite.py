@@ -2,14 +2,18 @@
 This file defines the LocalWeddingInvite class  which is used to build and run the local wedding invite for the
 main repo but not the dependencies' wedding invites.
 """
-from multiprocessing import Pool
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
 
-from docker.client import ContainerCollection
-from tqdm import tqdm
+from wedpy.builder_pool import BuildJob
+from wedpy.instance import Instance
+from wedpy.selection import Selection
+from wedpy.wedding_invite.build import DEFAULT_PROFILE, Build
+from wedpy.wedding_invite.wedding_invite import WeddingInvite, build_in_order, build_in_pool
 
-from wedpy.wedding_invite.build import Build
-from wedpy.wedding_invite.wedding_invite import WeddingInvite
+if TYPE_CHECKING:
+    from docker.models.containers import ContainerCollection
+
+    from wedpy.snapshot import VolumeSnapshots
 
 
 class LocalWeddingInvite:
@@ -19,74 +23,97 @@ class LocalWeddingInvite:
 
     Attributes:
         local_wedding_invite (WeddingInvite): the loaded local wedding invite
-        num_processes (int): number of processes to use for building images
+        num_processes (Optional[int]): the most processes to use for building images, None to use as many as the
+                                       host capacity allows
     """
-    def __init__(self, local_wedding_invite_path: str, num_processes: int = 4) -> None:
+    def __init__(self, local_wedding_invite_path: str, num_processes: Optional[int] = None,
+                 instance: Optional[Instance] = None) -> None:
         """
         The constructor for the LocalWeddingInvite class.
 
         :param local_wedding_invite_path: path to the local wedding invite yaml file
-        :param num_processes: number of processes to use for building images
+        :param num_processes: the most processes to use for building images, defaults to what the host capacity
+                              allows
+        :param instance: the instance the containers are namespaced to
         """
         self.local_wedding_invite: WeddingInvite = WeddingInvite.from_yaml(filename=local_wedding_invite_path)
-        self.num_processes: int = num_processes
+        if instance is not None:
+            instance.namespace(self.local_wedding_invite)
+        self.num_processes: Optional[int] = num_processes
 
-    def build_images(self, dev: bool = False) -> None:
+    @property
+    def has_builds(self) -> bool:
+        return len(self.local_wedding_invite.builds) + len(self.local_wedding_invite.init_builds) > 0
+
+    def select(self, selection: Selection) -> None:
         """
-        Builds the docker images for the local wedding invite.
+        Drops the builds of the local wedding invite that are not part of a resolved selection.
 
-        :param dev: whether or not to build the main images
+        :param selection: the resolved selection
         :return: None
         """
-        package_root = "."
-        total_builds: List[Build] = self.local_wedding_invite.builds + self.local_wedding_invite.init_builds
-        total_num = len(total_builds)
+        selection.filter(self.local_wedding_invite)
 
-        with Pool(processes=self.num_processes) as pool:
-            results = []
-            for build in total_builds:
-                if dev is True and build.core_unit.main is True:
-                    total_num -= 1
-                else:
-                    results.append(pool.apply_async(build.build_image, args=(package_root, None, False)))
+    def build_images(self, dev: bool = False) -> None:
+        """
+        Builds the docker images for the local wedding invite.
 
-            # Wait for all processes to finish
-            for result in tqdm(results, desc=f"{self.local_wedding_invite.package_name} builds", unit="item",
-                               total=total_num):
-                result.get()
+        :param dev: whether or not to skip the main images without dev mounts
+        :return: None
+        """
+        build_in_pool(self._builds(dev=dev), args=(".", None, False),
+                      desc=f"{self.local_wedding_invite.package_name} builds", processes=self.num_processes)
 
     def build_images_without_pool(self, dev: bool = False) -> None:
         """
         Builds the docker images for the local wedding invite.
 
-        :param dev: whether or not to build the main images
+        :param dev: whether or not to skip the main images without dev mounts
         :return: None
         """
-        package_root = "."
-        total_builds: List[Build] = self.local_wedding_invite.builds + self.local_wedding_invite.init_builds
+        build_in_order(self._builds(dev=dev), args=(".", None, False),
+                       desc=f"{self.local_wedding_invite.package_name} builds")
+
+    def build_jobs(self, dev: bool = False) -> List[BuildJob]:
+        """
+        Gets the builds of the local wedding invite as jobs for the builder pool.
+
+        :param dev: whether or not to skip the main builds without dev mounts
+        :return: the build jobs
+        """
+        return [BuildJob(build=build, package_root=".") for build in self._builds(dev=dev)]
 
-        for build in total_builds:
-            if dev is True and build.core_unit.main is True:
-                continue
-            else:
-                build.build_image(package_root=package_root, tag=None, remote=False)
+    def _builds(self, dev: bool = False) -> List[Build]:
+        """
+        Gets the builds and init builds of the local wedding invite.
+
+        :param dev: whether or not to skip the main builds without dev mounts
+        :return: the builds
+        """
+        total_builds: List[Build] = self.local_wedding_invite.builds + self.local_wedding_invite.init_builds
+        return [build for build in total_builds if not (dev is True and build.skipped_in_dev is True)]
 
-    def run_containers(self, runner: ContainerCollection, network_name: str, dev: bool = False) -> None:
+    def run_containers(self, runner: "ContainerCollection", network_name: str, dev: bool = False,
+                       snapshots: Optional["VolumeSnapshots"] = None, profile: str = DEFAULT_PROFILE) -> None:
         """
         Runs the containers for the local wedding invite.
 
         :param runner: the docker client container collection
         :param network_name: the name of the docker network to connect the containers to
-        :param dev: whether or not to run the main containers
+        :param dev: whether or not to run the main containers, main builds with dev mounts are run with their live
+                    source mounted
+        :param snapshots: if given, the data volumes are restored from or snapshotted into them
+        :param profile: the storage profile the containers are run with
         :return:
         """
         if dev is True:
             buffer = []
             for build in self.local_wedding_invite.builds:
-                if build.core_unit.main is False:
+                if build.skipped_in_dev is False:
                     buffer.append(build)
             self.local_wedding_invite.builds = buffer
-        self.local_wedding_invite.run_containers(runner=runner, network_name=network_name)
+        self.local_wedding_invite.run_containers(runner=runner, network_name=network_name, dev=dev,
+                                                 snapshots=snapshots, profile=profile)
 
     def destroy_init_containers(self) -> None:
         """
@@ -2,17 +2,143 @@
 This file defines the WeddingInvite class which is responsible for building the images for a package.
 """
 import os
+import threading
 import time
-from multiprocessing import Pool
-from typing import List
-
-import docker
-import yaml
-from docker.client import ContainerCollection
-from tqdm import tqdm
+from typing import TYPE_CHECKING, List, Optional
 
+from wedpy import tracing
+from wedpy.capacity import CapacityLimiter
 from wedpy.core_unit import CoreUnit
-from wedpy.wedding_invite.build import Build
+from wedpy.docker_client import engine_enabled, get_client
+from wedpy.failures import FAIL_FAST, BuildFailures, RetryPolicy, failure_policy
+from wedpy.plan_cache import load_yaml
+from wedpy.wedding_invite.build import DEFAULT_PROFILE, Build
+
+if TYPE_CHECKING:
+    from multiprocessing.pool import Pool
+    from queue import Queue
+
+    from docker.models.containers import ContainerCollection
+
+    from wedpy.snapshot import VolumeSnapshots
+
+
+# seconds to wait after starting the containers of a package before starting its init containers
+INIT_CONTAINER_DELAY = 10
+
+
+def submit_build(pool: "Pool", limiter: CapacityLimiter, build: Build, args: tuple, retry: RetryPolicy,
+                 finished: "Queue", cancelled: Optional[threading.Event] = None) -> bool:
+    """
+    Waits until the host has the capacity for a build and then hands the build to the pool, giving the capacity back
+    once the build finishes or fails. The build is retried in its worker while it fails with a transient error and
+    is put on the finished queue with the error it failed with, if any.
+
+    :param pool: the pool of processes running the builds
+    :param limiter: the capacity of the host
+    :param build: the build to run
+    :param args: the arguments passed to build_image
+    :param retry: the retries of the build
+    :param finished: the queue the build and its error are put on once it finishes
+    :param cancelled: set once the build fails, and if it is set while waiting for capacity the build is not handed
+                      to the pool
+    :return: True if the build was handed to the pool
+    """
+    demand = build.build_demand(remote=args[2])
+    limiter.acquire(demand)
+    if cancelled is not None and cancelled.is_set():
+        limiter.release(demand)
+        return False
+
+    def done(_) -> None:
+        limiter.release(demand)
+        finished.put((build, None))
+
+    def failed(error: BaseException) -> None:
+        limiter.release(demand)
+        if cancelled is not None:
+            cancelled.set()
+        finished.put((build, error))
+
+    pool.apply_async(retry.call, args=(f"{build.core_unit.default_image_tag} build", build.build_image) + args,
+                     callback=done, error_callback=failed)
+    return True
+
+
+def build_in_pool(builds: List[Build], args: tuple, desc: str, processes: Optional[int] = None) -> None:
+    """
+    Builds images in a pool of processes under the failure policy set in the environment. With fail-fast, the first
+    failure cancels the builds still queued or running. With keep-going, every build runs and every failure is
+    reported together.
+
+    :param builds: the builds to run
+    :param args: the arguments passed to build_image
+    :param desc: the description of the progress bar
+    :param processes: the number of processes, defaults to what the host capacity allows
+    :return: None
+    """
+    from multiprocessing import Pool
+    from queue import Queue
+    from tqdm import tqdm
+
+    policy = failure_policy()
+    retry = RetryPolicy.from_env()
+    limiter = CapacityLimiter()
+    if processes is None:
+        processes = max(1, min(limiter.max_workers, len(builds)))
+
+    finished: Queue = Queue()
+    cancelled = threading.Event() if policy == FAIL_FAST else None
+    failures: List[str] = []
+    done: List[Build] = []
+
+    # leaving the pool terminates it, which cancels the builds still queued or running after a fail-fast failure
+    with Pool(processes=processes) as pool, tqdm(total=len(builds), desc=desc, unit="item") as progress:
+        submitted = 0
+        for build in builds:
+            if submit_build(pool, limiter, build, args, retry, finished, cancelled=cancelled) is False:
+                break
+            submitted += 1
+
+        while len(done) < submitted and not (cancelled is not None and len(failures) > 0):
+            build_done, error = finished.get()
+            done.append(build_done)
+            if error is None:
+                progress.update(1)
+            else:
+                failures.append(f"{build_done.core_unit.default_image_tag}: {error}")
+
+    if len(failures) > 0:
+        raise BuildFailures(failures=failures, cancelled=[
+            build.core_unit.default_image_tag for build in builds if not any(build is d for d in done)
+        ])
+
+
+def build_in_order(builds: List[Build], args: tuple, desc: str) -> None:
+    """
+    Builds images one after the other under the failure policy set in the environment.
+
+    :param builds: the builds to run
+    :param args: the arguments passed to build_image
+    :param desc: the description of the progress bar
+    :return: None
+    """
+    from tqdm import tqdm
+
+    policy = failure_policy()
+    retry = RetryPolicy.from_env()
+    failures: List[str] = []
+    for index, build in enumerate(tqdm(builds, desc=desc, unit="item")):
+        tag = build.core_unit.default_image_tag
+        try:
+            retry.call(f"{tag} build", build.build_image, *args)
+        except Exception as e:
+            failures.append(f"{tag}: {e}")
+            if policy == FAIL_FAST:
+                raise BuildFailures(failures=failures,
+                                    cancelled=[b.core_unit.default_image_tag for b in builds[index + 1:]])
+    if len(failures) > 0:
+        raise BuildFailures(failures=failures)
 
 
 class WeddingInvite:
@@ -32,8 +158,12 @@ class WeddingInvite:
         :param init_build_dicts: init build dicts loaded from the wedding invite yaml file
         :param package_name: the name of the package loaded from the wedding invite yaml file
         """
-        self.builds: List[Build] = [Build(unit=CoreUnit.from_dict(b)) for b in build_dicts]
-        self.init_builds: List[Build] = [Build(unit=CoreUnit.from_dict(b)) for b in init_build_dicts]
+        self.builds: List[Build] = [
+            Build(unit=CoreUnit.from_dict(b), package_name=package_name) for b in build_dicts
+        ]
+        self.init_builds: List[Build] = [
+            Build(unit=CoreUnit.from_dict(b), package_name=package_name, init=True) for b in init_build_dicts
+        ]
         self.package_name: str = package_name
 
     def build_images(self, venue_path: str, remote: bool = False) -> None:
@@ -45,18 +175,8 @@ class WeddingInvite:
         :return: None
         """
         package_root = str(os.path.join(venue_path, self.package_name))
-
-        total_builds: List[Build] = self.builds + self.init_builds
-
-        with Pool(processes=4) as pool:
-            results = []
-            for build in total_builds:
-                results.append(pool.apply_async(build.build_image, args=(package_root, None, remote)))
-
-            # Wait for all processes to finish
-            for result in tqdm(results, desc=f"{self.package_name} builds", unit="item",
-                               total=len(total_builds)):
-                result.get()
+        build_in_pool(self.builds + self.init_builds, args=(package_root, None, remote),
+                      desc=f"{self.package_name} builds")
 
     def build_images_without_pool(self, venue_path: str, remote: bool = False) -> None:
         """
@@ -67,25 +187,80 @@ class WeddingInvite:
         :return: None
         """
         package_root = str(os.path.join(venue_path, self.package_name))
+        build_in_order(self.builds + self.init_builds, args=(package_root, None, remote),
+                       desc=f"{self.package_name} builds")
 
-        total_builds: List[Build] = self.builds + self.init_builds
+    def run_containers(self, runner: "ContainerCollection", network_name: str, remote: bool = False,
+                       dev: bool = False, package_root: str = ".",
+                       snapshots: Optional["VolumeSnapshots"] = None, profile: str = DEFAULT_PROFILE) -> None:
+        """
+        Runs the containers defined in the wedding invite.
 
-        for build in tqdm(total_builds, desc=f"{self.package_name} builds", unit="item"):
-            build.build_image(package_root, None, remote)
+        :param runner: the docker client container collection
+        :param network_name: the name of the docker network to connect the containers to
+        :param remote: whether to run the images from the registry instead of the locally built ones
+        :param dev: whether to mount the live source of builds with dev mounts
+        :param package_root: root directory of the package, used to resolve the dev mounts
+        :param snapshots: if given, the data volumes are restored from a snapshot instead of running the init
+                          containers, or a snapshot is taken once the init containers succeed
+        :param profile: the storage profile the containers are run with
+        :return: None
+        """
+        fingerprint = None
+        if snapshots is not None and len(snapshots.stateful_builds(self)) > 0:
+            fingerprint = snapshots.fingerprint(self, runner.client, remote=remote)
+            if snapshots.has(self, fingerprint) is True:
+                snapshots.restore(self, runner=runner, network_name=network_name, fingerprint=fingerprint,
+                                  remote=remote)
+                self._run_builds(self.builds, desc=f"{self.package_name} running containers", runner=runner,
+                                 network_name=network_name, remote=remote, dev=dev, package_root=package_root,
+                                 profile=profile)
+                print(f"{self.package_name} restored from its snapshot, init containers skipped")
+                return None
+        self._run_builds(self.builds, desc=f"{self.package_name} running containers", runner=runner,
+                         network_name=network_name, remote=remote, dev=dev, package_root=package_root, profile=profile)
+        with tracing.span("readiness wait", package=self.package_name):
+            time.sleep(INIT_CONTAINER_DELAY)
+        self._run_builds(self.init_builds, desc=f"{self.package_name} running init containers", runner=runner,
+                         network_name=network_name, remote=remote, dev=dev, package_root=package_root, profile=profile)
+        if fingerprint is not None:
+            snapshots.save(self, runner=runner, fingerprint=fingerprint)
 
-    def run_containers(self, runner: ContainerCollection, network_name: str, remote: bool = False) -> None:
+    @staticmethod
+    def _run_builds(builds: List[Build], desc: str, runner: "ContainerCollection", network_name: str, remote: bool,
+                    dev: bool, package_root: str, profile: str) -> None:
         """
-        Runs the containers defined in the wedding invite.
+        Runs the containers of builds, one at a time through docker-py or all at once over the asyncio engine client
+        when it is switched on. Shareable builds are always run through docker-py.
 
+        :param builds: the builds to run
+        :param desc: the description of the progress bar
         :param runner: the docker client container collection
         :param network_name: the name of the docker network to connect the containers to
+        :param remote: whether to run the images from the registry instead of the locally built ones
+        :param dev: whether to mount the live source of builds with dev mounts
+        :param package_root: root directory of the package, used to resolve the dev mounts
+        :param profile: the storage profile the containers are run with
         :return: None
         """
-        for build in tqdm(self.builds, desc=f"{self.package_name} running containers", unit="item"):
-            build.run_container(runner=runner, network_name=network_name, remote=remote)
-        time.sleep(10)
-        for build in tqdm(self.init_builds, desc=f"{self.package_name} running init containers", unit="item"):
-            build.run_container(runner=runner, network_name=network_name, remote=remote)
+        from tqdm import tqdm
+
+        if engine_enabled() is False:
+            for build in tqdm(builds, desc=desc, unit="item"):
+                build.run_container(runner=runner, network_name=network_name, remote=remote, dev=dev,
+                                    package_root=package_root, profile=profile)
+            return None
+        from wedpy import fanout
+
+        with tqdm(total=len(builds), desc=desc, unit="item") as progress:
+            for build in builds:
+                if build.core_unit.shareable is True:
+                    build.run_container(runner=runner, network_name=network_name, remote=remote, dev=dev,
+                                        package_root=package_root, profile=profile)
+                    progress.update(1)
+            fanout.run(fanout.run_builds, [build for build in builds if build.core_unit.shareable is False],
+                       network_name=network_name, remote=remote, dev=dev, package_root=package_root, profile=profile,
+                       progress=lambda: progress.update(1))
 
     def destroy_init_containers(self) -> None:
         """
@@ -93,10 +268,17 @@ class WeddingInvite:
 
         :return: None
         """
-        client = docker.from_env()
+        from docker.errors import NotFound
+
+        client = get_client()
         for build in self.init_builds:
-            container = client.containers.get(build.core_unit.default_container_name)
-            container.remove(force=True)
+            with tracing.span("teardown", container=build.core_unit.default_container_name, **build.trace_tags):
+                try:
+                    container = client.containers.get(build.core_unit.default_container_name)
+                except NotFound:
+                    # not run because the package was restored from a snapshot
+                    continue
+                container.remove(force=True)
             print(f"{build.core_unit.default_container_name} destroyed successfully.")
 
     def wipe_images(self) -> None:
@@ -118,8 +300,8 @@ class WeddingInvite:
         :param filename: the path to the yaml file
         :return: a WeddingInvite object
         """
-        with open(filename, 'r') as f:
-            data = yaml.safe_load(f)
+        with tracing.span("invite parse", file=filename):
+            data = load_yaml(filename)
         return cls(build_dicts=data.get('builds', []),
                    init_build_dicts=data.get('init_builds', []),
                    package_name=data['package_name'])